@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Cached Admin Authorization
+In-memory snapshot of active admins and their permissions, loaded at startup
+and refreshed on a TTL or immediately when Postgres NOTIFYs a change to
+admin_users. Admin checks are pure memory lookups
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Optional
+
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+ADMIN_CACHE_TTL_SECONDS = float(os.environ.get("ADMIN_CACHE_TTL_SECONDS", "300"))
+ADMIN_NOTIFY_CHANNEL = "admin_users_changed"
+
+# FALLBACK PROTECTION: Hardcoded admin IDs as safety net
+FALLBACK_ADMIN_IDS = frozenset({6630727156, 7057240608})  # @torah_support, @zohan
+
+# Default full permissions for fallback admins
+FALLBACK_PERMISSIONS = {
+    "can_send_broadcasts": True,
+    "can_test_broadcasts": True,
+    "can_manage_users": True,
+    "can_view_stats": True,
+    "can_manage_schedule": True
+}
+
+LOAD_ADMINS_SQL = """
+    SELECT telegram_user_id, permissions FROM admin_users
+    WHERE is_active = TRUE
+"""
+
+# Statement-level trigger: one notification per changing statement, not per row
+NOTIFY_TRIGGER_SQL = f"""
+    CREATE OR REPLACE FUNCTION notify_admin_users_changed() RETURNS trigger AS $$
+    BEGIN
+        PERFORM pg_notify('{ADMIN_NOTIFY_CHANNEL}', TG_OP);
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    DO $$
+    BEGIN
+        IF NOT EXISTS (
+            SELECT 1 FROM pg_trigger
+            WHERE tgname = 'admin_users_notify' AND tgrelid = 'admin_users'::regclass
+        ) THEN
+            CREATE TRIGGER admin_users_notify
+                AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON admin_users
+                FOR EACH STATEMENT EXECUTE FUNCTION notify_admin_users_changed();
+        END IF;
+    END;
+    $$;
+"""
+
+
+def _parse_permissions(raw: Any) -> Dict[str, bool]:
+    if not raw:
+        return {}
+    if isinstance(raw, dict):
+        return raw
+    try:
+        return json.loads(raw)
+    except (TypeError, ValueError):
+        logger.warning(f"⚠️ Ignoring malformed admin permissions: {raw!r}")
+        return {}
+
+
+class AdminAuthCache:
+    """Admin/permission snapshot with TTL refresh and LISTEN/NOTIFY invalidation"""
+
+    def __init__(self, ttl_seconds: float = ADMIN_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._pool = None
+        self._dsn: Optional[str] = None
+        # telegram_user_id -> permissions; None until the first successful load
+        self._admins: Optional[Dict[int, Dict[str, bool]]] = None
+        self._loaded_at = 0.0
+        self._listener: Optional[asyncpg.Connection] = None
+        self._changed: Optional[asyncio.Event] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.stats = {"refreshes": 0, "refresh_errors": 0, "notifications": 0}
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._admins is not None
+
+    async def start(self, pool=None, dsn: Optional[str] = None):
+        """Load the snapshot and start refreshing it (safe to call repeatedly)"""
+        if self._refresh_task is not None:
+            return
+        if pool is None:
+            from src.core.db_pool import get_shared_pool
+            pool = await get_shared_pool("default")
+        if dsn is None:
+            from src.core.db_pool import get_pool_manager
+            dsn = get_pool_manager().config.url
+        self._pool = pool
+        self._dsn = dsn
+        self._changed = asyncio.Event()
+
+        try:
+            await self._pool.execute(NOTIFY_TRIGGER_SQL)
+        except Exception as e:
+            # Without the trigger changes still arrive via the TTL refresh
+            logger.warning(f"⚠️ Could not install admin_users notify trigger: {e}")
+
+        await self.refresh()
+        await self._start_listener()
+        self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def refresh(self) -> bool:
+        """Reload the snapshot; on failure the last known snapshot is kept"""
+        try:
+            rows = await self._pool.fetch(LOAD_ADMINS_SQL)
+        except Exception as e:
+            self.stats["refresh_errors"] += 1
+            logger.error(f"❌ Admin snapshot refresh failed: {e}")
+            return False
+        self._admins = {row["telegram_user_id"]: _parse_permissions(row["permissions"]) for row in rows}
+        self._loaded_at = time.monotonic()
+        self.stats["refreshes"] += 1
+        logger.info(f"👑 Admin snapshot loaded: {len(self._admins)} active admins")
+        return True
+
+    def invalidate(self):
+        """Request an immediate refresh (e.g. after changing admin_users from this process)"""
+        if self._changed is not None:
+            self._changed.set()
+
+    def _on_notify(self, connection, pid, channel, payload):
+        self.stats["notifications"] += 1
+        self.invalidate()
+
+    async def _start_listener(self):
+        if not self._dsn:
+            return
+        try:
+            self._listener = await asyncpg.connect(self._dsn)
+            await self._listener.add_listener(ADMIN_NOTIFY_CHANNEL, self._on_notify)
+        except Exception as e:
+            self._listener = None
+            logger.warning(f"⚠️ Admin change listener unavailable, relying on {self.ttl_seconds:.0f}s TTL: {e}")
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=self.ttl_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._changed.clear()
+            await self.refresh()
+            if self._listener is None or self._listener.is_closed():
+                # Notifications may have been missed while disconnected - the refresh above covers them
+                await self._start_listener()
+
+    def _use_fallback(self, telegram_user_id: int) -> bool:
+        # No snapshot yet (DB unavailable) or empty admin_users table (fresh production DB)
+        return telegram_user_id in FALLBACK_ADMIN_IDS and not self._admins
+
+    def is_admin(self, telegram_user_id: int) -> bool:
+        if self._admins is not None and telegram_user_id in self._admins:
+            return True
+        return self._use_fallback(telegram_user_id)
+
+    def get_permissions(self, telegram_user_id: int) -> Dict[str, bool]:
+        if self._admins is not None:
+            permissions = self._admins.get(telegram_user_id)
+            if permissions:
+                return dict(permissions)
+        if self._use_fallback(telegram_user_id):
+            return dict(FALLBACK_PERMISSIONS)
+        return {}
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "loaded": self.is_loaded,
+            "admins": len(self._admins) if self._admins is not None else 0,
+            "age_seconds": round(time.monotonic() - self._loaded_at, 1) if self.is_loaded else None,
+            "listening": self._listener is not None and not self._listener.is_closed(),
+            **self.stats
+        }
+
+    async def stop(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+        if self._listener is not None:
+            try:
+                await self._listener.close()
+            except Exception:
+                pass
+            self._listener = None
+
+    async def cleanup(self):
+        """ServiceContainer cleanup hook"""
+        await self.stop()
+
+
+# Global admin authorization cache
+_admin_cache = AdminAuthCache()
+
+
+def get_admin_cache() -> AdminAuthCache:
+    """Get global admin authorization cache"""
+    return _admin_cache
@@ -7,14 +7,47 @@ import json
 import logging
 import asyncio
 import asyncpg
+import base64
+import ipaddress
 import os
-from datetime import datetime, timezone
-from typing import Dict, Any, Optional
+import queue
+import threading
+import time
+
+from src.core.db_pool import get_shared_pool
+from src.core.partition_manager import (
+    PARTITION_MAINTENANCE_LOCK_ID, PARTITIONED_TABLES, is_partitioned, maintain_table
+)
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple
 from dataclasses import dataclass, asdict
 from enum import Enum
 
 logger = logging.getLogger(__name__)
 
+# Batched writer tuning: flush after AUDIT_BATCH_SIZE events or AUDIT_FLUSH_MS, whichever first
+AUDIT_QUEUE_SIZE = int(os.environ.get("AUDIT_QUEUE_SIZE", "1000"))
+AUDIT_BATCH_SIZE = int(os.environ.get("AUDIT_BATCH_SIZE", "200"))
+AUDIT_FLUSH_MS = int(os.environ.get("AUDIT_FLUSH_MS", "250"))
+AUDIT_FALLBACK_FILE = os.environ.get("AUDIT_FALLBACK_FILE", "audit.log")
+
+# History pages are keyset-paginated on (timestamp, id); no OFFSET scans
+AUDIT_PAGE_SIZE_MAX = 500
+AUDIT_EXPORT_PAGE_SIZE = 500
+
+# Single-column indexes replaced by the (filter, timestamp, id) composites
+SUPERSEDED_AUDIT_INDEXES = ("idx_audit_event_type", "idx_audit_user", "idx_audit_resource")
+
+AUDIT_HISTORY_COLUMNS = """
+    id, timestamp, event_type, user_identifier, action, resource, details,
+    host(ip_address) AS ip_address, user_agent, success, error_message, session_id
+"""
+
+AUDIT_COPY_COLUMNS = (
+    "timestamp", "event_type", "user_identifier", "action", "resource", "details",
+    "ip_address", "user_agent", "success", "error_message", "session_id"
+)
+
 class AuditEventType(Enum):
     """Types of auditable events"""
     ADMIN_LOGIN = "admin_login"
@@ -48,27 +81,176 @@ class AuditEvent:
         data['event_type'] = self.event_type.value
         return data
 
+def _inet(value: Optional[str]):
+    """Parse an IP for the INET column; unparseable values become NULL instead of failing the batch"""
+    if not value:
+        return None
+    try:
+        return ipaddress.ip_address(value)
+    except ValueError:
+        return None
+
+def encode_audit_cursor(timestamp: datetime, row_id: int) -> str:
+    """Opaque cursor for the row a page ended on"""
+    raw = json.dumps([timestamp.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_audit_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of encode_audit_cursor; raises ValueError on malformed input"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except Exception as e:
+        raise ValueError(f"invalid audit cursor: {cursor!r}") from e
+
+@dataclass
+class AuditQuery:
+    """Supported audit history filters (each backed by a (column, timestamp, id) index)"""
+    event_type: Optional[AuditEventType] = None
+    user_identifier: Optional[str] = None
+    resource: Optional[str] = None
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    
+    def build(self, after: Optional[Tuple[datetime, int]], limit: int) -> Tuple[str, list]:
+        """SQL for one page newest-first, starting strictly after the `after` key"""
+        conditions: List[str] = []
+        params: list = []
+        
+        def add(template: str, value):
+            params.append(value)
+            conditions.append(template.format(f"${len(params)}"))
+        
+        if self.event_type:
+            add("event_type = {}", self.event_type.value)
+        if self.user_identifier:
+            add("user_identifier = {}", self.user_identifier)
+        if self.resource:
+            add("resource = {}", self.resource)
+        if self.since:
+            add("timestamp >= {}", self.since)
+        if self.until:
+            add("timestamp < {}", self.until)
+        if after:
+            params.extend(after)
+            conditions.append(f"(timestamp, id) < (${len(params) - 1}, ${len(params)})")
+        params.append(limit)
+        
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        query = f"""
+            SELECT {AUDIT_HISTORY_COLUMNS} FROM audit_log
+            {where}
+            ORDER BY timestamp DESC, id DESC
+            LIMIT ${len(params)}
+        """
+        return query, params
+
+def _history_row(row) -> Dict[str, Any]:
+    item = dict(row)
+    item["timestamp"] = item["timestamp"].isoformat()
+    if isinstance(item.get("details"), str):
+        try:
+            item["details"] = json.loads(item["details"])
+        except ValueError:
+            pass
+    return item
+
+class AuditFileWriter:
+    """Fallback audit sink: a background thread appends JSON lines through a buffered file,
+    so the event loop never blocks on disk I/O"""
+    
+    def __init__(self, path: str = AUDIT_FALLBACK_FILE, max_pending: int = 10000):
+        self.path = path
+        self._pending: "queue.Queue[Optional[str]]" = queue.Queue(maxsize=max_pending)
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+    
+    def submit(self, event: AuditEvent):
+        """Queue an event for the writer thread (never blocks)"""
+        self._ensure_started()
+        try:
+            self._pending.put_nowait(json.dumps(event.to_dict()) + "\n")
+        except queue.Full:
+            self.dropped += 1
+    
+    def _ensure_started(self):
+        if self._thread and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if not (self._thread and self._thread.is_alive()):
+                self._thread = threading.Thread(target=self._run, name="audit-file-writer", daemon=True)
+                self._thread.start()
+    
+    def _run(self):
+        stopping = False
+        while not stopping:
+            line = self._pending.get()
+            batch = []
+            # Drain whatever else is pending so one write/flush covers the burst
+            while line is not None:
+                batch.append(line)
+                try:
+                    line = self._pending.get_nowait()
+                except queue.Empty:
+                    break
+            stopping = line is None
+            if not batch:
+                continue
+            try:
+                with open(self.path, "a", encoding="utf-8", buffering=64 * 1024) as f:
+                    f.writelines(batch)
+                self.written += len(batch)
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"❌ Failed to log {len(batch)} audit events to file: {e}")
+    
+    def close(self, timeout: float = 5.0):
+        """Flush pending lines and stop the writer thread"""
+        if self._thread and self._thread.is_alive():
+            try:
+                self._pending.put(None, timeout=timeout)
+            except queue.Full:
+                pass
+            self._thread.join(timeout)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "pending": self._pending.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "errors": self.errors
+        }
+
 class AuditLogger:
     """Comprehensive audit logging system"""
     
+    CRITICAL_EVENT_TYPES = (
+        AuditEventType.SECURITY_EVENT,
+        AuditEventType.MANUAL_BROADCAST,
+        AuditEventType.SYSTEM_CONFIG_CHANGE
+    )
+    
     def __init__(self):
         self.database_url = os.getenv('DATABASE_URL')
         self._connection_pool = None
-        self._audit_queue = asyncio.Queue(maxsize=1000)  # Buffer for high-throughput logging
+        self._audit_queue = asyncio.Queue(maxsize=AUDIT_QUEUE_SIZE)  # Buffer for high-throughput logging
         self._processing_task = None
+        self._file_writer = AuditFileWriter()
         self._torah_logs_chat_id = int(os.environ.get("TORAH_LOGS_CHAT_ID", "-1003025527880"))
+        self.batch_size = max(1, AUDIT_BATCH_SIZE)
+        self.flush_interval = AUDIT_FLUSH_MS / 1000
+        self.stats = {"enqueued": 0, "written": 0, "batches": 0, "dropped": 0, "file_fallback": 0}
         
     async def initialize(self):
         """Initialize audit logging system"""
         try:
-            # Initialize database connection pool
+            # Audit writes use a capped sub-pool of the shared database pool
             if self.database_url:
-                self._connection_pool = await asyncpg.create_pool(
-                    self.database_url,
-                    min_size=1,
-                    max_size=5,
-                    command_timeout=30
-                )
+                self._connection_pool = await get_shared_pool("audit")
                 
                 # Ensure audit_log table exists
                 await self._ensure_audit_table()
@@ -88,9 +270,10 @@ class AuditLogger:
             if not self._connection_pool:
                 return
             async with self._connection_pool.acquire() as conn:
+                # Monthly partitions by timestamp; retention drops whole partitions
                 await conn.execute("""
                     CREATE TABLE IF NOT EXISTS audit_log (
-                        id SERIAL PRIMARY KEY,
+                        id BIGSERIAL,
                         timestamp TIMESTAMPTZ NOT NULL,
                         event_type VARCHAR(50) NOT NULL,
                         user_identifier VARCHAR(255) NOT NULL,
@@ -102,14 +285,18 @@ class AuditLogger:
                         success BOOLEAN NOT NULL DEFAULT true,
                         error_message TEXT,
                         session_id VARCHAR(255),
-                        created_at TIMESTAMPTZ DEFAULT NOW()
-                    );
-                    
-                    CREATE INDEX IF NOT EXISTS idx_audit_timestamp ON audit_log(timestamp);
-                    CREATE INDEX IF NOT EXISTS idx_audit_event_type ON audit_log(event_type);
-                    CREATE INDEX IF NOT EXISTS idx_audit_user ON audit_log(user_identifier);
-                    CREATE INDEX IF NOT EXISTS idx_audit_resource ON audit_log(resource);
+                        created_at TIMESTAMPTZ DEFAULT NOW(),
+                        PRIMARY KEY (id, timestamp)
+                    ) PARTITION BY RANGE (timestamp);
                 """)
+                for statement in PARTITIONED_TABLES["audit_log"].indexes:
+                    await conn.execute(statement)
+                for index_name in SUPERSEDED_AUDIT_INDEXES:
+                    await conn.execute(f"DROP INDEX IF EXISTS {index_name}")
+                if await is_partitioned(conn, "audit_log"):
+                    async with conn.transaction():
+                        await conn.execute("SELECT pg_advisory_xact_lock($1)", PARTITION_MAINTENANCE_LOCK_ID)
+                        await maintain_table(conn, PARTITIONED_TABLES["audit_log"])
                 logger.info("🔍 Audit log table ensured")
         except Exception as e:
             logger.error(f"❌ Failed to create audit log table: {e}")
@@ -146,78 +333,121 @@ class AuditLogger:
             # Add to queue for async processing
             try:
                 self._audit_queue.put_nowait(event)
+                self.stats["enqueued"] += 1
             except asyncio.QueueFull:
-                logger.warning("🔍 Audit queue full, dropping event")
-                # Log to file as fallback
-                await self._log_to_file(event)
+                self.stats["dropped"] += 1
+                if self.stats["dropped"] % 100 == 1:
+                    logger.warning(f"🔍 Audit queue full, diverting events to file ({self.stats['dropped']} so far)")
+                self._log_to_file([event])
                 
         except Exception as e:
             logger.error(f"❌ Failed to log audit event: {e}")
     
+    async def _fill_batch(self, batch: list):
+        """Wait for one event, then keep draining until batch_size events or flush_interval elapses"""
+        batch.append(await self._audit_queue.get())
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._audit_queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._audit_queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+    
     async def _process_audit_queue(self):
-        """Background task to process audit events"""
+        """Background task to process audit events in batches"""
         while True:
+            batch = []
+            stored = False
             try:
-                event = await self._audit_queue.get()
+                await self._fill_batch(batch)
                 
-                # Process event (database + notifications)
-                await self._store_event(event)
+                # Process batch (database + notifications)
+                await self._store_events(batch)
+                stored = True
                 
                 # Send critical events to Torah Logs chat
-                if event.event_type in [
-                    AuditEventType.SECURITY_EVENT, 
-                    AuditEventType.MANUAL_BROADCAST,
-                    AuditEventType.SYSTEM_CONFIG_CHANGE
-                ]:
-                    await self._notify_critical_event(event)
-                
-                self._audit_queue.task_done()
+                for event in batch:
+                    if event.event_type in self.CRITICAL_EVENT_TYPES:
+                        await self._notify_critical_event(event)
                 
+            except asyncio.CancelledError:
+                # Hand events not yet written to the file sink before shutting down
+                if batch and not stored:
+                    self._log_to_file(batch)
+                raise
             except Exception as e:
-                logger.error(f"❌ Error processing audit event: {e}")
+                logger.error(f"❌ Error processing audit events: {e}")
                 await asyncio.sleep(1)  # Prevent tight loop on persistent errors
+            finally:
+                for _ in batch:
+                    self._audit_queue.task_done()
     
-    async def _store_event(self, event: AuditEvent):
-        """Store audit event in database"""
+    async def _store_events(self, events: list):
+        """Store a batch of audit events in database with a single COPY"""
         try:
             if not self._connection_pool:
-                await self._log_to_file(event)
+                self._log_to_file(events)
                 return
-                
-            async with self._connection_pool.acquire() as conn:
-                await conn.execute("""
-                    INSERT INTO audit_log (
-                        timestamp, event_type, user_identifier, action, 
-                        resource, details, ip_address, user_agent, 
-                        success, error_message, session_id
-                    ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11)
-                """, 
+            
+            records = [
+                (
                     event.timestamp,
                     event.event_type.value,
                     event.user_identifier,
                     event.action,
                     event.resource,
                     json.dumps(event.details),
-                    event.ip_address,
+                    _inet(event.ip_address),
                     event.user_agent,
                     event.success,
                     event.error_message,
                     event.session_id
                 )
+                for event in events
+            ]
+            async with self._connection_pool.acquire() as conn:
+                await conn.copy_records_to_table("audit_log", records=records, columns=AUDIT_COPY_COLUMNS)
+            self.stats["written"] += len(events)
+            self.stats["batches"] += 1
                 
         except Exception as e:
-            logger.error(f"❌ Failed to store audit event in database: {e}")
+            logger.error(f"❌ Failed to store {len(events)} audit events in database: {e}")
             # Fallback to file logging
-            await self._log_to_file(event)
+            self._log_to_file(events)
     
-    async def _log_to_file(self, event: AuditEvent):
-        """Fallback logging to file"""
-        try:
-            audit_file = "audit.log"
-            with open(audit_file, "a", encoding="utf-8") as f:
-                f.write(json.dumps(event.to_dict()) + "\n")
-        except Exception as e:
-            logger.error(f"❌ Failed to log audit event to file: {e}")
+    def _log_to_file(self, events: list):
+        """Fallback logging to file (handed to the background writer thread)"""
+        self.stats["file_fallback"] += len(events)
+        for event in events:
+            self._file_writer.submit(event)
+    
+    def _drain_queue(self) -> list:
+        events = []
+        while True:
+            try:
+                events.append(self._audit_queue.get_nowait())
+            except asyncio.QueueEmpty:
+                return events
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth, throughput and drop counters"""
+        return {
+            "queue_depth": self._audit_queue.qsize(),
+            "queue_capacity": self._audit_queue.maxsize,
+            "batch_size": self.batch_size,
+            "flush_ms": int(self.flush_interval * 1000),
+            "database": self._connection_pool is not None,
+            **self.stats,
+            "file": self._file_writer.get_stats()
+        }
     
     async def _notify_critical_event(self, event: AuditEvent):
         """Send critical audit events to Torah Logs chat"""
@@ -265,6 +495,50 @@ class AuditLogger:
         except Exception as e:
             logger.error(f"❌ Failed to notify critical audit event: {e}")
     
+    async def query_audit_history(
+        self,
+        query: AuditQuery,
+        cursor: Optional[str] = None,
+        limit: int = 100
+    ) -> Dict[str, Any]:
+        """One page of audit history, newest first.
+        
+        Pass the returned next_cursor to get the following page; every page
+        is an index range scan, so cost does not grow with depth.
+        Raises ValueError for a malformed cursor.
+        """
+        after = decode_audit_cursor(cursor) if cursor else None
+        limit = max(1, min(limit, AUDIT_PAGE_SIZE_MAX))
+        if not self._connection_pool:
+            return {"items": [], "next_cursor": None}
+        
+        # Fetch one extra row to learn whether another page exists
+        sql, params = query.build(after, limit + 1)
+        async with self._connection_pool.acquire() as conn:
+            rows = await conn.fetch(sql, *params)
+        
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_audit_cursor(rows[-1]["timestamp"], rows[-1]["id"])
+        return {"items": [_history_row(row) for row in rows], "next_cursor": next_cursor}
+    
+    async def stream_audit_history(
+        self,
+        query: AuditQuery,
+        cursor: Optional[str] = None,
+        page_size: int = AUDIT_EXPORT_PAGE_SIZE
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield every matching event newest first, one keyset page at a time
+        (a connection is held per page only, never for the whole export)"""
+        while True:
+            page = await self.query_audit_history(query, cursor=cursor, limit=page_size)
+            for item in page["items"]:
+                yield item
+            cursor = page["next_cursor"]
+            if not cursor:
+                return
+    
     async def get_audit_history(
         self, 
         user_identifier: Optional[str] = None,
@@ -272,31 +546,15 @@ class AuditLogger:
         hours: int = 24,
         limit: int = 100
     ) -> list:
-        """Retrieve audit history"""
+        """Retrieve recent audit history (first page of query_audit_history)"""
         try:
-            if not self._connection_pool:
-                return []
-                
-            query = """
-                SELECT * FROM audit_log 
-                WHERE timestamp >= NOW() - INTERVAL $1 || ' hours'
-            """
-            params: list = [str(hours)]
-            
-            if user_identifier:
-                query += " AND user_identifier = $" + str(len(params) + 1)
-                params.append(user_identifier)
-                
-            if event_type:
-                query += " AND event_type = $" + str(len(params) + 1) 
-                params.append(event_type.value)
-                
-            query += " ORDER BY timestamp DESC LIMIT $" + str(len(params) + 1)
-            params.append(str(limit))
-            
-            async with self._connection_pool.acquire() as conn:
-                rows = await conn.fetch(query, *params)
-                return [dict(row) for row in rows]
+            query = AuditQuery(
+                event_type=event_type,
+                user_identifier=user_identifier,
+                since=datetime.now(timezone.utc) - timedelta(hours=hours)
+            )
+            page = await self.query_audit_history(query, limit=limit)
+            return page["items"]
                 
         except Exception as e:
             logger.error(f"❌ Failed to retrieve audit history: {e}")
@@ -307,9 +565,19 @@ class AuditLogger:
         try:
             if self._processing_task:
                 self._processing_task.cancel()
+                try:
+                    await self._processing_task
+                except asyncio.CancelledError:
+                    pass
+            
+            # Flush anything still queued: one last COPY, else the file sink
+            pending = self._drain_queue()
+            if pending:
+                await self._store_events(pending)
+            await asyncio.to_thread(self._file_writer.close)
                 
-            if self._connection_pool:
-                await self._connection_pool.close()
+            # The shared pool itself is closed by its owner (ServiceContainer)
+            self._connection_pool = None
                 
             logger.info("🔍 Audit logging system cleaned up")
             
@@ -327,6 +595,12 @@ async def get_audit_logger() -> AuditLogger:
         await _audit_logger.initialize()
     return _audit_logger
 
+def get_audit_stats() -> Dict[str, Any]:
+    """Audit writer stats for health checks (without forcing initialization)"""
+    if _audit_logger is None:
+        return {"initialized": False}
+    return _audit_logger.get_stats()
+
 # Convenience functions for common audit events
 async def log_admin_action(
     user_identifier: str,
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Adaptive Brownout Controller
+Watches rolling p95 latency and error rates of LLM and image calls and
+switches the bot into a cheaper degraded mode under pressure. While degraded
+a small share of real calls still goes upstream as probes, and the mode only
+recovers (with hysteresis) once those probes show healthy dependencies
+"""
+
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Share of degraded requests still sent upstream as recovery probes
+BROWNOUT_PROBE_SHARE = float(os.environ.get("BROWNOUT_PROBE_SHARE", "0.1"))
+# A probe is also let through when none ran for this long (low traffic)
+BROWNOUT_PROBE_INTERVAL = float(os.environ.get("BROWNOUT_PROBE_INTERVAL", "30"))
+
+
+@dataclass
+class BrownoutThresholds:
+    """Enter/exit thresholds for one dependency (exit < enter gives hysteresis)"""
+    enter_p95: float
+    exit_p95: float
+    enter_error_rate: float = 0.25
+    exit_error_rate: float = 0.10
+
+
+DEFAULT_THRESHOLDS = {
+    "llm": BrownoutThresholds(enter_p95=12.0, exit_p95=6.0),
+    "image": BrownoutThresholds(enter_p95=35.0, exit_p95=20.0),
+}
+
+
+class BrownoutController:
+    """Rolling-window health tracker that toggles degraded generation mode"""
+
+    def __init__(self, window_seconds: float = 300.0, min_samples: int = 8,
+                 min_dwell_seconds: float = 120.0, max_samples: int = 200,
+                 thresholds: Optional[Dict[str, BrownoutThresholds]] = None,
+                 enabled: bool = True, probe_share: float = BROWNOUT_PROBE_SHARE,
+                 probe_interval: float = BROWNOUT_PROBE_INTERVAL, min_probe_samples: int = 3):
+        self.window_seconds = window_seconds
+        self.min_samples = min_samples
+        self.min_dwell_seconds = min_dwell_seconds
+        self.thresholds = thresholds or dict(DEFAULT_THRESHOLDS)
+        self.enabled = enabled
+        self._samples: Dict[str, Deque[Tuple[float, float, bool]]] = {
+            name: deque(maxlen=max_samples) for name in self.thresholds
+        }
+        self.probe_every = max(1, round(1 / probe_share)) if probe_share > 0 else 0
+        self.probe_interval = probe_interval
+        self.min_probe_samples = min_probe_samples
+        self._degraded_calls: Dict[str, int] = {name: 0 for name in self.thresholds}
+        self._last_probe: Dict[str, float] = {name: 0.0 for name in self.thresholds}
+        self.probes = 0
+        self.active = False
+        self.reason = ""
+        self.changed_at = time.monotonic()
+        self.transitions = 0
+        # Dependencies that pushed us into brownout - recovery needs fresh samples from each
+        self._pressured: Set[str] = set()
+
+    def record(self, dependency: str, duration: float, success: bool):
+        """Record one real upstream call outcome and re-evaluate the mode"""
+        samples = self._samples.get(dependency)
+        if samples is None:
+            return
+        samples.append((time.monotonic(), duration, success))
+        self._evaluate()
+
+    def sampler(self, dependency: str) -> Callable[[float, bool], None]:
+        """Callback for the code that performs the real upstream call (once per call, not per waiter)"""
+        return lambda duration, success: self.record(dependency, duration, success)
+
+    def _window(self, dependency: str):
+        cutoff = time.monotonic() - self.window_seconds
+        samples = self._samples[dependency]
+        while samples and samples[0][0] < cutoff:
+            samples.popleft()
+        return samples
+
+    def dependency_stats(self, dependency: str) -> Dict[str, Any]:
+        """p95 latency and error rate over the rolling window"""
+        samples = self._window(dependency)
+        if not samples:
+            return {"samples": 0, "p95": 0.0, "error_rate": 0.0}
+        durations = sorted(duration for _, duration, _ in samples)
+        p95 = durations[min(len(durations) - 1, int(0.95 * len(durations)))]
+        errors = sum(1 for _, _, ok in samples if not ok)
+        return {"samples": len(samples), "p95": round(p95, 2), "error_rate": round(errors / len(samples), 3)}
+
+    def _evaluate(self):
+        if not self.enabled:
+            return
+
+        pressure = []
+        pressured = set()
+        healthy = True
+        for dependency, limits in self.thresholds.items():
+            stats = self.dependency_stats(dependency)
+            if stats["samples"] < self.min_samples:
+                continue
+            if stats["p95"] > limits.enter_p95:
+                pressure.append(f"{dependency} p95 {stats['p95']:.1f}s")
+                pressured.add(dependency)
+            if stats["error_rate"] > limits.enter_error_rate:
+                pressure.append(f"{dependency} errors {stats['error_rate']*100:.0f}%")
+                pressured.add(dependency)
+            if stats["p95"] > limits.exit_p95 or stats["error_rate"] > limits.exit_error_rate:
+                healthy = False
+
+        now = time.monotonic()
+        if not self.active and pressure:
+            self._pressured = pressured
+            self._transition(True, ", ".join(pressure), now)
+        elif (self.active and healthy and now - self.changed_at >= self.min_dwell_seconds
+              and self._has_recovery_evidence()):
+            self._transition(False, "probes show latency and error rates recovered", now)
+
+    def _has_recovery_evidence(self) -> bool:
+        """Samples aging out is not recovery - each pressured dependency needs calls made while degraded"""
+        for dependency in self._pressured:
+            recent = sum(1 for at, _, _ in self._samples[dependency] if at >= self.changed_at)
+            if recent < self.min_probe_samples:
+                return False
+        return True
+
+    def _transition(self, active: bool, reason: str, now: float):
+        self.active = active
+        self.reason = reason
+        self.changed_at = now
+        self.transitions += 1
+        for dependency in self._degraded_calls:
+            self._degraded_calls[dependency] = 0
+            self._last_probe[dependency] = now
+        if active:
+            logger.warning(f"🟠 BROWNOUT ON: {reason} - presets for images, pool quizzes, shorter completions")
+        else:
+            logger.info(f"🟢 BROWNOUT OFF: {reason} - full generation restored")
+
+    def _degrade(self, dependency: str) -> bool:
+        """True to serve the degraded path; every probe_every-th call (or one per probe_interval) goes upstream"""
+        if not self.active:
+            return False
+        self._degraded_calls[dependency] += 1
+        now = time.monotonic()
+        share_due = bool(self.probe_every) and self._degraded_calls[dependency] % self.probe_every == 0
+        if share_due or now - self._last_probe[dependency] >= self.probe_interval:
+            self._last_probe[dependency] = now
+            self.probes += 1
+            logger.info(f"🔎 Brownout probe: sending one {dependency} call upstream")
+            return False
+        return True
+
+    # === Degradation decisions ===
+
+    def prefer_preset_images(self) -> bool:
+        """Serve preset images instead of DALL-E (except recovery probes)"""
+        return self._degrade("image")
+
+    def pool_only_quizzes(self) -> bool:
+        """Serve quizzes from the curated pool instead of the LLM (except recovery probes)"""
+        return self._degrade("llm")
+
+    def max_completion_tokens(self, default: int) -> int:
+        """Shrink completion length while degraded"""
+        return max(150, int(default * 0.6)) if self.active else default
+
+    def get_status(self) -> Dict[str, Any]:
+        """Current mode and per-dependency window stats"""
+        return {
+            "enabled": self.enabled,
+            "active": self.active,
+            "reason": self.reason,
+            "since_seconds": round(time.monotonic() - self.changed_at, 1),
+            "transitions": self.transitions,
+            "probes": self.probes,
+            "dependencies": {name: self.dependency_stats(name) for name in self.thresholds}
+        }
+
+
+# Global brownout controller
+_brownout_controller = BrownoutController(
+    enabled=os.environ.get("BROWNOUT_ENABLED", "true").lower() == "true"
+)
+
+
+def get_brownout_controller() -> BrownoutController:
+    """Get global brownout controller"""
+    return _brownout_controller
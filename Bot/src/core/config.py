@@ -28,6 +28,9 @@ class DatabaseConfig:
     url: str
     pool_size: int = 10
     timeout: int = 30
+    min_pool_size: int = 2  # Warm connections kept open between broadcasts
+    statement_cache_size: int = 256
+    max_idle_seconds: float = 300.0
     
     @classmethod
     def from_env(cls) -> 'DatabaseConfig':
@@ -35,7 +38,10 @@ class DatabaseConfig:
         return cls(
             url=os.getenv('DATABASE_URL', ''),
             pool_size=int(os.getenv('DB_POOL_SIZE', '10')),
-            timeout=int(os.getenv('DB_TIMEOUT', '30'))
+            timeout=int(os.getenv('DB_TIMEOUT', '30')),
+            min_pool_size=int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+            statement_cache_size=int(os.getenv('DB_STATEMENT_CACHE_SIZE', '256')),
+            max_idle_seconds=float(os.getenv('DB_MAX_IDLE_SECONDS', '300'))
         )
 
 @dataclass
@@ -285,22 +291,32 @@ class AppConfig:
             }
         }
 
-# Global configuration instance
-config = AppConfig()
+# Global configuration instance - created on first use so that importing the
+# config dataclasses (e.g. DatabaseConfig) never depends on full validation
+_config: Optional[AppConfig] = None
+
+def __getattr__(name: str):
+    """Backward compatible module attribute `config`"""
+    if name == "config":
+        return get_config()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Convenience functions for common config access
 def get_config() -> AppConfig:
     """Get the global configuration instance"""
-    return config
+    global _config
+    if _config is None:
+        _config = AppConfig()
+    return _config
 
 def is_production() -> bool:
     """Quick check if running in production"""
-    return config.is_production()
+    return get_config().is_production()
 
 def is_development() -> bool:
     """Quick check if running in development"""
-    return config.is_development()
+    return get_config().is_development()
 
 def get_deployment_mode() -> DeploymentMode:
     """Get current deployment mode"""
-    return config.deployment_mode
\ No newline at end of file
+    return get_config().deployment_mode
\ No newline at end of file
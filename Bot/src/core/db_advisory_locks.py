@@ -11,6 +11,8 @@ from contextlib import asynccontextmanager
 from typing import Optional
 import hashlib
 
+from src.core.db_pool import get_shared_pool
+
 logger = logging.getLogger(__name__)
 
 class DBAdvisoryLockManager:
@@ -21,18 +23,14 @@ class DBAdvisoryLockManager:
         self._connection_pool = None
     
     async def get_connection_pool(self):
-        """Get or create connection pool"""
+        """Get the advisory lock sub-pool of the shared database pool"""
         if not self._connection_pool:
             if not self.database_url:
                 raise ValueError("DATABASE_URL environment variable not set")
             
-            self._connection_pool = await asyncpg.create_pool(
-                self.database_url,
-                min_size=1,
-                max_size=3,
-                command_timeout=60
-            )
-            logger.info("🔒 Advisory lock database pool created")
+            # Session-level locks pin a connection for the whole broadcast, so they get a capped sub-pool
+            self._connection_pool = await get_shared_pool("locks")
+            logger.info("🔒 Advisory lock database pool attached")
         
         return self._connection_pool
     
@@ -178,13 +176,10 @@ class DBAdvisoryLockManager:
             return []
     
     async def cleanup_connection_pool(self):
-        """Clean up connection pool on shutdown"""
+        """Detach from the shared pool on shutdown (the pool itself is owned by ServiceContainer)"""
         if self._connection_pool:
-            try:
-                await self._connection_pool.close()
-                logger.info("🔒 Advisory lock connection pool closed")
-            except Exception as e:
-                logger.error(f"❌ Error closing advisory lock pool: {e}")
+            self._connection_pool = None
+            logger.info("🔒 Advisory lock connection pool released")
 
 # Global lock manager instance
 _lock_manager = None
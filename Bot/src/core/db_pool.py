@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Shared asyncpg Pool Manager
+One warm, instrumented connection pool for the whole process, sized from
+DatabaseConfig and split into named logical sub-pools. Background sub-pools
+(broadcasts, audit writes, advisory locks, rate limits) also share one
+combined cap that leaves a reserved headroom for interactive "default"
+queries. Connection checkouts go through the postgres circuit breaker.
+Exposes acquire-wait histograms and saturation metrics
+"""
+
+import asyncio
+import logging
+import math
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import asyncpg
+
+from src.core.config import DatabaseConfig
+from src.core.resilience import RetryPolicy, get_dependency_guard
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the acquire-wait histogram buckets
+WAIT_BUCKETS: Tuple[float, ...] = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Share of the physical pool each logical sub-pool may hold (None = uncapped)
+# Background shares are per sub-pool; together they are bounded by the background cap below
+SUB_POOL_SHARES: Dict[str, Optional[float]] = {
+    "default": None,       # Interactive bot/admin queries
+    "broadcast": 0.6,      # Newsletter fan-out and content generation bookkeeping
+    "audit": 0.2,          # Background audit log writes
+    "locks": 0.2,          # Advisory locks hold a connection for the whole broadcast
+    "rate_limit": 0.2,     # Shared rate limit counters
+}
+
+# Share of the physical pool only "default" may use - background sub-pools combined never exceed the rest
+DEFAULT_RESERVED_SHARE = 0.3
+
+
+def background_limit(pool_size: int) -> int:
+    """Connections all background sub-pools may hold together (pool_size minus the default reserve)"""
+    if pool_size <= 1:
+        return 1  # Nothing to reserve in a single-connection pool
+    reserved = max(1, math.ceil(DEFAULT_RESERVED_SHARE * pool_size))
+    return max(1, pool_size - reserved)
+
+
+class WaitHistogram:
+    """Cumulative-bucket latency histogram (Prometheus style)"""
+
+    def __init__(self, buckets: Tuple[float, ...] = WAIT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Approximate quantile (bucket upper bound)"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        running = 0
+        for i, bucket_count in enumerate(self.counts):
+            running += bucket_count
+            if running >= target:
+                return self.buckets[i] if i < len(self.buckets) else float("inf")
+        return float("inf")
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """(le, cumulative count) pairs including +Inf"""
+        result, running = [], 0
+        for bound, bucket_count in zip(list(self.buckets) + [float("inf")], self.counts):
+            running += bucket_count
+            result.append(("+Inf" if math.isinf(bound) else str(bound), running))
+        return result
+
+
+class _SubPool:
+    """Concurrency cap and metrics for one logical sub-pool"""
+
+    def __init__(self, name: str, limit: Optional[int]):
+        self.name = name
+        self.limit = limit
+        self.semaphore = asyncio.Semaphore(limit) if limit else None
+        self.wait_histogram = WaitHistogram()
+        self.in_use = 0
+        self.waiting = 0
+        self.peak_in_use = 0
+        self.acquired = 0
+        self.timeouts = 0
+
+
+class _AcquireContext:
+    """Supports both `await pool.acquire()` and `async with pool.acquire()`"""
+
+    def __init__(self, manager: "PoolManager", sub_pool: str, timeout: Optional[float]):
+        self.manager = manager
+        self.sub_pool = sub_pool
+        self.timeout = timeout
+        self.connection = None
+
+    def __await__(self):
+        return self.manager._acquire(self.sub_pool, self.timeout).__await__()
+
+    async def __aenter__(self):
+        self.connection = await self.manager._acquire(self.sub_pool, self.timeout)
+        return self.connection
+
+    async def __aexit__(self, *exc_info):
+        connection, self.connection = self.connection, None
+        await self.manager._release(self.sub_pool, connection)
+
+
+class LogicalPool:
+    """asyncpg.Pool-compatible view bound to one named sub-pool"""
+
+    def __init__(self, manager: "PoolManager", name: str):
+        self.manager = manager
+        self.name = name
+
+    def acquire(self, timeout: Optional[float] = None) -> _AcquireContext:
+        return _AcquireContext(self.manager, self.name, timeout)
+
+    async def release(self, connection):
+        await self.manager._release(self.name, connection)
+
+    async def execute(self, query: str, *args, timeout: Optional[float] = None) -> str:
+        async with self.acquire() as conn:
+            return await conn.execute(query, *args, timeout=timeout)
+
+    async def executemany(self, query: str, args, timeout: Optional[float] = None):
+        async with self.acquire() as conn:
+            return await conn.executemany(query, args, timeout=timeout)
+
+    async def fetch(self, query: str, *args, timeout: Optional[float] = None) -> List[asyncpg.Record]:
+        async with self.acquire() as conn:
+            return await conn.fetch(query, *args, timeout=timeout)
+
+    async def fetchrow(self, query: str, *args, timeout: Optional[float] = None) -> Optional[asyncpg.Record]:
+        async with self.acquire() as conn:
+            return await conn.fetchrow(query, *args, timeout=timeout)
+
+    async def fetchval(self, query: str, *args, column: int = 0, timeout: Optional[float] = None) -> Any:
+        async with self.acquire() as conn:
+            return await conn.fetchval(query, *args, column=column, timeout=timeout)
+
+    async def close(self):
+        """No-op: the shared pool is owned by the PoolManager"""
+
+
+class PoolManager:
+    """Process-wide asyncpg pool with logical sub-pools and wait metrics"""
+
+    def __init__(self, config: Optional[DatabaseConfig] = None):
+        self.config = config or DatabaseConfig.from_env()
+        self._pool: Optional[asyncpg.Pool] = None
+        self._init_lock: Optional[asyncio.Lock] = None
+        self._sub_pools: Dict[str, _SubPool] = {}
+        self._views: Dict[str, LogicalPool] = {}
+        # Combined cap over every capped (background) sub-pool
+        self.background_limit = background_limit(self.config.pool_size)
+        self._background = asyncio.Semaphore(self.background_limit)
+        self._background_in_use = 0
+
+    @property
+    def is_initialized(self) -> bool:
+        return self._pool is not None
+
+    async def initialize(self) -> "PoolManager":
+        """Create the shared pool once (safe to call from every consumer)"""
+        if self._pool is not None:
+            return self
+        if self._init_lock is None:
+            self._init_lock = asyncio.Lock()
+        async with self._init_lock:
+            if self._pool is not None:
+                return self
+            if not self.config.url:
+                raise ValueError("DATABASE_URL not found in environment")
+
+            max_size = max(1, self.config.pool_size)
+            min_size = min(max(0, self.config.min_pool_size), max_size)
+            # Transient connection errors are retried with jittered exponential backoff
+            self._pool = await get_dependency_guard("postgres").call(
+                lambda: asyncpg.create_pool(
+                    self.config.url,
+                    min_size=min_size,
+                    max_size=max_size,
+                    command_timeout=self.config.timeout,
+                    statement_cache_size=self.config.statement_cache_size,
+                    max_inactive_connection_lifetime=self.config.max_idle_seconds
+                ),
+                policy=RetryPolicy(max_attempts=3, base_delay=1.0, max_delay=4.0)
+            )
+            logger.info(f"🗄️ Shared database pool ready: {min_size} warm / {max_size} max connections")
+        return self
+
+    def _sub_pool(self, name: str) -> _SubPool:
+        sub_pool = self._sub_pools.get(name)
+        if sub_pool is None:
+            share = SUB_POOL_SHARES.get(name)
+            limit = max(1, math.ceil(share * self.config.pool_size)) if share else None
+            sub_pool = self._sub_pools[name] = _SubPool(name, limit)
+        return sub_pool
+
+    def logical(self, name: str = "default") -> LogicalPool:
+        """Get the pool view for a named sub-pool"""
+        view = self._views.get(name)
+        if view is None:
+            self._sub_pool(name)
+            view = self._views[name] = LogicalPool(self, name)
+        return view
+
+    async def _acquire(self, name: str, timeout: Optional[float]):
+        if self._pool is None:
+            raise ValueError("Database pool not initialized")
+        sub_pool = self._sub_pool(name)
+        timeout = timeout if timeout is not None else self.config.timeout
+        start = time.monotonic()
+        slot_taken = background_taken = False
+        sub_pool.waiting += 1
+        try:
+            if sub_pool.semaphore:
+                await asyncio.wait_for(sub_pool.semaphore.acquire(), timeout)
+                slot_taken = True
+                remaining = max(0.001, timeout - (time.monotonic() - start))
+                await asyncio.wait_for(self._background.acquire(), remaining)
+                background_taken = True
+            remaining = max(0.001, timeout - (time.monotonic() - start))
+            # Physical checkouts feed the postgres breaker: connect errors and pool timeouts trip it,
+            # and while it is open callers fail fast instead of queueing on a dead database
+            connection = await get_dependency_guard("postgres").call_once(self._pool.acquire(timeout=remaining))
+        except BaseException as e:
+            if background_taken:
+                self._background.release()
+            if slot_taken:
+                sub_pool.semaphore.release()
+            if isinstance(e, asyncio.TimeoutError):
+                sub_pool.timeouts += 1
+                logger.warning(f"🗄️ Pool acquire timeout on '{name}' after {timeout:.1f}s (in use {sub_pool.in_use}, waiting {sub_pool.waiting - 1})")
+            raise
+        finally:
+            sub_pool.waiting -= 1
+
+        sub_pool.wait_histogram.observe(time.monotonic() - start)
+        sub_pool.acquired += 1
+        sub_pool.in_use += 1
+        sub_pool.peak_in_use = max(sub_pool.peak_in_use, sub_pool.in_use)
+        if sub_pool.semaphore:
+            self._background_in_use += 1
+        return connection
+
+    async def _release(self, name: str, connection):
+        if connection is None:
+            return
+        sub_pool = self._sub_pool(name)
+        try:
+            await self._pool.release(connection)
+        finally:
+            sub_pool.in_use -= 1
+            if sub_pool.semaphore:
+                self._background_in_use -= 1
+                self._background.release()
+                sub_pool.semaphore.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Saturation and acquire-wait metrics per sub-pool"""
+        if self._pool is None:
+            return {"initialized": False}
+        size = self._pool.get_size()
+        idle = self._pool.get_idle_size()
+        max_size = self._pool.get_max_size()
+        return {
+            "initialized": True,
+            "size": size,
+            "idle": idle,
+            "in_use": size - idle,
+            "max_size": max_size,
+            "min_size": self._pool.get_min_size(),
+            "saturation": round((size - idle) / max_size, 3) if max_size else 0.0,
+            "background": {"limit": self.background_limit, "in_use": self._background_in_use},
+            "sub_pools": {
+                name: {
+                    "limit": sub_pool.limit,
+                    "in_use": sub_pool.in_use,
+                    "waiting": sub_pool.waiting,
+                    "peak_in_use": sub_pool.peak_in_use,
+                    "acquired": sub_pool.acquired,
+                    "timeouts": sub_pool.timeouts,
+                    "wait_p50_ms": round(sub_pool.wait_histogram.quantile(0.5) * 1000, 1),
+                    "wait_p99_ms": round(sub_pool.wait_histogram.quantile(0.99) * 1000, 1),
+                }
+                for name, sub_pool in self._sub_pools.items()
+            }
+        }
+
+    def wait_histograms(self) -> Dict[str, WaitHistogram]:
+        """Raw acquire-wait histograms per sub-pool (for metrics export)"""
+        return {name: sub_pool.wait_histogram for name, sub_pool in self._sub_pools.items()}
+
+    async def close(self):
+        """Close the shared pool"""
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+            logger.info("🗄️ Shared database pool closed")
+
+    async def cleanup(self):
+        """ServiceContainer cleanup hook"""
+        await self.close()
+
+
+# Global pool manager
+_pool_manager: Optional[PoolManager] = None
+
+
+def get_pool_manager() -> PoolManager:
+    """Get or create global pool manager"""
+    global _pool_manager
+    if _pool_manager is None:
+        _pool_manager = PoolManager()
+    return _pool_manager
+
+
+async def get_shared_pool(name: str = "default") -> LogicalPool:
+    """Initialize the shared pool if needed and return a named sub-pool view"""
+    manager = get_pool_manager()
+    await manager.initialize()
+    return manager.logical(name)
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Process Metrics Registry
+Latency histograms, counters and gauges rendered in the Prometheus text
+exposition format at /metrics. Hot paths record into in-memory
+WaitHistograms (no locks, no I/O); dependency-owned metrics (pool waits,
+named queries, queue depths) are pulled from their owners at scrape time
+through collectors. Also measures event-loop lag
+"""
+
+import asyncio
+import logging
+import math
+import os
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.core.db_pool import WaitHistogram
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) for request-style latencies (HTTP handlers, Telegram, OpenAI)
+LATENCY_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+LOOP_LAG_BUCKETS: Tuple[float, ...] = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+LOOP_LAG_INTERVAL = float(os.getenv("METRICS_LOOP_LAG_INTERVAL", "0.5"))
+
+# Metric families recorded by instrumentation
+HTTP_REQUEST_SECONDS = "torah_http_request_duration_seconds"
+TELEGRAM_REQUEST_SECONDS = "torah_telegram_api_request_duration_seconds"
+OPENAI_REQUEST_SECONDS = "torah_openai_request_duration_seconds"
+BROADCAST_DELIVERIES = "torah_broadcast_deliveries_total"
+EVENT_LOOP_LAG_SECONDS = "torah_event_loop_lag_seconds"
+
+DEFAULT_FAMILIES = (
+    (HTTP_REQUEST_SECONDS, "histogram", "HTTP request handling time by route template", LATENCY_BUCKETS),
+    (TELEGRAM_REQUEST_SECONDS, "histogram", "Telegram Bot API call time per attempt by method and status", LATENCY_BUCKETS),
+    (OPENAI_REQUEST_SECONDS, "histogram", "OpenAI API call time by model and operation", LATENCY_BUCKETS),
+    (BROADCAST_DELIVERIES, "counter", "Newsletter deliveries by broadcast kind and outcome", None),
+    (EVENT_LOOP_LAG_SECONDS, "histogram", "Delay of a periodic event-loop tick past its deadline", LOOP_LAG_BUCKETS),
+)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class MetricFamily:
+    """One named metric with its samples keyed by label set"""
+    __slots__ = ("name", "type", "help", "buckets", "samples")
+
+    def __init__(self, name: str, metric_type: str, help_text: str, buckets: Optional[Tuple[float, ...]] = None):
+        self.name = name
+        self.type = metric_type
+        self.help = help_text
+        self.buckets = buckets
+        self.samples: Dict[Labels, Any] = {}  # labels -> WaitHistogram (histogram) or float
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class MetricsRegistry:
+    """In-process metric families plus scrape-time collectors"""
+
+    def __init__(self):
+        self._families: Dict[str, MetricFamily] = {}
+        self._collectors: List[Callable[[], Iterable[MetricFamily]]] = []
+        for name, metric_type, help_text, buckets in DEFAULT_FAMILIES:
+            self.register(name, metric_type, help_text, buckets)
+
+    def register(self, name: str, metric_type: str, help_text: str,
+                 buckets: Optional[Tuple[float, ...]] = None) -> MetricFamily:
+        family = self._families.get(name)
+        if family is None:
+            family = self._families[name] = MetricFamily(name, metric_type, help_text, buckets or LATENCY_BUCKETS)
+        return family
+
+    def observe(self, name: str, value: float, **labels):
+        """Record a histogram observation (seconds)"""
+        family = self._families[name]
+        key = _labels(labels)
+        histogram = family.samples.get(key)
+        if histogram is None:
+            histogram = family.samples[key] = WaitHistogram(family.buckets)
+        histogram.observe(value)
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        """Increment a counter"""
+        samples = self._families[name].samples
+        key = _labels(labels)
+        samples[key] = samples.get(key, 0) + amount
+
+    def set(self, name: str, value: float, **labels):
+        """Set a gauge"""
+        self._families[name].samples[_labels(labels)] = value
+
+    def add_collector(self, collector: Callable[[], Iterable[MetricFamily]]):
+        """Register a callable producing families at scrape time (failures skip that collector)"""
+        self._collectors.append(collector)
+
+    def collect(self) -> List[MetricFamily]:
+        families = list(self._families.values())
+        for collector in self._collectors:
+            try:
+                families.extend(collector())
+            except Exception as e:
+                logger.warning(f"⚠️ Metrics collector {getattr(collector, '__name__', collector)} failed: {e}")
+        return families
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for family in self.collect():
+            lines.append(f"# HELP {family.name} {family.help}")
+            lines.append(f"# TYPE {family.name} {family.type}")
+            for labels, sample in sorted(family.samples.items()):
+                if family.type == "histogram":
+                    for le, count in sample.cumulative():
+                        lines.append(f"{family.name}_bucket{_format_labels(labels, ('le', le))} {count}")
+                    lines.append(f"{family.name}_sum{_format_labels(labels)} {_format_value(sample.total)}")
+                    lines.append(f"{family.name}_count{_format_labels(labels)} {sample.count}")
+                else:
+                    lines.append(f"{family.name}{_format_labels(labels)} {_format_value(sample)}")
+        return "\n".join(lines) + "\n"
+
+
+def gauge_family(name: str, help_text: str, samples: Dict[Labels, float]) -> MetricFamily:
+    family = MetricFamily(name, "gauge", help_text)
+    family.samples = samples
+    return family
+
+
+def histogram_family(name: str, help_text: str, label: str, histograms: Dict[str, WaitHistogram]) -> MetricFamily:
+    family = MetricFamily(name, "histogram", help_text)
+    family.samples = {((label, key),): histogram for key, histogram in histograms.items()}
+    return family
+
+
+def collect_core_metrics() -> List[MetricFamily]:
+    """DB pool waits and saturation, named query latencies, audit queue and in-flight AI calls"""
+    from src.core.audit_logger import get_audit_stats
+    from src.core.db_pool import get_pool_manager
+    from src.core.query_registry import get_query_registry
+    from src.core.single_flight import get_single_flight
+
+    pool_manager = get_pool_manager()
+    families = [
+        histogram_family("torah_db_pool_acquire_wait_seconds", "Time waiting for a connection by logical sub-pool",
+                         "sub_pool", pool_manager.wait_histograms()),
+        histogram_family("torah_db_query_duration_seconds", "Named query latency (query registry)",
+                         "query", get_query_registry().histograms()),
+        gauge_family("torah_single_flight_in_flight", "Distinct AI calls currently executing",
+                     {(): get_single_flight().get_stats()["in_flight"]}),
+    ]
+
+    pool_stats = pool_manager.get_stats()
+    if pool_stats.get("initialized"):
+        families.append(gauge_family("torah_db_pool_connections", "Physical pool connections by state", {
+            (("state", "in_use"),): pool_stats["in_use"],
+            (("state", "idle"),): pool_stats["idle"],
+            (("state", "max"),): pool_stats["max_size"],
+        }))
+        sub_pools = pool_stats["sub_pools"]
+        families.append(gauge_family("torah_db_pool_in_use", "Connections held by logical sub-pool",
+                                     {(("sub_pool", name),): sub["in_use"] for name, sub in sub_pools.items()}))
+        families.append(gauge_family("torah_db_pool_waiting", "Acquirers queued by logical sub-pool",
+                                     {(("sub_pool", name),): sub["waiting"] for name, sub in sub_pools.items()}))
+
+    audit = get_audit_stats()
+    if "queue_depth" in audit:
+        families.append(gauge_family("torah_queue_depth", "Items waiting in background queues", {
+            (("queue", "audit"),): audit["queue_depth"],
+            (("queue", "audit_file"),): audit["file"]["pending"],
+        }))
+    return families
+
+
+class EventLoopLagMonitor:
+    """Periodic tick measuring how late the event loop runs it"""
+
+    def __init__(self, registry: "MetricsRegistry", interval: float = LOOP_LAG_INTERVAL):
+        self.registry = registry
+        self.interval = interval
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - expected)
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            self.registry.observe(EVENT_LOOP_LAG_SECONDS, lag)
+
+    def collect(self) -> List[MetricFamily]:
+        return [gauge_family("torah_event_loop_lag_last_seconds", "Most recent event-loop lag sample",
+                             {(): self.last_lag})]
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+
+# Global metrics registry
+_metrics: Optional[MetricsRegistry] = None
+_loop_lag_monitor: Optional[EventLoopLagMonitor] = None
+
+
+def get_metrics() -> MetricsRegistry:
+    """Get or create global metrics registry"""
+    global _metrics
+    if _metrics is None:
+        _metrics = MetricsRegistry()
+        _metrics.add_collector(collect_core_metrics)
+    return _metrics
+
+
+def get_event_loop_lag_monitor() -> EventLoopLagMonitor:
+    """Get or create global event-loop lag monitor (call start() from a running loop)"""
+    global _loop_lag_monitor
+    if _loop_lag_monitor is None:
+        _loop_lag_monitor = EventLoopLagMonitor(get_metrics())
+        get_metrics().add_collector(_loop_lag_monitor.collect)
+    return _loop_lag_monitor
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request by route template (not raw path)"""
+
+    def __init__(self, app, registry: Optional[MetricsRegistry] = None):
+        self.app = app
+        self.registry = registry or get_metrics()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            endpoint = scope.get("endpoint")
+            if route is not None and getattr(route, "path", None):
+                route_name = route.path
+            elif endpoint is not None:
+                route_name = getattr(endpoint, "__name__", "endpoint")
+            else:
+                route_name = "unmatched"
+            self.registry.observe(HTTP_REQUEST_SECONDS, time.perf_counter() - start,
+                                  route=route_name, method=scope["method"], status=status["code"])
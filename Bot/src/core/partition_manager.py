@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Monthly Partitioning for Append-Only Log Tables
+delivery_log and audit_log are range-partitioned by month on their time
+column with BRIN indexes. Maintenance pre-creates upcoming partitions and
+enforces retention by detaching and dropping whole partitions instead of
+running large DELETEs. Existing heap tables are converted once with
+`python -m src.core.partition_manager migrate`
+"""
+
+import logging
+import os
+import re
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Serializes partition DDL across instances
+PARTITION_MAINTENANCE_LOCK_ID = 0x5041525453  # "PARTS"
+
+
+@dataclass
+class PartitionSpec:
+    """Monthly range partitioning of one table"""
+    table: str
+    column: str
+    retention_months: int
+    premake_months: int = 2
+    # Indexes created on the partitioned parent (propagated to every partition)
+    indexes: Tuple[str, ...] = field(default_factory=tuple)
+
+    def partition_name(self, month: date) -> str:
+        return f"{self.table}_p{month.year:04d}{month.month:02d}"
+
+    @property
+    def default_partition(self) -> str:
+        return f"{self.table}_default"
+
+
+PARTITIONED_TABLES: Dict[str, PartitionSpec] = {
+    "delivery_log": PartitionSpec(
+        table="delivery_log",
+        column="scheduled_at",
+        retention_months=int(os.environ.get("DELIVERY_LOG_RETENTION_MONTHS", "6")),
+        indexes=(
+            "CREATE INDEX IF NOT EXISTS idx_delivery_log_broadcast ON delivery_log(broadcast_id, status)",
+            "CREATE INDEX IF NOT EXISTS idx_delivery_log_user ON delivery_log(user_id, delivered_at DESC)",
+            "CREATE INDEX IF NOT EXISTS idx_delivery_log_status_scheduled ON delivery_log(status, scheduled_at) WHERE status = 'pending'",
+            "CREATE INDEX IF NOT EXISTS idx_delivery_log_scheduled_brin ON delivery_log USING brin (scheduled_at)",
+            "CREATE INDEX IF NOT EXISTS idx_delivery_log_user_failed ON delivery_log (user_id, scheduled_at DESC) WHERE status = 'failed'",
+        )
+    ),
+    "audit_log": PartitionSpec(
+        table="audit_log",
+        column="timestamp",
+        retention_months=int(os.environ.get("AUDIT_LOG_RETENTION_MONTHS", "12")),
+        indexes=(
+            "CREATE INDEX IF NOT EXISTS idx_audit_timestamp_brin ON audit_log USING brin (timestamp)",
+            # Keyset pagination: each supported filter + (timestamp, id) in page order
+            "CREATE INDEX IF NOT EXISTS idx_audit_ts_id ON audit_log (timestamp DESC, id DESC)",
+            "CREATE INDEX IF NOT EXISTS idx_audit_event_type_ts ON audit_log (event_type, timestamp DESC, id DESC)",
+            "CREATE INDEX IF NOT EXISTS idx_audit_user_ts ON audit_log (user_identifier, timestamp DESC, id DESC)",
+            "CREATE INDEX IF NOT EXISTS idx_audit_resource_ts ON audit_log (resource, timestamp DESC, id DESC)",
+        )
+    ),
+}
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_timestamp(month: date) -> datetime:
+    """UTC midnight at the start of a month (partition bound)"""
+    return datetime(month.year, month.month, 1, tzinfo=timezone.utc)
+
+
+def _utc_today() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+async def is_partitioned(conn, table: str) -> bool:
+    """Check whether a table exists as a partitioned (relkind 'p') table"""
+    relkind = await conn.fetchval("SELECT relkind FROM pg_class WHERE oid = to_regclass($1)", table)
+    return relkind == "p"
+
+
+async def ensure_partitions(conn, spec: PartitionSpec, first_month: date, last_month: date) -> List[str]:
+    """Create monthly partitions covering [first_month, last_month] plus the default partition"""
+    created = []
+    await conn.execute(
+        f"CREATE TABLE IF NOT EXISTS {spec.default_partition} PARTITION OF {spec.table} DEFAULT"
+    )
+    month = month_start(first_month)
+    while month <= last_month:
+        name = spec.partition_name(month)
+        exists = await conn.fetchval("SELECT to_regclass($1) IS NOT NULL", name)
+        if not exists:
+            lower, upper = month_timestamp(month), month_timestamp(add_months(month, 1))
+            bounds = f"FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+            stray_rows = await conn.fetchval(
+                f"SELECT EXISTS (SELECT 1 FROM {spec.default_partition} WHERE {spec.column} >= $1 AND {spec.column} < $2)",
+                lower, upper
+            )
+            if stray_rows:
+                # Rows for this month landed in the default partition - move them into the new partition
+                await conn.execute(f"CREATE TABLE {name} (LIKE {spec.table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+                moved = await conn.execute(f"""
+                    WITH moved AS (
+                        DELETE FROM {spec.default_partition}
+                        WHERE {spec.column} >= $1 AND {spec.column} < $2
+                        RETURNING *
+                    )
+                    INSERT INTO {name} SELECT * FROM moved
+                """, lower, upper)
+                await conn.execute(f"ALTER TABLE {spec.table} ATTACH PARTITION {name} FOR VALUES {bounds}")
+                logger.info(f"🗂️ Moved {moved.split()[-1]} rows from {spec.default_partition} into {name}")
+            else:
+                await conn.execute(f"CREATE TABLE {name} PARTITION OF {spec.table} FOR VALUES {bounds}")
+            created.append(name)
+        month = add_months(month, 1)
+    return created
+
+
+async def list_partitions(conn, spec: PartitionSpec) -> List[Tuple[str, date]]:
+    """Monthly partitions of a table as (name, month) ordered by month"""
+    rows = await conn.fetch("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass($1)
+    """, spec.table)
+    pattern = re.compile(rf"^{re.escape(spec.table)}_p(\d{{4}})(\d{{2}})$")
+    partitions = []
+    for row in rows:
+        match = pattern.match(row["relname"])
+        if match:
+            partitions.append((row["relname"], date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(partitions, key=lambda item: item[1])
+
+
+async def drop_partitions_before(conn, spec: PartitionSpec, cutoff: date) -> List[str]:
+    """Detach and drop every monthly partition that ends on or before `cutoff`"""
+    dropped = []
+    for name, month in await list_partitions(conn, spec):
+        if add_months(month, 1) > cutoff:
+            break
+        await conn.execute(f"ALTER TABLE {spec.table} DETACH PARTITION {name}")
+        await conn.execute(f"DROP TABLE {name}")
+        dropped.append(name)
+        logger.info(f"🧹 Dropped expired partition {name}")
+    return dropped
+
+
+async def maintain_table(conn, spec: PartitionSpec, today: Optional[date] = None) -> Dict[str, List[str]]:
+    """Pre-create upcoming partitions and drop partitions past retention"""
+    today = today or _utc_today()
+    current = month_start(today)
+    created = await ensure_partitions(conn, spec, current, add_months(current, spec.premake_months))
+    dropped = await drop_partitions_before(conn, spec, add_months(current, -spec.retention_months))
+    return {"created": created, "dropped": dropped}
+
+
+async def run_partition_maintenance(pool=None, today: Optional[date] = None) -> Dict[str, Dict[str, List[str]]]:
+    """Maintain every partitioned log table (safe to run from several instances)"""
+    results = {}
+    try:
+        if pool is None:
+            from src.core.db_pool import get_shared_pool
+            pool = await get_shared_pool("default")
+        conn = await pool.acquire()
+    except Exception as e:
+        logger.error(f"❌ Partition maintenance skipped - database unavailable: {e}")
+        return results
+
+    try:
+        for table, spec in PARTITIONED_TABLES.items():
+            try:
+                async with conn.transaction():
+                    await conn.execute("SELECT pg_advisory_xact_lock($1)", PARTITION_MAINTENANCE_LOCK_ID)
+                    if not await is_partitioned(conn, table):
+                        logger.warning(f"⚠️ {table} is not partitioned - run `python -m src.core.partition_manager migrate {table}`")
+                        continue
+                    results[table] = await maintain_table(conn, spec, today)
+            except Exception as e:
+                logger.error(f"❌ Partition maintenance failed for {table}: {e}")
+    finally:
+        await pool.release(conn)
+    if results:
+        logger.info(f"🗂️ Partition maintenance: {results}")
+    return results
+
+
+async def migrate_to_partitioned(conn, spec: PartitionSpec, today: Optional[date] = None) -> int:
+    """
+    Convert an existing heap table into a monthly partitioned table
+
+    Runs in one transaction: the old table is renamed, a partitioned copy
+    takes its name (same columns, defaults, foreign keys and triggers),
+    partitions covering the existing data are created and rows are copied.
+    Rows older than the retention window are not copied; rows without a
+    partition key value are stamped with the migration time.
+    Returns the number of rows copied.
+    """
+    today = today or _utc_today()
+    legacy = f"{spec.table}_legacy"
+    async with conn.transaction():
+        await conn.execute("SELECT pg_advisory_xact_lock($1)", PARTITION_MAINTENANCE_LOCK_ID)
+        if await is_partitioned(conn, spec.table):
+            logger.info(f"🗂️ {spec.table} is already partitioned")
+            return 0
+
+        foreign_keys = await conn.fetch("""
+            SELECT conname, pg_get_constraintdef(oid) AS definition
+            FROM pg_constraint WHERE conrelid = to_regclass($1) AND contype = 'f'
+        """, spec.table)
+        triggers = await conn.fetch("""
+            SELECT pg_get_triggerdef(oid) AS definition
+            FROM pg_trigger WHERE tgrelid = to_regclass($1) AND NOT tgisinternal
+        """, spec.table)
+        indexes = await conn.fetch("""
+            SELECT indexrelid::regclass::text AS name
+            FROM pg_index WHERE indrelid = to_regclass($1)
+        """, spec.table)
+
+        await conn.execute(f"ALTER TABLE {spec.table} RENAME TO {legacy}")
+        # Free the index names for the partitioned table
+        for index in indexes:
+            await conn.execute(f"ALTER INDEX {index['name']} RENAME TO {index['name']}_legacy")
+
+        await conn.execute(f"""
+            CREATE TABLE {spec.table} (
+                LIKE {legacy} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE INCLUDING COMMENTS,
+                PRIMARY KEY (id, {spec.column})
+            ) PARTITION BY RANGE ({spec.column})
+        """)
+        for fk in foreign_keys:
+            await conn.execute(f"ALTER TABLE {spec.table} ADD CONSTRAINT {fk['conname']} {fk['definition']}")
+        for statement in spec.indexes:
+            await conn.execute(statement)
+
+        current = month_start(today)
+        cutoff = month_timestamp(add_months(current, -spec.retention_months))
+        oldest = await conn.fetchval(f"SELECT MIN({spec.column}) FROM {legacy} WHERE {spec.column} >= $1", cutoff)
+        first_month = month_start(oldest.date() if oldest else current)
+        await ensure_partitions(conn, spec, first_month, add_months(current, spec.premake_months))
+
+        # The partition key is part of the primary key and cannot be NULL
+        await conn.execute(f"UPDATE {legacy} SET {spec.column} = NOW() WHERE {spec.column} IS NULL")
+        result = await conn.execute(f"""
+            INSERT INTO {spec.table}
+            SELECT * FROM {legacy} WHERE {spec.column} >= $1
+        """, cutoff)
+        copied = int(result.split()[-1])
+        # The id sequence is shared via the copied default - move its ownership before dropping the old table
+        await conn.execute(f"""
+            DO $$
+            DECLARE seq TEXT := pg_get_serial_sequence('{legacy}', 'id');
+            BEGIN
+                IF seq IS NOT NULL THEN
+                    EXECUTE format('ALTER SEQUENCE %s OWNED BY {spec.table}.id', seq);
+                END IF;
+            END;
+            $$
+        """)
+        await conn.execute(f"DROP TABLE {legacy}")
+        for trigger in triggers:
+            await conn.execute(trigger["definition"])
+
+    logger.info(f"🗂️ Migrated {spec.table} to monthly partitions ({copied} rows copied)")
+    return copied
+
+
+async def _migrate_cli(tables: List[str]):
+    from src.core.db_pool import get_pool_manager, get_shared_pool
+    pool = await get_shared_pool("default")
+    try:
+        async with pool.acquire() as conn:
+            for table in tables:
+                await migrate_to_partitioned(conn, PARTITIONED_TABLES[table])
+        if "delivery_log" in tables:
+            # Rows copied into the new table did not pass through the rollup triggers
+            from src.core.stats_read_model import get_stats_read_model
+            await get_stats_read_model().rebuild()
+        await run_partition_maintenance(pool)
+    finally:
+        await get_pool_manager().close()
+
+
+if __name__ == "__main__":
+    import asyncio
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) < 2 or sys.argv[1] != "migrate":
+        print("Usage: python -m src.core.partition_manager migrate [delivery_log|audit_log ...]")
+        sys.exit(1)
+    asyncio.run(_migrate_cli(sys.argv[2:] or list(PARTITIONED_TABLES)))
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Named Query Registry with Timing
+Hot SQL is registered once under a stable name and executed through the
+registry, which records per-query latency (p50/p99), errors and slow-query
+logs so database regressions show up by name instead of as anonymous SQL
+"""
+
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from src.core.db_pool import WaitHistogram
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "250"))
+
+# Query latency buckets (seconds)
+QUERY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_QUERIES: Dict[str, str] = {}
+
+
+def register_query(name: str, sql: str) -> str:
+    """Register named SQL (idempotent for identical text) and return the name"""
+    existing = _QUERIES.get(name)
+    if existing is not None and existing != sql:
+        raise ValueError(f"Query name '{name}' already registered with different SQL")
+    _QUERIES[name] = sql
+    return name
+
+
+class QueryStats:
+    """Latency and error counters for one named query"""
+
+    def __init__(self, sample_size: int = 512):
+        self.calls = 0
+        self.errors = 0
+        self.slow = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.samples: Deque[float] = deque(maxlen=sample_size)
+        self.histogram = WaitHistogram(QUERY_BUCKETS)
+
+    def record(self, seconds: float, ok: bool):
+        self.calls += 1
+        if not ok:
+            self.errors += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.samples.append(seconds)
+        self.histogram.observe(seconds)
+
+    def percentile(self, q: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class QueryRegistry:
+    """
+    Executes registered queries on asyncpg connections with timing
+
+    Statements are prepared once per physical connection through asyncpg's
+    statement cache (sized by DatabaseConfig.statement_cache_size). Explicit
+    conn.prepare() handles are invalidated when a pooled connection is
+    released, so they cannot be reused across acquires.
+    """
+
+    def __init__(self, slow_query_ms: float = SLOW_QUERY_MS):
+        self.slow_query_seconds = slow_query_ms / 1000.0
+        self._stats: Dict[str, QueryStats] = {}
+
+    @staticmethod
+    def sql(name: str) -> str:
+        """Get the SQL text registered under a name"""
+        try:
+            return _QUERIES[name]
+        except KeyError:
+            raise KeyError(f"Unknown query '{name}' - register it with register_query()") from None
+
+    async def _run(self, conn, method: str, name: str, args: tuple) -> Any:
+        sql = self.sql(name)
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = QueryStats()
+        start = time.perf_counter()
+        ok = False
+        try:
+            result = await getattr(conn, method)(sql, *args)
+            ok = True
+            return result
+        finally:
+            elapsed = time.perf_counter() - start
+            stats.record(elapsed, ok)
+            if elapsed >= self.slow_query_seconds:
+                stats.slow += 1
+                logger.warning(f"🐢 Slow query {name}: {elapsed * 1000:.0f}ms")
+
+    async def execute(self, conn, name: str, *args) -> str:
+        return await self._run(conn, "execute", name, args)
+
+    async def fetch(self, conn, name: str, *args) -> List[Any]:
+        return await self._run(conn, "fetch", name, args)
+
+    async def fetchrow(self, conn, name: str, *args) -> Optional[Any]:
+        return await self._run(conn, "fetchrow", name, args)
+
+    async def fetchval(self, conn, name: str, *args) -> Any:
+        return await self._run(conn, "fetchval", name, args)
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-query call counts, p50/p99/max latency (ms) and error/slow counters"""
+        return {
+            name: {
+                "calls": stats.calls,
+                "errors": stats.errors,
+                "slow": stats.slow,
+                "avg_ms": round(stats.total_seconds / stats.calls * 1000, 2) if stats.calls else 0.0,
+                "p50_ms": round(stats.percentile(0.5) * 1000, 2),
+                "p99_ms": round(stats.percentile(0.99) * 1000, 2),
+                "max_ms": round(stats.max_seconds * 1000, 2),
+            }
+            for name, stats in sorted(self._stats.items())
+        }
+
+    def histograms(self) -> Dict[str, WaitHistogram]:
+        """Raw latency histograms per query (for metrics export)"""
+        return {name: stats.histogram for name, stats in self._stats.items()}
+
+
+# Global query registry
+_query_registry = QueryRegistry()
+
+
+def get_query_registry() -> QueryRegistry:
+    """Get global query registry"""
+    return _query_registry
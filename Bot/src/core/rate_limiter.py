@@ -2,155 +2,378 @@
 """
 Rate limiting middleware for API endpoints
 Protects against abuse and DDoS attacks
+
+GCRA (generic cell rate algorithm): each client/rule pair keeps one
+theoretical arrival time per limit tier instead of a timestamp history,
+so every check is O(1) in time and memory. State lives in shards of plain
+dicts - checks never await, so no lock is needed on the event loop.
+
+An optional shared backend (Postgres) enforces the minute/hour limits
+across workers and nodes. Each process leases admissions in batches with
+one atomic increment round trip, so the backend is not hit per request.
 """
 import asyncio
+import hashlib
+import json
+import os
 import time
 import logging
-from collections import defaultdict, deque
-from typing import Dict, Optional, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple
 from fastapi import Request, HTTPException
 from dataclasses import dataclass
 
 logger = logging.getLogger(__name__)
 
+BURST_WINDOW_SECONDS = 10.0
+STATE_SHARDS = 64            # Power of two - shard index is a bit mask
+ROUTE_CACHE_SIZE = 4096      # Resolved path -> rule entries kept in the lookup table
+LEASE_BATCH_SIZE = int(os.getenv("RATE_LIMIT_LEASE_BATCH", "10"))  # Max admissions leased per backend round trip
+
 @dataclass
 class RateLimitRule:
     """Rate limit configuration"""
     requests_per_minute: int = 60
     requests_per_hour: int = 1000
     burst_limit: int = 10  # Maximum requests in burst window (10 seconds)
-    
-class RateLimiter:
-    """In-memory rate limiter with sliding window algorithm"""
-    
+
+
+class _CompiledRule:
+    """Rule precomputed into GCRA (emission interval, period) pairs per tier"""
+    __slots__ = ("rule", "rule_id", "name", "tiers", "shared_windows", "lease_size")
+
+    def __init__(self, rule: RateLimitRule, rule_id: int, name: str = "default"):
+        self.rule = rule
+        self.rule_id = rule_id
+        self.name = name  # Stable across processes - used in shared backend keys
+        self.tiers = (
+            (BURST_WINDOW_SECONDS / max(1, rule.burst_limit), BURST_WINDOW_SECONDS,
+             f"Too many requests in short period. Limit: {rule.burst_limit} per 10 seconds"),
+            (60.0 / max(1, rule.requests_per_minute), 60.0,
+             f"Too many requests per minute. Limit: {rule.requests_per_minute}"),
+            (3600.0 / max(1, rule.requests_per_hour), 3600.0,
+             f"Too many requests per hour. Limit: {rule.requests_per_hour}"),
+        )
+        # Burst stays per-process; minute and hour limits are enforced by the shared backend
+        self.shared_windows = ((60, rule.requests_per_minute), (3600, rule.requests_per_hour))
+        # Small leases for strict rules so one worker can't hoard the whole quota
+        self.lease_size = max(1, min(LEASE_BATCH_SIZE, rule.requests_per_minute // 10))
+
+
+class _Lease:
+    """Admissions reserved from the shared backend for one client/rule pair"""
+    __slots__ = ("remaining", "expires_at", "denied_until", "denied_message")
+
+    def __init__(self):
+        self.remaining = 0
+        self.expires_at = 0.0
+        self.denied_until = 0.0
+        self.denied_message: Optional[str] = None
+
+
+def _window_start(now: float, period: int) -> int:
+    return int(now // period) * period
+
+
+class RateLimitBackend:
+    """Shared admission counter interface"""
+
+    name = "base"
+
+    async def reserve(self, bucket: str, windows: Sequence[Tuple[int, int]], units: int,
+                      now: float) -> Tuple[int, Optional[int]]:
+        """
+        Atomically add `units` to each (period, limit) window counter of a bucket
+        Returns (granted_units, exhausted_period or None)
+        """
+        raise NotImplementedError
+
+    async def cleanup(self, now: float):
+        """Drop expired window counters"""
+
+    @staticmethod
+    def _granted(windows: Sequence[Tuple[int, int]], totals: Dict[int, int], units: int) -> Tuple[int, Optional[int]]:
+        granted, exhausted = units, None
+        for period, limit in windows:
+            available = max(0, limit - (totals[period] - units))
+            if available < granted:
+                granted, exhausted = available, period
+        return granted, exhausted
+
+
+class LocalRateLimitBackend(RateLimitBackend):
+    """In-process stand-in for the shared backend (single worker, tests)"""
+
+    name = "local"
+
     def __init__(self):
-        # Track requests per IP per minute  
-        self._minute_windows: Dict[str, deque] = defaultdict(deque)
-        # Track requests per IP per hour
-        self._hour_windows: Dict[str, deque] = defaultdict(deque)
-        # Track burst requests (last 10 seconds)
-        self._burst_windows: Dict[str, deque] = defaultdict(deque)
-        # Lock for thread safety
-        self._lock = asyncio.Lock()
+        self._counters: Dict[Tuple[str, int, int], int] = {}
+
+    async def reserve(self, bucket: str, windows: Sequence[Tuple[int, int]], units: int,
+                      now: float) -> Tuple[int, Optional[int]]:
+        totals = {}
+        for period, _ in windows:
+            key = (bucket, period, _window_start(now, period))
+            totals[period] = self._counters[key] = self._counters.get(key, 0) + units
+        return self._granted(windows, totals, units)
+
+    async def cleanup(self, now: float):
+        expired = [key for key in self._counters if key[2] + key[1] <= now]
+        for key in expired:
+            del self._counters[key]
+
+
+class PostgresRateLimitBackend(RateLimitBackend):
+    """Shared counters in Postgres - one upsert round trip per lease"""
+
+    name = "postgres"
+
+    RESERVE_SQL = """
+        INSERT INTO rate_limit_counters (bucket_key, window_start, window_seconds, hits)
+        SELECT $1, w.window_start, w.window_seconds, $4
+        FROM unnest($2::bigint[], $3::int[]) AS w(window_start, window_seconds)
+        ON CONFLICT (bucket_key, window_seconds, window_start)
+        DO UPDATE SET hits = rate_limit_counters.hits + EXCLUDED.hits
+        RETURNING window_seconds, hits
+    """
+
+    def __init__(self, pool=None):
+        self._pool = pool
+
+    async def initialize(self):
+        """Attach to the shared pool (if not injected) and create the counters table"""
+        if self._pool is None:
+            from src.core.db_pool import get_shared_pool
+            self._pool = await get_shared_pool("rate_limit")
+        async with self._pool.acquire() as conn:
+            await conn.execute("""
+                CREATE UNLOGGED TABLE IF NOT EXISTS rate_limit_counters (
+                    bucket_key TEXT NOT NULL,
+                    window_seconds INTEGER NOT NULL,
+                    window_start BIGINT NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (bucket_key, window_seconds, window_start)
+                )
+            """)
+        logger.info("🚦 Shared rate limit backend ready (postgres)")
+
+    async def reserve(self, bucket: str, windows: Sequence[Tuple[int, int]], units: int,
+                      now: float) -> Tuple[int, Optional[int]]:
+        rows = await self._pool.fetch(
+            self.RESERVE_SQL, bucket,
+            [_window_start(now, period) for period, _ in windows],
+            [period for period, _ in windows], units
+        )
+        return self._granted(windows, {row["window_seconds"]: row["hits"] for row in rows}, units)
+
+    async def cleanup(self, now: float):
+        await self._pool.execute(
+            "DELETE FROM rate_limit_counters WHERE window_start + window_seconds < $1", int(now)
+        )
+
+
+class _ClientState:
+    """Theoretical arrival times for the burst, minute and hour tiers"""
+    __slots__ = ("tats",)
+
+    def __init__(self, now: float):
+        self.tats = [now, now, now]
+
+
+class RateLimiter:
+    """In-memory GCRA rate limiter with sharded per-client state"""
+
+    def __init__(self, shards: int = STATE_SHARDS, backend: Optional[RateLimitBackend] = None):
+        self._shard_mask = shards - 1
+        # Shared backend (None = per-process limits only)
+        self.backend = backend
+        self._leases: Dict[Tuple[str, int], _Lease] = {}
+        self.backend_stats = {"round_trips": 0, "lease_hits": 0, "shared_denials": 0, "errors": 0}
+        self._shards: List[Dict[Tuple[str, int], _ClientState]] = [{} for _ in range(shards)]
         # Default rules
         self.default_rule = RateLimitRule()
-        # Custom rules per endpoint
+        self._default_compiled = _CompiledRule(self.default_rule, 0)
+        # Custom rules per endpoint (pattern -> rule), matched as path substrings
         self.endpoint_rules: Dict[str, RateLimitRule] = {}
-        
+        self._compiled_rules: List[Tuple[str, _CompiledRule]] = []
+        self._route_table: Dict[str, _CompiledRule] = {}
+
     def add_endpoint_rule(self, endpoint_pattern: str, rule: RateLimitRule):
         """Add custom rate limit rule for specific endpoint"""
         self.endpoint_rules[endpoint_pattern] = rule
+        self._compiled_rules = [
+            (pattern, _CompiledRule(pattern_rule, index + 1, pattern))
+            for index, (pattern, pattern_rule) in enumerate(self.endpoint_rules.items())
+        ]
+        # Precompile exact pattern paths; other paths are resolved once and memoized
+        self._route_table = {}
+        for pattern, _ in self._compiled_rules:
+            self._route_table[pattern] = self._match_route(pattern)
         logger.info(f"🚦 Rate limit rule added for {endpoint_pattern}: {rule.requests_per_minute}/min")
-        
-    def get_client_identifier(self, request: Request) -> str:
-        """Get client identifier for rate limiting (IP + User-Agent hash)"""
-        # Get client IP
-        client_ip = "unknown"
-        
+
+    @staticmethod
+    def _client_identifier(headers, client_host: Optional[str]) -> str:
         # Check proxy headers first
-        forwarded_for = request.headers.get("X-Forwarded-For")
+        forwarded_for = headers.get("x-forwarded-for")
         if forwarded_for:
             client_ip = forwarded_for.split(",")[0].strip()
         else:
-            real_ip = request.headers.get("X-Real-IP")
-            if real_ip:
-                client_ip = real_ip
-            elif hasattr(request, 'client') and request.client:
-                client_ip = request.client.host
-                
-        # Add user agent hash for additional uniqueness
-        user_agent = request.headers.get("User-Agent", "")
-        ua_hash = str(hash(user_agent))[:8] if user_agent else "none"
-        
+            client_ip = headers.get("x-real-ip") or client_host or "unknown"
+
+        # Add user agent hash for additional uniqueness (stable across processes, unlike hash())
+        user_agent = headers.get("user-agent", "")
+        ua_hash = hashlib.blake2b(user_agent.encode("utf-8"), digest_size=4).hexdigest() if user_agent else "none"
+
         return f"{client_ip}:{ua_hash}"
-    
+
+    def get_client_identifier(self, request: Request) -> str:
+        """Get client identifier for rate limiting (IP + User-Agent hash)"""
+        client_host = request.client.host if getattr(request, "client", None) else None
+        return self._client_identifier(request.headers, client_host)
+
+    def _match_route(self, path: str) -> _CompiledRule:
+        for pattern, compiled in self._compiled_rules:
+            if pattern in path:
+                return compiled
+        return self._default_compiled
+
+    def _resolve(self, path: str) -> _CompiledRule:
+        compiled = self._route_table.get(path)
+        if compiled is None:
+            compiled = self._match_route(path)
+            if len(self._route_table) >= ROUTE_CACHE_SIZE:
+                # Unbounded distinct paths (scanners) must not grow the table forever
+                self._route_table = {pattern: self._match_route(pattern) for pattern, _ in self._compiled_rules}
+            self._route_table[path] = compiled
+        return compiled
+
     def get_rule_for_endpoint(self, path: str) -> RateLimitRule:
         """Get rate limit rule for specific endpoint"""
-        for pattern, rule in self.endpoint_rules.items():
-            if pattern in path:
-                return rule
-        return self.default_rule
-    
+        return self._resolve(path).rule
+
+    def has_endpoint_rule(self, path: str) -> bool:
+        """Check whether a path matches an explicit endpoint rule"""
+        return self._resolve(path) is not self._default_compiled
+
+    def check(self, client_id: str, path: str, now: Optional[float] = None) -> Tuple[bool, Optional[str], float]:
+        """
+        Synchronous O(1) GCRA check-and-record
+        Returns (allowed, error_message, retry_after_seconds)
+        """
+        compiled = self._resolve(path)
+        now = time.monotonic() if now is None else now
+        key = (client_id, compiled.rule_id)
+        shard = self._shards[hash(key) & self._shard_mask]
+        state = shard.get(key)
+        if state is None:
+            state = shard[key] = _ClientState(now)
+
+        tats = state.tats
+        new_tats = [0.0, 0.0, 0.0]
+        for index, (interval, period, message) in enumerate(compiled.tiers):
+            new_tat = max(tats[index], now) + interval
+            if new_tat - now > period:
+                retry_after = new_tat - period - now
+                logger.warning(f"🚦 {message.split('.')[0]} for {client_id} (retry in {retry_after:.1f}s)")
+                return False, message, retry_after
+            new_tats[index] = new_tat
+
+        # Record only once every tier conforms, so rejected requests don't consume quota
+        state.tats = new_tats
+        return True, None, 0.0
+
+    async def acquire(self, client_id: str, path: str) -> Tuple[bool, Optional[str], float]:
+        """
+        Local GCRA check followed by shared-backend admission (leased in batches)
+        Returns (allowed, error_message, retry_after_seconds)
+        """
+        allowed, error_message, retry_after = self.check(client_id, path)
+        if not allowed or self.backend is None:
+            return allowed, error_message, retry_after
+
+        compiled = self._resolve(path)
+        key = (client_id, compiled.rule_id)
+        now = time.time()
+        lease = self._leases.get(key)
+        if lease is None:
+            lease = self._leases[key] = _Lease()
+        if now < lease.denied_until:
+            return False, lease.denied_message, lease.denied_until - now
+        if lease.remaining > 0 and now < lease.expires_at:
+            lease.remaining -= 1
+            self.backend_stats["lease_hits"] += 1
+            return True, None, 0.0
+
+        self.backend_stats["round_trips"] += 1
+        try:
+            granted, exhausted_period = await self.backend.reserve(
+                f"{client_id}|{compiled.name}", compiled.shared_windows, compiled.lease_size, now
+            )
+        except Exception as e:
+            # Fail open to per-process limits - the shared store must not take the API down
+            self.backend_stats["errors"] += 1
+            logger.warning(f"🚦 Shared rate limit backend unavailable, using local limits: {e}")
+            return True, None, 0.0
+
+        if granted <= 0:
+            period = exhausted_period or 60
+            lease.remaining = 0
+            lease.denied_until = _window_start(now, period) + period
+            lease.denied_message = (compiled.tiers[1][2] if period == 60 else compiled.tiers[2][2])
+            self.backend_stats["shared_denials"] += 1
+            logger.warning(f"🚦 Shared limit exhausted for {client_id} on {compiled.name} (retry in {lease.denied_until - now:.0f}s)")
+            return False, lease.denied_message, lease.denied_until - now
+
+        lease.remaining = granted - 1
+        # Leased admissions belong to the current minute window
+        lease.expires_at = _window_start(now, 60) + 60
+        return True, None, 0.0
+
     async def is_allowed(self, request: Request) -> Tuple[bool, Optional[str]]:
         """
         Check if request is allowed under rate limits
         Returns (allowed, error_message)
         """
-        async with self._lock:
-            client_id = self.get_client_identifier(request)
-            rule = self.get_rule_for_endpoint(request.url.path)
-            current_time = time.time()
-            
-            # Clean old entries
-            await self._cleanup_old_entries(client_id, current_time)
-            
-            # Check burst limit (last 10 seconds)
-            burst_count = len(self._burst_windows[client_id])
-            if burst_count >= rule.burst_limit:
-                logger.warning(f"🚦 Burst limit exceeded for {client_id}: {burst_count}/{rule.burst_limit}")
-                return False, f"Too many requests in short period. Limit: {rule.burst_limit} per 10 seconds"
-            
-            # Check minute limit
-            minute_count = len(self._minute_windows[client_id])
-            if minute_count >= rule.requests_per_minute:
-                logger.warning(f"🚦 Minute limit exceeded for {client_id}: {minute_count}/{rule.requests_per_minute}")
-                return False, f"Too many requests per minute. Limit: {rule.requests_per_minute}"
-                
-            # Check hour limit
-            hour_count = len(self._hour_windows[client_id])
-            if hour_count >= rule.requests_per_hour:
-                logger.warning(f"🚦 Hour limit exceeded for {client_id}: {hour_count}/{rule.requests_per_hour}")
-                return False, f"Too many requests per hour. Limit: {rule.requests_per_hour}"
-            
-            # Record this request
-            self._burst_windows[client_id].append(current_time)
-            self._minute_windows[client_id].append(current_time)
-            self._hour_windows[client_id].append(current_time)
-            
-            return True, None
-    
-    async def _cleanup_old_entries(self, client_id: str, current_time: float):
-        """Remove expired entries from tracking windows"""
-        # Clean burst window (10 seconds)
-        burst_cutoff = current_time - 10
-        while (self._burst_windows[client_id] and 
-               self._burst_windows[client_id][0] < burst_cutoff):
-            self._burst_windows[client_id].popleft()
-            
-        # Clean minute window (60 seconds)
-        minute_cutoff = current_time - 60
-        while (self._minute_windows[client_id] and 
-               self._minute_windows[client_id][0] < minute_cutoff):
-            self._minute_windows[client_id].popleft()
-            
-        # Clean hour window (3600 seconds)
-        hour_cutoff = current_time - 3600
-        while (self._hour_windows[client_id] and 
-               self._hour_windows[client_id][0] < hour_cutoff):
-            self._hour_windows[client_id].popleft()
-    
+        allowed, error_message, _ = await self.acquire(self.get_client_identifier(request), request.url.path)
+        return allowed, error_message
+
+    def client_count(self) -> int:
+        """Number of tracked client/rule pairs"""
+        return sum(len(shard) for shard in self._shards)
+
     async def cleanup_inactive_clients(self):
         """Periodic cleanup of inactive client data"""
-        current_time = time.time()
-        hour_cutoff = current_time - 3600
-        
-        async with self._lock:
-            # Find inactive clients (no requests in last hour)
-            inactive_clients = []
-            for client_id in list(self._hour_windows.keys()):
-                if not self._hour_windows[client_id]:
-                    inactive_clients.append(client_id)
-                elif self._hour_windows[client_id][-1] < hour_cutoff:
-                    inactive_clients.append(client_id)
-            
-            # Remove inactive clients
-            for client_id in inactive_clients:
-                self._burst_windows.pop(client_id, None)
-                self._minute_windows.pop(client_id, None) 
-                self._hour_windows.pop(client_id, None)
-                
-            if inactive_clients:
-                logger.info(f"🧹 Cleaned up {len(inactive_clients)} inactive rate limit clients")
+        now = time.monotonic()
+        removed = 0
+        for shard in self._shards:
+            # A state whose arrival times are all in the past is identical to a fresh client
+            inactive = [key for key, state in shard.items() if max(state.tats) <= now]
+            for key in inactive:
+                del shard[key]
+            removed += len(inactive)
+            await asyncio.sleep(0)  # Yield between shards to keep the loop responsive
+
+        wall_now = time.time()
+        expired_leases = [key for key, lease in self._leases.items()
+                          if lease.expires_at <= wall_now and lease.denied_until <= wall_now]
+        for key in expired_leases:
+            del self._leases[key]
+        if self.backend is not None:
+            try:
+                await self.backend.cleanup(wall_now)
+            except Exception as e:
+                logger.warning(f"🚦 Shared rate limit cleanup failed: {e}")
+
+        if removed:
+            logger.info(f"🧹 Cleaned up {removed} inactive rate limit clients")
+
+    def get_status(self) -> Dict[str, object]:
+        """Backend and lease counters for monitoring"""
+        return {
+            "backend": self.backend.name if self.backend else "none",
+            "tracked_clients": self.client_count(),
+            "leases": len(self._leases),
+            **self.backend_stats
+        }
 
 # Global rate limiter instance
 rate_limiter = RateLimiter()
@@ -162,7 +385,7 @@ admin_rule = RateLimitRule(
     burst_limit=3
 )
 
-# Configure moderate limits for scheduler endpoints  
+# Configure moderate limits for scheduler endpoints
 scheduler_rule = RateLimitRule(
     requests_per_minute=20,
     requests_per_hour=200,
@@ -176,35 +399,116 @@ webhook_rule = RateLimitRule(
     burst_limit=20
 )
 
+# Configure strict limits for audit log reads (admin secret + streaming exports)
+audit_log_rule = RateLimitRule(
+    requests_per_minute=6,
+    requests_per_hour=60,
+    burst_limit=2
+)
+
+# Configure limits for mini game score submissions (one per finished round)
+game_score_rule = RateLimitRule(
+    requests_per_minute=20,
+    requests_per_hour=300,
+    burst_limit=5
+)
+
 # Add endpoint-specific rules
 rate_limiter.add_endpoint_rule("/api/manual_broadcast", admin_rule)
+rate_limiter.add_endpoint_rule("/api/audit_log", audit_log_rule)
 rate_limiter.add_endpoint_rule("/api/scheduler", scheduler_rule)
 rate_limiter.add_endpoint_rule("/webhook", webhook_rule)
+rate_limiter.add_endpoint_rule("/game/score", game_score_rule)
+
+
+def _log_rate_limit_event(request: Request, client_id: str, error_message: Optional[str]):
+    logger.warning(f"🚦 Rate limit exceeded for {client_id} on {request.url.path}: {error_message}")
+
+    # Log security event
+    from src.core.telegram_security import log_security_event
+    log_security_event("RATE_LIMIT_EXCEEDED", request, error_message or "Rate limit exceeded")
+
 
 async def rate_limit_middleware(request: Request):
     """
     FastAPI middleware function for rate limiting
     Raises HTTPException if rate limit is exceeded
     """
-    allowed, error_message = await rate_limiter.is_allowed(request)
-    
+    client_id = rate_limiter.get_client_identifier(request)
+    allowed, error_message, retry_after = await rate_limiter.acquire(client_id, request.url.path)
+
     if not allowed:
-        client_id = rate_limiter.get_client_identifier(request)
-        logger.warning(f"🚦 Rate limit exceeded for {client_id} on {request.url.path}: {error_message}")
-        
-        # Log security event
-        from src.core.telegram_security import log_security_event
-        log_security_event("RATE_LIMIT_EXCEEDED", request, error_message or "Rate limit exceeded")
-        
+        _log_rate_limit_event(request, client_id, error_message)
+
         raise HTTPException(
             status_code=429,
             detail={
                 "error": "Rate limit exceeded",
                 "message": error_message,
-                "retry_after": 60  # Suggest retry after 60 seconds
+                "retry_after": max(1, int(retry_after + 0.999))
             }
         )
 
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware enforcing rate limits before routing
+    Only paths under protected_prefixes are checked, so static assets and the
+    Telegram webhook are never throttled by accident
+    """
+
+    def __init__(self, app, protected_prefixes: Tuple[str, ...] = (), limiter: Optional[RateLimiter] = None):
+        self.app = app
+        self.protected_prefixes = tuple(protected_prefixes)
+        self.limiter = limiter or rate_limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.protected_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        headers = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope.get("headers", [])}
+        client = scope.get("client")
+        client_id = self.limiter._client_identifier(headers, client[0] if client else None)
+        allowed, error_message, retry_after = await self.limiter.acquire(client_id, scope["path"])
+        if allowed:
+            await self.app(scope, receive, send)
+            return
+
+        _log_rate_limit_event(Request(scope), client_id, error_message)
+        retry_seconds = max(1, int(retry_after + 0.999))
+        body = json.dumps({"detail": {
+            "error": "Rate limit exceeded",
+            "message": error_message,
+            "retry_after": retry_seconds
+        }}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"retry-after", str(retry_seconds).encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+async def configure_rate_limit_backend() -> Optional[RateLimitBackend]:
+    """Attach the shared backend selected by RATE_LIMIT_BACKEND (none | local | postgres)"""
+    backend_name = os.getenv("RATE_LIMIT_BACKEND", "none").lower()
+    if backend_name == "local":
+        rate_limiter.backend = LocalRateLimitBackend()
+    elif backend_name == "postgres":
+        backend = PostgresRateLimitBackend()
+        try:
+            await backend.initialize()
+            rate_limiter.backend = backend
+        except Exception as e:
+            logger.error(f"🚦 Postgres rate limit backend failed to start, keeping per-process limits: {e}")
+    if rate_limiter.backend:
+        logger.info(f"🚦 Rate limiting uses shared backend: {rate_limiter.backend.name}")
+    return rate_limiter.backend
+
 # Background cleanup task
 async def start_rate_limiter_cleanup():
     """Start background task for cleaning up inactive rate limit data"""
@@ -213,4 +517,32 @@ async def start_rate_limiter_cleanup():
             await asyncio.sleep(300)  # Clean up every 5 minutes
             await rate_limiter.cleanup_inactive_clients()
         except Exception as e:
-            logger.error(f"🚦 Rate limiter cleanup error: {e}")
\ No newline at end of file
+            logger.error(f"🚦 Rate limiter cleanup error: {e}")
+
+
+def benchmark_rate_limiter(client_counts: Tuple[int, ...] = (10, 1_000, 100_000),
+                           checks: int = 200_000) -> Dict[int, float]:
+    """
+    Measure the cost of one check at increasing client populations
+    Returns nanoseconds per check - roughly flat numbers show O(1) cost
+    """
+    results = {}
+    for clients in client_counts:
+        limiter = RateLimiter()
+        limiter.add_endpoint_rule("/api/scheduler", scheduler_rule)
+        client_ids = [f"10.0.{i // 256 % 256}.{i % 256}:{i}" for i in range(clients)]
+        now = 1_000.0
+        for client_id in client_ids:  # Populate state before timing
+            limiter.check(client_id, "/api/scheduler_status", now)
+
+        start = time.perf_counter()
+        for i in range(checks):
+            limiter.check(client_ids[i % clients], "/api/scheduler_status", now + i * 0.001)
+        results[clients] = (time.perf_counter() - start) / checks * 1e9
+    return results
+
+
+if __name__ == "__main__":
+    logging.disable(logging.WARNING)  # Rejections would flood the output
+    for clients, ns_per_check in benchmark_rate_limiter().items():
+        print(f"{clients:>8} clients: {ns_per_check:8.0f} ns/check")
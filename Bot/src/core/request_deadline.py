@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Per-Request Deadline Budgets
+Propagates an absolute deadline through a user workflow via contextvars so
+each stage (LLM, image, send) can check its remaining budget and degrade
+instead of stacking timeouts
+"""
+
+import asyncio
+import contextvars
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Iterator, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Workflow budgets (seconds) - hard upper bound on user-visible latency
+WISDOM_DEADLINE_SECONDS = float(os.environ.get("WISDOM_DEADLINE_SECONDS", "35"))
+QUIZ_DEADLINE_SECONDS = float(os.environ.get("QUIZ_DEADLINE_SECONDS", "20"))
+
+# Stage thresholds used to decide whether a stage is still worth starting
+LLM_MIN_BUDGET = 4.0        # Below this, use fallback wisdom/quiz immediately
+IMAGE_MIN_BUDGET = 8.0      # Below this, skip DALL-E and use a preset image
+IMAGE_HD_BUDGET = 25.0      # HD images only when plenty of budget remains
+SEND_RESERVE = 3.0          # Always keep time to deliver the final message
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """Raised when a stage runs out of request budget"""
+
+
+@contextmanager
+def deadline_budget(seconds: float) -> Iterator[float]:
+    """Set a deadline for the current workflow (nested budgets can only shrink it)"""
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        deadline = min(deadline, current)
+    token = _deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_budget() -> Optional[float]:
+    """Seconds left for the current request, or None when no deadline is set"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+def has_budget(min_seconds: float) -> bool:
+    """Check whether at least min_seconds remain (always True without a deadline)"""
+    remaining = remaining_budget()
+    return remaining is None or remaining >= min_seconds
+
+
+async def run_within_budget(awaitable: Awaitable[T], reserve: float = 0.0, stage: str = "stage") -> T:
+    """Await with a timeout equal to the remaining budget minus reserve"""
+    remaining = remaining_budget()
+    if remaining is None:
+        return await awaitable
+    timeout = remaining - reserve
+    if timeout <= 0:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise DeadlineExceeded(f"No budget left for {stage}")
+    try:
+        return await asyncio.wait_for(awaitable, timeout=timeout)
+    except asyncio.TimeoutError:
+        logger.warning(f"⏱️ {stage} exceeded request budget ({timeout:.1f}s)")
+        raise DeadlineExceeded(f"{stage} exceeded request budget")
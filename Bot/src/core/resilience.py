@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Resilience Layer for External Dependencies
+Error classification (retryable vs permanent), exponential backoff with
+jitter, retry budgets and per-dependency circuit breakers for Telegram,
+OpenAI and Postgres
+"""
+
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+import asyncpg
+import httpx
+
+try:
+    import openai
+except ImportError:  # OpenAI SDK is optional for DB-only tools
+    openai = None
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class CircuitState(Enum):
+    """Circuit breaker states"""
+    CLOSED = "closed"        # Normal operation
+    OPEN = "open"            # Failing fast
+    HALF_OPEN = "half_open"  # Probing with a limited number of calls
+
+
+class CircuitOpenError(Exception):
+    """Raised when a dependency's circuit is open and calls fail fast"""
+
+    def __init__(self, dependency: str, retry_in: float):
+        super().__init__(f"{dependency} circuit open - retry in {retry_in:.0f}s")
+        self.dependency = dependency
+        self.retry_in = retry_in
+
+
+# ===================================================================
+# ERROR CLASSIFICATION
+# ===================================================================
+
+_PERMANENT_MARKERS = ("insufficient_quota", "quota", "billing", "content_policy", "safety",
+                      "invalid_api_key", "unauthorized", "forbidden", "blocked")
+_RETRYABLE_MARKERS = ("rate_limit", "rate limit", "timeout", "timed out", "temporarily",
+                      "connection", "network", "overloaded", "503", "502", "504")
+
+_RETRYABLE_DB_ERRORS = (
+    asyncpg.exceptions.PostgresConnectionError,
+    asyncpg.exceptions.CannotConnectNowError,
+    asyncpg.exceptions.TooManyConnectionsError,
+    asyncpg.exceptions.ConnectionDoesNotExistError,
+    asyncpg.exceptions.InterfaceError,
+    asyncpg.exceptions.SerializationError,
+    asyncpg.exceptions.DeadlockDetectedError,
+    asyncpg.exceptions.AdminShutdownError,
+)
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """Classify an exception as transient (retryable) or permanent"""
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError, httpx.TimeoutException, httpx.TransportError)):
+        return True
+    if isinstance(error, _RETRYABLE_DB_ERRORS):
+        return True
+    if isinstance(error, asyncpg.exceptions.PostgresError):
+        return False  # Constraint violations, syntax errors, etc.
+
+    message = str(error).lower()
+    if openai is not None:
+        if isinstance(error, openai.RateLimitError):
+            # 429 covers both throttling (transient) and exhausted quota (permanent)
+            return not any(marker in message for marker in ("insufficient_quota", "quota", "billing"))
+        if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError)):
+            return True
+        if isinstance(error, openai.APIStatusError):
+            return getattr(error, "status_code", 0) >= 500
+
+    if any(marker in message for marker in _PERMANENT_MARKERS):
+        return False
+    return any(marker in message for marker in _RETRYABLE_MARKERS)
+
+
+def is_permanent_openai_error(error: BaseException) -> bool:
+    """Quota/billing/auth errors that will not succeed on any retry or prompt change"""
+    message = str(error).lower()
+    if any(marker in message for marker in ("insufficient_quota", "quota", "billing", "invalid_api_key")):
+        return True
+    if openai is not None and isinstance(error, (openai.AuthenticationError, openai.PermissionDeniedError)):
+        return True
+    return False
+
+
+def classify_telegram_result(result: Dict[str, Any]) -> Tuple[bool, Optional[float]]:
+    """Classify a failed Telegram Bot API response: (retryable, retry_after seconds)"""
+    error_code = result.get("error_code", 0) or 0
+    if error_code == 429:
+        retry_after = (result.get("parameters") or {}).get("retry_after")
+        return True, float(retry_after) if retry_after is not None else None
+    if error_code >= 500:
+        return True, None
+    # 400 bad request, 401/403 blocked or unauthorized, 404 not found: never succeed on retry
+    return False, None
+
+
+# ===================================================================
+# BACKOFF AND RETRY BUDGET
+# ===================================================================
+
+@dataclass
+class RetryPolicy:
+    """Exponential backoff with full jitter"""
+    max_attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+
+    def backoff(self, attempt: int) -> float:
+        """Delay before retry number `attempt` (0-based)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class RetryBudget:
+    """Caps retries to a fraction of recent requests so outages don't multiply load"""
+
+    def __init__(self, ratio: float = 0.2, min_retries: int = 5, window_seconds: float = 10.0):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.window_seconds = window_seconds
+        self._window_start = time.monotonic()
+        self._requests = 0
+        self._retries = 0
+        self.exhausted_count = 0
+
+    def _roll(self):
+        now = time.monotonic()
+        if now - self._window_start >= self.window_seconds:
+            self._window_start = now
+            self._requests = 0
+            self._retries = 0
+
+    def record_request(self):
+        self._roll()
+        self._requests += 1
+
+    def try_acquire_retry(self) -> bool:
+        """Reserve one retry if the budget allows it"""
+        self._roll()
+        if self._retries >= max(self.min_retries, self.ratio * self._requests):
+            self.exhausted_count += 1
+            return False
+        self._retries += 1
+        return True
+
+
+# ===================================================================
+# CIRCUIT BREAKER
+# ===================================================================
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with half-open probing"""
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0,
+                 half_open_max_calls: int = 1, half_open_timeout: Optional[float] = None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        # A probe that never reports back (hung, or its caller vanished) reopens the circuit after this
+        self.half_open_timeout = half_open_timeout if half_open_timeout is not None else recovery_timeout
+        self.state = CircuitState.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.half_open_calls = 0
+        self.half_open_since = 0.0
+        self.stats = {"successes": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    def retry_in(self) -> float:
+        return max(0.0, self.recovery_timeout - (time.monotonic() - self.opened_at))
+
+    def allow_request(self) -> bool:
+        """Check whether a call may proceed (transitions OPEN -> HALF_OPEN after the timeout)"""
+        if self.state == CircuitState.OPEN:
+            if self.retry_in() > 0:
+                self.stats["rejected"] += 1
+                return False
+            self.state = CircuitState.HALF_OPEN
+            self.half_open_calls = 0
+            self.half_open_since = time.monotonic()
+            logger.info(f"🟡 Circuit {self.name}: half-open, probing dependency")
+        if self.state == CircuitState.HALF_OPEN:
+            if self.half_open_calls >= self.half_open_max_calls:
+                if time.monotonic() - self.half_open_since >= self.half_open_timeout:
+                    logger.warning(f"🔴 Circuit {self.name}: half-open probe timed out - reopening")
+                    self._open()
+                self.stats["rejected"] += 1
+                return False
+            self.half_open_calls += 1
+        return True
+
+    def release_probe(self):
+        """Give back a half-open slot for a call that ended without a verdict (e.g. cancelled)"""
+        if self.state == CircuitState.HALF_OPEN and self.half_open_calls > 0:
+            self.half_open_calls -= 1
+
+    def _open(self):
+        self.state = CircuitState.OPEN
+        self.opened_at = time.monotonic()
+
+    def record_success(self):
+        self.stats["successes"] += 1
+        self.consecutive_failures = 0
+        if self.state != CircuitState.CLOSED:
+            logger.info(f"🟢 Circuit {self.name}: closed, dependency recovered")
+            self.state = CircuitState.CLOSED
+
+    def record_failure(self):
+        self.stats["failures"] += 1
+        self.consecutive_failures += 1
+        if self.state == CircuitState.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != CircuitState.OPEN:
+                self.stats["opened"] += 1
+                logger.error(f"🔴 Circuit {self.name}: OPEN after {self.consecutive_failures} failures - failing fast for {self.recovery_timeout:.0f}s")
+            self._open()
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "state": self.state.value,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_in_seconds": round(self.retry_in(), 1) if self.state == CircuitState.OPEN else 0,
+            **self.stats
+        }
+
+
+class DependencyGuard:
+    """Circuit breaker + retry policy + retry budget for one external dependency"""
+
+    def __init__(self, name: str, policy: Optional[RetryPolicy] = None,
+                 breaker: Optional[CircuitBreaker] = None, budget: Optional[RetryBudget] = None):
+        self.name = name
+        self.policy = policy or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker(name)
+        self.budget = budget or RetryBudget()
+
+    async def call_once(self, awaitable: Awaitable[T]) -> T:
+        """Await a single call through the circuit breaker (no retries)"""
+        if not self.breaker.allow_request():
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            raise CircuitOpenError(self.name, self.breaker.retry_in())
+        self.budget.record_request()
+        try:
+            result = await awaitable
+        except asyncio.CancelledError:
+            # Deadline/shutdown cancelled the caller: no verdict on the dependency, but free the probe slot
+            self.breaker.release_probe()
+            raise
+        except Exception as e:
+            if is_retryable_error(e):
+                self.breaker.record_failure()
+            else:
+                # Permanent errors are the caller's problem, not a sign of dependency outage
+                self.breaker.record_success()
+            raise
+        self.breaker.record_success()
+        return result
+
+    async def call(self, func: Callable[[], Awaitable[T]], policy: Optional[RetryPolicy] = None) -> T:
+        """Call with circuit breaking, retrying transient errors with jittered backoff"""
+        policy = policy or self.policy
+        attempt = 0
+        while True:
+            try:
+                return await self.call_once(func())
+            except Exception as e:
+                retryable = is_retryable_error(e)
+                if (not retryable or attempt + 1 >= policy.max_attempts
+                        or not self.budget.try_acquire_retry()):
+                    raise
+                delay = policy.backoff(attempt)
+                logger.warning(f"🔁 {self.name} transient error ({type(e).__name__}): {e}. Retry {attempt + 1}/{policy.max_attempts - 1} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    def get_status(self) -> Dict[str, Any]:
+        return {**self.breaker.get_status(), "retry_budget_exhausted": self.budget.exhausted_count}
+
+
+# Global per-dependency guards
+_guards: Dict[str, DependencyGuard] = {
+    "telegram": DependencyGuard("telegram", RetryPolicy(max_attempts=3, base_delay=0.5, max_delay=5.0),
+                                CircuitBreaker("telegram", failure_threshold=8, recovery_timeout=20.0)),
+    "openai": DependencyGuard("openai", RetryPolicy(max_attempts=2, base_delay=1.0, max_delay=8.0),
+                              CircuitBreaker("openai", failure_threshold=5, recovery_timeout=60.0)),
+    "postgres": DependencyGuard("postgres", RetryPolicy(max_attempts=3, base_delay=1.0, max_delay=4.0),
+                                CircuitBreaker("postgres", failure_threshold=5, recovery_timeout=15.0)),
+}
+
+
+def get_dependency_guard(name: str) -> DependencyGuard:
+    """Get (or lazily create) the guard for a dependency"""
+    guard = _guards.get(name)
+    if guard is None:
+        guard = _guards[name] = DependencyGuard(name)
+    return guard
+
+
+def get_resilience_status() -> Dict[str, Any]:
+    """Circuit states for /health"""
+    return {name: guard.get_status() for name, guard in _guards.items()}
@@ -9,6 +9,24 @@ from typing import Optional
 
 logger = logging.getLogger(__name__)
 
+async def create_db_pool_manager():
+    """Factory function to create the shared database pool manager"""
+    from .db_pool import get_pool_manager
+    
+    logger.info("🗄️ Creating shared database pool...")
+    manager = get_pool_manager()
+    await manager.initialize()
+    return manager
+
+async def create_admin_cache():
+    """Factory function to start the admin authorization cache"""
+    from .admin_cache import get_admin_cache
+    
+    logger.info("👑 Loading admin authorization snapshot...")
+    admin_cache = get_admin_cache()
+    await admin_cache.start()
+    return admin_cache
+
 async def create_torah_bot():
     """Factory function to create TorahBotFinal instance"""
     from ..torah_bot.simple_bot import TorahBotFinal
@@ -64,7 +82,9 @@ async def create_admin_commands(telegram_client, newsletter_manager):
 
 # Service creation order - important for dependencies
 SERVICE_DEPENDENCIES = {
-    'torah_bot': [],
+    'db_pool': [],
+    'admin_cache': ['db_pool'],
+    'torah_bot': ['db_pool'],
     'telegram_client': ['torah_bot'],
     'newsletter_manager': ['torah_bot'],
     'admin_commands': ['telegram_client', 'newsletter_manager']
@@ -74,6 +94,22 @@ async def initialize_all_services(container):
     """Initialize all services in correct dependency order"""
     logger.info("🚀 Starting ServiceContainer initialization sequence...")
     
+    # 0. Shared database pool - every DB consumer attaches to it
+    try:
+        db_pool = await container.get_service('db_pool', create_db_pool_manager)
+    except Exception as e:
+        # Consumers degrade individually (fallback permissions, no newsletter) as before
+        logger.error(f"❌ Shared database pool unavailable: {type(e).__name__}: {e}")
+        db_pool = None
+    
+    # 0.5 Admin snapshot - admin checks become memory lookups
+    admin_cache = None
+    if db_pool is not None:
+        try:
+            admin_cache = await container.get_service('admin_cache', create_admin_cache)
+        except Exception as e:
+            logger.error(f"❌ Admin cache unavailable, using fallback admins: {type(e).__name__}: {e}")
+    
     # 1. Create Torah Bot (base dependency)
     bot = await container.get_service('torah_bot', create_torah_bot)
     
@@ -101,6 +137,8 @@ async def initialize_all_services(container):
     
     logger.info("✅ All services initialized in ServiceContainer")
     return {
+        'db_pool': db_pool,
+        'admin_cache': admin_cache,
         'torah_bot': bot,
         'telegram_client': telegram_client,
         'newsletter_manager': newsletter_manager,
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Single-Flight Request Coalescing
+Concurrent identical generations (same operation + same prompt) share one
+in-flight OpenAI call instead of issuing duplicate requests
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from src.core.metrics import OPENAI_REQUEST_SECONDS, get_metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Coalesces concurrent calls keyed by (operation, prompt hash)"""
+
+    def __init__(self):
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {"executed": 0, "coalesced": 0, "failed": 0})
+
+    @staticmethod
+    def make_key(operation: str, key_material: Any) -> str:
+        """Build a stable coalescing key from the operation name and request parameters"""
+        payload = json.dumps(key_material, sort_keys=True, ensure_ascii=False, default=str)
+        digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+        return f"{operation}:{digest}"
+
+    async def run(self, operation: str, key_material: Any, func: Callable[[], Awaitable[T]]) -> T:
+        """Run func once for all concurrent callers with the same key"""
+        key = self.make_key(operation, key_material)
+        stats = self._stats[operation]
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            stats["coalesced"] += 1
+            logger.info(f"🔗 Coalesced duplicate {operation} request onto in-flight call ({key[-8:]})")
+        else:
+            stats["executed"] += 1
+            task = asyncio.ensure_future(self._execute(key, operation, func))
+            task.add_done_callback(self._consume_exception)
+            self._in_flight[key] = task
+
+        # Shield so a caller hitting its deadline doesn't cancel the shared call for everyone
+        return await asyncio.shield(task)
+
+    async def _execute(self, key: str, operation: str, func: Callable[[], Awaitable[T]]) -> T:
+        try:
+            return await func()
+        except Exception:
+            self._stats[operation]["failed"] += 1
+            raise
+        finally:
+            self._in_flight.pop(key, None)
+
+    @staticmethod
+    def _consume_exception(task: asyncio.Future):
+        # Avoid "exception was never retrieved" when every caller gave up waiting
+        if not task.cancelled():
+            task.exception()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get executed/coalesced counters per operation"""
+        return {
+            "in_flight": len(self._in_flight),
+            "operations": {operation: dict(counts) for operation, counts in self._stats.items()}
+        }
+
+
+# Global single-flight instance
+_single_flight = SingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    """Get global single-flight instance"""
+    return _single_flight
+
+
+async def _timed_in_thread(operation: str, func: Callable[..., T], request_kwargs: Dict[str, Any],
+                           record_sample: Optional[Callable[[float, bool], None]] = None) -> T:
+    """The actual SDK call, timed once per execution (coalesced waiters are not double-counted)"""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        result = await asyncio.to_thread(func, **request_kwargs)
+        outcome = "ok"
+        return result
+    finally:
+        duration = time.perf_counter() - start
+        get_metrics().observe(OPENAI_REQUEST_SECONDS, duration,
+                              model=request_kwargs.get("model", "unknown"), operation=operation, outcome=outcome)
+        if record_sample:
+            record_sample(duration, outcome == "ok")
+
+
+async def run_coalesced_in_thread(operation: str, func: Callable[..., T], *,
+                                  record_sample: Optional[Callable[[float, bool], None]] = None,
+                                  **request_kwargs) -> T:
+    """
+    Run a blocking SDK call (e.g. OpenAI create) in a thread, shared with identical in-flight requests
+    record_sample(duration, success) is called once per real upstream call, never for coalesced waiters
+    """
+    return await _single_flight.run(
+        operation, request_kwargs, lambda: _timed_in_thread(operation, func, request_kwargs, record_sample)
+    )
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Pre-aggregated Newsletter Analytics
+Counters and daily rollups maintained incrementally by triggers
+(src/database/stats_rollups.sql), with a short TTL cache in front, so
+/newsletter_stats and the stats API read a handful of rows regardless of
+how large users and delivery_log grow
+"""
+
+import asyncio
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from src.core.single_flight import get_single_flight
+
+logger = logging.getLogger(__name__)
+
+STATS_CACHE_TTL_SECONDS = float(os.environ.get("STATS_CACHE_TTL_SECONDS", "30"))
+ROLLUPS_SQL_PATH = Path(__file__).resolve().parent.parent / "database" / "stats_rollups.sql"
+
+# Serializes schema installation / backfill across instances
+ROLLUP_INSTALL_LOCK_ID = 0x5354415453  # "STATS"
+
+COUNTERS_SQL = "SELECT name, value FROM stats_counters"
+
+LANGUAGES_SQL = """
+    SELECT
+        l.language,
+        l.active AS subscriber_count,
+        COALESCE(SUM(a.subscribers) FILTER (WHERE a.day > (NOW() AT TIME ZONE 'UTC')::date - 30), 0) AS active_users_30d,
+        COALESCE(SUM(a.subscribers) FILTER (WHERE a.day > (NOW() AT TIME ZONE 'UTC')::date - 7), 0) AS active_users_7d
+    FROM stats_subscribers_by_language l
+    LEFT JOIN stats_subscriber_activity_daily a
+        ON a.language = l.language AND a.day > (NOW() AT TIME ZONE 'UTC')::date - 30
+    WHERE l.active > 0
+    GROUP BY l.language, l.active
+    ORDER BY subscriber_count DESC
+"""
+
+DELIVERIES_30D_SQL = """
+    SELECT COALESCE(SUM(sent), 0) FROM stats_delivery_daily
+    WHERE day > (NOW() AT TIME ZONE 'UTC')::date - 30
+"""
+
+RECENT_BROADCASTS_SQL = """
+    SELECT
+        nb.broadcast_date,
+        nb.status,
+        nb.total_recipients,
+        nb.successful_deliveries,
+        COALESCE(o.opens, 0) AS opens
+    FROM newsletter_broadcasts nb
+    LEFT JOIN stats_broadcast_opens o ON o.broadcast_id = nb.id
+    WHERE nb.broadcast_date >= CURRENT_DATE - INTERVAL '7 days'
+    ORDER BY nb.broadcast_date DESC
+"""
+
+
+def _percent(part: int, whole: int) -> float:
+    return round(part / whole * 100, 2) if whole else 0
+
+
+class NewsletterStatsReadModel:
+    """Reads pre-aggregated analytics through a small TTL cache"""
+
+    def __init__(self, ttl_seconds: float = STATS_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._pool = None
+        self._installed = False
+        self._install_lock: Optional[asyncio.Lock] = None
+        self._cached: Optional[Dict[str, Any]] = None
+        self._cached_at = 0.0
+        self.stats = {"hits": 0, "misses": 0, "errors": 0}
+
+    async def initialize(self, pool=None):
+        """Install rollup tables/triggers and backfill them on first use (idempotent)"""
+        if self._installed:
+            return
+        if self._install_lock is None:
+            self._install_lock = asyncio.Lock()
+        async with self._install_lock:
+            if self._installed:
+                return
+            if pool is None:
+                from src.core.db_pool import get_shared_pool
+                pool = await get_shared_pool("default")
+            self._pool = pool
+            ddl = ROLLUPS_SQL_PATH.read_text(encoding="utf-8")
+            async with pool.acquire() as conn:
+                async with conn.transaction():
+                    await conn.execute("SELECT pg_advisory_xact_lock($1)", ROLLUP_INSTALL_LOCK_ID)
+                    await conn.execute(ddl)
+                    if not await conn.fetchval("SELECT EXISTS (SELECT 1 FROM stats_counters)"):
+                        logger.info("📊 Backfilling analytics rollups (one-time)...")
+                        await conn.execute("SELECT stats_rebuild_rollups()")
+            self._installed = True
+            logger.info("📊 Analytics read model ready")
+
+    async def rebuild(self):
+        """Recompute every rollup from the source tables (reconciliation)"""
+        await self.initialize()
+        async with self._pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute("SELECT stats_rebuild_rollups()")
+        self.invalidate()
+
+    def invalidate(self):
+        self._cached = None
+
+    async def _load(self) -> Dict[str, Any]:
+        await self.initialize()
+        async with self._pool.acquire() as conn:
+            counters = {row["name"]: row["value"] for row in await conn.fetch(COUNTERS_SQL)}
+            languages = await conn.fetch(LANGUAGES_SQL)
+            deliveries_30d = await conn.fetchval(DELIVERIES_30D_SQL)
+            recent_broadcasts = await conn.fetch(RECENT_BROADCASTS_SQL)
+
+        return {
+            "counters": {
+                "total_users": counters.get("users_total", 0),
+                "total_subscriptions": counters.get("subscriptions_total", 0),
+                "active_subscribers": counters.get("subscriptions_active", 0),
+                "completed_broadcasts": counters.get("broadcasts_completed", 0),
+                "deliveries_last_30d": int(deliveries_30d or 0),
+            },
+            "languages": [
+                {
+                    "language": row["language"],
+                    "subscribers": row["subscriber_count"],
+                    "active_30d": int(row["active_users_30d"]),
+                    "active_7d": int(row["active_users_7d"])
+                }
+                for row in languages
+            ],
+            "recent_broadcasts": [
+                {
+                    "date": row["broadcast_date"],
+                    "status": row["status"],
+                    "recipients": row["total_recipients"],
+                    "delivery_rate": _percent(row["successful_deliveries"] or 0, row["total_recipients"] or 0),
+                    "open_rate": _percent(row["opens"], row["successful_deliveries"] or 0)
+                }
+                for row in recent_broadcasts
+            ]
+        }
+
+    async def _load_and_cache(self) -> Dict[str, Any]:
+        try:
+            result = await self._load()
+        except Exception:
+            self.stats["errors"] += 1
+            raise
+        self._cached, self._cached_at = result, time.monotonic()
+        return result
+
+    async def snapshot(self) -> Dict[str, Any]:
+        """Current analytics (cached for ttl_seconds; concurrent misses share one load)"""
+        if self._cached is not None and time.monotonic() - self._cached_at < self.ttl_seconds:
+            self.stats["hits"] += 1
+            return self._cached
+        self.stats["misses"] += 1
+        return await get_single_flight().run("newsletter_stats", None, self._load_and_cache)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "installed": self._installed,
+            "cache_age_seconds": round(time.monotonic() - self._cached_at, 1) if self._cached is not None else None,
+            **self.stats
+        }
+
+
+# Global analytics read model
+_stats_read_model = NewsletterStatsReadModel()
+
+
+def get_stats_read_model() -> NewsletterStatsReadModel:
+    """Get global analytics read model"""
+    return _stats_read_model
@@ -1,13 +1,17 @@
 #!/usr/bin/env python3
 """
 Telegram webhook security utilities
-Handles webhook authentication and IP validation
+Handles webhook authentication, IP validation and Mini App initData checks
 """
 import hashlib
 import hmac
 import ipaddress
+import json
 import logging
-from typing import Optional, List
+import os
+import time
+from typing import Any, Dict, Optional, List
+from urllib.parse import parse_qsl
 from fastapi import Request
 
 logger = logging.getLogger(__name__)
@@ -26,6 +30,10 @@ TELEGRAM_IP_RANGES = [
     ipaddress.IPv6Network("2001:b28:f23f::/48"),
 ]
 
+# Maximum age of Mini App initData accepted for writes (seconds)
+WEBAPP_INIT_DATA_MAX_AGE = int(os.getenv("WEBAPP_INIT_DATA_MAX_AGE", "86400"))
+WEBAPP_INIT_DATA_HEADER = "X-Telegram-Web-App-Init-Data"
+
 class TelegramWebhookSecurityError(Exception):
     """Custom exception for webhook security errors"""
     pass
@@ -111,6 +119,43 @@ def verify_telegram_webhook(request: Request, secret_token: Optional[str] = None
         logger.error(f"🔒 Webhook verification error: {e}")
         return False
 
+def verify_webapp_init_data(init_data: Optional[str], bot_token: Optional[str] = None,
+                            max_age: int = WEBAPP_INIT_DATA_MAX_AGE) -> Optional[Dict[str, Any]]:
+    """
+    Verify Telegram Mini App initData (HMAC-SHA256 keyed by the bot token)
+    Returns the signed `user` object, or None when the data is missing, forged or stale
+    """
+    bot_token = bot_token or os.environ.get('BOT_TOKEN') or os.environ.get('TELEGRAM_BOT_TOKEN')
+    if not init_data or not bot_token:
+        return None
+    
+    try:
+        fields = dict(parse_qsl(init_data, keep_blank_values=True, strict_parsing=True))
+    except ValueError:
+        logger.warning("🔒 Malformed WebApp initData")
+        return None
+    
+    received_hash = fields.pop("hash", "")
+    data_check_string = "\n".join(f"{key}={value}" for key, value in sorted(fields.items()))
+    secret_key = hmac.new(b"WebAppData", bot_token.encode("utf-8"), hashlib.sha256).digest()
+    expected_hash = hmac.new(secret_key, data_check_string.encode("utf-8"), hashlib.sha256).hexdigest()
+    if not hmac.compare_digest(expected_hash, received_hash):
+        logger.warning("🔒 Invalid WebApp initData signature")
+        return None
+    
+    try:
+        auth_date = int(fields.get("auth_date", "0"))
+        user = json.loads(fields.get("user", ""))
+    except ValueError:
+        logger.warning("🔒 WebApp initData without auth_date or user")
+        return None
+    if max_age and time.time() - auth_date > max_age:
+        logger.warning("🔒 Expired WebApp initData")
+        return None
+    if not isinstance(user, dict) or not isinstance(user.get("id"), int):
+        return None
+    return user
+
 def generate_webhook_secret_token() -> str:
     """Generate a secure random token for webhook setup"""
     import secrets
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Per-User Fair-Share Quotas for AI Workflows
+Token buckets and in-flight guards per Telegram user and workflow type:
+double-clicks (same input) join the running generation, and users over quota are served
+a cheap response (fallback wisdom, preset image, pool quiz) instead of new
+OpenAI calls
+"""
+
+import asyncio
+import contextvars
+import logging
+import os
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from enum import Enum
+from typing import Awaitable, Callable, Dict, Iterator, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+@dataclass
+class WorkflowQuota:
+    """Token bucket for one workflow: `capacity` requests, refilled one per `refill_seconds`"""
+    capacity: float
+    refill_seconds: float
+
+
+DEFAULT_QUOTAS = {
+    "wisdom": WorkflowQuota(
+        capacity=float(os.environ.get("WISDOM_USER_BURST", "5")),
+        refill_seconds=float(os.environ.get("WISDOM_USER_REFILL_SECONDS", "60"))
+    ),
+    "quiz": WorkflowQuota(
+        capacity=float(os.environ.get("QUIZ_USER_BURST", "8")),
+        refill_seconds=float(os.environ.get("QUIZ_USER_REFILL_SECONDS", "30"))
+    ),
+}
+
+
+class QuotaDecision(Enum):
+    """Outcome of a per-user admission check"""
+    ADMITTED = "admitted"      # Full AI workflow
+    THROTTLED = "throttled"    # Over quota - cheap response
+    COALESCED = "coalesced"    # Same workflow with the same input already running for this user
+
+
+_cheap_mode: contextvars.ContextVar[bool] = contextvars.ContextVar("cheap_response_mode", default=False)
+
+
+@contextmanager
+def cheap_response_mode() -> Iterator[None]:
+    """Serve the current workflow without new AI generations"""
+    token = _cheap_mode.set(True)
+    try:
+        yield
+    finally:
+        _cheap_mode.reset(token)
+
+
+def is_cheap_mode() -> bool:
+    """Check whether the current workflow must avoid OpenAI calls"""
+    return _cheap_mode.get()
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class UserWorkflowLimiter:
+    """Token buckets keyed by (user_id, workflow) + in-flight guards keyed by (user_id, workflow, input)"""
+
+    CLEANUP_EVERY = 1000  # Admission checks between sweeps of idle buckets
+
+    def __init__(self, quotas: Optional[Dict[str, WorkflowQuota]] = None, enabled: bool = True):
+        self.quotas = quotas or dict(DEFAULT_QUOTAS)
+        self.enabled = enabled
+        self._buckets: Dict[Tuple[int, str], _Bucket] = {}
+        self._in_flight: Dict[Tuple[int, str, str], asyncio.Task] = {}
+        self._checks = 0
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {d.value: 0 for d in QuotaDecision})
+
+    def _take_token(self, user_id: int, workflow: str) -> bool:
+        quota = self.quotas.get(workflow)
+        if quota is None:
+            return True
+        now = time.monotonic()
+        key = (user_id, workflow)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket(quota.capacity, now)
+        else:
+            bucket.tokens = min(quota.capacity, bucket.tokens + (now - bucket.updated) / quota.refill_seconds)
+            bucket.updated = now
+
+        self._checks += 1
+        if self._checks % self.CLEANUP_EVERY == 0:
+            self._cleanup(now)
+
+        if bucket.tokens < 1:
+            return False
+        bucket.tokens -= 1
+        return True
+
+    def _cleanup(self, now: float):
+        # A bucket that has refilled completely is identical to a new one
+        idle = [key for key, bucket in self._buckets.items()
+                if bucket.tokens + (now - bucket.updated) / self.quotas[key[1]].refill_seconds >= self.quotas[key[1]].capacity]
+        for key in idle:
+            del self._buckets[key]
+
+    async def run(self, user_id: int, workflow: str, func: Callable[[], Awaitable[T]],
+                  request_key: str = "") -> Tuple[QuotaDecision, Optional[T]]:
+        """
+        Run a workflow for a user under the fair-share policy
+        request_key identifies the input (prompt text, button); only identical inputs are coalesced,
+        a different question while one is running goes through normal admission
+        """
+        if not self.enabled:
+            return QuotaDecision.ADMITTED, await func()
+
+        key = (user_id, workflow, request_key)
+        stats = self._stats[workflow]
+        if key in self._in_flight:
+            # Double-click on the same input: the running generation will answer this chat
+            stats[QuotaDecision.COALESCED.value] += 1
+            logger.info(f"🔗 User {user_id} {workflow} already in progress - coalesced repeated request")
+            return QuotaDecision.COALESCED, None
+
+        if self._take_token(user_id, workflow):
+            decision = QuotaDecision.ADMITTED
+            task = asyncio.ensure_future(func())
+        else:
+            decision = QuotaDecision.THROTTLED
+            logger.warning(f"🪣 User {user_id} over {workflow} quota - serving cheap response")
+            with cheap_response_mode():
+                # The task copies the context, so the cheap mode flag travels with it
+                task = asyncio.ensure_future(func())
+        stats[decision.value] += 1
+
+        self._in_flight[key] = task
+        try:
+            return decision, await task
+        finally:
+            if self._in_flight.get(key) is task:
+                del self._in_flight[key]
+
+    def get_stats(self) -> Dict[str, object]:
+        """Decision counters per workflow"""
+        return {
+            "enabled": self.enabled,
+            "tracked_buckets": len(self._buckets),
+            "in_flight": len(self._in_flight),
+            "workflows": {workflow: dict(counts) for workflow, counts in self._stats.items()}
+        }
+
+
+# Global per-user workflow limiter
+_user_workflow_limiter = UserWorkflowLimiter(
+    enabled=os.environ.get("USER_QUOTAS_ENABLED", "true").lower() == "true"
+)
+
+
+def get_user_workflow_limiter() -> UserWorkflowLimiter:
+    """Get global per-user workflow limiter"""
+    return _user_workflow_limiter
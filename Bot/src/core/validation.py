@@ -7,6 +7,7 @@ from typing import Optional, List, Dict, Any, Union
 from pydantic import BaseModel, Field, validator
 import re
 from enum import Enum
+import os
 
 class SupportedLanguage(str, Enum):
     """Supported languages for validation"""
@@ -20,14 +21,23 @@ class SupportedLanguage(str, Enum):
     PORTUGUESE = "portuguese"
     ARABIC = "arabic"
 
+GAME_ANALYTICS_MAX_BATCH = 100
+# Highest score a finished game can report (leaderboard and analytics share it)
+GAME_MAX_SCORE = int(os.getenv('GAME_MAX_SCORE', '1000'))
+
 class GameAnalyticsRequest(BaseModel):
-    """Validation model for game analytics data"""
+    """Validation model for one game/tutorial analytics event"""
+    event_type: str = Field(..., pattern=r'^(TUTORIAL_STARTED|TUTORIAL_COMPLETED|GAME_STARTED|GAME_COMPLETED|GAME_ACHIEVEMENT)$')
     user_id: int = Field(..., ge=1, description="Telegram user ID")
-    score: int = Field(..., ge=0, le=10000, description="Game score")
-    duration: int = Field(..., ge=1, le=120, description="Game duration in seconds")
-    items_collected: int = Field(..., ge=0, le=1000, description="Items collected")
-    mistakes: int = Field(..., ge=0, le=500, description="Mistakes made")
+    username: Optional[str] = Field(None, max_length=100)
+    score: Optional[int] = Field(None, ge=0, le=GAME_MAX_SCORE, description="Game score")
+    duration: Optional[float] = Field(None, ge=0, le=3600, description="Game/tutorial duration in seconds")
+    items_collected: Optional[int] = Field(None, ge=0, le=1000, description="Items collected")
+    mistakes: Optional[int] = Field(None, ge=0, le=500, description="Mistakes made")
+    achievement_type: Optional[str] = Field(None, max_length=50, description="GAME_ACHIEVEMENT kind")
     achievements: Optional[List[str]] = Field(default=[], description="Achievements unlocked")
+    first_time: bool = False
+    after_tutorial: bool = False
     language: Optional[SupportedLanguage] = Field(default=SupportedLanguage.ENGLISH)
     
     @validator('achievements')
@@ -42,7 +52,7 @@ class GameAnalyticsRequest(BaseModel):
 class TutorialAnalyticsRequest(BaseModel):
     """Validation model for tutorial analytics"""
     user_id: int = Field(..., ge=1, description="Telegram user ID")
-    event_type: str = Field(..., regex=r'^(TUTORIAL_STARTED|TUTORIAL_COMPLETED|SCREEN_COMPLETED)$')
+    event_type: str = Field(..., pattern=r'^(TUTORIAL_STARTED|TUTORIAL_COMPLETED|SCREEN_COMPLETED)$')
     screen_number: Optional[int] = Field(None, ge=1, le=10, description="Tutorial screen number")
     duration: Optional[int] = Field(None, ge=0, le=600, description="Duration in seconds")
     language: Optional[SupportedLanguage] = Field(default=SupportedLanguage.ENGLISH)
@@ -62,7 +72,7 @@ class WebhookRequest(BaseModel):
 
 class HealthCheckResponse(BaseModel):
     """Health check response format"""
-    status: str = Field(..., regex=r'^(healthy|unhealthy)$')
+    status: str = Field(..., pattern=r'^(healthy|unhealthy)$')
     service: str = Field(..., min_length=1, max_length=100)
     timestamp: Optional[float] = None
     details: Optional[Dict[str, Any]] = None
@@ -118,7 +128,7 @@ def validate_game_score(score: Union[str, int]) -> int:
         score_int = int(score)
         if score_int < 0:
             raise ValueError("Score cannot be negative")
-        if score_int > 10000:
+        if score_int > GAME_MAX_SCORE:
             raise ValueError("Score too high")
         return score_int
     except (ValueError, TypeError):
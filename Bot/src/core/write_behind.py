@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Write-Behind Table Persistence
+Callers update pending rows in memory; a background loop upserts them to
+Postgres every few seconds. Failed batches are merged back into rows that
+changed meanwhile, so nothing is lost or double-counted. Also installs the
+table DDL under an advisory lock so concurrent instances don't race
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindTable:
+    """Pending rows keyed by primary key, upserted in batches by a flush loop"""
+
+    def __init__(self, name: str, ddl: str, upsert_sql: str, install_lock_id: int,
+                 to_row: Callable[[Hashable, Any], Tuple], merge: Callable[[Any, Any], None],
+                 flush_interval: float, after_flush: Optional[Callable[[], Awaitable[None]]] = None):
+        """
+        to_row(key, value) shapes one pending entry into UPSERT_SQL arguments;
+        merge(newer, older) folds a failed batch entry into the entry that replaced it;
+        after_flush runs after every flush while persistent (pruning, maintenance)
+        """
+        self.name = name
+        self.ddl = ddl
+        self.upsert_sql = upsert_sql
+        self.install_lock_id = install_lock_id
+        self.to_row = to_row
+        self.merge = merge
+        self.flush_interval = flush_interval
+        self.after_flush = after_flush
+        self.pool = None
+        self.pending: Dict[Hashable, Any] = {}
+        self.initialized = False
+        self._init_lock: Optional[asyncio.Lock] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self.stats = {"flushed_rows": 0, "flush_errors": 0}
+
+    @property
+    def persistent(self) -> bool:
+        return self.pool is not None
+
+    async def initialize(self, pool=None, load: Optional[Callable[[Any], Awaitable[None]]] = None,
+                         on_ready: Optional[Callable[[], None]] = None):
+        """
+        Install the table, run load(conn) and start the flush loop (idempotent)
+        Without a database the owner keeps working in memory; on_ready runs once either way
+        """
+        if self.initialized:
+            return
+        if self._init_lock is None:
+            self._init_lock = asyncio.Lock()
+        async with self._init_lock:
+            if self.initialized:
+                return
+            try:
+                if pool is None:
+                    from src.core.db_pool import get_shared_pool
+                    pool = await get_shared_pool("default")
+                async with pool.acquire() as conn:
+                    async with conn.transaction():
+                        await conn.execute("SELECT pg_advisory_xact_lock($1)", self.install_lock_id)
+                        await conn.execute(self.ddl)
+                    if load:
+                        await load(conn)
+                self.pool = pool
+            except Exception as e:
+                logger.warning(f"⚠️ {self.name} persistence unavailable, running in memory: {e}")
+            if on_ready:
+                on_ready()
+            self._flush_task = asyncio.create_task(self._flush_loop())
+            self.initialized = True
+
+    async def flush(self):
+        """Upsert rows changed since the last flush"""
+        if not self.pending or not self.pool:
+            return
+        batch, self.pending = self.pending, {}
+        rows = [self.to_row(key, value) for key, value in batch.items()]
+        try:
+            async with self.pool.acquire() as conn:
+                await conn.executemany(self.upsert_sql, rows)
+            self.stats["flushed_rows"] += len(rows)
+        except Exception as e:
+            self.stats["flush_errors"] += 1
+            logger.warning(f"⚠️ {self.name} flush failed, will retry ({len(rows)} rows): {e}")
+            # Merge back anything written meanwhile
+            for key, value in batch.items():
+                newer = self.pending.get(key)
+                if newer is not None:
+                    self.merge(newer, value)
+                else:
+                    self.pending[key] = value
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+                if self.pool and self.after_flush:
+                    await self.after_flush()
+            except Exception as e:
+                logger.error(f"❌ {self.name} flush loop error: {e}")
+
+    async def close(self):
+        """Stop the flush loop and write out pending rows"""
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "persistent": self.persistent,
+            "pending_rows": len(self.pending),
+            **self.stats
+        }
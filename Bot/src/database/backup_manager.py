@@ -2,19 +2,201 @@
 """
 Database Backup Manager for Torah Bot
 Handles regular PostgreSQL database backups and restoration
+
+Each backup is a directory with one gzip-compressed COPY stream per table and
+a manifest.json (row counts, SHA-256 checksums). Tables are streamed in
+parallel on separate connections that share one exported snapshot, so the
+backup is consistent and memory use stays bounded by a few COPY chunks.
+
+Between weekly full backups, incremental backups copy only rows past each
+large table's high-water mark and chain to the previous backup. Restore
+replays a chain with COPY FROM in foreign-key order inside one transaction:
+    python -m src.database.backup_manager restore [backup_name|latest]
+(target is RESTORE_DATABASE_URL - use a scratch database to benchmark)
 """
 import os
 import asyncio
 import logging
 import json
+import hashlib
+import shutil
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 import gzip
 import asyncpg
 
 logger = logging.getLogger(__name__)
 
+BACKUP_PREFIX = "torah_bot_backup_"
+MANIFEST_NAME = "manifest.json"
+BACKUP_FORMAT_VERSION = 2
+BACKUP_PARALLELISM = int(os.environ.get("BACKUP_PARALLELISM", "3"))
+BACKUP_COMPRESSLEVEL = int(os.environ.get("BACKUP_COMPRESSLEVEL", "6"))
+BACKUP_FULL_INTERVAL_DAYS = int(os.environ.get("BACKUP_FULL_INTERVAL_DAYS", "7"))
+# Incrementals re-read this much before the previous high-water mark to catch late commits;
+# restore upserts by primary key, so the overlap is harmless
+BACKUP_WATERMARK_OVERLAP_SECONDS = int(os.environ.get("BACKUP_WATERMARK_OVERLAP_SECONDS", "300"))
+RESTORE_CHUNK_SIZE = 256 * 1024
+
+# High-water mark per large table; every other table is small and copied whole each time.
+# Incrementals do not capture deletes - the next full backup does.
+INCREMENTAL_WATERMARKS = {
+    "users": "updated_at",  # maintained by update_users_updated_at trigger
+    # newsletter_broadcasts is deliberately absent: topic/status updates move none of its
+    # timestamps, and at ~2 rows a day copying it whole (upserted on restore) is cheap
+    "delivery_log": "scheduled_at",  # append-only
+    "audit_log": "timestamp",  # append-only
+}
+
+# Tables and their COPY-able (non-generated) columns, largest first for better parallel packing
+TABLES_SQL = """
+    SELECT c.relname AS table_name,
+           array_agg(a.attname::text ORDER BY a.attnum) AS columns
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped AND a.attgenerated = ''
+    WHERE n.nspname = 'public' AND c.relkind IN ('r', 'p') AND NOT c.relispartition
+    GROUP BY c.oid, c.relname
+    ORDER BY pg_total_relation_size(c.oid) DESC, c.relname
+"""
+
+# Foreign keys between public tables (child depends on parent)
+FOREIGN_KEYS_SQL = """
+    SELECT DISTINCT child.relname AS child, parent.relname AS parent
+    FROM pg_constraint con
+    JOIN pg_class child ON child.oid = con.conrelid
+    JOIN pg_class parent ON parent.oid = con.confrelid
+    JOIN pg_namespace n ON n.oid = child.relnamespace
+    WHERE con.contype = 'f' AND n.nspname = 'public'
+      AND NOT child.relispartition AND child.oid <> parent.oid
+"""
+
+PRIMARY_KEY_SQL = """
+    SELECT array_agg(a.attname::text ORDER BY array_position(i.indkey::int2[], a.attnum)) AS columns
+    FROM pg_index i
+    JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+    WHERE i.indrelid = to_regclass($1) AND i.indisprimary
+"""
+
+SERIAL_COLUMNS_SQL = """
+    SELECT c.relname AS table_name, a.attname AS column_name,
+           pg_get_serial_sequence(format('%I.%I', n.nspname, c.relname), a.attname) AS sequence_name
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+    WHERE n.nspname = 'public' AND c.relkind IN ('r', 'p') AND NOT c.relispartition
+      AND pg_get_serial_sequence(format('%I.%I', n.nspname, c.relname), a.attname) IS NOT NULL
+"""
+
+
+def quote_ident(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def dependency_order(tables: List[str], foreign_keys: List[Tuple[str, str]]) -> List[str]:
+    """Topological order so referenced tables load before the tables pointing at them"""
+    remaining = set(tables)
+    depends_on = {table: {parent for child, parent in foreign_keys if child == table and parent in remaining}
+                  for table in tables}
+    ordered = []
+    while remaining:
+        ready = sorted(table for table in remaining if not depends_on[table] & remaining)
+        if not ready:
+            # FK cycle: fall back to name order for the rest (checks run at commit)
+            ready = sorted(remaining)
+        ordered.extend(ready)
+        remaining.difference_update(ready)
+    return ordered
+
+
+class GzipTableSink:
+    """Receives one table's COPY chunks and compresses them on a dedicated worker thread.
+    
+    The single-thread executor keeps chunks in order; at most max_in_flight
+    chunks are queued before the COPY reader waits, which bounds memory.
+    """
+    
+    def __init__(self, path: Path, max_in_flight: int = 4):
+        self.path = path
+        self.max_in_flight = max_in_flight
+        self.raw_bytes = 0
+        self._sha256 = hashlib.sha256()
+        self._file = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"backup-{path.stem}")
+        self._pending: deque = deque()
+    
+    def _write(self, chunk: bytes):
+        if self._file is None:
+            self._file = gzip.open(self.path, "wb", compresslevel=BACKUP_COMPRESSLEVEL)
+        self._sha256.update(chunk)
+        self.raw_bytes += len(chunk)
+        self._file.write(chunk)
+    
+    def _close(self):
+        if self._file is None:
+            self._file = gzip.open(self.path, "wb", compresslevel=BACKUP_COMPRESSLEVEL)
+        self._file.close()
+    
+    async def write(self, chunk: bytes):
+        """COPY output callback"""
+        loop = asyncio.get_running_loop()
+        self._pending.append(loop.run_in_executor(self._executor, self._write, bytes(chunk)))
+        while len(self._pending) >= self.max_in_flight:
+            await self._pending.popleft()
+    
+    async def close(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while self._pending:
+                await self._pending.popleft()
+            await loop.run_in_executor(self._executor, self._close)
+        finally:
+            self._executor.shutdown(wait=False)
+    
+    @property
+    def sha256(self) -> str:
+        return self._sha256.hexdigest()
+
+
+class GzipTableSource:
+    """Async iterator over a table's COPY file for COPY FROM; decompression runs on a
+    worker thread and the SHA-256 is checked against the manifest at end of stream"""
+    
+    def __init__(self, path: Path, expected_sha256: str):
+        self.path = path
+        self.expected_sha256 = expected_sha256
+        self._sha256 = hashlib.sha256()
+        self._file = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"restore-{path.stem}")
+    
+    def _read(self) -> bytes:
+        if self._file is None:
+            self._file = gzip.open(self.path, "rb")
+        chunk = self._file.read(RESTORE_CHUNK_SIZE)
+        self._sha256.update(chunk)
+        if not chunk:
+            self._file.close()
+        return chunk
+    
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                chunk = await loop.run_in_executor(self._executor, self._read)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            self._executor.shutdown(wait=False)
+        if self._sha256.hexdigest() != self.expected_sha256:
+            raise ValueError(f"Checksum mismatch for {self.path.name}")
+
+
 class DatabaseBackupManager:
     """Manages database backups and restoration"""
     
@@ -22,97 +204,154 @@ class DatabaseBackupManager:
         self.db_url = os.getenv('DATABASE_URL')
         self.backup_dir = Path(__file__).parent / 'backups'
         self.max_backups = 30  # Keep 30 days of backups
+        self.parallelism = max(1, BACKUP_PARALLELISM)
         
         # Create backup directory if it doesn't exist
         self.backup_dir.mkdir(exist_ok=True)
     
-    async def create_backup(self) -> Optional[str]:
-        """Create a full database backup"""
+    async def _dump_table(
+        self, conn: asyncpg.Connection, table: str, columns: List[str], target: Path,
+        since: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """Stream one table through COPY TO STDOUT into <table>.copy.gz
+        (only rows past `since` when the table has a high-water mark)"""
+        column_list = ", ".join(quote_ident(column) for column in columns)
+        watermark = INCREMENTAL_WATERMARKS.get(table)
+        high_water = None
+        query = f"SELECT {column_list} FROM {quote_ident(table)}"
+        args: list = []
+        if watermark:
+            # Same snapshot as the COPY, so nothing past this mark is in the file
+            high_water = await conn.fetchval(f"SELECT max({watermark}) FROM {quote_ident(table)}")
+            if since is not None:
+                query += f" WHERE {watermark} > $1"
+                args.append(since)
+        
+        sink = GzipTableSink(target / f"{table}.copy.gz")
+        try:
+            # COPY (SELECT ...) also works for partitioned parents
+            status = await conn.copy_from_query(query, *args, output=sink.write, format="text")
+        finally:
+            await sink.close()
+        
+        return {
+            "file": sink.path.name,
+            "columns": columns,
+            "mode": "incremental" if args else "full",
+            "since": since.isoformat() if args else None,
+            "high_water": high_water.isoformat() if high_water else None,
+            "rows": int(status.split()[-1]),
+            "raw_bytes": sink.raw_bytes,
+            "compressed_bytes": sink.path.stat().st_size,
+            "sha256": sink.sha256
+        }
+    
+    async def _dump_worker(
+        self, snapshot: str, tables: asyncio.Queue, target: Path, results: Dict[str, Any],
+        since: Dict[str, datetime]
+    ):
+        """Dump tables from the shared queue on a dedicated connection pinned to the snapshot"""
+        conn = await asyncpg.connect(self.db_url)
+        try:
+            async with conn.transaction(isolation="repeatable_read", readonly=True):
+                await conn.execute(f"SET TRANSACTION SNAPSHOT '{snapshot}'")
+                while True:
+                    try:
+                        table, columns = tables.get_nowait()
+                    except asyncio.QueueEmpty:
+                        return
+                    info = await self._dump_table(conn, table, columns, target, since.get(table))
+                    results[table] = info
+                    logger.info(f"  📋 Backed up {table}: {info['rows']} rows ({info['mode']})")
+        finally:
+            await conn.close()
+    
+    def _plan_backup(self, kind: Optional[str]) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """Pick full vs incremental; an incremental chains to the newest backup
+        as long as the chain's full backup is recent enough"""
+        if kind == "full":
+            return "full", None
+        for path in self._backup_entries():
+            manifest = self._read_manifest(path)
+            if not manifest:
+                continue
+            base = self.backup_dir / manifest["base"]
+            base_manifest = self._read_manifest(base) if base.is_dir() else None
+            if not base_manifest:
+                break
+            age = datetime.now() - datetime.fromisoformat(base_manifest["created"])
+            if kind == "incremental" or age < timedelta(days=BACKUP_FULL_INTERVAL_DAYS):
+                return "incremental", {"name": path.name, **manifest}
+            break
+        return "full", None
+    
+    async def create_backup(self, kind: Optional[str] = None) -> Optional[str]:
+        """Create a database backup.
+        
+        kind: "full", "incremental", or None to chain an incremental onto the
+        latest backup until the last full one is BACKUP_FULL_INTERVAL_DAYS old
+        """
         if not self.db_url:
             logger.error("DATABASE_URL not found for backup")
             return None
         
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        backup_filename = f"torah_bot_backup_{timestamp}.sql.gz"
-        backup_path = self.backup_dir / backup_filename
+        started = datetime.now()
+        backup_name = f"{BACKUP_PREFIX}{started.strftime('%Y%m%d_%H%M%S')}"
+        backup_path = self.backup_dir / backup_name
+        partial_path = self.backup_dir / f".{backup_name}.partial"
         
         try:
-            logger.info(f"🔄 Starting database backup: {backup_filename}")
-            
-            # Connect to database
-            conn = await asyncpg.connect(self.db_url)
-            
-            # Get all table names
-            tables = await conn.fetch("""
-                SELECT tablename FROM pg_tables 
-                WHERE schemaname = 'public'
-                ORDER BY tablename
-            """)
-            
-            backup_content = []
+            kind, parent = await asyncio.to_thread(self._plan_backup, kind)
+            since: Dict[str, datetime] = {}
+            if parent:
+                overlap = timedelta(seconds=BACKUP_WATERMARK_OVERLAP_SECONDS)
+                for table, info in parent["tables"].items():
+                    if info.get("high_water"):
+                        since[table] = datetime.fromisoformat(info["high_water"]) - overlap
             
-            # Add header
-            backup_content.append(f"-- Torah Bot Database Backup")
-            backup_content.append(f"-- Created: {datetime.now().isoformat()}")
-            backup_content.append(f"-- Tables: {len(tables)}")
-            backup_content.append("")
+            logger.info(f"🔄 Starting {kind} database backup: {backup_name}")
+            partial_path.mkdir()
             
-            # Backup each table
-            for table_row in tables:
-                table_name = table_row['tablename']
-                logger.info(f"  📋 Backing up table: {table_name}")
-                
-                # Get table schema
-                schema_query = f"""
-                    SELECT column_name, data_type, is_nullable, column_default
-                    FROM information_schema.columns 
-                    WHERE table_name = '{table_name}' 
-                    ORDER BY ordinal_position
-                """
-                
-                columns = await conn.fetch(schema_query)
-                
-                # Add table creation info (simplified)
-                backup_content.append(f"-- Table: {table_name}")
-                backup_content.append(f"-- Columns: {len(columns)}")
-                
-                # Get table data
-                rows = await conn.fetch(f"SELECT * FROM {table_name}")
-                
-                if rows:
-                    backup_content.append(f"-- Data for {table_name} ({len(rows)} rows)")
+            # The coordinator transaction exports the snapshot every worker reads from
+            conn = await asyncpg.connect(self.db_url)
+            try:
+                async with conn.transaction(isolation="repeatable_read", readonly=True):
+                    snapshot = await conn.fetchval("SELECT pg_export_snapshot()")
+                    table_rows = await conn.fetch(TABLES_SQL)
                     
-                    # Convert rows to JSON for easy restoration
-                    table_data = []
-                    for row in rows:
-                        row_dict = {}
-                        for key, value in row.items():
-                            # Handle special data types
-                            if isinstance(value, datetime):
-                                row_dict[key] = value.isoformat()
-                            elif value is None:
-                                row_dict[key] = None
-                            else:
-                                row_dict[key] = str(value)
-                        table_data.append(row_dict)
+                    tables: asyncio.Queue = asyncio.Queue()
+                    for row in table_rows:
+                        tables.put_nowait((row['table_name'], list(row['columns'])))
                     
-                    # Store as JSON comment for easy parsing
-                    backup_content.append(f"-- JSON_DATA_{table_name}: {json.dumps(table_data)}")
-                
-                backup_content.append("")
-            
-            await conn.close()
-            
-            # Write compressed backup
-            backup_text = "\\n".join(backup_content)
+                    results: Dict[str, Any] = {}
+                    workers = min(self.parallelism, len(table_rows)) or 1
+                    await asyncio.gather(*(
+                        self._dump_worker(snapshot, tables, partial_path, results, since)
+                        for _ in range(workers)
+                    ))
+            finally:
+                await conn.close()
             
-            with gzip.open(backup_path, 'wt', encoding='utf-8') as f:
-                f.write(backup_text)
+            # A table without a previous mark (new or empty before) keeps the older mark
+            for table, info in results.items():
+                if not info["high_water"] and parent and table in parent["tables"]:
+                    info["high_water"] = parent["tables"][table].get("high_water")
             
-            # Get file size
-            file_size = backup_path.stat().st_size / 1024  # KB
+            manifest = {
+                "format": BACKUP_FORMAT_VERSION,
+                "kind": kind,
+                "base": parent["base"] if parent else backup_name,
+                "parent": parent["name"] if parent else None,
+                "created": started.isoformat(),
+                "duration_seconds": round((datetime.now() - started).total_seconds(), 2),
+                # Dependency order is resolved at restore time; keep listing order stable
+                "tables": {name: results[name] for name in sorted(results)}
+            }
+            await asyncio.to_thread(self._finalize, partial_path, backup_path, manifest)
             
-            logger.info(f"✅ Database backup completed: {backup_filename} ({file_size:.1f} KB)")
+            size_kb = sum(info["compressed_bytes"] for info in results.values()) / 1024
+            total_rows = sum(info["rows"] for info in results.values())
+            logger.info(f"✅ Database backup completed: {backup_name} ({kind}, {len(results)} tables, {total_rows} rows, {size_kb:.1f} KB)")
             
             # Clean up old backups
             await self._cleanup_old_backups()
@@ -121,49 +360,213 @@ class DatabaseBackupManager:
             
         except Exception as e:
             logger.error(f"❌ Database backup failed: {e}")
-            if backup_path.exists():
-                backup_path.unlink()  # Remove partial backup
+            await asyncio.to_thread(shutil.rmtree, partial_path, True)  # Remove partial backup
             return None
     
+    @staticmethod
+    def _finalize(partial_path: Path, backup_path: Path, manifest: Dict[str, Any]):
+        """Write the manifest last and publish the backup with an atomic rename"""
+        with open(partial_path / MANIFEST_NAME, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        partial_path.rename(backup_path)
+    
+    def _backup_entries(self) -> List[Path]:
+        """Completed backups (manifest directories and legacy .sql.gz dumps), newest first"""
+        entries = [
+            path for path in self.backup_dir.glob(f"{BACKUP_PREFIX}*")
+            if (path.is_dir() and (path / MANIFEST_NAME).exists()) or path.name.endswith(".sql.gz")
+        ]
+        entries.sort(key=lambda x: x.stat().st_mtime, reverse=True)
+        return entries
+    
+    @staticmethod
+    def _read_manifest(path: Path) -> Optional[Dict[str, Any]]:
+        if not path.is_dir():
+            return None
+        with open(path / MANIFEST_NAME, encoding="utf-8") as f:
+            return json.load(f)
+    
+    def _backup_chains(self) -> List[List[Path]]:
+        """Backups grouped into restore chains (a full backup plus its incrementals), newest first"""
+        chains: Dict[str, List[Path]] = {}
+        for path in self._backup_entries():
+            manifest = self._read_manifest(path)
+            chains.setdefault(manifest["base"] if manifest else path.name, []).append(path)
+        return list(chains.values())
+    
     async def _cleanup_old_backups(self):
-        """Remove old backup files"""
+        """Remove old backups (whole chains, so no kept incremental loses its base)"""
         try:
-            backup_files = list(self.backup_dir.glob("torah_bot_backup_*.sql.gz"))
-            backup_files.sort(key=lambda x: x.stat().st_mtime, reverse=True)
+            chains = await asyncio.to_thread(self._backup_chains)
             
             # Keep only the most recent backups
-            if len(backup_files) > self.max_backups:
-                files_to_remove = backup_files[self.max_backups:]
-                for file_path in files_to_remove:
-                    file_path.unlink()
-                    logger.info(f"🗑️ Removed old backup: {file_path.name}")
+            kept = 0
+            for chain in chains:
+                if kept < self.max_backups:
+                    kept += len(chain)
+                    continue
+                for path in chain:
+                    if path.is_dir():
+                        await asyncio.to_thread(shutil.rmtree, path)
+                    else:
+                        path.unlink()
+                    logger.info(f"🗑️ Removed old backup: {path.name}")
                     
         except Exception as e:
             logger.error(f"⚠️ Backup cleanup warning: {e}")
     
-    async def list_backups(self) -> List[Dict[str, str]]:
+    def _describe_backup(self, path: Path) -> Dict[str, Any]:
+        stat = path.stat()
+        manifest = self._read_manifest(path)
+        if manifest:
+            size = sum(info["compressed_bytes"] for info in manifest["tables"].values())
+            created = datetime.fromisoformat(manifest["created"])
+        else:
+            size = stat.st_size
+            created = datetime.fromtimestamp(stat.st_mtime)
+        return {
+            'filename': path.name,
+            'path': str(path),
+            'kind': manifest["kind"] if manifest else "legacy",
+            'tables': len(manifest["tables"]) if manifest else None,
+            'rows': sum(info["rows"] for info in manifest["tables"].values()) if manifest else None,
+            'size_kb': round(size / 1024, 1),
+            'created': created.isoformat(),
+            'age_days': (datetime.now() - created).days
+        }
+    
+    async def list_backups(self) -> List[Dict[str, Any]]:
         """List available backups"""
         try:
-            backup_files = list(self.backup_dir.glob("torah_bot_backup_*.sql.gz"))
-            backup_files.sort(key=lambda x: x.stat().st_mtime, reverse=True)
-            
-            backups = []
-            for backup_file in backup_files:
-                stat = backup_file.stat()
-                backups.append({
-                    'filename': backup_file.name,
-                    'path': str(backup_file),
-                    'size_kb': round(stat.st_size / 1024, 1),
-                    'created': datetime.fromtimestamp(stat.st_mtime).isoformat(),
-                    'age_days': (datetime.now() - datetime.fromtimestamp(stat.st_mtime)).days
-                })
-            
-            return backups
+            entries = await asyncio.to_thread(self._backup_entries)
+            return [await asyncio.to_thread(self._describe_backup, path) for path in entries]
             
         except Exception as e:
             logger.error(f"Failed to list backups: {e}")
             return []
     
+    def _resolve_chain(self, name: Optional[str]) -> List[Tuple[Path, Dict[str, Any]]]:
+        """The full backup and incrementals needed to restore `name` (latest if None), oldest first"""
+        if name in (None, "latest"):
+            latest = next((path for path in self._backup_entries() if path.is_dir()), None)
+            if latest is None:
+                raise FileNotFoundError("No restorable backups found")
+            name = latest.name
+        chain = []
+        while name:
+            path = self.backup_dir / name
+            manifest = self._read_manifest(path) if path.is_dir() else None
+            if not manifest:
+                raise FileNotFoundError(f"Backup {name} is missing or not restorable")
+            chain.append((path, manifest))
+            name = manifest["parent"]
+        chain.reverse()
+        return chain
+    
+    async def _disable_triggers(self, conn: asyncpg.Connection) -> bool:
+        """Skip per-row triggers during the load when the role allows it (superuser)"""
+        try:
+            async with conn.transaction():
+                await conn.execute("SET LOCAL session_replication_role = replica")
+            return True
+        except asyncpg.PostgresError:
+            return False
+    
+    async def _copy_in(self, conn: asyncpg.Connection, info: Dict[str, Any], path: Path, target: str) -> int:
+        source = GzipTableSource(path / info["file"], info["sha256"])
+        status = await conn.copy_to_table(target, source=source, columns=info["columns"], format="text")
+        rows = int(status.split()[-1])
+        if rows != info["rows"]:
+            raise ValueError(f"{path.name}/{info['file']}: loaded {rows} rows, manifest says {info['rows']}")
+        return rows
+    
+    async def _merge_in(self, conn: asyncpg.Connection, table: str, info: Dict[str, Any], path: Path) -> int:
+        """Load an incremental file into a temp table, then upsert it by primary key"""
+        staging = f"restore_{table}"
+        await conn.execute(f"CREATE TEMP TABLE {quote_ident(staging)} (LIKE {quote_ident(table)} INCLUDING DEFAULTS)")
+        rows = await self._copy_in(conn, info, path, staging)
+        
+        columns = info["columns"]
+        column_list = ", ".join(quote_ident(column) for column in columns)
+        key = await conn.fetchval(PRIMARY_KEY_SQL, table) or []
+        conflict = ""
+        if key:
+            updates = [f"{quote_ident(c)} = EXCLUDED.{quote_ident(c)}" for c in columns if c not in key]
+            key_list = ", ".join(quote_ident(column) for column in key)
+            conflict = f"ON CONFLICT ({key_list}) " + (f"DO UPDATE SET {', '.join(updates)}" if updates else "DO NOTHING")
+        await conn.execute(f"""
+            INSERT INTO {quote_ident(table)} ({column_list})
+            SELECT {column_list} FROM {quote_ident(staging)}
+            {conflict}
+        """)
+        await conn.execute(f"DROP TABLE {quote_ident(staging)}")
+        return rows
+    
+    async def _reset_sequences(self, conn: asyncpg.Connection):
+        for row in await conn.fetch(SERIAL_COLUMNS_SQL):
+            column, table = quote_ident(row['column_name']), quote_ident(row['table_name'])
+            await conn.execute(
+                f"SELECT setval($1, COALESCE(max({column}), 1), max({column}) IS NOT NULL) FROM {table}",
+                row['sequence_name']
+            )
+    
+    async def restore_backup(self, name: Optional[str] = None, database_url: Optional[str] = None) -> Dict[str, Any]:
+        """Restore a backup chain with COPY FROM in foreign-key order, in one transaction.
+        
+        Replaces the contents of every table in the full backup. Checksums and
+        row counts are verified while loading; any mismatch rolls back.
+        """
+        chain = await asyncio.to_thread(self._resolve_chain, name)
+        target_url = database_url or self.db_url
+        if not target_url:
+            raise ValueError("No database URL to restore into")
+        
+        started = time.monotonic()
+        tables = sorted({table for _, manifest in chain for table in manifest["tables"]})
+        loaded: Dict[str, int] = {}
+        conn = await asyncpg.connect(target_url)
+        try:
+            async with conn.transaction():
+                foreign_keys = [(row['child'], row['parent']) for row in await conn.fetch(FOREIGN_KEYS_SQL)]
+                order = dependency_order(tables, foreign_keys)
+                triggers_disabled = await self._disable_triggers(conn)
+                
+                base_tables = [quote_ident(table) for table in order if table in chain[0][1]["tables"]]
+                await conn.execute(f"TRUNCATE {', '.join(base_tables)} CASCADE")
+                
+                for position, (path, manifest) in enumerate(chain):
+                    for table in order:
+                        info = manifest["tables"].get(table)
+                        if not info:
+                            continue
+                        if position == 0:
+                            rows = await self._copy_in(conn, info, path, table)
+                        else:
+                            rows = await self._merge_in(conn, table, info, path)
+                        loaded[table] = loaded.get(table, 0) + rows
+                    logger.info(f"  📥 Restored {path.name} ({manifest['kind']})")
+                
+                await self._reset_sequences(conn)
+                if triggers_disabled and await conn.fetchval("SELECT to_regproc('stats_rebuild_rollups') IS NOT NULL"):
+                    # Rollup triggers were skipped during the load
+                    await conn.execute("SELECT stats_rebuild_rollups()")
+        finally:
+            await conn.close()
+        
+        seconds = time.monotonic() - started
+        total_rows = sum(loaded.values())
+        result = {
+            "backup": chain[-1][0].name,
+            "chain": [path.name for path, _ in chain],
+            "tables": len(loaded),
+            "rows": total_rows,
+            "seconds": round(seconds, 2),
+            "rows_per_second": int(total_rows / seconds) if seconds else total_rows,
+            "triggers_disabled": triggers_disabled
+        }
+        logger.info(f"✅ Restore completed: {result['backup']} ({len(chain)} backups, {total_rows} rows in {seconds:.1f}s)")
+        return result
+    
     async def get_backup_stats(self) -> Dict[str, any]:
         """Get backup system statistics"""
         try:
@@ -171,11 +574,15 @@ class DatabaseBackupManager:
             
             total_size = sum(backup['size_kb'] for backup in backups)
             latest_backup = backups[0] if backups else None
+            latest_full = next((backup for backup in backups if backup['kind'] == 'full'), None)
             
             return {
                 'total_backups': len(backups),
                 'total_size_mb': round(total_size / 1024, 2),
                 'latest_backup': latest_backup['created'] if latest_backup else None,
+                'latest_backup_kind': latest_backup['kind'] if latest_backup else None,
+                'latest_full_backup': latest_full['created'] if latest_full else None,
+                'full_backup_interval_days': BACKUP_FULL_INTERVAL_DAYS,
                 'backup_directory': str(self.backup_dir),
                 'max_backups_kept': self.max_backups
             }
@@ -246,4 +653,45 @@ class BackupScheduler:
 
 # Global instances
 backup_manager = DatabaseBackupManager()
-backup_scheduler = BackupScheduler()
\ No newline at end of file
+backup_scheduler = BackupScheduler()
+
+
+async def _restore_cli(name: Optional[str]):
+    database_url = os.getenv('RESTORE_DATABASE_URL')
+    if not database_url:
+        logging.error("❌ RESTORE_DATABASE_URL is not set (restore replaces every backed-up table)")
+        sys.exit(2)
+    result = await backup_manager.restore_backup(name, database_url)
+    
+    # Benchmark + verification: a full-only restore must match the manifest row counts exactly
+    conn = await asyncpg.connect(database_url)
+    try:
+        chain = backup_manager._resolve_chain(result["backup"])
+        mismatches = []
+        if len(chain) == 1:
+            for table, info in chain[0][1]["tables"].items():
+                count = await conn.fetchval(f"SELECT count(*) FROM {quote_ident(table)}")
+                if count != info["rows"]:
+                    mismatches.append(f"{table}: {count} rows, expected {info['rows']}")
+    finally:
+        await conn.close()
+    
+    logging.info(f"⏱️ {result['rows']} rows / {result['tables']} tables in {result['seconds']}s "
+                 f"({result['rows_per_second']} rows/s, chain of {len(result['chain'])})")
+    for mismatch in mismatches:
+        logging.error(f"❌ {mismatch}")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    if command == "backup":
+        kind = sys.argv[2] if len(sys.argv) > 2 else None
+        sys.exit(0 if asyncio.run(backup_manager.create_backup(kind)) else 1)
+    elif command == "restore":
+        asyncio.run(_restore_cli(sys.argv[2] if len(sys.argv) > 2 else None))
+    else:
+        print("Usage: python -m src.database.backup_manager backup [full|incremental]")
+        print("       python -m src.database.backup_manager restore [backup_name|latest]")
+        sys.exit(1)
@@ -0,0 +1,18 @@
+-- ===================================================================
+-- INDEXES FOR HOT QUERIES (verified by src/database/query_plans.py)
+-- Idempotent; one statement per line so each can run outside a transaction
+-- (CONCURRENTLY does not block writers on live tables)
+-- ===================================================================
+
+-- topics.recent_quiz: quiz exclusion window filtered on wisdom_content->>'type' and created_at
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_broadcasts_quiz_recent ON newsletter_broadcasts (created_at, (wisdom_content->>'topic')) WHERE (wisdom_content->>'type') = 'quiz';
+
+-- topics.recent_wisdom: recent wisdom topics in the active statuses
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_broadcasts_wisdom_recent ON newsletter_broadcasts (broadcast_date, wisdom_topic) WHERE broadcast_type = 'wisdom' AND wisdom_topic IS NOT NULL AND status IN ('sent', 'generating', 'ready');
+
+-- admin.blocked_users_export: blocked users newest first
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_blocked_updated ON users (updated_at DESC) WHERE is_blocked = TRUE;
+
+-- admin.blocked_users_export (LATERAL): latest failed delivery per user
+-- delivery_log is partitioned - partitioned parents cannot be indexed CONCURRENTLY
+CREATE INDEX IF NOT EXISTS idx_delivery_log_user_failed ON delivery_log (user_id, scheduled_at DESC) WHERE status = 'failed';
@@ -41,6 +41,15 @@ async def init_database():
                     logging.warning(f"⚠️ Warning in section {i+1}: {e}")
                     # Продолжаем выполнение, некоторые команды могут быть дублирующимися
         
+        # Индексы горячих запросов - по одному выражению (CONCURRENTLY нельзя внутри транзакции)
+        indexes_path = Path(__file__).parent / 'hot_query_indexes.sql'
+        for statement in indexes_path.read_text(encoding='utf-8').splitlines():
+            if statement.startswith('CREATE'):
+                try:
+                    await conn.execute(statement)
+                except Exception as e:
+                    logging.warning(f"⚠️ Index warning: {e}")
+        
         # Проверяем что таблицы созданы
         tables = await conn.fetch("""
             SELECT tablename FROM pg_tables 
@@ -49,9 +49,12 @@ CREATE TABLE newsletter_subscriptions (
 -- Контент для рассылок
 CREATE TABLE newsletter_broadcasts (
     id BIGSERIAL PRIMARY KEY,
-    broadcast_date DATE NOT NULL UNIQUE,
-    -- Контент на разных языках (JSON структура)
-    wisdom_content JSONB NOT NULL, -- {"en": {"text": "...", "topic": "...", "references": "..."}}
+    broadcast_date DATE NOT NULL,
+    broadcast_type VARCHAR(50) DEFAULT 'wisdom', -- 'wisdom', 'quiz'
+    -- Контент на разных языках (JSON структура); пусто пока слот зарезервирован
+    wisdom_content JSONB, -- {"en": {"text": "...", "topic": "...", "references": "..."}}
+    wisdom_topic VARCHAR(200),
+    quiz_topic VARCHAR(255),
     image_url TEXT,
     -- Статус рассылки
     status VARCHAR(20) DEFAULT 'draft', -- 'draft', 'ready', 'sending', 'completed', 'failed'
@@ -65,27 +68,33 @@ CREATE TABLE newsletter_broadcasts (
     failed_deliveries INTEGER DEFAULT 0,
     -- Метаданные
     created_by VARCHAR(100), -- Админ который создал
-    notes TEXT
+    notes TEXT,
+    -- Одна рассылка каждого типа в день
+    CONSTRAINT unique_broadcast_date_type UNIQUE (broadcast_date, broadcast_type)
 );
 
--- Лог доставки сообщений
+-- Лог доставки сообщений (помесячные партиции по scheduled_at, см. src/core/partition_manager.py)
 CREATE TABLE delivery_log (
-    id BIGSERIAL PRIMARY KEY,
+    id BIGSERIAL,
     broadcast_id BIGINT REFERENCES newsletter_broadcasts(id) ON DELETE CASCADE,
     user_id BIGINT REFERENCES users(telegram_user_id) ON DELETE CASCADE,
     -- Статус доставки
     status VARCHAR(20) NOT NULL, -- 'pending', 'sent', 'failed', 'blocked', 'opened'
     attempt_count INTEGER DEFAULT 0,
     -- Временные метки
-    scheduled_at TIMESTAMPTZ DEFAULT NOW(),
+    scheduled_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
     delivered_at TIMESTAMPTZ,
     opened_at TIMESTAMPTZ,
     -- Ошибки
     error_message TEXT,
     telegram_message_id INTEGER,
     -- Дополнительная информация
-    delivery_metadata JSONB -- Информация о доставке, устройстве и т.д.
-);
+    delivery_metadata JSONB, -- Информация о доставке, устройстве и т.д.
+    PRIMARY KEY (id, scheduled_at)
+) PARTITION BY RANGE (scheduled_at);
+
+-- Партиция по умолчанию; помесячные партиции создает и удаляет партиционный менеджер
+CREATE TABLE delivery_log_default PARTITION OF delivery_log DEFAULT;
 
 -- Админские пользователи и права доступа
 CREATE TABLE admin_users (
@@ -123,6 +132,7 @@ CREATE INDEX idx_users_last_interaction ON users(last_interaction DESC);
 CREATE INDEX idx_users_created ON users(created_at DESC);
 
 -- Индексы для подписок
+CREATE UNIQUE INDEX idx_newsletter_subscriptions_user_id_unique ON newsletter_subscriptions(user_id);
 CREATE INDEX idx_subscriptions_user_active ON newsletter_subscriptions(user_id, is_active);
 CREATE INDEX idx_subscriptions_delivery_time ON newsletter_subscriptions(delivery_time, timezone) WHERE is_active = TRUE;
 CREATE INDEX idx_subscriptions_language ON newsletter_subscriptions(language) WHERE is_active = TRUE;
@@ -136,6 +146,9 @@ CREATE INDEX idx_broadcasts_created ON newsletter_broadcasts(created_at DESC);
 CREATE INDEX idx_delivery_log_broadcast ON delivery_log(broadcast_id, status);
 CREATE INDEX idx_delivery_log_user ON delivery_log(user_id, delivered_at DESC);
 CREATE INDEX idx_delivery_log_status_scheduled ON delivery_log(status, scheduled_at) WHERE status = 'pending';
+CREATE INDEX idx_delivery_log_scheduled_brin ON delivery_log USING brin (scheduled_at);
+
+-- Индексы горячих запросов (проверяются src/database/query_plans.py): см. hot_query_indexes.sql
 
 -- Индексы для админов
 CREATE INDEX idx_admin_users_telegram_id ON admin_users(telegram_user_id);
@@ -181,6 +194,22 @@ CREATE TRIGGER update_broadcast_delivery_stats
     AFTER UPDATE ON delivery_log
     FOR EACH ROW EXECUTE FUNCTION update_broadcast_stats();
 
+-- Уведомление об изменении админов (сбрасывает кэш прав в приложении)
+CREATE OR REPLACE FUNCTION notify_admin_users_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('admin_users_changed', TG_OP);
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER admin_users_notify
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON admin_users
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_admin_users_changed();
+
+-- Предагрегированная аналитика (счетчики, дневные сводки и их триггеры):
+-- см. stats_rollups.sql - применяется при старте приложения
+
 -- ===================================================================
 -- НАЧАЛЬНЫЕ ДАННЫЕ
 -- ===================================================================
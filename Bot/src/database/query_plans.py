@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Query-Plan Regression Check for Hot SQL
+Loads newsletter_schema.sql into a scratch schema of a local Postgres,
+seeds realistic volumes, and runs EXPLAIN (ANALYZE, BUFFERS) on every query
+in the query registry. Flags sequential scans on large tables and buffer
+regressions against the stored baseline.
+
+Usage (from Bot/):
+    PLAN_CHECK_DATABASE_URL=postgresql://localhost/scratch python -m src.database.query_plans
+    ... --update-baseline    record the current plans as the new baseline
+    ... --keep               keep the scratch schema for manual inspection
+"""
+import os
+import sys
+import json
+import asyncio
+import logging
+from datetime import date, datetime, time, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+DATABASE_DIR = Path(__file__).parent
+SCHEMA_PATH = DATABASE_DIR / 'newsletter_schema.sql'
+INDEXES_PATH = DATABASE_DIR / 'hot_query_indexes.sql'
+ROLLUPS_PATH = DATABASE_DIR / 'stats_rollups.sql'
+BASELINE_PATH = DATABASE_DIR / 'query_plan_baseline.json'
+
+SCRATCH_SCHEMA = 'plan_check'
+SCALE = float(os.environ.get('PLAN_CHECK_SCALE', '1'))
+
+# Tables at least this large must not be read with a sequential scan
+SEQ_SCAN_MIN_ROWS = 1000
+# A query regresses when it touches this much more than the baseline (ratio, absolute blocks)
+BUFFER_REGRESSION_RATIO = 1.5
+BUFFER_REGRESSION_SLACK = 16
+
+# Queries whose job is to read (nearly) a whole table
+SEQ_SCAN_ALLOWED = {
+    'subscriptions.active_recipients': 'broadcast fan-out reads every active subscriber',
+}
+
+# Modules that register hot queries on import
+HOT_QUERY_MODULES = (
+    'src.torah_bot.newsletter_manager',
+    'src.newsletter_api.service',
+    'src.torah_bot.wisdom_topics',
+    'src.torah_bot.quiz_topics',
+    'src.torah_bot.admin_commands',
+)
+
+FUTURE_DATE = date.today() + timedelta(days=3650)
+
+# Sample arguments per query, built from seeded ids
+QUERY_ARGS: Dict[str, Callable[[Dict[str, Any]], Tuple]] = {
+    'users.upsert': lambda ctx: (ctx['user_id'], 'plan_check', 'Plan', 'Check', 'en', False, False, '{}'),
+    'users.count_wisdom_request': lambda ctx: (ctx['user_id'],),
+    'users.count_quiz_attempt': lambda ctx: (ctx['user_id'],),
+    'users.mark_blocked': lambda ctx: (ctx['user_id'],),
+    'subscriptions.upsert': lambda ctx: (ctx['user_id'], 'English', time(9, 0), 'UTC'),
+    'subscriptions.deactivate': lambda ctx: (ctx['user_id'],),
+    'subscriptions.active_recipients': lambda ctx: (),
+    'subscriptions.count_delivery': lambda ctx: (ctx['user_id'],),
+    'broadcasts.reserve_slot': lambda ctx: (FUTURE_DATE, 'wisdom'),
+    'delivery_log.insert_sent': lambda ctx: (ctx['broadcast_id'], ctx['user_id'], 1),
+    'delivery_log.insert_failed': lambda ctx: (ctx['broadcast_id'], ctx['user_id'], 'plan_check'),
+    'topics.recent_wisdom': lambda ctx: (date.today() - timedelta(days=14),),
+    'topics.wisdom_broadcast_for_date': lambda ctx: (date.today(), 'wisdom'),
+    'topics.recent_quiz': lambda ctx: (datetime.now(timezone.utc) - timedelta(days=30),),
+    'topics.upsert_quiz': lambda ctx: (FUTURE_DATE, json.dumps({'type': 'quiz', 'topic': 'plan_check'})),
+    'admin.blocked_users_export': lambda ctx: (),
+}
+
+SEED_SQL = """
+    INSERT INTO users (telegram_user_id, username, first_name, language_code,
+                       created_at, last_interaction, updated_at, is_blocked)
+    SELECT 1000000000 + i, 'user_' || i, 'User', 'ru',
+           NOW() - (random() * INTERVAL '730 days'),
+           NOW() - (random() * INTERVAL '365 days'),
+           NOW() - (random() * INTERVAL '365 days'),
+           i % 40 = 0
+    FROM generate_series(1, {users}) AS i;
+
+    INSERT INTO newsletter_subscriptions (user_id, language, is_active)
+    SELECT 1000000000 + i,
+           (ARRAY['Russian', 'English', 'Hebrew'])[1 + i % 3],
+           i % 10 <> 0
+    FROM generate_series(1, {users}) AS i
+    WHERE i % 5 <> 0;
+
+    INSERT INTO newsletter_broadcasts (broadcast_date, broadcast_type, wisdom_content,
+                                       wisdom_topic, status, created_at, total_recipients, successful_deliveries)
+    SELECT CURRENT_DATE - d, t.kind,
+           CASE WHEN t.kind = 'quiz'
+                THEN jsonb_build_object('type', 'quiz', 'topic', 'quiz topic ' || (d % 97))
+                ELSE jsonb_build_object('type', 'wisdom', 'topic', 'wisdom topic ' || (d % 113)) END,
+           CASE WHEN t.kind = 'wisdom' THEN 'wisdom topic ' || (d % 113) END,
+           'sent', NOW() - d * INTERVAL '1 day', {users}, {users}
+    FROM generate_series(1, {days}) AS d
+    CROSS JOIN (VALUES ('wisdom'), ('quiz')) AS t(kind);
+
+    INSERT INTO delivery_log (broadcast_id, user_id, status, scheduled_at, delivered_at, error_message)
+    SELECT b.id,
+           1000000000 + 1 + (g.i * 7919 + b.id) % {users},
+           CASE WHEN g.i % 20 = 0 THEN 'failed' ELSE 'sent' END,
+           b.created_at,
+           CASE WHEN g.i % 20 = 0 THEN NULL ELSE b.created_at END,
+           CASE WHEN g.i % 40 = 0 THEN 'Forbidden: bot was blocked by the user'
+                WHEN g.i % 20 = 0 THEN 'Bad Request: chat not found' END
+    FROM (SELECT id, created_at FROM newsletter_broadcasts ORDER BY broadcast_date DESC LIMIT {recent_broadcasts}) AS b
+    CROSS JOIN generate_series(1, {deliveries_per_broadcast}) AS g(i);
+"""
+
+
+def _sql_statements(path: Path) -> List[str]:
+    """One-statement-per-line SQL files (hot_query_indexes.sql)"""
+    return [line for line in path.read_text(encoding='utf-8').splitlines() if line.startswith('CREATE')]
+
+
+def _walk(plan: Dict[str, Any]):
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from _walk(child)
+
+
+def _plan_summary(plan: Dict[str, Any]) -> Dict[str, Any]:
+    nodes = list(_walk(plan))
+    return {
+        'buffers': plan.get('Shared Hit Blocks', 0) + plan.get('Shared Read Blocks', 0),
+        'nodes': sorted({node['Node Type'] for node in nodes}),
+        'seq_scans': sorted({node['Relation Name'] for node in nodes
+                             if node['Node Type'] == 'Seq Scan' and 'Relation Name' in node}),
+    }
+
+
+async def _prepare_scratch_schema(conn, scale: float) -> Dict[str, Any]:
+    """Create the scratch schema, seed it and return ids used as query arguments"""
+    from src.core.partition_manager import PARTITIONED_TABLES, add_months, ensure_partitions, month_start
+
+    await conn.execute(f"DROP SCHEMA IF EXISTS {SCRATCH_SCHEMA} CASCADE")
+    await conn.execute(f"CREATE SCHEMA {SCRATCH_SCHEMA}")
+    await conn.execute(f"SET search_path = {SCRATCH_SCHEMA}, public")
+    await conn.execute(SCHEMA_PATH.read_text(encoding='utf-8'))
+
+    days = 730
+    today = date.today()
+    await ensure_partitions(conn, PARTITIONED_TABLES['delivery_log'],
+                            month_start(today - timedelta(days=days)), add_months(month_start(today), 1))
+
+    users = max(1000, int(50000 * scale))
+    logger.info(f"🌱 Seeding {users} users, {days * 2} broadcasts, {int(60 * 5000 * scale)} deliveries...")
+    await conn.execute(SEED_SQL.format(
+        users=users, days=days, recent_broadcasts=60, deliveries_per_broadcast=max(100, int(5000 * scale))
+    ))
+
+    # Production shape: rollup triggers and hot-query indexes on top of the base schema
+    await conn.execute(ROLLUPS_PATH.read_text(encoding='utf-8'))
+    await conn.execute("SELECT stats_rebuild_rollups()")
+    for statement in _sql_statements(INDEXES_PATH):
+        # CONCURRENTLY is only needed on live tables
+        await conn.execute(statement.replace(' CONCURRENTLY', ''))
+    await conn.execute("ANALYZE")
+
+    return {
+        'user_id': await conn.fetchval("SELECT MAX(telegram_user_id) FROM users"),
+        'broadcast_id': await conn.fetchval("SELECT MAX(id) FROM newsletter_broadcasts"),
+    }
+
+
+async def explain_hot_queries(conn, context: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """EXPLAIN (ANALYZE, BUFFERS) every registered query; writes are rolled back"""
+    from src.core.query_registry import _QUERIES
+
+    results = {}
+    for name, sql in sorted(_QUERIES.items()):
+        build_args = QUERY_ARGS.get(name)
+        if build_args is None:
+            results[name] = {'error': 'no sample arguments in QUERY_ARGS'}
+            continue
+        transaction = conn.transaction()
+        await transaction.start()
+        try:
+            raw = await conn.fetchval(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}", *build_args(context))
+            plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]
+            results[name] = {**_plan_summary(plan['Plan']), 'execution_ms': round(plan.get('Execution Time', 0.0), 2)}
+        except Exception as e:
+            results[name] = {'error': f"{type(e).__name__}: {e}"}
+        finally:
+            await transaction.rollback()
+    return results
+
+
+async def find_problems(conn, results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]]) -> List[str]:
+    """Sequential scans on large tables, failed EXPLAINs and buffer regressions"""
+    large_tables = {
+        row['relname'] for row in await conn.fetch("""
+            SELECT c.relname FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = $1 AND c.relkind = 'r' AND c.reltuples >= $2
+        """, SCRATCH_SCHEMA, SEQ_SCAN_MIN_ROWS)
+    }
+    problems = []
+    for name, result in results.items():
+        if 'error' in result:
+            problems.append(f"{name}: EXPLAIN failed - {result['error']}")
+            continue
+        scanned = [table for table in result['seq_scans'] if table in large_tables]
+        if scanned and name not in SEQ_SCAN_ALLOWED:
+            problems.append(f"{name}: sequential scan on {', '.join(scanned)}")
+        previous = baseline.get(name)
+        if previous and 'buffers' in previous:
+            limit = previous['buffers'] * BUFFER_REGRESSION_RATIO + BUFFER_REGRESSION_SLACK
+            if result['buffers'] > limit:
+                problems.append(f"{name}: {result['buffers']} buffers vs baseline {previous['buffers']} "
+                                f"(plan {previous['nodes']} -> {result['nodes']})")
+    return problems
+
+
+async def run_plan_check(database_url: str, update_baseline: bool = False, keep: bool = False) -> int:
+    """Run the whole check; returns the number of problems found"""
+    import importlib
+    for module in HOT_QUERY_MODULES:
+        importlib.import_module(module)
+
+    conn = await asyncpg.connect(database_url)
+    try:
+        context = await _prepare_scratch_schema(conn, SCALE)
+        results = await explain_hot_queries(conn, context)
+        baseline = json.loads(BASELINE_PATH.read_text(encoding='utf-8')) if BASELINE_PATH.exists() else {}
+        problems = await find_problems(conn, results, baseline)
+
+        for name, result in results.items():
+            if 'error' not in result:
+                logger.info(f"📐 {name}: {result['execution_ms']}ms, {result['buffers']} buffers, {', '.join(result['nodes'])}")
+        if update_baseline:
+            BASELINE_PATH.write_text(json.dumps(results, indent=2, sort_keys=True) + '\n', encoding='utf-8')
+            logger.info(f"💾 Baseline written to {BASELINE_PATH}")
+        for problem in problems:
+            logger.error(f"❌ {problem}")
+        if not problems:
+            logger.info(f"✅ {len(results)} hot queries passed the plan check")
+        return len(problems)
+    finally:
+        if not keep:
+            await conn.execute(f"DROP SCHEMA IF EXISTS {SCRATCH_SCHEMA} CASCADE")
+        await conn.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    database_url = os.getenv('PLAN_CHECK_DATABASE_URL')
+    if not database_url:
+        logging.error("❌ PLAN_CHECK_DATABASE_URL is not set (use a local scratch database, never production)")
+        sys.exit(2)
+    problem_count = asyncio.run(run_plan_check(
+        database_url,
+        update_baseline='--update-baseline' in sys.argv,
+        keep='--keep' in sys.argv
+    ))
+    sys.exit(1 if problem_count else 0)
@@ -0,0 +1,259 @@
+-- ===================================================================
+-- PRE-AGGREGATED ANALYTICS (read model for /newsletter_stats and stats API)
+-- Idempotent: applied at startup by src/core/stats_read_model.py
+-- ===================================================================
+
+-- Глобальные счетчики: users_total, subscriptions_total, subscriptions_active, broadcasts_completed
+CREATE TABLE IF NOT EXISTS stats_counters (
+    name VARCHAR(50) PRIMARY KEY,
+    value BIGINT NOT NULL DEFAULT 0
+);
+
+-- Активные подписчики по языкам
+CREATE TABLE IF NOT EXISTS stats_subscribers_by_language (
+    language VARCHAR(10) PRIMARY KEY,
+    active BIGINT NOT NULL DEFAULT 0
+);
+
+-- Активные подписчики по дню последней активности (UTC) - для active_30d / active_7d
+CREATE TABLE IF NOT EXISTS stats_subscriber_activity_daily (
+    language VARCHAR(10) NOT NULL,
+    day DATE NOT NULL,
+    subscribers BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, language)
+);
+
+-- Доставки по дням (UTC)
+CREATE TABLE IF NOT EXISTS stats_delivery_daily (
+    day DATE PRIMARY KEY,
+    sent BIGINT NOT NULL DEFAULT 0,
+    failed BIGINT NOT NULL DEFAULT 0
+);
+
+-- Открытия по рассылкам
+CREATE TABLE IF NOT EXISTS stats_broadcast_opens (
+    broadcast_id BIGINT PRIMARY KEY,
+    opens BIGINT NOT NULL DEFAULT 0
+);
+
+-- ===================================================================
+-- ФУНКЦИИ ИНКРЕМЕНТАЛЬНОГО ОБНОВЛЕНИЯ
+-- ===================================================================
+
+CREATE OR REPLACE FUNCTION stats_bump(p_name VARCHAR, p_delta BIGINT)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO stats_counters (name, value) VALUES (p_name, p_delta)
+    ON CONFLICT (name) DO UPDATE SET value = stats_counters.value + EXCLUDED.value;
+END;
+$$ language 'plpgsql';
+
+CREATE OR REPLACE FUNCTION stats_bump_subscriber(p_language VARCHAR, p_last_interaction TIMESTAMPTZ, p_delta BIGINT)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO stats_subscribers_by_language (language, active) VALUES (p_language, p_delta)
+    ON CONFLICT (language) DO UPDATE SET active = stats_subscribers_by_language.active + EXCLUDED.active;
+
+    IF p_last_interaction IS NOT NULL THEN
+        INSERT INTO stats_subscriber_activity_daily (language, day, subscribers)
+        VALUES (p_language, (p_last_interaction AT TIME ZONE 'UTC')::date, p_delta)
+        ON CONFLICT (day, language) DO UPDATE
+        SET subscribers = stats_subscriber_activity_daily.subscribers + EXCLUDED.subscribers;
+    END IF;
+END;
+$$ language 'plpgsql';
+
+CREATE OR REPLACE FUNCTION stats_on_users_change()
+RETURNS TRIGGER AS $$
+DECLARE
+    sub_language VARCHAR;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM stats_bump('users_total', 1);
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM stats_bump('users_total', -1);
+    ELSE
+        -- last_interaction moved to another day: move the subscriber between activity buckets
+        SELECT language INTO sub_language FROM newsletter_subscriptions
+        WHERE user_id = NEW.telegram_user_id AND is_active = TRUE;
+        IF FOUND THEN
+            IF OLD.last_interaction IS NOT NULL THEN
+                INSERT INTO stats_subscriber_activity_daily (language, day, subscribers)
+                VALUES (sub_language, (OLD.last_interaction AT TIME ZONE 'UTC')::date, -1)
+                ON CONFLICT (day, language) DO UPDATE
+                SET subscribers = stats_subscriber_activity_daily.subscribers - 1;
+            END IF;
+            IF NEW.last_interaction IS NOT NULL THEN
+                INSERT INTO stats_subscriber_activity_daily (language, day, subscribers)
+                VALUES (sub_language, (NEW.last_interaction AT TIME ZONE 'UTC')::date, 1)
+                ON CONFLICT (day, language) DO UPDATE
+                SET subscribers = stats_subscriber_activity_daily.subscribers + 1;
+            END IF;
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE OR REPLACE FUNCTION stats_on_subscriptions_change()
+RETURNS TRIGGER AS $$
+DECLARE
+    user_last_interaction TIMESTAMPTZ;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM stats_bump('subscriptions_total', 1);
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM stats_bump('subscriptions_total', -1);
+    END IF;
+
+    IF TG_OP <> 'INSERT' THEN
+        IF OLD.is_active THEN
+            SELECT last_interaction INTO user_last_interaction FROM users WHERE telegram_user_id = OLD.user_id;
+            PERFORM stats_bump('subscriptions_active', -1);
+            PERFORM stats_bump_subscriber(OLD.language, user_last_interaction, -1);
+        END IF;
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        IF NEW.is_active THEN
+            SELECT last_interaction INTO user_last_interaction FROM users WHERE telegram_user_id = NEW.user_id;
+            PERFORM stats_bump('subscriptions_active', 1);
+            PERFORM stats_bump_subscriber(NEW.language, user_last_interaction, 1);
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE OR REPLACE FUNCTION stats_on_broadcasts_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        IF OLD.status = 'completed' THEN
+            PERFORM stats_bump('broadcasts_completed', -1);
+        END IF;
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        IF NEW.status = 'completed' THEN
+            PERFORM stats_bump('broadcasts_completed', 1);
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE OR REPLACE FUNCTION stats_on_delivery_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        IF OLD.status = 'sent' AND OLD.delivered_at IS NOT NULL THEN
+            UPDATE stats_delivery_daily SET sent = sent - 1
+            WHERE day = (OLD.delivered_at AT TIME ZONE 'UTC')::date;
+        ELSIF OLD.status = 'failed' THEN
+            UPDATE stats_delivery_daily SET failed = failed - 1
+            WHERE day = (COALESCE(OLD.scheduled_at, OLD.delivered_at) AT TIME ZONE 'UTC')::date;
+        END IF;
+        IF OLD.opened_at IS NOT NULL AND OLD.broadcast_id IS NOT NULL THEN
+            UPDATE stats_broadcast_opens SET opens = opens - 1 WHERE broadcast_id = OLD.broadcast_id;
+        END IF;
+    END IF;
+
+    IF TG_OP <> 'DELETE' THEN
+        IF NEW.status = 'sent' AND NEW.delivered_at IS NOT NULL THEN
+            INSERT INTO stats_delivery_daily (day, sent) VALUES ((NEW.delivered_at AT TIME ZONE 'UTC')::date, 1)
+            ON CONFLICT (day) DO UPDATE SET sent = stats_delivery_daily.sent + 1;
+        ELSIF NEW.status = 'failed' THEN
+            INSERT INTO stats_delivery_daily (day, failed)
+            VALUES ((COALESCE(NEW.scheduled_at, NEW.delivered_at, NOW()) AT TIME ZONE 'UTC')::date, 1)
+            ON CONFLICT (day) DO UPDATE SET failed = stats_delivery_daily.failed + 1;
+        END IF;
+        IF NEW.opened_at IS NOT NULL AND NEW.broadcast_id IS NOT NULL THEN
+            INSERT INTO stats_broadcast_opens (broadcast_id, opens) VALUES (NEW.broadcast_id, 1)
+            ON CONFLICT (broadcast_id) DO UPDATE SET opens = stats_broadcast_opens.opens + 1;
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- ===================================================================
+-- ПОЛНЫЙ ПЕРЕСЧЕТ (первичное заполнение и сверка)
+-- ===================================================================
+
+CREATE OR REPLACE FUNCTION stats_rebuild_rollups()
+RETURNS VOID AS $$
+BEGIN
+    -- Writers wait until the snapshot is consistent with the triggers; readers are not blocked
+    LOCK TABLE users, newsletter_subscriptions, newsletter_broadcasts, delivery_log IN SHARE MODE;
+
+    TRUNCATE stats_counters, stats_subscribers_by_language, stats_subscriber_activity_daily,
+             stats_delivery_daily, stats_broadcast_opens;
+
+    INSERT INTO stats_counters (name, value)
+    SELECT 'users_total', COUNT(*) FROM users
+    UNION ALL SELECT 'subscriptions_total', COUNT(*) FROM newsletter_subscriptions
+    UNION ALL SELECT 'subscriptions_active', COUNT(*) FROM newsletter_subscriptions WHERE is_active = TRUE
+    UNION ALL SELECT 'broadcasts_completed', COUNT(*) FROM newsletter_broadcasts WHERE status = 'completed';
+
+    INSERT INTO stats_subscribers_by_language (language, active)
+    SELECT language, COUNT(*) FROM newsletter_subscriptions WHERE is_active = TRUE GROUP BY language;
+
+    INSERT INTO stats_subscriber_activity_daily (language, day, subscribers)
+    SELECT ns.language, (u.last_interaction AT TIME ZONE 'UTC')::date, COUNT(*)
+    FROM newsletter_subscriptions ns
+    JOIN users u ON u.telegram_user_id = ns.user_id
+    WHERE ns.is_active = TRUE AND u.last_interaction IS NOT NULL
+    GROUP BY 1, 2;
+
+    INSERT INTO stats_delivery_daily (day, sent, failed)
+    SELECT day, SUM(sent), SUM(failed) FROM (
+        SELECT (delivered_at AT TIME ZONE 'UTC')::date AS day, 1 AS sent, 0 AS failed
+        FROM delivery_log WHERE status = 'sent' AND delivered_at IS NOT NULL
+        UNION ALL
+        SELECT (COALESCE(scheduled_at, delivered_at) AT TIME ZONE 'UTC')::date, 0, 1
+        FROM delivery_log WHERE status = 'failed' AND COALESCE(scheduled_at, delivered_at) IS NOT NULL
+    ) d
+    GROUP BY day;
+
+    INSERT INTO stats_broadcast_opens (broadcast_id, opens)
+    SELECT broadcast_id, COUNT(*) FROM delivery_log
+    WHERE opened_at IS NOT NULL AND broadcast_id IS NOT NULL
+    GROUP BY broadcast_id;
+END;
+$$ language 'plpgsql';
+
+-- ===================================================================
+-- ТРИГГЕРЫ (создаются один раз)
+-- ===================================================================
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'stats_users_insert_delete' AND tgrelid = 'users'::regclass) THEN
+        CREATE TRIGGER stats_users_insert_delete
+            AFTER INSERT OR DELETE ON users
+            FOR EACH ROW EXECUTE FUNCTION stats_on_users_change();
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'stats_users_activity_day' AND tgrelid = 'users'::regclass) THEN
+        -- Fires only when the interaction day changes, not on every upsert
+        CREATE TRIGGER stats_users_activity_day
+            AFTER UPDATE OF last_interaction ON users
+            FOR EACH ROW
+            WHEN ((OLD.last_interaction AT TIME ZONE 'UTC')::date IS DISTINCT FROM (NEW.last_interaction AT TIME ZONE 'UTC')::date)
+            EXECUTE FUNCTION stats_on_users_change();
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'stats_subscriptions_change' AND tgrelid = 'newsletter_subscriptions'::regclass) THEN
+        CREATE TRIGGER stats_subscriptions_change
+            AFTER INSERT OR DELETE OR UPDATE OF is_active, language ON newsletter_subscriptions
+            FOR EACH ROW EXECUTE FUNCTION stats_on_subscriptions_change();
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'stats_broadcasts_change' AND tgrelid = 'newsletter_broadcasts'::regclass) THEN
+        CREATE TRIGGER stats_broadcasts_change
+            AFTER INSERT OR DELETE OR UPDATE OF status ON newsletter_broadcasts
+            FOR EACH ROW EXECUTE FUNCTION stats_on_broadcasts_change();
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'stats_delivery_change' AND tgrelid = 'delivery_log'::regclass) THEN
+        CREATE TRIGGER stats_delivery_change
+            AFTER INSERT OR DELETE OR UPDATE OF status, delivered_at, scheduled_at, opened_at ON delivery_log
+            FOR EACH ROW EXECUTE FUNCTION stats_on_delivery_change();
+    END IF;
+END;
+$$;
@@ -0,0 +1,198 @@
+# Batched mini game analytics ingestion
+"""
+The Mini App posts analytics events in batches. Validated events go onto an
+async queue; a worker aggregates them in memory (per UTC day, event type,
+language and achievement) and hands each one to the bot's SmartLogger, and
+a flush loop upserts the aggregates to Postgres every GAME_ANALYTICS_FLUSH_SECONDS.
+"""
+import asyncio
+import logging
+import os
+from datetime import date, datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.core.write_behind import WriteBehindTable
+
+logger = logging.getLogger(__name__)
+
+GAME_ANALYTICS_QUEUE_SIZE = int(os.environ.get("GAME_ANALYTICS_QUEUE_SIZE", "5000"))
+GAME_ANALYTICS_FLUSH_SECONDS = float(os.environ.get("GAME_ANALYTICS_FLUSH_SECONDS", "30"))
+
+# Serializes DDL across instances
+GAME_ANALYTICS_INSTALL_LOCK_ID = 0x47414E4C59  # "GANLY"
+
+GAME_ANALYTICS_DDL = """
+    CREATE TABLE IF NOT EXISTS game_analytics_daily (
+        day DATE NOT NULL,
+        event_type VARCHAR(30) NOT NULL,
+        language VARCHAR(20) NOT NULL,
+        achievement_type VARCHAR(50) NOT NULL DEFAULT '',
+        events BIGINT NOT NULL DEFAULT 0,
+        score_sum BIGINT NOT NULL DEFAULT 0,
+        score_max INTEGER NOT NULL DEFAULT 0,
+        duration_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+        items_sum BIGINT NOT NULL DEFAULT 0,
+        mistakes_sum BIGINT NOT NULL DEFAULT 0,
+        updated_at TIMESTAMPTZ DEFAULT NOW(),
+        PRIMARY KEY (day, event_type, language, achievement_type)
+    );
+"""
+
+# Rows carry deltas since the last flush, so concurrent instances add up
+UPSERT_SQL = """
+    INSERT INTO game_analytics_daily
+        (day, event_type, language, achievement_type, events, score_sum, score_max, duration_sum, items_sum, mistakes_sum)
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
+    ON CONFLICT (day, event_type, language, achievement_type) DO UPDATE SET
+        events = game_analytics_daily.events + EXCLUDED.events,
+        score_sum = game_analytics_daily.score_sum + EXCLUDED.score_sum,
+        score_max = GREATEST(game_analytics_daily.score_max, EXCLUDED.score_max),
+        duration_sum = game_analytics_daily.duration_sum + EXCLUDED.duration_sum,
+        items_sum = game_analytics_daily.items_sum + EXCLUDED.items_sum,
+        mistakes_sum = game_analytics_daily.mistakes_sum + EXCLUDED.mistakes_sum,
+        updated_at = NOW()
+"""
+
+AggregateKey = Tuple[date, str, str, str]
+
+
+class EventAggregate:
+    """Running sums for one (day, event type, language, achievement) bucket"""
+    __slots__ = ("events", "score_sum", "score_max", "duration_sum", "items_sum", "mistakes_sum")
+
+    def __init__(self):
+        self.events = 0
+        self.score_sum = 0
+        self.score_max = 0
+        self.duration_sum = 0.0
+        self.items_sum = 0
+        self.mistakes_sum = 0
+
+    def add(self, event):
+        self.events += 1
+        score = event.score or 0
+        self.score_sum += score
+        self.score_max = max(self.score_max, score)
+        self.duration_sum += event.duration or 0
+        self.items_sum += event.items_collected or 0
+        self.mistakes_sum += event.mistakes or 0
+
+    def merge(self, other: "EventAggregate"):
+        self.events += other.events
+        self.score_sum += other.score_sum
+        self.score_max = max(self.score_max, other.score_max)
+        self.duration_sum += other.duration_sum
+        self.items_sum += other.items_sum
+        self.mistakes_sum += other.mistakes_sum
+
+
+def language_of(event) -> str:
+    language = event.language
+    return getattr(language, "value", language) or "unknown"
+
+
+def _aggregate_row(key: AggregateKey, a: EventAggregate) -> Tuple:
+    day, event_type, language, achievement = key
+    return (day, event_type, language, achievement, a.events, a.score_sum, a.score_max,
+            a.duration_sum, a.items_sum, a.mistakes_sum)
+
+
+class GameAnalyticsIngestor:
+    """Async ingestion queue with in-memory aggregation and periodic Postgres flushes"""
+
+    def __init__(self, queue_size: int = GAME_ANALYTICS_QUEUE_SIZE,
+                 flush_interval: float = GAME_ANALYTICS_FLUSH_SECONDS):
+        self.queue_size = queue_size
+        # Called with each validated event (SmartLogger routing); set by the web service
+        self.on_event: Optional[Callable[[Any], None]] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_task: Optional[asyncio.Task] = None
+        # (day, event type, language, achievement) -> EventAggregate since last flush
+        self._table = WriteBehindTable(
+            "Game analytics", GAME_ANALYTICS_DDL, UPSERT_SQL, GAME_ANALYTICS_INSTALL_LOCK_ID,
+            _aggregate_row, EventAggregate.merge, flush_interval
+        )
+        self.stats = {"batches": 0, "accepted": 0, "rejected": 0, "dropped": 0, "processed": 0}
+
+    async def initialize(self, pool=None):
+        """Create the table and start the worker and flush loop (idempotent)"""
+        await self._table.initialize(pool, on_ready=self._start_worker)
+
+    def _start_worker(self):
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._worker_task = asyncio.create_task(self._worker())
+
+    async def submit(self, events: List[Any], rejected: int = 0) -> int:
+        """Enqueue validated events; returns how many were accepted (the rest are dropped when full)"""
+        await self.initialize()
+        self.stats["batches"] += 1
+        self.stats["rejected"] += rejected
+        accepted = 0
+        for event in events:
+            try:
+                self._queue.put_nowait(event)
+                accepted += 1
+            except asyncio.QueueFull:
+                self.stats["dropped"] += len(events) - accepted
+                logger.warning(f"⚠️ Game analytics queue full, dropped {len(events) - accepted} events")
+                break
+        self.stats["accepted"] += accepted
+        return accepted
+
+    def _aggregate(self, event):
+        key = (datetime.now(timezone.utc).date(), event.event_type, language_of(event), event.achievement_type or "")
+        pending = self._table.pending
+        aggregate = pending.get(key)
+        if aggregate is None:
+            aggregate = pending[key] = EventAggregate()
+        aggregate.add(event)
+
+    async def _worker(self):
+        while True:
+            event = await self._queue.get()
+            try:
+                # Without a database events only go to the bot log
+                if self._table.persistent:
+                    self._aggregate(event)
+                if self.on_event:
+                    self.on_event(event)
+                self.stats["processed"] += 1
+            except Exception as e:
+                logger.error(f"❌ Game analytics event failed ({event.event_type}): {e}")
+            finally:
+                self._queue.task_done()
+
+    async def flush(self):
+        """Upsert aggregates collected since the last flush"""
+        await self._table.flush()
+
+    async def close(self):
+        """Process queued events, stop the worker and flush loop and write out pending aggregates"""
+        if self._worker_task:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout=5)
+            except asyncio.TimeoutError:
+                logger.warning(f"⚠️ Game analytics closing with {self._queue.qsize()} unprocessed events")
+            self._worker_task.cancel()
+            try:
+                await self._worker_task
+            except asyncio.CancelledError:
+                pass
+            self._worker_task = None
+        await self._table.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self._table.get_stats(),
+            "queued": self._queue.qsize() if self._queue else 0,
+            **self.stats
+        }
+
+
+# Global analytics ingestor
+_game_analytics = GameAnalyticsIngestor()
+
+
+def get_game_analytics() -> GameAnalyticsIngestor:
+    """Get global game analytics ingestor"""
+    return _game_analytics
@@ -0,0 +1,322 @@
+# Mini game static asset pipeline
+"""
+Builds content-hashed copies of the mini game assets into frontend/dist:
+precompressed gzip/brotli for text assets, WebP/AVIF variants for images,
+and rewrites references in the HTML pages. Hashed URLs are served with
+`immutable` caching; only the HTML pages are revalidated, from an in-memory
+cache invalidated by file mtime.
+
+Runs at startup (skips files whose hash is already built) or ahead of time:
+    python -m src.mini_game.backend.assets
+"""
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import re
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import FileResponse, Response
+
+import brotli
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+MINI_GAME_DIR = Path(__file__).parent.parent
+PUBLIC_DIR = MINI_GAME_DIR / "frontend" / "public"
+DIST_DIR = MINI_GAME_DIR / "frontend" / "dist"
+MANIFEST_NAME = "manifest.json"
+# Bump when the set of built representations changes so existing dist/ builds are redone
+PIPELINE_VERSION = 2
+
+ASSET_URL_PREFIX = "/assets/"
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+
+HTML_PAGES = ("index.html", "tutorial.html")
+HTML_CACHE_CHECK_SECONDS = float(os.getenv("HTML_CACHE_CHECK_SECONDS", "2"))  # mtime stat at most this often
+HTML_CACHE_MIN_GZIP = 1024
+COMPRESSIBLE_SUFFIXES = {".css", ".js", ".svg", ".json"}
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg"}
+# Preferred first; only kept when smaller than the original
+IMAGE_VARIANTS = (("image/avif", "AVIF", ".avif", {"quality": 55}), ("image/webp", "WEBP", ".webp", {"quality": 82, "method": 6}))
+
+
+@dataclass
+class BuiltAsset:
+    """One fingerprinted asset and its precomputed representations"""
+    source: str
+    digest: str
+    file: str
+    media_type: str
+    encodings: Dict[str, str] = field(default_factory=dict)  # content-encoding -> file
+    variants: Dict[str, str] = field(default_factory=dict)  # image media type -> file
+    pipeline: int = 0
+
+    @property
+    def url(self) -> str:
+        return ASSET_URL_PREFIX + self.file
+
+
+class AssetPipeline:
+    """Fingerprints, precompresses and serves the mini game assets"""
+
+    def __init__(self, public_dir: Path = PUBLIC_DIR, dist_dir: Path = DIST_DIR):
+        self.public_dir = public_dir
+        self.dist_dir = dist_dir
+        self.assets: Dict[str, BuiltAsset] = {}  # source name -> asset
+        self._by_file: Dict[str, BuiltAsset] = {}  # any built file name -> asset
+        self._reference_pattern: Optional[re.Pattern] = None
+
+    def build(self) -> Dict[str, BuiltAsset]:
+        """Build every static asset in public_dir (HTML pages are rewritten at serve time)"""
+        self.dist_dir.mkdir(parents=True, exist_ok=True)
+        previous = self._load_manifest()
+        assets = {}
+        for path in sorted(self.public_dir.iterdir()):
+            if not path.is_file() or path.name in HTML_PAGES:
+                continue
+            try:
+                assets[path.name] = self._build_asset(path, previous.get(path.name))
+            except Exception as e:
+                logger.error(f"❌ Asset build failed for {path.name}: {e}")
+
+        self.assets = assets
+        self._by_file = {}
+        for asset in assets.values():
+            for built in (asset.file, *asset.encodings.values(), *asset.variants.values()):
+                self._by_file[built] = asset
+        names = "|".join(re.escape(name) for name in sorted(assets, key=len, reverse=True))
+        self._reference_pattern = re.compile(
+            rf'(?P<attr>(?:href|src)=["\'])/?(?P<name>{names})(?:\?[^"\']*)?(?=["\'])'
+        ) if assets else None
+
+        with open(self.dist_dir / MANIFEST_NAME, "w", encoding="utf-8") as f:
+            json.dump({name: asdict(asset) for name, asset in assets.items()}, f, indent=2)
+        self._remove_stale_files()
+        logger.info(f"📦 Mini game assets ready: {len(assets)} fingerprinted ({', '.join(a.file for a in assets.values())})")
+        return assets
+
+    def _load_manifest(self) -> Dict[str, BuiltAsset]:
+        try:
+            with open(self.dist_dir / MANIFEST_NAME, encoding="utf-8") as f:
+                return {name: BuiltAsset(**data) for name, data in json.load(f).items()}
+        except (OSError, ValueError, TypeError):
+            return {}
+
+    def _build_asset(self, path: Path, previous: Optional[BuiltAsset]) -> BuiltAsset:
+        data = path.read_bytes()
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        if previous and previous.digest == digest and previous.pipeline == PIPELINE_VERSION and self._complete(previous):
+            return previous
+
+        media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        asset = BuiltAsset(path.name, digest, f"{path.stem}.{digest}{path.suffix}", media_type, pipeline=PIPELINE_VERSION)
+        (self.dist_dir / asset.file).write_bytes(data)
+
+        suffix = path.suffix.lower()
+        if suffix in COMPRESSIBLE_SUFFIXES:
+            asset.encodings["gzip"] = self._write(asset.file + ".gz", gzip.compress(data, 9, mtime=0))
+            asset.encodings["br"] = self._write(asset.file + ".br", brotli.compress(data, quality=11))
+        elif suffix in IMAGE_SUFFIXES:
+            asset.variants = self._image_variants(path, asset, len(data))
+        return asset
+
+    def _image_variants(self, path: Path, asset: BuiltAsset, original_size: int) -> Dict[str, str]:
+        variants = {}
+        with Image.open(path) as image:
+            for media_type, pil_format, extension, options in IMAGE_VARIANTS:
+                target = self.dist_dir / f"{path.stem}.{asset.digest}{extension}"
+                try:
+                    image.save(target, pil_format, **options)
+                except (KeyError, OSError, ValueError) as e:
+                    # Pillow built without this encoder
+                    logger.info(f"📦 Skipping {pil_format} variant of {path.name}: {e}")
+                    target.unlink(missing_ok=True)
+                    continue
+                if target.stat().st_size < original_size:
+                    variants[media_type] = target.name
+                else:
+                    target.unlink()
+        return variants
+
+    def _write(self, name: str, data: bytes) -> str:
+        (self.dist_dir / name).write_bytes(data)
+        return name
+
+    def _complete(self, asset: BuiltAsset) -> bool:
+        files = (asset.file, *asset.encodings.values(), *asset.variants.values())
+        return all((self.dist_dir / name).exists() for name in files)
+
+    def _remove_stale_files(self):
+        for path in self.dist_dir.iterdir():
+            if path.is_file() and path.name != MANIFEST_NAME and path.name not in self._by_file:
+                path.unlink()
+
+    def rewrite_html(self, html: str) -> str:
+        """Point asset references (style.css?v=..., game.js, ...) at their fingerprinted URLs"""
+        if not self._reference_pattern:
+            return html
+        return self._reference_pattern.sub(
+            lambda m: m.group("attr") + self.assets[m.group("name")].url, html
+        )
+
+    def response(self, request: Request, asset: BuiltAsset, immutable: bool = True) -> Response:
+        """Best representation for the client, with ETag/304 and long-lived caching when fingerprinted"""
+        file, media_type, encoding = asset.file, asset.media_type, None
+        vary = None
+        if asset.variants:
+            vary = "Accept"
+            accept = request.headers.get("accept", "")
+            for variant_type, variant_file in sorted(asset.variants.items(), key=lambda item: item[0] != "image/avif"):
+                if variant_type in accept:
+                    file, media_type = variant_file, variant_type
+                    break
+        elif asset.encodings:
+            vary = "Accept-Encoding"
+            accepted = request.headers.get("accept-encoding", "")
+            for candidate in ("br", "gzip"):
+                if candidate in asset.encodings and candidate in accepted:
+                    file, encoding = asset.encodings[candidate], candidate
+                    break
+
+        etag = f'"{asset.digest}-{Path(file).suffix.lstrip(".")}"'
+        headers = {"ETag": etag, "Cache-Control": IMMUTABLE_CACHE if immutable else REVALIDATE_CACHE}
+        if vary:
+            headers["Vary"] = vary
+        if etag in request.headers.get("if-none-match", ""):
+            return Response(status_code=304, headers=headers)
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return FileResponse(self.dist_dir / file, media_type=media_type, headers=headers)
+
+    def serve_fingerprinted(self, request: Request, file: str) -> Optional[Response]:
+        """Response for an /assets/<file> URL, or None if unknown"""
+        asset = self._by_file.get(file)
+        if asset is None or file != asset.file:
+            return None
+        return self.response(request, asset, immutable=True)
+
+    def serve_source(self, request: Request, name: str) -> Optional[Response]:
+        """Response for a legacy unhashed URL (/style.css, /game.js, ...): same bytes, revalidated"""
+        asset = self.assets.get(name)
+        return self.response(request, asset, immutable=False) if asset else None
+
+
+class CachedPage:
+    """Rendered HTML page held as pre-encoded bytes"""
+    __slots__ = ("body", "gzip_body", "digest", "mtime_ns", "size", "checked_at")
+
+    def __init__(self, body: bytes, mtime_ns: int, size: int):
+        self.body = body
+        self.gzip_body = gzip.compress(body, 6, mtime=0) if len(body) >= HTML_CACHE_MIN_GZIP else None
+        self.digest = hashlib.sha256(body).hexdigest()[:16]
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.checked_at = time.monotonic()
+
+
+class HtmlPageCache:
+    """In-memory cache of rendered mini game pages, invalidated by file mtime/size"""
+
+    def __init__(self, public_dir: Path = PUBLIC_DIR, render: Optional[Callable[[str], str]] = None,
+                 check_interval: float = HTML_CACHE_CHECK_SECONDS):
+        self.public_dir = public_dir
+        self.render = render or (lambda html: html)
+        self.check_interval = check_interval
+        self._pages: Dict[str, CachedPage] = {}
+        self.stats = {"hits": 0, "not_modified": 0, "loads": 0}
+
+    def get(self, name: str) -> Optional[CachedPage]:
+        """Cached page, reloaded only when the file changed since the last (throttled) stat"""
+        page = self._pages.get(name)
+        now = time.monotonic()
+        if page and now - page.checked_at < self.check_interval:
+            return page
+        try:
+            st = (self.public_dir / name).stat()
+        except OSError:
+            self._pages.pop(name, None)
+            return None
+        if page and page.mtime_ns == st.st_mtime_ns and page.size == st.st_size:
+            page.checked_at = now
+            return page
+
+        html = (self.public_dir / name).read_text(encoding="utf-8")
+        page = CachedPage(self.render(html).encode("utf-8"), st.st_mtime_ns, st.st_size)
+        self._pages[name] = page
+        self.stats["loads"] += 1
+        logger.info(f"📄 Cached {name} ({len(page.body)} bytes, etag {page.digest})")
+        return page
+
+    def response(self, request: Request, name: str, headers: Optional[Dict[str, str]] = None,
+                 inject_head: Optional[str] = None) -> Optional[Response]:
+        """HTML response with ETag/304; inject_head (per-request script) is added before </head>"""
+        page = self.get(name)
+        if page is None:
+            return None
+
+        if inject_head:
+            etag = f'"{page.digest}-{hashlib.sha256(inject_head.encode("utf-8")).hexdigest()[:8]}"'
+        else:
+            etag = f'"{page.digest}"'
+        response_headers = {**(headers or {}), "ETag": etag, "Cache-Control": REVALIDATE_CACHE}
+        compressible = page.gzip_body is not None and not inject_head
+        if compressible:
+            response_headers["Vary"] = "Accept-Encoding"
+        if etag in request.headers.get("if-none-match", ""):
+            self.stats["not_modified"] += 1
+            return Response(status_code=304, headers=response_headers)
+
+        self.stats["hits"] += 1
+        if inject_head:
+            body = page.body.replace(b"</head>", inject_head.encode("utf-8") + b"</head>", 1)
+            return Response(content=body, media_type="text/html; charset=utf-8", headers=response_headers)
+        if compressible and "gzip" in request.headers.get("accept-encoding", ""):
+            response_headers["Content-Encoding"] = "gzip"
+            return Response(content=page.gzip_body, media_type="text/html; charset=utf-8", headers=response_headers)
+        return Response(content=page.body, media_type="text/html; charset=utf-8", headers=response_headers)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {**self.stats, "pages": len(self._pages)}
+
+
+# Global asset pipeline (built on first use)
+_asset_pipeline: Optional[AssetPipeline] = None
+_html_cache: Optional[HtmlPageCache] = None
+
+
+def get_asset_pipeline() -> AssetPipeline:
+    """Get global asset pipeline, building it on first call"""
+    global _asset_pipeline
+    if _asset_pipeline is None:
+        pipeline = AssetPipeline()
+        pipeline.build()
+        _asset_pipeline = pipeline
+    return _asset_pipeline
+
+
+def get_html_cache() -> HtmlPageCache:
+    """Get global HTML page cache (pages rendered through the asset pipeline when it builds)"""
+    global _html_cache
+    if _html_cache is None:
+        try:
+            render = get_asset_pipeline().rewrite_html
+        except Exception as e:
+            logger.error(f"❌ Mini game asset pipeline failed, caching unrewritten HTML: {e}")
+            render = None
+        _html_cache = HtmlPageCache(render=render)
+    return _html_cache
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    for built in AssetPipeline().build().values():
+        print(f"{built.source:32} -> {built.url}  encodings={list(built.encodings)} variants={list(built.variants)}")
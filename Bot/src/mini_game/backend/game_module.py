@@ -1,11 +1,84 @@
 # Mini Game integration module for Torah Bot
 import logging
+import os
+from collections import deque
+from datetime import date, datetime, timezone
 from typing import Dict, Any, Optional, List
 import json
 import asyncio
 
+from .leaderboard import get_game_leaderboard
+from .menu_button import get_menu_button_registry, menu_button_version
+
 logger = logging.getLogger(__name__)
 
+# Per-player history is bounded: aggregates plus the last GAME_RECENT_SCORES scores
+GAME_RECENT_SCORES = int(os.environ.get("GAME_RECENT_SCORES", "10"))
+
+# For Menu Button, always use the production autoscale domain
+# because Telegram needs external access, not development domain
+MENU_BUTTON = {
+    "type": "web_app",
+    "text": "🎮 Shabbat Game",
+    "web_app": {
+        # Use SHORT URL for BotFather menu button
+        "url": "https://torah-project-jobjoyclub.replit.app"
+    }
+}
+MENU_BUTTON_VERSION = menu_button_version(MENU_BUTTON)
+
+
+def _utc_today() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+class PlayerGameStats:
+    """Running aggregates for one player (constant size regardless of games played)"""
+    __slots__ = ("best", "count", "total", "recent")
+    
+    def __init__(self):
+        self.best = 0
+        self.count = 0
+        self.total = 0
+        self.recent = deque(maxlen=GAME_RECENT_SCORES)
+    
+    def add(self, score: int) -> int:
+        """Record a score; returns the previous best"""
+        previous_best = self.best
+        self.count += 1
+        self.total += score
+        self.recent.append(score)
+        if self.count == 1 or score > self.best:
+            self.best = score
+        return previous_best
+    
+    @property
+    def average(self) -> float:
+        return self.total / self.count if self.count else 0
+
+
+class DailyCounter:
+    """Counter that resets when the UTC day changes"""
+    __slots__ = ("day", "count")
+    
+    def __init__(self):
+        self.day = _utc_today()
+        self.count = 0
+    
+    def _roll(self):
+        today = _utc_today()
+        if today != self.day:
+            self.day, self.count = today, 0
+    
+    def increment(self):
+        self._roll()
+        self.count += 1
+    
+    @property
+    def value(self) -> int:
+        self._roll()
+        return self.count
+
 class MiniGameModule:
     """Safe integration of Shabbat Runner mini game with Torah Bot"""
     
@@ -14,18 +87,26 @@ class MiniGameModule:
         self.session_manager = session_manager
         self.analytics = analytics
         
-        # Game analytics storage
-        self.game_scores = {}  # user_id -> [scores]
-        self.game_stats = {
-            "total_games": 0,
-            "total_players": set(),
-            "average_score": 0,
-            "best_score": 0,
-            "today_games": 0
-        }
+        # Game analytics storage: O(1) work per recorded score
+        self.player_stats: Dict[int, PlayerGameStats] = {}
+        self._total_games = 0
+        self._score_sum = 0
+        self._best_score = 0
+        self._today_games = DailyCounter()
         
-        # Native menu button setup
-        self._menu_button_users = set()  # Track users with menu button
+        # Native menu button setup (applied state lives in the menu button registry)
+        self._menu_button_pending: Dict[int, asyncio.Task] = {}  # user_id -> in-flight setup
+    
+    @property
+    def game_stats(self) -> Dict[str, Any]:
+        """Global game statistics"""
+        return {
+            "total_games": self._total_games,
+            "total_players": len(self.player_stats),
+            "average_score": self._score_sum / self._total_games if self._total_games else 0,
+            "best_score": self._best_score,
+            "today_games": self._today_games.value
+        }
     
     async def handle_game_command(self, chat_id: int, user_id: int, user_data: Optional[Dict] = None):
         """Handle request to start mini game"""
@@ -55,9 +136,8 @@ class MiniGameModule:
             
             message_data = game_messages.get(language, game_messages["English"])
             
-            # Set native menu button globally AND for this user (critical fix)
-            await self._setup_native_menu_button(None)  # Global setting
-            await self._setup_native_menu_button(user_id)  # User-specific
+            # Set native menu button globally AND for this user, off the game-open path
+            self._ensure_menu_buttons(user_id)
             
             # Create game URL with user parameters  
             # Autoscale deployment URL - FIXED
@@ -158,9 +238,9 @@ class MiniGameModule:
         session = self.session_manager.get_session(user_id, user_data)
         language = session.get("language", "English")
         
-        user_scores = self.game_scores.get(user_id, [])
+        player = self.player_stats.get(user_id)
         
-        if not user_scores:
+        if not player:
             no_games_messages = {
                 "English": "🎮 You haven't played Shabbat Runner yet!\n\nStart your first game to see your stats here.",
                 "Russian": "🎮 Вы ещё не играли в Shabbat Runner!\n\nСыграйте первую игру, чтобы увидеть статистику.",
@@ -168,9 +248,9 @@ class MiniGameModule:
             }
             message = no_games_messages.get(language, no_games_messages["English"])
         else:
-            best_score = max(user_scores)
-            avg_score = sum(user_scores) / len(user_scores)
-            total_games = len(user_scores)
+            best_score = player.best
+            avg_score = player.average
+            total_games = player.count
             
             stats_messages = {
                 "English": f"🏆 <b>Your Shabbat Runner Stats</b>\n\n🎯 Best Score: <b>{best_score}</b>\n📊 Average: <b>{avg_score:.1f}</b>\n🎮 Games Played: <b>{total_games}</b>\n\n🌟 Keep collecting those Shabbat items!",
@@ -201,25 +281,18 @@ class MiniGameModule:
     def record_game_score(self, user_id: int, score: int, user_data: Optional[Dict] = None):
         """Record game score for analytics (called from web app)"""
         try:
-            if user_id not in self.game_scores:
-                self.game_scores[user_id] = []
-            
-            self.game_scores[user_id].append(score)
+            player = self.player_stats.get(user_id)
+            if player is None:
+                player = self.player_stats[user_id] = PlayerGameStats()
+            previous_best = player.add(score)
             
-            # Update global stats
-            self.game_stats["total_games"] += 1
-            self.game_stats["total_players"].add(user_id)
-            self.game_stats["today_games"] += 1
+            # Update global stats (running aggregates, no rescans)
+            self._total_games += 1
+            self._score_sum += score
+            self._today_games.increment()
             
-            if score > self.game_stats["best_score"]:
-                self.game_stats["best_score"] = score
-            
-            # Recalculate average
-            all_scores = []
-            for scores in self.game_scores.values():
-                all_scores.extend(scores)
-            if all_scores:
-                self.game_stats["average_score"] = sum(all_scores) / len(all_scores)
+            if score > self._best_score:
+                self._best_score = score
             
             # Enhanced business analytics with detailed game data
             if self.analytics:
@@ -242,21 +315,26 @@ class MiniGameModule:
                     user_id,
                     username=user_data.get("username", "unknown") if user_data else "unknown",
                     score=score,
-                    best_score=max(self.game_scores[user_id]),
-                    games_played=len(self.game_scores[user_id])
+                    best_score=player.best,
+                    games_played=player.count
                 )
             
             logger.info(f"🎮 Game score recorded: user {user_id} scored {score}")
             
             # Check for achievement rewards
-            self.check_achievements(user_id, score)
+            self.check_achievements(user_id, score, previous_best)
             
         except Exception as e:
             logger.error(f"❌ Failed to record game score: {e}")
     
-    def check_achievements(self, user_id: int, score: int):
+    def check_achievements(self, user_id: int, score: int, previous_best: Optional[int] = None):
         """Check if user earned any achievement rewards with enhanced analytics"""
-        user_scores = self.game_scores.get(user_id, [])
+        player = self.player_stats.get(user_id)
+        if player is None:
+            return
+        games_played = player.count
+        if previous_best is None:
+            previous_best = player.best
         
         # Achievement triggers with smart analytics
         if score >= 20:
@@ -286,9 +364,9 @@ class MiniGameModule:
                     score=score
                 )
         
-        if len(user_scores) >= 5:
+        if games_played >= 5:
             # Frequent player achievement  
-            logger.info(f"🎯 User {user_id} is a frequent player: {len(user_scores)} games")
+            logger.info(f"🎯 User {user_id} is a frequent player: {games_played} games")
             
             if self.analytics:
                 self.analytics.smart_logger.game_achievement_event(
@@ -296,11 +374,11 @@ class MiniGameModule:
                     user_id,
                     username="unknown",
                     language="unknown",
-                    games_played=len(user_scores)
+                    games_played=games_played
                 )
         
         # Personal best
-        if score == max(user_scores):
+        if games_played == 1 or score >= previous_best:
             logger.info(f"🏆 User {user_id} set new personal best: {score}")
             
             if self.analytics:
@@ -310,53 +388,51 @@ class MiniGameModule:
                     username="unknown",
                     language="unknown",
                     score=score,
-                    previous_best=max(user_scores[:-1]) if len(user_scores) > 1 else 0
+                    previous_best=previous_best if games_played > 1 else 0
                 )
     
     def get_game_leaderboard(self, limit: int = 10) -> List[Dict]:
-        """Get top players leaderboard"""
+        """Get top players leaderboard (all-time, from the persistent leaderboard)"""
         leaderboard = []
         
-        for user_id, scores in self.game_scores.items():
-            best_score = max(scores)
-            total_games = len(scores)
-            avg_score = sum(scores) / len(scores)
-            
+        for row in get_game_leaderboard().top("all", limit):
+            player = self.player_stats.get(row["user_id"])
             leaderboard.append({
-                "user_id": user_id,
-                "best_score": best_score,
-                "total_games": total_games,
-                "avg_score": avg_score
+                "user_id": row["user_id"],
+                "best_score": row["score"],
+                "total_games": row["games"],
+                "avg_score": player.average if player else None
             })
         
-        # Sort by best score
-        leaderboard.sort(key=lambda x: x["best_score"], reverse=True)
-        return leaderboard[:limit]
+        return leaderboard
+    
+    def _ensure_menu_buttons(self, user_id: int):
+        """Apply the global and per-user menu button in the background unless already applied"""
+        registry = get_menu_button_registry()
+        if registry.version == MENU_BUTTON_VERSION and registry.is_applied(None) and registry.is_applied(user_id):
+            return
+        if user_id in self._menu_button_pending:
+            return
+        
+        async def setup():
+            try:
+                await self._setup_native_menu_button(None)
+                await self._setup_native_menu_button(user_id)
+            finally:
+                self._menu_button_pending.pop(user_id, None)
+        
+        self._menu_button_pending[user_id] = asyncio.create_task(setup())
     
-    async def _setup_native_menu_button(self, user_id: Optional[int]):
-        """Set up native Telegram menu button for user (one-time)"""
+    async def _setup_native_menu_button(self, user_id: Optional[int], force: bool = False):
+        """Set up native Telegram menu button (None = bot-wide default); skipped once applied for this config"""
         try:
-            # Skip if already set for this user
-            if user_id in self._menu_button_users:
-                return
-            
-            # Game URL for WebApp - ALWAYS use production autoscale domain for Telegram
-            import os
+            registry = get_menu_button_registry()
+            await registry.initialize(MENU_BUTTON_VERSION)
+            # Skip if this config is already set for this chat (survives restarts)
+            if not force and registry.is_applied(user_id):
+                return True
             
-            # For Menu Button, always use the production autoscale domain
-            # because Telegram needs external access, not development domain
-            base_url = "https://torah-project-jobjoyclub.replit.app"
-            
-            # Use SHORT URL for BotFather menu button
-            game_url = base_url
-            
-            menu_button = {
-                "type": "web_app",
-                "text": "🎮 Shabbat Game",
-                "web_app": {
-                    "url": game_url
-                }
-            }
+            menu_button = MENU_BUTTON
             
             # Use bot's _make_request method for consistency  
             data: Dict[str, Any] = {"menu_button": menu_button}
@@ -371,9 +447,7 @@ class MiniGameModule:
                 
                 if result.get("ok"):
                     logger.info(f"🎮 Native menu button set for user {user_id}")
-                    # Only add to set if user_id is not None
-                    if user_id is not None:
-                        self._menu_button_users.add(user_id)
+                    await registry.mark_applied(user_id)
                     return True
                 else:
                     logger.warning(f"⚠️ Menu button setup failed for user {user_id}: {result}")
@@ -0,0 +1,369 @@
+# Persistent Shabbat Runner leaderboard
+"""
+All-time, daily and weekly best scores kept in memory in indexable skip lists
+(top-K, "my rank" and "players around me" in O(log n)) and persisted to
+Postgres write-behind: submissions only touch memory, a background task
+upserts changed rows every few seconds
+"""
+import logging
+import math
+import os
+import random
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.core.validation import GAME_MAX_SCORE
+from src.core.write_behind import WriteBehindTable
+
+logger = logging.getLogger(__name__)
+
+LEADERBOARD_FLUSH_SECONDS = float(os.environ.get("GAME_LEADERBOARD_FLUSH_SECONDS", "5"))
+# Daily/weekly rows older than this are deleted from Postgres
+LEADERBOARD_PERIOD_RETENTION_DAYS = int(os.environ.get("GAME_LEADERBOARD_PERIOD_RETENTION_DAYS", "60"))
+
+WINDOWS = ("all", "daily", "weekly")
+ALL_TIME_PERIOD = date(1970, 1, 1)
+
+# Serializes DDL across instances
+LEADERBOARD_INSTALL_LOCK_ID = 0x4C45414442  # "LEADB"
+
+LEADERBOARD_DDL = """
+    CREATE TABLE IF NOT EXISTS game_leaderboard (
+        window_type VARCHAR(10) NOT NULL,   -- 'all', 'daily', 'weekly'
+        period_start DATE NOT NULL,         -- 1970-01-01 for all-time
+        user_id BIGINT NOT NULL,
+        username VARCHAR(100),
+        best_score INTEGER NOT NULL,
+        best_at TIMESTAMPTZ NOT NULL,
+        games_played INTEGER NOT NULL DEFAULT 0,
+        updated_at TIMESTAMPTZ DEFAULT NOW(),
+        PRIMARY KEY (window_type, period_start, user_id)
+    );
+    CREATE INDEX IF NOT EXISTS idx_game_leaderboard_best
+        ON game_leaderboard (window_type, period_start, best_score DESC, best_at);
+"""
+
+LOAD_SQL = """
+    SELECT window_type, user_id, username, best_score, best_at, games_played
+    FROM game_leaderboard
+    WHERE (window_type = 'all' AND period_start = $1)
+       OR (window_type = 'daily' AND period_start = $2)
+       OR (window_type = 'weekly' AND period_start = $3)
+"""
+
+# games_played carries the delta since the last flush, so concurrent instances add up
+UPSERT_SQL = """
+    INSERT INTO game_leaderboard (window_type, period_start, user_id, username, best_score, best_at, games_played)
+    VALUES ($1, $2, $3, $4, $5, $6, $7)
+    ON CONFLICT (window_type, period_start, user_id) DO UPDATE SET
+        username = COALESCE(EXCLUDED.username, game_leaderboard.username),
+        best_at = CASE WHEN EXCLUDED.best_score > game_leaderboard.best_score
+                       THEN EXCLUDED.best_at ELSE game_leaderboard.best_at END,
+        best_score = GREATEST(game_leaderboard.best_score, EXCLUDED.best_score),
+        games_played = game_leaderboard.games_played + EXCLUDED.games_played,
+        updated_at = NOW()
+"""
+
+PRUNE_SQL = "DELETE FROM game_leaderboard WHERE window_type <> 'all' AND period_start < $1"
+
+
+def period_start(window: str, now: datetime) -> date:
+    """First day of the window's current period (UTC)"""
+    today = now.date()
+    if window == "daily":
+        return today
+    if window == "weekly":
+        return today - timedelta(days=today.weekday())
+    return ALL_TIME_PERIOD
+
+
+class _SkipNode:
+    __slots__ = ("key", "next", "width")
+
+    def __init__(self, key, levels: int):
+        self.key = key
+        self.next: List[Optional["_SkipNode"]] = [None] * levels
+        self.width = [1] * levels
+
+
+class IndexableSkipList:
+    """Sorted multiset with O(log n) insert, remove, rank and positional access.
+    Each link stores how many elements it skips, so positions are summed on the way down."""
+
+    def __init__(self, max_levels: int = 24):
+        self.max_levels = max_levels
+        self._head = _SkipNode(None, max_levels)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _random_levels(self) -> int:
+        return min(self.max_levels, 1 - int(math.log2(1.0 - random.random())))
+
+    def insert(self, key):
+        chain: List[_SkipNode] = [self._head] * self.max_levels
+        steps_at_level = [0] * self.max_levels
+        node = self._head
+        for level in reversed(range(self.max_levels)):
+            while node.next[level] is not None and node.next[level].key <= key:
+                steps_at_level[level] += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+
+        levels = self._random_levels()
+        new_node = _SkipNode(key, levels)
+        steps = 0
+        for level in range(levels):
+            previous = chain[level]
+            new_node.next[level] = previous.next[level]
+            previous.next[level] = new_node
+            new_node.width[level] = previous.width[level] - steps
+            previous.width[level] = steps + 1
+            steps += steps_at_level[level]
+        for level in range(levels, self.max_levels):
+            chain[level].width[level] += 1
+        self._size += 1
+
+    def remove(self, key):
+        chain: List[_SkipNode] = [self._head] * self.max_levels
+        node = self._head
+        for level in reversed(range(self.max_levels)):
+            while node.next[level] is not None and node.next[level].key < key:
+                node = node.next[level]
+            chain[level] = node
+
+        target = chain[0].next[0]
+        if target is None or target.key != key:
+            raise KeyError(key)
+        for level in range(len(target.next)):
+            previous = chain[level]
+            previous.width[level] += target.width[level] - 1
+            previous.next[level] = target.next[level]
+        for level in range(len(target.next), self.max_levels):
+            chain[level].width[level] -= 1
+        self._size -= 1
+
+    def index(self, key) -> int:
+        """Number of elements strictly less than key (0-based position of key)"""
+        position = 0
+        node = self._head
+        for level in reversed(range(self.max_levels)):
+            while node.next[level] is not None and node.next[level].key < key:
+                position += node.width[level]
+                node = node.next[level]
+        return position
+
+    def slice(self, start: int, count: int) -> List[Any]:
+        """Up to count keys starting at 0-based position start"""
+        if start < 0:
+            count, start = count + start, 0
+        if count <= 0 or start >= self._size:
+            return []
+        node = self._head
+        remaining = start + 1
+        for level in reversed(range(self.max_levels)):
+            while node.next[level] is not None and node.width[level] <= remaining:
+                remaining -= node.width[level]
+                node = node.next[level]
+        keys = []
+        while node is not None and len(keys) < count:
+            keys.append(node.key)
+            node = node.next[0]
+        return keys
+
+
+class LeaderboardEntry:
+    __slots__ = ("user_id", "username", "best", "best_at", "games")
+
+    def __init__(self, user_id: int, username: Optional[str], best: int, best_at: float, games: int = 0):
+        self.user_id = user_id
+        self.username = username
+        self.best = best
+        self.best_at = best_at
+        self.games = games
+
+    @property
+    def key(self) -> Tuple[int, float, int]:
+        # Higher score first; earlier achiever wins ties
+        return (-self.best, self.best_at, self.user_id)
+
+
+class LeaderboardWindow:
+    """One leaderboard period (all-time, today, this week)"""
+    __slots__ = ("name", "period", "entries", "order")
+
+    def __init__(self, name: str, period: date):
+        self.name = name
+        self.period = period
+        self.entries: Dict[int, LeaderboardEntry] = {}
+        self.order = IndexableSkipList()
+
+    def load(self, entry: LeaderboardEntry):
+        previous = self.entries.get(entry.user_id)
+        if previous:
+            self.order.remove(previous.key)
+        self.entries[entry.user_id] = entry
+        self.order.insert(entry.key)
+
+    def submit(self, user_id: int, score: int, at: float, username: Optional[str]) -> LeaderboardEntry:
+        entry = self.entries.get(user_id)
+        if entry is None:
+            entry = LeaderboardEntry(user_id, username, score, at)
+            self.entries[user_id] = entry
+            self.order.insert(entry.key)
+        elif score > entry.best:
+            self.order.remove(entry.key)
+            entry.best, entry.best_at = score, at
+            self.order.insert(entry.key)
+        if username:
+            entry.username = username
+        entry.games += 1
+        return entry
+
+    def rank_of(self, user_id: int) -> Optional[int]:
+        entry = self.entries.get(user_id)
+        return self.order.index(entry.key) + 1 if entry else None
+
+    def rows(self, start: int, count: int) -> List[Dict[str, Any]]:
+        rows = []
+        for offset, key in enumerate(self.order.slice(start, count)):
+            entry = self.entries[key[2]]
+            rows.append({
+                "rank": max(start, 0) + offset + 1,
+                "user_id": entry.user_id,
+                "name": entry.username or f"Player #{str(entry.user_id)[-4:]}",
+                "score": entry.best,
+                "games": entry.games
+            })
+        return rows
+
+
+def _leaderboard_row(key: Tuple[str, date, int], dirty: list) -> Tuple:
+    name, period, user_id = key
+    username, best, best_at, games = dirty
+    return (name, period, user_id, username, best, datetime.fromtimestamp(best_at, timezone.utc), games)
+
+
+def _merge_dirty(newer: list, older: list):
+    newer[3] += older[3]
+    if older[1] > newer[1]:
+        newer[1], newer[2] = older[1], older[2]
+
+
+class GameLeaderboard:
+    """In-memory ranked leaderboards with write-behind persistence"""
+
+    def __init__(self, flush_interval: float = LEADERBOARD_FLUSH_SECONDS):
+        now = datetime.now(timezone.utc)
+        self._windows = {name: LeaderboardWindow(name, period_start(name, now)) for name in WINDOWS}
+        # (window, period, user_id) -> [username, best, best_at, games since last flush]
+        self._table = WriteBehindTable(
+            "Game leaderboard", LEADERBOARD_DDL, UPSERT_SQL, LEADERBOARD_INSTALL_LOCK_ID,
+            _leaderboard_row, _merge_dirty, flush_interval, after_flush=self._prune
+        )
+        self._pruned_on: Optional[date] = None
+        self.stats = {"submissions": 0, "rejected": 0}
+
+    async def initialize(self, pool=None):
+        """Create the table, load current periods and start the flush loop (idempotent)"""
+        await self._table.initialize(pool, load=self._load)
+
+    async def _load(self, conn):
+        periods = [self._current(name).period for name in WINDOWS]
+        rows = await conn.fetch(LOAD_SQL, *periods)
+        for row in rows:
+            # Scores submitted before the load stay in memory and win if higher
+            window = self._windows[row["window_type"]]
+            current = window.entries.get(row["user_id"])
+            entry = LeaderboardEntry(
+                row["user_id"], row["username"], row["best_score"],
+                row["best_at"].timestamp(), row["games_played"] + (current.games if current else 0)
+            )
+            if current and (current.best > entry.best):
+                entry.best, entry.best_at = current.best, current.best_at
+            window.load(entry)
+        logger.info(f"🏆 Game leaderboard loaded ({len(self._windows['all'].entries)} players)")
+
+    def _current(self, name: str) -> LeaderboardWindow:
+        """The window for the current period; a new day/week starts empty"""
+        window = self._windows[name]
+        current_period = period_start(name, datetime.now(timezone.utc))
+        if window.period != current_period:
+            window = self._windows[name] = LeaderboardWindow(name, current_period)
+        return window
+
+    async def record_score(self, user_id: int, score: int, username: Optional[str] = None) -> Dict[str, Optional[int]]:
+        """Submit a finished game; returns the player's rank in each window"""
+        if not 0 <= score <= GAME_MAX_SCORE:
+            self.stats["rejected"] += 1
+            raise ValueError(f"score out of range: {score}")
+        await self.initialize()
+        self.stats["submissions"] += 1
+        at = time.time()
+        ranks = {}
+        for name in WINDOWS:
+            window = self._current(name)
+            entry = window.submit(user_id, score, at, username)
+            ranks[name] = window.rank_of(user_id)
+            if not self._table.persistent:
+                continue
+            dirty = self._table.pending.setdefault((name, window.period, user_id), [None, entry.best, entry.best_at, 0])
+            dirty[0], dirty[1], dirty[2] = entry.username, entry.best, entry.best_at
+            dirty[3] += 1
+        return ranks
+
+    def top(self, window: str = "all", limit: int = 10) -> List[Dict[str, Any]]:
+        return self._current(window).rows(0, limit)
+
+    def rank(self, window: str, user_id: int) -> Optional[Dict[str, Any]]:
+        """The player's row (rank, score, games) or None if they have not played in this window"""
+        current = self._current(window)
+        position = current.rank_of(user_id)
+        return current.rows(position - 1, 1)[0] if position else None
+
+    def around(self, window: str, user_id: int, radius: int = 2) -> List[Dict[str, Any]]:
+        """Rows from `radius` places above the player to `radius` places below"""
+        current = self._current(window)
+        position = current.rank_of(user_id)
+        if not position:
+            return []
+        return current.rows(position - 1 - radius, 2 * radius + 1)
+
+    def player_count(self, window: str = "all") -> int:
+        return len(self._current(window).entries)
+
+    async def flush(self):
+        """Upsert rows changed since the last flush"""
+        await self._table.flush()
+
+    async def _prune(self):
+        """Delete expired daily/weekly rows (once per UTC day, from the flush loop)"""
+        today = datetime.now(timezone.utc).date()
+        if self._pruned_on == today:
+            return
+        cutoff = today - timedelta(days=LEADERBOARD_PERIOD_RETENTION_DAYS)
+        async with self._table.pool.acquire() as conn:
+            await conn.execute(PRUNE_SQL, cutoff)
+        self._pruned_on = today
+
+    async def close(self):
+        """Stop the flush loop and write out pending rows"""
+        await self._table.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self._table.get_stats(),
+            "players": {name: len(window.entries) for name, window in self._windows.items()},
+            **self.stats
+        }
+
+
+# Global leaderboard
+_game_leaderboard = GameLeaderboard()
+
+
+def get_game_leaderboard() -> GameLeaderboard:
+    """Get global game leaderboard"""
+    return _game_leaderboard
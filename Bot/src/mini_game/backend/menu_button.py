@@ -1,11 +1,35 @@
 # Telegram Menu Button configuration for native WebApp integration
+import asyncio
+import hashlib
 import logging
 import json
 import httpx
-from typing import Optional
+from typing import Any, Dict, Optional, Set
 
 logger = logging.getLogger(__name__)
 
+# Serializes DDL across instances
+MENU_BUTTON_INSTALL_LOCK_ID = 0x4D454E5542  # "MENUB"
+
+# chat_id 0 is the bot-wide default button
+GLOBAL_MENU_BUTTON_CHAT = 0
+
+MENU_BUTTON_STATE_DDL = """
+    CREATE TABLE IF NOT EXISTS menu_button_state (
+        chat_id BIGINT PRIMARY KEY,
+        config_version VARCHAR(32) NOT NULL,
+        applied_at TIMESTAMPTZ DEFAULT NOW()
+    );
+"""
+
+LOAD_APPLIED_SQL = "SELECT chat_id FROM menu_button_state WHERE config_version = $1"
+
+MARK_APPLIED_SQL = """
+    INSERT INTO menu_button_state (chat_id, config_version, applied_at)
+    VALUES ($1, $2, NOW())
+    ON CONFLICT (chat_id) DO UPDATE SET config_version = EXCLUDED.config_version, applied_at = NOW()
+"""
+
 class TelegramMenuButton:
     """Handle native Telegram menu button for WebApp"""
     
@@ -115,4 +139,83 @@ class TelegramMenuButton:
                 
         except Exception as e:
             logger.error(f"❌ Menu button removal error: {e}")
-            return False
\ No newline at end of file
+            return False
+
+
+def menu_button_version(menu_button: Dict[str, Any]) -> str:
+    """Content hash of a menu button config; changing the button changes the version"""
+    return hashlib.sha256(json.dumps(menu_button, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+class MenuButtonRegistry:
+    """Chats whose menu button already matches the current config, persisted across restarts"""
+    
+    def __init__(self):
+        self.version: Optional[str] = None
+        self._applied: Set[int] = set()
+        self._pool = None
+        self._init_lock: Optional[asyncio.Lock] = None
+        self.stats = {"skipped": 0, "applied": 0}
+    
+    async def initialize(self, version: str, pool=None):
+        """Load the chats already configured with this version (once per version)"""
+        if self.version == version:
+            return
+        if self._init_lock is None:
+            self._init_lock = asyncio.Lock()
+        async with self._init_lock:
+            if self.version == version:
+                return
+            applied = set()
+            try:
+                if pool is None:
+                    from src.core.db_pool import get_shared_pool
+                    pool = await get_shared_pool("default")
+                async with pool.acquire() as conn:
+                    async with conn.transaction():
+                        await conn.execute("SELECT pg_advisory_xact_lock($1)", MENU_BUTTON_INSTALL_LOCK_ID)
+                        await conn.execute(MENU_BUTTON_STATE_DDL)
+                    rows = await conn.fetch(LOAD_APPLIED_SQL, version)
+                applied = {row["chat_id"] for row in rows}
+                self._pool = pool
+                logger.info(f"🎮 Menu button {version}: {len(applied)} chats already configured")
+            except Exception as e:
+                logger.warning(f"⚠️ Menu button state persistence unavailable, tracking in memory: {e}")
+            self._applied = applied
+            self.version = version
+    
+    def is_applied(self, chat_id: Optional[int]) -> bool:
+        applied = (GLOBAL_MENU_BUTTON_CHAT if chat_id is None else chat_id) in self._applied
+        if applied:
+            self.stats["skipped"] += 1
+        return applied
+    
+    async def mark_applied(self, chat_id: Optional[int]):
+        chat_id = GLOBAL_MENU_BUTTON_CHAT if chat_id is None else chat_id
+        self._applied.add(chat_id)
+        self.stats["applied"] += 1
+        if self._pool is None:
+            return
+        try:
+            async with self._pool.acquire() as conn:
+                await conn.execute(MARK_APPLIED_SQL, chat_id, self.version)
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to persist menu button state for chat {chat_id}: {e}")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "persistent": self._pool is not None,
+            "global_applied": GLOBAL_MENU_BUTTON_CHAT in self._applied,
+            "chats": len(self._applied),
+            **self.stats
+        }
+
+
+# Global menu button registry
+_menu_button_registry = MenuButtonRegistry()
+
+
+def get_menu_button_registry() -> MenuButtonRegistry:
+    """Get global menu button registry"""
+    return _menu_button_registry
@@ -6,6 +6,12 @@ import logging
 import os
 from pathlib import Path
 
+from src.core.rate_limiter import RateLimitMiddleware
+from src.core.telegram_security import WEBAPP_INIT_DATA_HEADER, log_security_event, verify_webapp_init_data
+from src.core.validation import GAME_MAX_SCORE
+from .assets import get_asset_pipeline, get_html_cache
+from .leaderboard import WINDOWS, get_game_leaderboard
+
 logger = logging.getLogger(__name__)
 
 # Get the mini game directory
@@ -47,11 +53,21 @@ class MiniGameWebServer:
             allow_headers=["Content-Type", "Authorization", "X-Admin-Secret", "X-Telegram-Web-App-Init-Data", "X-Requested-With"],
         )
         
+        # 🚦 Score submissions are throttled per client before routing
+        self.app.add_middleware(RateLimitMiddleware, protected_prefixes=("/game/score",))
+        
         self.setup_routes()
     
     def setup_routes(self):
         """Setup web routes for mini game"""
         
+        # Fingerprinted + precompressed assets; HTML references are rewritten to them
+        try:
+            assets = get_asset_pipeline()
+        except Exception as e:
+            logger.error(f"❌ Mini game asset pipeline failed, serving unhashed files: {e}")
+            assets = None
+        
         @self.app.get("/health_mini_game")
         async def health_check_integrated_v3():
             """Enhanced health check with deployment mode detection - RENAMED TO AVOID CONFLICTS"""
@@ -118,7 +134,7 @@ class MiniGameWebServer:
                     
                     # Look for game module
                     if hasattr(bot, 'game_module') and bot.game_module:
-                        result = await bot.game_module._setup_native_menu_button(None)
+                        result = await bot.game_module._setup_native_menu_button(None, force=True)
                         if result:
                             return JSONResponse({
                                 "status": "menu_button_updated",
@@ -131,7 +147,7 @@ class MiniGameWebServer:
                                 "details": "setChatMenuButton returned False"
                             }, status_code=500)
                     elif hasattr(bot, 'mini_game_module') and bot.mini_game_module:
-                        result = await bot.mini_game_module._setup_native_menu_button(None)
+                        result = await bot.mini_game_module._setup_native_menu_button(None, force=True)
                         if result:
                             return JSONResponse({
                                 "status": "menu_button_updated",
@@ -181,8 +197,11 @@ class MiniGameWebServer:
 
         @self.app.get("/game_rabbi_with_torah.png")
         @self.app.head("/game_rabbi_with_torah.png")
-        async def serve_game_photo():
-            """Serve game invitation photo"""
+        async def serve_game_photo(request: Request):
+            """Serve game invitation photo (WebP/AVIF when the client accepts them)"""
+            response = assets.serve_source(request, "game_rabbi_with_torah.png") if assets else None
+            if response:
+                return response
             photo_path = PUBLIC_DIR / "game_rabbi_with_torah.png"
             if photo_path.exists():
                 from fastapi.responses import FileResponse
@@ -190,24 +209,19 @@ class MiniGameWebServer:
             else:
                 raise HTTPException(status_code=404, detail="Photo not found")
 
+        # Rendered pages live in memory (mtime-invalidated) and are revalidated via ETag
+        html_cache = get_html_cache()
+        
         @self.app.get("/game")
-        async def serve_game(request: Request, response: Response):
+        async def serve_game(request: Request):
             """Serve the main game page"""
             try:
-                # Check if we have index.html
-                index_path = PUBLIC_DIR / "index.html"
-                if not index_path.exists():
-                    raise HTTPException(status_code=404, detail="Game not found")
-                
-                # Read and serve index.html
-                with open(index_path, "r", encoding="utf-8") as f:
-                    html_content = f.read()
-                
                 # Add user parameters from query string
                 user_id = request.query_params.get("user_id")
                 lang = request.query_params.get("lang", "english")
                 
                 # Inject user data into HTML
+                user_script = None
                 if user_id:
                     user_script = f"""
                     <script>
@@ -216,44 +230,58 @@ class MiniGameWebServer:
                         console.log('🎮 Game user:', '{user_id}', 'Language:', '{lang}');
                     </script>
                     """
-                    html_content = html_content.replace("</head>", f"{user_script}</head>")
-                
-                # Set Telegram WebApp iframe headers - SECURED (no X-Frame-Options to avoid conflicts)
-                response.headers["Content-Security-Policy"] = "frame-ancestors https://web.telegram.org https://*.web.telegram.org"
-                response.headers["X-Content-Type-Options"] = "nosniff"
                 
-                # CRITICAL: Disable caching for HTML to force reload of changes
-                response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
-                response.headers["Pragma"] = "no-cache"
-                response.headers["Expires"] = "0"
-                
-                return HTMLResponse(content=html_content)
+                # Telegram WebApp iframe headers - SECURED (no X-Frame-Options to avoid conflicts)
+                response = html_cache.response(request, "index.html", headers={
+                    "Content-Security-Policy": "frame-ancestors https://web.telegram.org https://*.web.telegram.org",
+                    "X-Content-Type-Options": "nosniff"
+                }, inject_head=user_script)
                 
             except Exception as e:
                 logger.error(f"❌ Failed to serve game: {e}")
                 raise HTTPException(status_code=500, detail="Game loading error")
+            
+            if response is None:
+                raise HTTPException(status_code=404, detail="Game not found")
+            return response
         
         @self.app.post("/game/score")
         async def record_score(request: Request):
             """Receive game score from mini app"""
             try:
-                data = await request.json()
-                user_id = data.get("user_id")
-                score = data.get("score")
+                user = verify_webapp_init_data(request.headers.get(WEBAPP_INIT_DATA_HEADER))
+                if user is None:
+                    log_security_event("INVALID_WEBAPP_INIT_DATA", request, "Score submission without valid initData")
+                    raise HTTPException(status_code=401, detail="Invalid Telegram WebApp initData")
                 
-                if not user_id or score is None:
-                    raise HTTPException(status_code=400, detail="Missing user_id or score")
-                
-                # Record score in game analytics
-                logger.info(f"🎮 Score received: user {user_id} scored {score}")
+                try:
+                    data = await request.json()
+                except ValueError:
+                    raise HTTPException(status_code=400, detail="Invalid JSON")
+                if not isinstance(data, dict):
+                    raise HTTPException(status_code=400, detail="Body must be a JSON object")
+                
+                # Identity comes from the signed initData, never from the body
+                user_id = user["id"]
+                try:
+                    score = int(data.get("score"))
+                except (TypeError, ValueError):
+                    raise HTTPException(status_code=400, detail="Missing or invalid score")
+                if not 0 <= score <= GAME_MAX_SCORE:
+                    raise HTTPException(status_code=400, detail=f"score must be between 0 and {GAME_MAX_SCORE}")
                 
-                # Note: Full integration with game_module happens via main bot instance
+                # Record score in the persistent leaderboard (write-behind)
+                ranks = await get_game_leaderboard().record_score(user_id, score, user.get("username"))
+                logger.info(f"🎮 Score received: user {user_id} scored {score} (rank {ranks['all']})")
                 
                 return JSONResponse({
                     "success": True,
-                    "message": "Score recorded successfully"
+                    "message": "Score recorded successfully",
+                    "ranks": ranks
                 })
                 
+            except HTTPException:
+                raise
             except Exception as e:
                 logger.error(f"❌ Failed to record score: {e}")
                 raise HTTPException(status_code=500, detail="Score recording failed")
@@ -301,65 +329,59 @@ class MiniGameWebServer:
                 raise HTTPException(status_code=500, detail="Share URL generation failed")
         
         @self.app.get("/game/leaderboard")
-        async def get_leaderboard():
-            """Get game leaderboard"""
+        async def get_leaderboard(window: str = "all", limit: int = 10, user_id: int = None, radius: int = 2):
+            """Get game leaderboard: top players, plus the player's rank and neighbours when user_id is given"""
+            if window not in WINDOWS:
+                raise HTTPException(status_code=400, detail=f"window must be one of {', '.join(WINDOWS)}")
             try:
-                # Simple leaderboard for web display
-                leaderboard = [
-                    {"rank": 1, "name": "Torah Master", "score": 25},
-                    {"rank": 2, "name": "Shabbat Keeper", "score": 22},
-                    {"rank": 3, "name": "Wisdom Seeker", "score": 18}
-                ]
-                
-                # Note: Advanced leaderboard with real scores handled by game_module
+                leaderboard = get_game_leaderboard()
+                await leaderboard.initialize()
+                result = {
+                    "window": window,
+                    "players": leaderboard.player_count(window),
+                    "top": leaderboard.top(window, max(1, min(limit, 100)))
+                }
+                if user_id is not None:
+                    result["me"] = leaderboard.rank(window, user_id)
+                    result["around"] = leaderboard.around(window, user_id, max(0, min(radius, 10)))
                 
-                return JSONResponse(leaderboard)
+                return JSONResponse(result)
                 
             except Exception as e:
                 logger.error(f"❌ Failed to get leaderboard: {e}")
                 raise HTTPException(status_code=500, detail="Leaderboard error")
         
-        # Mount individual static files directly 
+        @self.app.get("/assets/{file_name}")
+        async def serve_asset(request: Request, file_name: str):
+            """Fingerprinted asset (cache forever)"""
+            response = assets.serve_fingerprinted(request, file_name) if assets else None
+            if response is None:
+                raise HTTPException(status_code=404, detail="Asset not found")
+            return response
+        
+        # Unhashed URLs kept for pages cached before fingerprinting: same bytes, revalidated via ETag
         if PUBLIC_DIR.exists():
             @self.app.get("/style.css")
-            async def serve_css():
+            async def serve_css(request: Request):
+                response = assets.serve_source(request, "style.css") if assets else None
+                if response:
+                    return response
                 css_path = PUBLIC_DIR / "style.css"
                 if css_path.exists():
-                    with open(css_path, "r") as f:
-                        content = f.read()
-                    
-                    # CRITICAL: Disable caching for CSS to force reload of changes
-                    headers = {
-                        "Cache-Control": "no-cache, no-store, must-revalidate",
-                        "Pragma": "no-cache",
-                        "Expires": "0"
-                    }
-                    return Response(content=content, media_type="text/css", headers=headers)
+                    from fastapi.responses import FileResponse
+                    return FileResponse(css_path, media_type="text/css", headers={"Cache-Control": "no-cache"})
                 raise HTTPException(status_code=404, detail="CSS not found")
             
             @self.app.get("/game.js")
-            async def serve_js():
+            async def serve_js(request: Request):
+                response = assets.serve_source(request, "game.js") if assets else None
+                if response:
+                    return response
                 js_path = PUBLIC_DIR / "game.js"
                 if js_path.exists():
-                    with open(js_path, "r") as f:
-                        content = f.read()
-                    
-                    # CRITICAL: Disable caching for JS to force reload of changes
-                    headers = {
-                        "Cache-Control": "no-cache, no-store, must-revalidate",
-                        "Pragma": "no-cache",
-                        "Expires": "0"
-                    }
-                    return Response(content=content, media_type="application/javascript", headers=headers)
-                raise HTTPException(status_code=404, detail="JS not found")
-            
-            @self.app.get("/game_rabbi_with_torah.png")
-            async def serve_image():
-                img_path = PUBLIC_DIR / "game_rabbi_with_torah.png"
-                if img_path.exists():
                     from fastapi.responses import FileResponse
-                    return FileResponse(img_path, media_type="image/png")
-                raise HTTPException(status_code=404, detail="Image not found")
+                    return FileResponse(js_path, media_type="application/javascript", headers={"Cache-Control": "no-cache"})
+                raise HTTPException(status_code=404, detail="JS not found")
             
             logger.info(f"📁 Static files routes configured from {PUBLIC_DIR}")
         
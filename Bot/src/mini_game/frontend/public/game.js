@@ -1465,6 +1465,9 @@ class AudioSystem {
             // Check for achievements
             checkAndSendAchievements(gameState.score, gameState.itemsCollected);
             
+            // One request carries the completed game and its achievements
+            flushGameAnalytics();
+            
             // Audio and visual feedback
             audio.playEndSound();
             rabbi.celebrate();
@@ -1485,38 +1488,77 @@ class AudioSystem {
 
         // ========== ANALYTICS FUNCTIONS ==========
         
-        // Send game analytics to server
-        async function sendGameAnalytics(eventType, eventData = {}) {
-            try {
-                // Get user data from gameState (already populated from Telegram)
-                const userData = {
-                    user_id: gameState.userId || Date.now(),
-                    username: gameState.username || 'unknown',
-                    language: gameState.language || 'russian'
-                };
-                
-                const analyticsData = {
-                    event_type: eventType,
-                    ...userData,
-                    ...eventData
-                };
+        // Analytics events are queued and sent to the server in batches
+        const ANALYTICS_BATCH_SIZE = 20;
+        const ANALYTICS_FLUSH_MS = 10000;
+        let analyticsQueue = [];
+        let analyticsFlushTimer = null;
+        
+        // Queue a game analytics event (flushNow sends the batch immediately)
+        function sendGameAnalytics(eventType, eventData = {}, flushNow = false) {
+            // Get user data from gameState (already populated from Telegram)
+            const userData = {
+                user_id: gameState.userId || Date.now(),
+                username: gameState.username || 'unknown',
+                language: gameState.language || 'russian'
+            };
+            
+            analyticsQueue.push({
+                event_type: eventType,
+                ...userData,
+                ...eventData
+            });
+            
+            if (flushNow || analyticsQueue.length >= ANALYTICS_BATCH_SIZE) {
+                flushGameAnalytics();
+            } else if (!analyticsFlushTimer) {
+                analyticsFlushTimer = setTimeout(flushGameAnalytics, ANALYTICS_FLUSH_MS);
+            }
+        }
+        
+        // Send queued analytics; useBeacon survives the page being closed
+        async function flushGameAnalytics(useBeacon = false) {
+            if (analyticsFlushTimer) {
+                clearTimeout(analyticsFlushTimer);
+                analyticsFlushTimer = null;
+            }
+            
+            while (analyticsQueue.length > 0) {
+                const events = analyticsQueue.splice(0, ANALYTICS_BATCH_SIZE);
+                const body = JSON.stringify({ events });
                 
-                const response = await fetch('/api/game-analytics', {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify(analyticsData)
-                });
+                if (useBeacon && navigator.sendBeacon) {
+                    navigator.sendBeacon('/api/game-analytics', new Blob([body], { type: 'application/json' }));
+                    continue;
+                }
                 
-                if (response.ok) {
-                    console.log(`📊 Game analytics sent: ${eventType}`, userData);
-                } else {
-                    console.warn(`⚠️ Game analytics failed: ${eventType}`);
+                try {
+                    const response = await fetch('/api/game-analytics', {
+                        method: 'POST',
+                        headers: { 'Content-Type': 'application/json' },
+                        body: body,
+                        keepalive: true
+                    });
+                    
+                    if (response.ok) {
+                        console.log(`📊 Game analytics sent: ${events.length} events`);
+                    } else {
+                        console.warn(`⚠️ Game analytics failed: ${events.length} events`);
+                    }
+                } catch (error) {
+                    console.warn(`⚠️ Game analytics error: ${error.message}`);
                 }
-            } catch (error) {
-                console.warn(`⚠️ Game analytics error: ${error.message}`);
             }
         }
         
+        // Send whatever is left when the Mini App is hidden or closed
+        document.addEventListener('visibilitychange', () => {
+            if (document.visibilityState === 'hidden') {
+                flushGameAnalytics(true);
+            }
+        });
+        window.addEventListener('pagehide', () => flushGameAnalytics(true));
+        
         // Check if user came from tutorial
         function checkIfFromTutorial() {
             const urlParams = new URLSearchParams(window.location.search);
@@ -1557,8 +1599,12 @@ class AudioSystem {
             try {
                 const response = await fetch('/game/score', {
                     method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({ user_id: userId, score: score })
+                    headers: {
+                        'Content-Type': 'application/json',
+                        // Signed by Telegram - the server takes the player identity from it
+                        'X-Telegram-Web-App-Init-Data': window.Telegram?.WebApp?.initData || ''
+                    },
+                    body: JSON.stringify({ score: score, language: gameState.language })
                 });
                 
                 if (response.ok) {
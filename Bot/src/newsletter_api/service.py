@@ -22,9 +22,48 @@ project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(_
 sys.path.append(project_root)
 
 from openai import OpenAI
+from src.core.single_flight import run_coalesced_in_thread
+from src.core.metrics import BROADCAST_DELIVERIES, get_metrics
+from src.core.db_pool import get_shared_pool
+from src.core.query_registry import get_query_registry, register_query
+from src.core.stats_read_model import get_stats_read_model
+from src.core.resilience import (
+    CircuitOpenError, get_dependency_guard,
+    is_permanent_openai_error, is_retryable_error
+)
 
 logger = logging.getLogger(__name__)
 
+# Hot queries - executed by name through the query registry for per-query timing
+_queries = get_query_registry()
+
+Q_ACTIVE_SUBSCRIBERS = register_query("subscriptions.active_recipients", """
+    SELECT user_id, language
+    FROM newsletter_subscriptions
+    WHERE is_active = TRUE
+""")
+Q_LOG_DELIVERY_SENT = register_query("delivery_log.insert_sent", """
+    INSERT INTO delivery_log
+    (broadcast_id, user_id, status, delivered_at, telegram_message_id)
+    VALUES ($1, $2, 'sent', NOW(), $3)
+""")
+Q_LOG_DELIVERY_FAILED = register_query("delivery_log.insert_failed", """
+    INSERT INTO delivery_log
+    (broadcast_id, user_id, status, error_message, scheduled_at)
+    VALUES ($1, $2, 'failed', $3, NOW())
+""")
+Q_COUNT_DELIVERY = register_query("subscriptions.count_delivery", """
+    UPDATE newsletter_subscriptions
+    SET total_deliveries = total_deliveries + 1,
+        last_delivery = NOW()
+    WHERE user_id = $1 AND is_active = TRUE
+""")
+Q_MARK_USER_BLOCKED = register_query("users.mark_blocked", """
+    UPDATE users
+    SET is_blocked = TRUE, updated_at = NOW()
+    WHERE telegram_user_id = $1
+""")
+
 class NewsletterAPIService:
     """Internal Newsletter API Service"""
     
@@ -113,38 +152,28 @@ class NewsletterAPIService:
         logger.info("✅ Environment validation passed for NewsletterAPIService")
         
     async def initialize(self):
-        """Initialize database connection pool with validation and retry logic"""
-        import asyncio
-        
+        """Attach to the shared database pool with validation and retry logic"""
         database_url = os.getenv('DATABASE_URL')
         if not database_url:
             logger.error("❌ DATABASE_URL environment variable is required")
             self.db_pool = None
             return
         
-        # Retry logic with exponential backoff
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                self.db_pool = await asyncpg.create_pool(database_url, min_size=0, max_size=4)
-                logger.info("✅ Newsletter API Service: Database pool initialized")
-                return
-            except Exception as e:
-                wait_time = 2 ** attempt  # Exponential backoff: 1s, 2s, 4s
-                if attempt < max_retries - 1:
-                    logger.warning(f"⚠️ Database pool initialization failed (attempt {attempt + 1}/{max_retries}): {e}. Retrying in {wait_time}s...")
-                    await asyncio.sleep(wait_time)
-                else:
-                    logger.error(f"❌ Database pool initialization failed after {max_retries} attempts: {e}")
-                    # Don't raise - allow service to run in degraded mode
-                    logger.warning("⚠️ Running in degraded mode - newsletter functionality limited")
-                    self.db_pool = None
+        # Broadcast work runs in its own capped sub-pool of the shared pool
+        try:
+            self.db_pool = await get_shared_pool("broadcast")
+            logger.info("✅ Newsletter API Service: Database pool initialized")
+        except Exception as e:
+            logger.error(f"❌ Database pool initialization failed: {type(e).__name__}: {e}")
+            # Don't raise - allow service to run in degraded mode
+            logger.warning("⚠️ Running in degraded mode - newsletter functionality limited")
+            self.db_pool = None
     
     async def close(self):
-        """Close database pool"""
+        """Detach from the shared database pool (owned by ServiceContainer)"""
         if self.db_pool:
-            await self.db_pool.close()
-            logger.info("🔒 Newsletter API Service: Database pool closed")
+            self.db_pool = None
+            logger.info("🔒 Newsletter API Service: Database pool released")
     
     def _shuffle_quiz_using_main_bot(self, quiz_data):
         """Shuffle quiz options using MAIN BOT's shuffle function (no duplication)"""
@@ -258,7 +287,8 @@ class NewsletterAPIService:
                     raise ValueError("OpenAI client not initialized")
                     
                 # EXACT same OpenAI call as main bot
-                response = await asyncio.to_thread(
+                response = await run_coalesced_in_thread(
+                    "wisdom",
                     self.openai_client.chat.completions.create,
                     model="gpt-4o",  # SAME model as main bot
                     messages=[
@@ -279,7 +309,8 @@ class NewsletterAPIService:
                     raise ValueError("OpenAI client not available for fallback")
                     
                 # EXACT same fallback logic as main bot
-                response = await asyncio.to_thread(
+                response = await run_coalesced_in_thread(
+                    "wisdom",
                     self.openai_client.chat.completions.create,
                     model="gpt-4o",
                     messages=[
@@ -395,13 +426,14 @@ class NewsletterAPIService:
                     
                     logger.info(f"🎨 Newsletter image generation attempt {attempt+1}, prompt {prompt_index+1}: {prompt[:50]}...")
                     
-                    response = await asyncio.to_thread(
+                    response = await get_dependency_guard("openai").call_once(run_coalesced_in_thread(
+                        "image",
                         self.openai_client.images.generate,
                         model="dall-e-3",
                         prompt=prompt,
                         size="1024x1024",
                         quality="hd" if prompt_index == 0 else "standard"  # HD only for primary (same as main bot)
-                    )
+                    ))
                     
                     if response.data and len(response.data) > 0 and response.data[0].url:
                         logger.info(f"✅ Newsletter image generated successfully on attempt {attempt+1}, prompt {prompt_index+1}")
@@ -414,15 +446,19 @@ class NewsletterAPIService:
                     logger.error(f"❌ Newsletter image generation failed attempt {attempt+1}, prompt {prompt_index+1}: {error_type}: {str(e)[:100]}")
                     
                     # EXACT same error handling as main bot
-                    if "content_policy" in str(e).lower() or "safety" in str(e).lower():
+                    if isinstance(e, CircuitOpenError) or is_permanent_openai_error(e):
+                        logger.error("💳 OpenAI unavailable (circuit open or quota/billing issue) - stopping image generation")
+                        return None
+                    elif "content_policy" in str(e).lower() or "safety" in str(e).lower():
                         logger.warning("🚫 Content policy violation - trying simpler prompt")
                         continue
-                    elif "rate_limit" in str(e).lower():
-                        logger.warning("🔄 Rate limit hit - waiting before retry")
-                        await asyncio.sleep(2)
+                    elif is_retryable_error(e):
+                        delay = get_dependency_guard("openai").policy.backoff(attempt + 1)
+                        logger.warning(f"🔄 Transient OpenAI error - waiting {delay:.1f}s before retry")
+                        await asyncio.sleep(delay)
                         continue
-                    elif "quota" in str(e).lower() or "billing" in str(e).lower():
-                        logger.error("💳 OpenAI quota/billing issue - stopping image generation")
+                    else:
+                        logger.error("🛑 Permanent image generation error - stopping")
                         return None
         
         logger.error("💥 All newsletter image generation attempts failed")
@@ -476,7 +512,8 @@ class NewsletterAPIService:
             logger.info(f"📝 Prompt loaded ({len(prompt)} chars)")
             
             # EXACT same OpenAI call as main bot
-            response = await asyncio.to_thread(
+            response = await run_coalesced_in_thread(
+                "quiz",
                 self.openai_client.chat.completions.create,
                 model="gpt-4o",  # SAME model as main bot
                 messages=[
@@ -674,11 +711,7 @@ class NewsletterAPIService:
             if self.db_pool is None:
                 raise ValueError("Database pool not initialized")
             async with self.db_pool.acquire() as conn:
-                subscribers = await conn.fetch("""
-                    SELECT user_id, language 
-                    FROM newsletter_subscriptions 
-                    WHERE is_active = TRUE
-                """)
+                subscribers = await _queries.fetch(conn, Q_ACTIVE_SUBSCRIBERS)
             
             if not subscribers:
                 return {
@@ -790,10 +823,12 @@ class NewsletterAPIService:
                         logger.warning(f"⚠️ No telegram client available for user {user_id}")
                         failed_count += 1
                         error_breakdown["no_client"] += 1
+                        get_metrics().inc(BROADCAST_DELIVERIES, kind="wisdom", outcome="no_client")
                         continue
                     
                     if response and response.get('ok'):
                         sent_count += 1
+                        get_metrics().inc(BROADCAST_DELIVERIES, kind="wisdom", outcome="sent")
                         telegram_message_id = response.get('result', {}).get('message_id')
                         logger.info(f"✅ Newsletter sent to user {user_id}")
                         
@@ -802,44 +837,28 @@ class NewsletterAPIService:
                             if self.db_pool and broadcast_id:
                                 async with self.db_pool.acquire() as conn:
                                     # Insert delivery log record
-                                    await conn.execute("""
-                                        INSERT INTO delivery_log 
-                                        (broadcast_id, user_id, status, delivered_at, telegram_message_id)
-                                        VALUES ($1, $2, 'sent', NOW(), $3)
-                                    """, broadcast_id, user_id, telegram_message_id)
+                                    await _queries.execute(conn, Q_LOG_DELIVERY_SENT, broadcast_id, user_id, telegram_message_id)
                                     
                                     # Update subscription counter
-                                    await conn.execute("""
-                                        UPDATE newsletter_subscriptions 
-                                        SET total_deliveries = total_deliveries + 1,
-                                            last_delivery = NOW()
-                                        WHERE user_id = $1 AND is_active = TRUE
-                                    """, user_id)
+                                    await _queries.execute(conn, Q_COUNT_DELIVERY, user_id)
                         except Exception as tracking_error:
                             logger.warning(f"⚠️ Delivery tracking failed for user {user_id}: {tracking_error}")
                     else:
                         failed_count += 1
                         error_type = self._categorize_telegram_error(response, user_id)
                         error_breakdown[error_type] += 1
+                        get_metrics().inc(BROADCAST_DELIVERIES, kind="wisdom", outcome=error_type)
                         logger.error(f"❌ Newsletter failed for user {user_id} ({error_type}): {response}")
                         
                         # ADD FAILED DELIVERY TRACKING (SAFE)
                         try:
                             if self.db_pool and broadcast_id:
                                 async with self.db_pool.acquire() as conn:
-                                    await conn.execute("""
-                                        INSERT INTO delivery_log 
-                                        (broadcast_id, user_id, status, error_message, scheduled_at)
-                                        VALUES ($1, $2, 'failed', $3, NOW())
-                                    """, broadcast_id, user_id, str(response))
+                                    await _queries.execute(conn, Q_LOG_DELIVERY_FAILED, broadcast_id, user_id, str(response))
                                     
                                     # CRITICAL: Mark user as blocked if 403 error (user blocked bot)
                                     if error_type == "403_blocked":
-                                        await conn.execute("""
-                                            UPDATE users 
-                                            SET is_blocked = TRUE, updated_at = NOW()
-                                            WHERE telegram_user_id = $1
-                                        """, user_id)
+                                        await _queries.execute(conn, Q_MARK_USER_BLOCKED, user_id)
                                         logger.info(f"🚫 Marked user {user_id} as blocked in database")
                         except Exception as tracking_error:
                             logger.warning(f"⚠️ Failed delivery tracking error for user {user_id}: {tracking_error}")
@@ -850,6 +869,7 @@ class NewsletterAPIService:
                     failed_count += 1
                     error_type = "network_error" if "network" in str(e).lower() or "connection" in str(e).lower() else "unknown_error"
                     error_breakdown[error_type] += 1
+                    get_metrics().inc(BROADCAST_DELIVERIES, kind="wisdom", outcome=error_type)
                     logger.error(f"❌ Exception sending to user {subscriber.get('user_id', 'unknown')} ({error_type}): {e}")
             
             success_rate = (sent_count / len(subscribers)) * 100
@@ -916,6 +936,19 @@ class NewsletterAPIService:
         try:
             if self.db_pool is None:
                 raise ValueError("Database pool not initialized")
+            # Pre-aggregated counters - constant time regardless of history size
+            try:
+                snapshot = await get_stats_read_model().snapshot()
+                return {
+                    "total_subscribers": snapshot["counters"]["total_subscriptions"],
+                    "active_subscribers": snapshot["counters"]["active_subscribers"],
+                    "language_breakdown": {row["language"]: row["subscribers"] for row in snapshot["languages"]},
+                    "last_broadcast_time": None,
+                    "total_broadcasts_sent": 0
+                }
+            except Exception as e:
+                logger.warning(f"⚠️ Stats read model unavailable, querying subscriptions: {e}")
+            
             async with self.db_pool.acquire() as conn:
                 # Total subscribers
                 total_subs = await conn.fetchval("""
@@ -1033,11 +1066,7 @@ class NewsletterAPIService:
             if self.db_pool is None:
                 raise ValueError("Database pool not initialized")
             async with self.db_pool.acquire() as conn:
-                subscribers = await conn.fetch("""
-                    SELECT user_id, language 
-                    FROM newsletter_subscriptions 
-                    WHERE is_active = TRUE
-                """)
+                subscribers = await _queries.fetch(conn, Q_ACTIVE_SUBSCRIBERS)
             
             if not subscribers:
                 return {
@@ -1106,17 +1135,20 @@ class NewsletterAPIService:
                         logger.warning(f"⚠️ No telegram client available for user {user_id}")
                         failed_count += 1
                         error_breakdown["no_client"] += 1
+                        get_metrics().inc(BROADCAST_DELIVERIES, kind="quiz", outcome="no_client")
                         continue
                     
                     # Count as success if both poll and message sent successfully
                     if poll_success and message_success:
                         sent_count += 1
+                        get_metrics().inc(BROADCAST_DELIVERIES, kind="quiz", outcome="sent")
                         logger.info(f"✅ Quiz sent to user {user_id} (poll + message)")
                     else:
                         failed_count += 1
                         # Analyze poll and message responses for detailed error tracking
                         error_type = self._categorize_quiz_error(poll_response, message_response, user_id)
                         error_breakdown[error_type] += 1
+                        get_metrics().inc(BROADCAST_DELIVERIES, kind="quiz", outcome=error_type)
                         status = f"poll:{poll_success}, message:{message_success}"
                         logger.error(f"❌ Quiz failed for user {user_id} ({error_type}): {status}")
                     
@@ -1126,6 +1158,7 @@ class NewsletterAPIService:
                     failed_count += 1
                     error_type = "network_error" if "network" in str(e).lower() or "connection" in str(e).lower() else "unknown_error"
                     error_breakdown[error_type] += 1
+                    get_metrics().inc(BROADCAST_DELIVERIES, kind="quiz", outcome=error_type)
                     user_info = subscriber.get('user_id', 'unknown') if 'subscriber' in locals() else 'unknown'
                     logger.error(f"❌ Exception sending quiz to user {user_info} ({error_type}): {e}")
             
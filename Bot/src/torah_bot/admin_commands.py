@@ -10,9 +10,37 @@ from datetime import date, datetime
 from typing import Dict, List, Optional, Any
 # UNIFIED ARCHITECTURE: newsletter_manager passed via constructor
 from ..newsletter_api import InternalNewsletterAPIClient, get_newsletter_stats
+from src.core.single_flight import run_coalesced_in_thread
+from src.core.query_registry import get_query_registry, register_query
 
 logger = logging.getLogger(__name__)
 
+# Hot queries - executed by name through the query registry for per-query timing
+_queries = get_query_registry()
+
+Q_BLOCKED_USERS_EXPORT = register_query("admin.blocked_users_export", """
+    SELECT
+        u.telegram_user_id,
+        u.username,
+        u.first_name,
+        u.last_name,
+        u.updated_at as blocked_date,
+        u.last_interaction,
+        dl.error_message
+    FROM users u
+    LEFT JOIN LATERAL (
+        SELECT error_message, scheduled_at
+        FROM delivery_log
+        WHERE user_id = u.telegram_user_id
+        AND status = 'failed'
+        AND error_message ILIKE '%blocked%'
+        ORDER BY scheduled_at DESC
+        LIMIT 1
+    ) dl ON true
+    WHERE u.is_blocked = TRUE
+    ORDER BY u.updated_at DESC
+""")
+
 class AdminCommands:
     """Admin-only commands for newsletter management"""
     
@@ -228,7 +256,9 @@ class AdminCommands:
             
             async def generate_wisdom():
                 try:
-                    response = openai_client.chat.completions.create(
+                    response = await run_coalesced_in_thread(
+                        "wisdom",
+                        openai_client.chat.completions.create,
                         model="gpt-4o",
                         messages=[
                             {"role": "system", "content": system_prompt},
@@ -255,7 +285,9 @@ class AdminCommands:
                     # Load image prompt same as main bot
                     image_prompt = prompt_loader.get_wisdom_image_prompt(test_topic)
                     
-                    response = openai_client.images.generate(
+                    response = await run_coalesced_in_thread(
+                        "image",
+                        openai_client.images.generate,
                         model="dall-e-3",
                         prompt=image_prompt,
                         size="1024x1024",
@@ -525,28 +557,7 @@ Dear @torah_support, this is a test of our daily newsletter system.
             
             async with self.newsletter_manager.pool.acquire() as conn:
                 # Query blocked users with details
-                blocked_users = await conn.fetch("""
-                    SELECT 
-                        u.telegram_user_id,
-                        u.username,
-                        u.first_name,
-                        u.last_name,
-                        u.updated_at as blocked_date,
-                        u.last_interaction,
-                        dl.error_message
-                    FROM users u
-                    LEFT JOIN LATERAL (
-                        SELECT error_message, scheduled_at
-                        FROM delivery_log
-                        WHERE user_id = u.telegram_user_id 
-                        AND status = 'failed'
-                        AND error_message ILIKE '%blocked%'
-                        ORDER BY scheduled_at DESC
-                        LIMIT 1
-                    ) dl ON true
-                    WHERE u.is_blocked = TRUE
-                    ORDER BY u.updated_at DESC
-                """)
+                blocked_users = await _queries.fetch(conn, Q_BLOCKED_USERS_EXPORT)
             
             if not blocked_users:
                 await self.telegram_client.edit_message_text(
@@ -712,7 +723,7 @@ Dear @torah_support, this is a test of our daily newsletter system.
                 result_message = f"""✅ <b>Database Backup Completed!</b>
                 
 📋 <b>Backup Details:</b>
-• File created successfully
+• Type: {stats.get('latest_backup_kind') or 'full'} (full every {stats.get('full_backup_interval_days', 7)} days, incremental in between)
 • Size: {stats.get('total_size_mb', 0)} MB total
 • Location: Protected backup directory
 • Total backups: {stats.get('total_backups', 0)}
@@ -4,7 +4,6 @@ Torah Bot Newsletter Management System
 Handles subscriptions, broadcasts, and admin functionality
 """
 import os
-import asyncio
 import logging
 import json
 import asyncpg
@@ -12,8 +11,69 @@ from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime, date, time, timezone
 from dataclasses import dataclass
 
+from src.core.admin_cache import get_admin_cache
+from src.core.db_pool import LogicalPool, get_shared_pool
+from src.core.query_registry import get_query_registry, register_query
+from src.core.stats_read_model import get_stats_read_model
+
 logger = logging.getLogger(__name__)
 
+# Hot queries - executed by name through the query registry for per-query timing
+_queries = get_query_registry()
+
+Q_UPSERT_USER = register_query("users.upsert", """
+    INSERT INTO users (
+        telegram_user_id, username, first_name, last_name,
+        language_code, is_bot, is_premium, user_data
+    ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+    ON CONFLICT (telegram_user_id)
+    DO UPDATE SET
+        username = EXCLUDED.username,
+        first_name = EXCLUDED.first_name,
+        last_name = EXCLUDED.last_name,
+        language_code = EXCLUDED.language_code,
+        is_premium = EXCLUDED.is_premium,
+        user_data = EXCLUDED.user_data,
+        last_interaction = NOW()
+""")
+Q_COUNT_WISDOM_REQUEST = register_query("users.count_wisdom_request", """
+    UPDATE users
+    SET total_wisdom_requests = total_wisdom_requests + 1,
+        last_interaction = NOW()
+    WHERE telegram_user_id = $1
+""")
+Q_COUNT_QUIZ_ATTEMPT = register_query("users.count_quiz_attempt", """
+    UPDATE users
+    SET total_quiz_attempts = total_quiz_attempts + 1,
+        last_interaction = NOW()
+    WHERE telegram_user_id = $1
+""")
+Q_UPSERT_SUBSCRIPTION = register_query("subscriptions.upsert", """
+    INSERT INTO newsletter_subscriptions
+    (user_id, language, delivery_time, timezone, is_active)
+    VALUES ($1, $2, $3, $4, TRUE)
+    ON CONFLICT (user_id)
+    DO UPDATE SET
+        is_active = TRUE,
+        language = EXCLUDED.language,
+        delivery_time = EXCLUDED.delivery_time,
+        timezone = EXCLUDED.timezone,
+        unsubscribed_at = NULL
+""")
+Q_DEACTIVATE_SUBSCRIPTION = register_query("subscriptions.deactivate", """
+    UPDATE newsletter_subscriptions
+    SET is_active = FALSE, unsubscribed_at = NOW()
+    WHERE user_id = $1 AND is_active = TRUE
+""")
+Q_RESERVE_BROADCAST_SLOT = register_query("broadcasts.reserve_slot", """
+    INSERT INTO newsletter_broadcasts
+    (broadcast_date, broadcast_type, created_at, status, created_by)
+    VALUES ($1, $2, NOW(), 'reserved', 'auto_scheduler')
+    ON CONFLICT (broadcast_date, broadcast_type) DO NOTHING
+    RETURNING id
+""")
+
+
 @dataclass
 class NewsletterUser:
     telegram_user_id: int
@@ -36,38 +96,29 @@ class NewsletterManager:
     
     def __init__(self):
         self.db_url = os.getenv('DATABASE_URL')
-        self.pool: Optional[asyncpg.Pool] = None
+        self.pool: Optional[LogicalPool] = None
         
     async def initialize(self):
-        """Initialize database connection pool with retry logic"""
-        import asyncio
-        
+        """Attach to the shared database pool (created with retry logic on first use)"""
         if not self.db_url:
             raise ValueError("DATABASE_URL not found in environment")
         
-        # Retry logic with exponential backoff
-        max_retries = 3
-        for attempt in range(max_retries):
+        try:
+            self.pool = await get_shared_pool("default")
+            logger.info("Newsletter database pool initialized")
+            # Admin checks are served from an in-memory snapshot kept fresh by the cache
+            await get_admin_cache().start(self.pool, self.db_url)
             try:
-                self.pool = await asyncpg.create_pool(
-                    self.db_url,
-                    min_size=0,
-                    max_size=4,
-                    command_timeout=30
-                )
-                logger.info("Newsletter database pool initialized")
-                return
+                await get_stats_read_model().initialize(self.pool)
             except Exception as e:
-                wait_time = 2 ** attempt  # Exponential backoff: 1s, 2s, 4s
-                if attempt < max_retries - 1:
-                    logger.warning(f"⚠️ Database pool initialization failed (attempt {attempt + 1}/{max_retries}): {e}. Retrying in {wait_time}s...")
-                    await asyncio.sleep(wait_time)
-                else:
-                    logger.error(f"❌ Database pool initialization failed after {max_retries} attempts: {e}")
-                    raise
+                # Stats fall back to direct queries until the rollups can be installed
+                logger.warning(f"⚠️ Analytics rollups not installed: {e}")
+        except Exception as e:
+            logger.error(f"❌ Database pool initialization failed: {type(e).__name__}: {e}")
+            raise
     
     async def close(self):
-        """Close database connections"""
+        """Close database connections (a no-op for the shared pool view, owned by ServiceContainer)"""
         if self.pool:
             await self.pool.close()
     
@@ -81,21 +132,7 @@ class NewsletterManager:
             if not self.pool:
                 raise ValueError("Database pool not initialized")
             async with self.pool.acquire() as conn:
-                await conn.execute("""
-                    INSERT INTO users (
-                        telegram_user_id, username, first_name, last_name, 
-                        language_code, is_bot, is_premium, user_data
-                    ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
-                    ON CONFLICT (telegram_user_id) 
-                    DO UPDATE SET
-                        username = EXCLUDED.username,
-                        first_name = EXCLUDED.first_name,
-                        last_name = EXCLUDED.last_name,
-                        language_code = EXCLUDED.language_code,
-                        is_premium = EXCLUDED.is_premium,
-                        user_data = EXCLUDED.user_data,
-                        last_interaction = NOW()
-                """, 
+                await _queries.execute(conn, Q_UPSERT_USER, 
                     user_data.get('id'),
                     user_data.get('username'),
                     user_data.get('first_name'),
@@ -120,19 +157,9 @@ class NewsletterManager:
                 raise ValueError("Database pool not initialized")
             async with self.pool.acquire() as conn:
                 if activity_type == "wisdom_request":
-                    await conn.execute("""
-                        UPDATE users 
-                        SET total_wisdom_requests = total_wisdom_requests + 1,
-                            last_interaction = NOW()
-                        WHERE telegram_user_id = $1
-                    """, telegram_user_id)
+                    await _queries.execute(conn, Q_COUNT_WISDOM_REQUEST, telegram_user_id)
                 elif activity_type == "quiz_attempt":
-                    await conn.execute("""
-                        UPDATE users 
-                        SET total_quiz_attempts = total_quiz_attempts + 1,
-                            last_interaction = NOW()
-                        WHERE telegram_user_id = $1
-                    """, telegram_user_id)
+                    await _queries.execute(conn, Q_COUNT_QUIZ_ATTEMPT, telegram_user_id)
                     
         except Exception as e:
             logger.error(f"Failed to update user activity for {telegram_user_id}: {e}")
@@ -161,18 +188,7 @@ class NewsletterManager:
                 else:
                     delivery_time_obj = delivery_time
                 
-                await conn.execute("""
-                    INSERT INTO newsletter_subscriptions 
-                    (user_id, language, delivery_time, timezone, is_active)
-                    VALUES ($1, $2, $3, $4, TRUE)
-                    ON CONFLICT (user_id) 
-                    DO UPDATE SET
-                        is_active = TRUE,
-                        language = EXCLUDED.language,
-                        delivery_time = EXCLUDED.delivery_time,
-                        timezone = EXCLUDED.timezone,
-                        unsubscribed_at = NULL
-                """, telegram_user_id, language, delivery_time_obj, timezone_str)
+                await _queries.execute(conn, Q_UPSERT_SUBSCRIPTION, telegram_user_id, language, delivery_time_obj, timezone_str)
                 
                 logger.info(f"📧 User {telegram_user_id} subscribed to newsletter ({language})")
                 return True
@@ -187,11 +203,7 @@ class NewsletterManager:
             if not self.pool:
                 raise ValueError("Database pool not initialized")
             async with self.pool.acquire() as conn:
-                result = await conn.execute("""
-                    UPDATE newsletter_subscriptions 
-                    SET is_active = FALSE, unsubscribed_at = NOW()
-                    WHERE user_id = $1 AND is_active = TRUE
-                """, telegram_user_id)
+                result = await _queries.execute(conn, Q_DEACTIVATE_SUBSCRIPTION, telegram_user_id)
                 
                 if result == "UPDATE 1":
                     logger.info(f"📧 User {telegram_user_id} unsubscribed from newsletter")
@@ -298,13 +310,7 @@ class NewsletterManager:
             
             async with self.pool.acquire() as conn:
                 # Atomic INSERT with ON CONFLICT DO NOTHING
-                broadcast_id = await conn.fetchval("""
-                    INSERT INTO newsletter_broadcasts 
-                    (broadcast_date, broadcast_type, created_at, status, created_by)
-                    VALUES ($1, $2, NOW(), 'reserved', 'auto_scheduler')
-                    ON CONFLICT (broadcast_date, broadcast_type) DO NOTHING
-                    RETURNING id
-                """, today_msk, content_type)
+                broadcast_id = await _queries.fetchval(conn, Q_RESERVE_BROADCAST_SLOT, today_msk, content_type)
                 
                 if broadcast_id:
                     logger.info(f"✅ RESERVED {content_type} broadcast slot for {today_msk} (ID: {broadcast_id})")
@@ -354,104 +360,12 @@ class NewsletterManager:
     # ===================================================================
     
     async def is_admin(self, telegram_user_id: int) -> bool:
-        """Check if user is admin with retry logic for race conditions and comprehensive fallback protection"""
-        
-        # FALLBACK PROTECTION: Hardcoded admin IDs as safety net
-        FALLBACK_ADMIN_IDS = {6630727156, 7057240608}  # @torah_support, @zohan
-        
-        try:
-            # CRITICAL FIX: Retry logic for pool initialization race condition
-            max_retries = 3
-            for attempt in range(max_retries):
-                if not self.pool:
-                    if attempt < max_retries - 1:
-                        logger.warning(f"Pool not ready, retrying... (attempt {attempt + 1})")
-                        await asyncio.sleep(0.1)  # Wait 100ms
-                        continue
-                    else:
-                        logger.error("Pool not initialized after retries - using fallback")
-                        # Fallback to hardcoded list if DB unavailable
-                        fallback_result = telegram_user_id in FALLBACK_ADMIN_IDS
-                        logger.info(f"🔒 Fallback admin check for {telegram_user_id}: {fallback_result}")
-                        return fallback_result
-                
-                async with self.pool.acquire() as conn:
-                    admin = await conn.fetchrow("""
-                        SELECT id FROM admin_users 
-                        WHERE telegram_user_id = $1 AND is_active = TRUE
-                    """, telegram_user_id)
-                    
-                    is_admin_result = admin is not None
-                    logger.info(f"✅ Database admin check for {telegram_user_id}: {is_admin_result}")
-                    
-                    # ENHANCED FALLBACK: If database is empty but user is in fallback list, use fallback
-                    if not is_admin_result and telegram_user_id in FALLBACK_ADMIN_IDS:
-                        # Check if admin_users table is completely empty (production DB scenario)
-                        admin_count = await conn.fetchval("SELECT COUNT(*) FROM admin_users WHERE is_active = TRUE")
-                        if admin_count == 0:
-                            logger.warning(f"🔒 Production DB empty - using fallback for {telegram_user_id}")
-                            return True
-                    
-                    return is_admin_result
-                    
-            # Fallback if loop completes without return
-            logger.warning(f"🔒 Unexpected path in is_admin for {telegram_user_id} - using fallback")
-            return telegram_user_id in FALLBACK_ADMIN_IDS
-            
-        except Exception as e:
-            logger.error(f"❌ Failed to check admin status for {telegram_user_id}: {e}")
-            # Fallback to hardcoded list if DB error occurs
-            fallback_result = telegram_user_id in FALLBACK_ADMIN_IDS
-            logger.info(f"🔒 Exception fallback admin check for {telegram_user_id}: {fallback_result}")
-            return fallback_result
+        """Check if user is admin (memory lookup in the admin snapshot, with hardcoded fallback admins)"""
+        return get_admin_cache().is_admin(telegram_user_id)
     
     async def get_admin_permissions(self, telegram_user_id: int) -> Dict[str, bool]:
-        """Get admin permissions with fallback support"""
-        
-        # FALLBACK ADMIN IDs
-        FALLBACK_ADMIN_IDS = {6630727156, 7057240608}  # @torah_support, @zohan
-        
-        # Default full permissions for fallback admins
-        FALLBACK_PERMISSIONS = {
-            "can_send_broadcasts": True,
-            "can_test_broadcasts": True, 
-            "can_manage_users": True,
-            "can_view_stats": True,
-            "can_manage_schedule": True
-        }
-        
-        try:
-            if not self.pool:
-                if telegram_user_id in FALLBACK_ADMIN_IDS:
-                    logger.info(f"🔒 Fallback permissions for {telegram_user_id} (no pool)")
-                    return FALLBACK_PERMISSIONS
-                return {}
-                
-            async with self.pool.acquire() as conn:
-                admin = await conn.fetchrow("""
-                    SELECT permissions FROM admin_users 
-                    WHERE telegram_user_id = $1 AND is_active = TRUE
-                """, telegram_user_id)
-                
-                if admin and admin['permissions']:
-                    return json.loads(admin['permissions'])
-                
-                # ENHANCED FALLBACK: Check if DB is empty and user is fallback admin
-                if telegram_user_id in FALLBACK_ADMIN_IDS:
-                    admin_count = await conn.fetchval("SELECT COUNT(*) FROM admin_users WHERE is_active = TRUE")
-                    if admin_count == 0:
-                        logger.info(f"🔒 Fallback permissions for {telegram_user_id} (empty DB)")
-                        return FALLBACK_PERMISSIONS
-                
-                return {}
-                
-        except Exception as e:
-            logger.error(f"❌ Failed to get admin permissions for {telegram_user_id}: {e}")
-            # Fallback for exceptions
-            if telegram_user_id in FALLBACK_ADMIN_IDS:
-                logger.info(f"🔒 Exception fallback permissions for {telegram_user_id}")
-                return FALLBACK_PERMISSIONS
-            return {}
+        """Get admin permissions from the admin snapshot with fallback support"""
+        return get_admin_cache().get_permissions(telegram_user_id)
     
     async def create_test_broadcast(self, admin_id: int, test_content: Dict, 
                                   image_url: Optional[str] = None, 
@@ -487,6 +401,23 @@ class NewsletterManager:
         try:
             if not self.pool:
                 raise ValueError("Database pool not initialized")
+            # Pre-aggregated counters and rollups - constant time regardless of history size
+            try:
+                snapshot = await get_stats_read_model().snapshot()
+                counters = snapshot['counters']
+                return {
+                    'overview': {
+                        'total_users': counters['total_users'],
+                        'active_subscribers': counters['active_subscribers'],
+                        'completed_broadcasts': counters['completed_broadcasts'],
+                        'deliveries_last_30d': counters['deliveries_last_30d']
+                    },
+                    'languages': snapshot['languages'],
+                    'recent_broadcasts': snapshot['recent_broadcasts']
+                }
+            except Exception as e:
+                logger.warning(f"⚠️ Analytics read model unavailable, querying source tables: {e}")
+            
             async with self.pool.acquire() as conn:
                 # Basic stats
                 basic_stats = await conn.fetchrow("""
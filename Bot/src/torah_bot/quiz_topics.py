@@ -6,8 +6,30 @@ from typing import List, Optional
 from datetime import date, datetime, timedelta
 import logging
 
+from src.core.query_registry import get_query_registry, register_query
+
 logger = logging.getLogger(__name__)
 
+# Hot queries - executed by name through the query registry for per-query timing
+_queries = get_query_registry()
+
+Q_RECENT_QUIZ_TOPICS = register_query("topics.recent_quiz", """
+    SELECT DISTINCT wisdom_content->>'topic' as quiz_topic
+    FROM newsletter_broadcasts
+    WHERE wisdom_content->>'type' = 'quiz'
+    AND created_at >= $1
+    ORDER BY wisdom_content->>'topic'
+""")
+Q_UPSERT_QUIZ_TOPIC = register_query("topics.upsert_quiz", """
+    INSERT INTO newsletter_broadcasts
+    (broadcast_date, broadcast_type, wisdom_content, status, created_by)
+    VALUES ($1, 'quiz', $2, 'ready', 'auto_quiz_system')
+    ON CONFLICT (broadcast_date, broadcast_type)
+    DO UPDATE SET wisdom_content = EXCLUDED.wisdom_content,
+                  status = 'ready',
+                  created_by = 'auto_quiz_system'
+""")
+
 class QuizTopicGenerator:
     """Генератор разнообразных тем для квизов"""
     
@@ -137,13 +159,7 @@ class QuizTopicGenerator:
                 # This query was redundant - removing it since we have the corrected one below
                 
                 # Filter only quiz broadcast types for accurate exclusion (FIXED SCHEMA)
-                recent_quiz_topics = await conn.fetch("""
-                    SELECT DISTINCT wisdom_content->>'topic' as quiz_topic 
-                    FROM newsletter_broadcasts 
-                    WHERE wisdom_content->>'type' = 'quiz'
-                    AND created_at >= $1
-                    ORDER BY wisdom_content->>'topic'
-                """, cutoff_date)
+                recent_quiz_topics = await _queries.fetch(conn, Q_RECENT_QUIZ_TOPICS, cutoff_date)
                 
                 exclude_list = [row['quiz_topic'] for row in recent_quiz_topics if row['quiz_topic']]
                 logger.info(f"📊 Found {len(exclude_list)} QUIZ topics used in last {days_back} days")
@@ -173,15 +189,7 @@ class QuizTopicGenerator:
                 })
                 
                 # FIX: Add broadcast_type to prevent conflicts with wisdom broadcasts
-                await conn.execute("""
-                    INSERT INTO newsletter_broadcasts 
-                    (broadcast_date, broadcast_type, wisdom_content, status, created_by)
-                    VALUES ($1, 'quiz', $2, 'ready', 'auto_quiz_system')
-                    ON CONFLICT (broadcast_date, broadcast_type) 
-                    DO UPDATE SET wisdom_content = EXCLUDED.wisdom_content, 
-                                  status = 'ready',
-                                  created_by = 'auto_quiz_system'
-                """, broadcast_date, quiz_content)
+                await _queries.execute(conn, Q_UPSERT_QUIZ_TOPIC, broadcast_date, quiz_content)
                 
                 logger.info(f"✅ UPSERTED quiz topic '{topic}' for {broadcast_date}")
                 return True
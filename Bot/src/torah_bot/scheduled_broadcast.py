@@ -17,6 +17,7 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 from src.newsletter_api import InternalNewsletterAPIClient
 from src.core.db_advisory_locks import get_advisory_lock_manager
+from src.core.partition_manager import run_partition_maintenance
 
 logger = logging.getLogger(__name__)
 
@@ -69,6 +70,12 @@ class ScheduledBroadcastSystem:
             lambda: asyncio.create_task(self.send_scheduled_quiz())
         )
         
+        # Log table partitions: pre-create upcoming months, drop partitions past retention
+        schedule.every().day.at("03:00").do(
+            lambda: asyncio.create_task(run_partition_maintenance())
+        )
+        asyncio.create_task(run_partition_maintenance())
+        
         logger.info("✅ Internal API scheduler started - morning wisdom at 06:00 UTC (09:00 MSK), daily quiz at 18:00 UTC (21:00 MSK)")
         self.is_running = True
         
@@ -13,11 +13,24 @@ import os
 import sys
 import time
 import random
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Callable, Awaitable
 from datetime import datetime
 
 # Import unified user context
 from src.core.user_context import UserContext, UnifiedLogFormatter
+from src.core.single_flight import run_coalesced_in_thread
+from src.core.metrics import TELEGRAM_REQUEST_SECONDS, get_metrics
+from src.core.brownout import get_brownout_controller
+from src.core.user_quotas import get_user_workflow_limiter, is_cheap_mode
+from src.core.resilience import (
+    CircuitOpenError, classify_telegram_result, get_dependency_guard,
+    is_permanent_openai_error, is_retryable_error
+)
+from src.core.request_deadline import (
+    DeadlineExceeded, deadline_budget, has_budget, remaining_budget, run_within_budget,
+    WISDOM_DEADLINE_SECONDS, QUIZ_DEADLINE_SECONDS,
+    LLM_MIN_BUDGET, IMAGE_MIN_BUDGET, IMAGE_HD_BUDGET, SEND_RESERVE
+)
 try:
     from .prompt_loader import PromptLoader
 except ImportError:
@@ -27,6 +40,12 @@ try:
     from .quiz_topics import QuizTopicGenerator
 except ImportError:
     from torah_bot.quiz_topics import QuizTopicGenerator
+try:
+    from .wisdom_stream import (ThrottledMessageEditor, extract_partial_json_string,
+                                is_streaming_enabled, stream_completion_text)
+except ImportError:
+    from torah_bot.wisdom_stream import (ThrottledMessageEditor, extract_partial_json_string,
+                                         is_streaming_enabled, stream_completion_text)
 
 # Import deployment safety guard
 try:
@@ -149,6 +168,7 @@ class SmartLogger:
         }
         self.telegram_client = telegram_client
         self.logs_chat_id = TORAH_LOGS_CHAT_ID
+        self.brownout_reported = False
     
     async def send_log_to_chat(self, message: str):
         """Send log message to Torah Logs chat"""
@@ -547,6 +567,16 @@ class SmartLogger:
                 alert_msg = f"🚨 HIGH: AI failure rate {failure_rate*100:.1f}% exceeds threshold"
                 logger.warning(alert_msg)
                 asyncio.create_task(self.send_log_to_chat(f"🚨 QUALITY ALERT: {alert_msg}"))
+        
+        # Report brownout mode changes (the controller itself adapts the workflows)
+        brownout = get_brownout_controller()
+        if brownout.active != self.brownout_reported:
+            self.brownout_reported = brownout.active
+            if brownout.active:
+                alert_msg = f"🟠 BROWNOUT ON: {brownout.reason}"
+            else:
+                alert_msg = "🟢 BROWNOUT OFF: full AI generation restored"
+            asyncio.create_task(self.send_log_to_chat(f"🚨 QUALITY ALERT: {alert_msg}"))
     
     def schedule_user_report(self, user_id: int, delay_minutes: int = 1):
         """Schedule detailed user report to be sent after delay"""
@@ -955,29 +985,59 @@ class ProductionTelegramClient:
         await self.close_session()
     
     async def _make_request(self, method: str, data: Dict, retries: int = 3) -> Dict:
-        """Make HTTP request with retry logic"""
+        """Make HTTP request, retrying only transient failures behind the Telegram circuit breaker"""
         url = f"{self.base_url}/{method}"
         
         if not self.session:
             self.session = httpx.AsyncClient(timeout=30.0)
         
+        guard = get_dependency_guard("telegram")
+        
         for attempt in range(retries):
+            if not guard.breaker.allow_request():
+                logger.warning(f"🔴 Telegram circuit open - failing fast on {method}")
+                return {"ok": False, "error": "Telegram circuit open", "circuit_open": True}
+            guard.budget.record_request()
+            
+            retry_after = None
+            start = time.perf_counter()
+            status = "exception"
             try:
                 response = await self.session.post(url, json=data)
                 result = response.json()
+                status = "ok" if result.get("ok") else str(result.get("error_code") or response.status_code)
                 
                 if result.get("ok"):
+                    guard.breaker.record_success()
                     return result
+                
+                retryable, retry_after = classify_telegram_result(result)
+                if (result.get("error_code") or 0) >= 500:
+                    guard.breaker.record_failure()
                 else:
-                    logger.warning(f"Telegram API error: {result}")
-                    if attempt == retries - 1:
-                        return result
+                    guard.breaker.record_success()  # Telegram is up, the request itself was rejected
+                logger.warning(f"Telegram API error ({'retryable' if retryable else 'permanent'}): {result}")
+                
+                # Permanent errors (400/403/404) never succeed on retry; long flood waits are surfaced to the caller
+                if (not retryable or attempt == retries - 1
+                        or (retry_after or 0) > guard.policy.max_delay
+                        or not guard.budget.try_acquire_retry()):
+                    return result
                     
+            except asyncio.CancelledError:
+                guard.breaker.release_probe()
+                raise
             except Exception as e:
-                logger.error(f"Request failed (attempt {attempt + 1}): {e}")
-                if attempt == retries - 1:
+                logger.error(f"Request failed (attempt {attempt + 1}): {type(e).__name__}: {e}")
+                retryable = is_retryable_error(e)
+                if retryable:
+                    guard.breaker.record_failure()
+                if not retryable or attempt == retries - 1 or not guard.budget.try_acquire_retry():
                     return {"ok": False, "error": str(e)}
-                await asyncio.sleep(1)
+            finally:
+                get_metrics().observe(TELEGRAM_REQUEST_SECONDS, time.perf_counter() - start, method=method, status=status)
+            
+            await asyncio.sleep(retry_after if retry_after is not None else guard.policy.backoff(attempt))
         
         return {"ok": False, "error": "Max retries exceeded"}
     
@@ -1035,13 +1095,19 @@ class ProductionTelegramClient:
             
             # Send directly to Telegram API using httpx
             import httpx
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"https://api.telegram.org/bot{self.token}/sendPhoto",
-                    data=form_data,
-                    files=files
-                )
-                result = response.json()
+            start = time.perf_counter()
+            status = "exception"
+            try:
+                async with httpx.AsyncClient() as client:
+                    response = await client.post(
+                        f"https://api.telegram.org/bot{self.token}/sendPhoto",
+                        data=form_data,
+                        files=files
+                    )
+                    result = response.json()
+                status = "ok" if result.get("ok") else str(result.get("error_code") or response.status_code)
+            finally:
+                get_metrics().observe(TELEGRAM_REQUEST_SECONDS, time.perf_counter() - start, method="sendPhoto", status=status)
                 
             if result.get("ok"):
                 logger.info(f"📸 Photo file sent to {chat_id}")
@@ -1072,6 +1138,10 @@ class ProductionTelegramClient:
         
         return await self._make_request("editMessageText", data)
     
+    async def delete_message(self, chat_id: int, message_id: int):
+        """Delete message with error handling"""
+        return await self._make_request("deleteMessage", {"chat_id": chat_id, "message_id": message_id}, retries=1)
+    
     async def send_poll(self, chat_id: int, question: str, options: list, correct_answer: int = 0, explanation: str = ""):
         """Send quiz poll with validation and proper character limits"""
         # Validate inputs
@@ -1134,6 +1204,16 @@ class ProductionTelegramClient:
             logger.error(f"Get updates failed: {e}")
             return {"ok": False, "error": str(e)}
 
+async def guarded_openai_call(stage: str, awaitable):
+    """
+    Run an OpenAI call under the request budget and the OpenAI circuit breaker
+    Brownout samples come from the awaitable itself (record_sample), so fast-fails and coalesced waiters don't count
+    """
+    return await run_within_budget(
+        get_dependency_guard("openai").call_once(awaitable), reserve=SEND_RESERVE, stage=stage
+    )
+
+
 class OptimizedRabbiModule:
     """Production-optimized Rabbi module"""
     
@@ -1157,8 +1237,9 @@ class OptimizedRabbiModule:
                 self.image_manager = None
                 logger.warning("📸 Wisdom image manager not available - using AI generation only")
     
-    async def generate_wisdom(self, user_text: str, language: str = "English", user_name: str = "Friend") -> Dict[str, Any]:
-        """Generate AI wisdom with proper context handling"""
+    async def generate_wisdom(self, user_text: str, language: str = "English", user_name: str = "Friend",
+                              on_partial: Optional[Callable[[str], Awaitable[Any]]] = None) -> Dict[str, Any]:
+        """Generate AI wisdom with proper context handling (streams partial wisdom to on_partial if enabled)"""
         if not openai_client:
             return {
                 "wisdom": f"Thank you, {user_name}. The Torah teaches us that wisdom comes through learning and reflection. Even in uncertainty, we find guidance through study and contemplation.",
@@ -1166,6 +1247,19 @@ class OptimizedRabbiModule:
                 "references": "Pirkei Avot 1:4"
             }
         
+        # User over their fair-share quota: answer from the fallback pool, no OpenAI call
+        if is_cheap_mode():
+            return self._get_fallback_wisdom(user_text, user_name, language)
+        
+        # Degrade straight to fallback wisdom when the request budget is nearly spent
+        if not has_budget(LLM_MIN_BUDGET + SEND_RESERVE):
+            logger.warning(f"⏱️ Request budget low ({remaining_budget():.1f}s) - using fallback wisdom")
+            return self._get_fallback_wisdom(user_text, user_name, language)
+        
+        # Brownout: shorter completions while OpenAI is slow or failing
+        brownout = get_brownout_controller()
+        max_tokens = brownout.max_completion_tokens(400)
+        
         # Initialize content variable to prevent unbound variable error
         content = ""
         
@@ -1177,36 +1271,68 @@ class OptimizedRabbiModule:
                 if openai_client is None:
                     raise ValueError("OpenAI client not initialized")
                     
-                # Use GPT-4o directly (GPT-5 doesn't exist)
-                response = openai_client.chat.completions.create(
-                    model="gpt-4o",
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": user_prompt}
-                    ],
-                    max_completion_tokens=400,
-                    temperature=0.7
-                )
-                
-                content = response.choices[0].message.content
-                if content:
-                    logger.info(f"GPT-5 raw response: {content[:100]}...")
+                if on_partial is not None and is_streaming_enabled():
+                    # Streaming mode: surface the "wisdom" field as soon as tokens arrive
+                    async def _on_delta(buffer: str):
+                        partial_wisdom = extract_partial_json_string(buffer, "wisdom")
+                        if partial_wisdom:
+                            await on_partial(partial_wisdom)
+                    
+                    content = await guarded_openai_call("wisdom LLM", stream_completion_text(
+                        openai_client,
+                        on_delta=_on_delta,
+                        record_sample=get_brownout_controller().sampler("llm"),
+                        model="gpt-4o",
+                        messages=[
+                            {"role": "system", "content": system_prompt},
+                            {"role": "user", "content": user_prompt}
+                        ],
+                        max_completion_tokens=max_tokens,
+                        temperature=0.7
+                    ))
+                    if content:
+                        logger.info(f"🌊 Streamed wisdom response: {content[:100]}...")
+                else:
+                    # Use GPT-4o directly (GPT-5 doesn't exist); identical concurrent prompts share one call
+                    response = await guarded_openai_call("wisdom LLM", run_coalesced_in_thread(
+                        "wisdom",
+                        openai_client.chat.completions.create,
+                        record_sample=get_brownout_controller().sampler("llm"),
+                        model="gpt-4o",
+                        messages=[
+                            {"role": "system", "content": system_prompt},
+                            {"role": "user", "content": user_prompt}
+                        ],
+                        max_completion_tokens=max_tokens,
+                        temperature=0.7
+                    ))
+                    
+                    content = response.choices[0].message.content
+                    if content:
+                        logger.info(f"GPT-5 raw response: {content[:100]}...")
                 
+            except (DeadlineExceeded, CircuitOpenError):
+                raise  # No time or no healthy dependency for a second attempt - outer handler returns fallback wisdom
             except Exception as api_error:
+                if is_permanent_openai_error(api_error):
+                    raise  # Quota/auth problems won't be fixed by a plain-text retry
                 logger.warning(f"GPT-4o with structured format failed, trying plain text: {api_error}")
                 if openai_client is None:
                     raise ValueError("OpenAI client not available for fallback")
                     
                 # Fallback without json_object format
-                response = openai_client.chat.completions.create(
+                response = await guarded_openai_call("wisdom LLM retry", run_coalesced_in_thread(
+                    "wisdom",
+                    openai_client.chat.completions.create,
+                    record_sample=get_brownout_controller().sampler("llm"),
                     model="gpt-4o",
                     messages=[
                         {"role": "system", "content": system_prompt},
                         {"role": "user", "content": user_prompt}
                     ],
-                    max_completion_tokens=400,
+                    max_completion_tokens=max_tokens,
                     temperature=0.7
-                )
+                ))
                 
                 content = response.choices[0].message.content or ""
                 if content:
@@ -1299,6 +1425,9 @@ class OptimizedRabbiModule:
         if not openai_client:
             logger.warning("No OpenAI client available for image generation")
             return None
+        if is_cheap_mode():
+            logger.info("🪣 User over quota - skipping DALL-E generation")
+            return None
         
         max_retries = 2
         fallback_prompts = [
@@ -1312,17 +1441,27 @@ class OptimizedRabbiModule:
         
         for attempt in range(max_retries):
             for prompt_index, prompt_func in enumerate(fallback_prompts):
+                # Deadline budget: stop attempting once an image can no longer arrive in time
+                if not has_budget(IMAGE_MIN_BUDGET):
+                    logger.warning(f"⏱️ Request budget low ({remaining_budget():.1f}s) - skipping image generation")
+                    return None
+                
                 try:
                     prompt = prompt_func()
                     
                     logger.info(f"🎨 Image generation attempt {attempt+1}, prompt {prompt_index+1}: {prompt[:50]}...")
                     
-                    response = openai_client.images.generate(
+                    # HD only for primary, and only while the budget can absorb the slower render
+                    use_hd = prompt_index == 0 and has_budget(IMAGE_HD_BUDGET)
+                    response = await guarded_openai_call("image generation", run_coalesced_in_thread(
+                        "image",
+                        openai_client.images.generate,
+                        record_sample=get_brownout_controller().sampler("image"),
                         model="dall-e-3",
                         prompt=prompt,
                         size="1024x1024",
-                        quality="hd" if prompt_index == 0 else "standard"  # HD only for primary
-                    )
+                        quality="hd" if use_hd else "standard"
+                    ))
                     
                     if response.data and len(response.data) > 0 and response.data[0].url:
                         logger.info(f"✅ Image generated successfully on attempt {attempt+1}, prompt {prompt_index+1}")
@@ -1330,20 +1469,29 @@ class OptimizedRabbiModule:
                     else:
                         logger.warning(f"⚠️ Empty response from DALL-E on attempt {attempt+1}, prompt {prompt_index+1}")
                         
+                except DeadlineExceeded:
+                    return None
+                except CircuitOpenError as e:
+                    logger.warning(f"🔴 {e} - skipping image generation")
+                    return None
                 except Exception as e:
                     error_type = type(e).__name__
                     logger.error(f"❌ Image generation failed attempt {attempt+1}, prompt {prompt_index+1}: {error_type}: {str(e)[:100]}")
                     
-                    # Specific error handling
-                    if "content_policy" in str(e).lower() or "safety" in str(e).lower():
+                    # Specific error handling - permanent quota/billing/auth errors stop immediately
+                    if is_permanent_openai_error(e):
+                        logger.error("💳 OpenAI quota/billing issue - stopping image generation")
+                        return None
+                    elif "content_policy" in str(e).lower() or "safety" in str(e).lower():
                         logger.warning("🚫 Content policy violation - trying simpler prompt")
                         continue
-                    elif "rate_limit" in str(e).lower():
-                        logger.warning("🔄 Rate limit hit - waiting before retry")
-                        await asyncio.sleep(2)
+                    elif is_retryable_error(e):
+                        delay = get_dependency_guard("openai").policy.backoff(attempt + 1)
+                        logger.warning(f"🔄 Transient OpenAI error - waiting {delay:.1f}s before retry")
+                        await asyncio.sleep(delay)
                         continue
-                    elif "quota" in str(e).lower() or "billing" in str(e).lower():
-                        logger.error("💳 OpenAI quota/billing issue - stopping image generation")
+                    else:
+                        logger.error("🛑 Permanent image generation error - stopping")
                         return None
         
         logger.error("💥 All image generation attempts failed")
@@ -1359,6 +1507,25 @@ class OptimizedRabbiModule:
             return f"Peaceful study library about {topic}. Warm lighting, books and scrolls, cozy atmosphere, no text visible."
     
     async def handle_wisdom_request(self, chat_id: int, user_id: int, user_message: Optional[str] = None, user_data: Optional[Dict] = None) -> bool:
+        """Complete wisdom workflow bounded by a per-request deadline budget"""
+        with deadline_budget(WISDOM_DEADLINE_SECONDS):
+            return await self._run_wisdom_workflow(chat_id, user_id, user_message, user_data)
+    
+    def _pick_preset_image(self, user_id: int, session: Dict) -> Optional[str]:
+        """Pick a preset wisdom image, avoiding the user's recent ones"""
+        if not (self.image_manager and self.image_manager.has_presets()):
+            return None
+        recent_images = session.get("recent_wisdom_images", [])
+        preset_image_path = self.image_manager.get_random_preset_image(exclude_recent=recent_images)
+        if preset_image_path:
+            # Track recent images (keep last 5)
+            recent_images.append(os.path.basename(preset_image_path))
+            if len(recent_images) > 5:
+                recent_images = recent_images[-5:]
+            self.session_manager.update_session(user_id, recent_wisdom_images=recent_images)
+        return preset_image_path
+    
+    async def _run_wisdom_workflow(self, chat_id: int, user_id: int, user_message: Optional[str] = None, user_data: Optional[Dict] = None) -> bool:
         """Complete wisdom workflow with proper context handling"""
         session_id = self.analytics.start_session(user_id, "rabbi_wisdom", user_data)
         
@@ -1424,10 +1591,23 @@ class OptimizedRabbiModule:
             self.analytics.log_stage(session_id, "wisdom_generation")
             logger.info(f"Generating wisdom for: '{topic_text}' in {language} for {user_name}")
             
+            # Opt-in streaming: progressively show the wisdom in the thinking message
+            stream_editor = None
+            if thinking_msg_id and is_streaming_enabled():
+                stream_editor = ThrottledMessageEditor(
+                    self.telegram_client, chat_id, thinking_msg_id, prefix="💫 "
+                )
+            
             # Generate wisdom first to get the actual topic
-            wisdom_data = await self.generate_wisdom(topic_text, language, user_name)
+            wisdom_data = await self.generate_wisdom(
+                topic_text, language, user_name,
+                on_partial=stream_editor.update if stream_editor else None
+            )
             wisdom_time = time.time() - start_time
             
+            if stream_editor and stream_editor.edit_count:
+                logger.info(f"🌊 Streamed wisdom: first edit after {stream_editor.first_edit_latency:.2f}s, {stream_editor.edit_count} edits")
+            
             # Track AI performance
             self.analytics.smart_logger.ai_performance("WISDOM_GENERATION", True, wisdom_time, topic=wisdom_data.get("topic", "unknown"))
             logger.info(f"Generated wisdom topic: '{wisdom_data['topic']}', length: {len(wisdom_data['wisdom'])} chars")
@@ -1438,27 +1618,40 @@ class OptimizedRabbiModule:
             
             is_button_request = not (user_message and user_message.strip())
             
-            if thinking_msg_id:
+            if stream_editor and stream_editor.edit_count:
+                # Keep the streamed text visible while the artwork is prepared
+                await stream_editor.flush(
+                    wisdom_data["wisdom"],
+                    suffix="\n\n" + self.session_manager.get_localized_text("creating_artwork", language)
+                )
+            elif thinking_msg_id:
                 await self.telegram_client.edit_message_text(
                     chat_id, thinking_msg_id, self.session_manager.get_localized_text("creating_artwork", language)
                 )
             
             image_start = time.time()
             
-            if is_button_request and self.image_manager and self.image_manager.has_presets():
-                # Button request: use fast preset images
-                recent_images = session.get("recent_wisdom_images", [])
-                preset_image_path = self.image_manager.get_random_preset_image(exclude_recent=recent_images)
+            # Deadline budget / brownout: when DALL-E is too slow or unhealthy, degrade to a preset.
+            # The brownout check goes last - it may hand out a recovery probe, which only a
+            # request that would otherwise generate an image should take
+            preset_reason = None
+            if self.image_manager and self.image_manager.has_presets():
+                if is_button_request:
+                    preset_reason = "button request"
+                elif is_cheap_mode():
+                    preset_reason = "user over quota"
+                elif not has_budget(IMAGE_MIN_BUDGET):
+                    preset_reason = "low request budget"
+                elif get_brownout_controller().prefer_preset_images():
+                    preset_reason = "brownout"
+            
+            if preset_reason:
+                # Button request (or low budget / brownout / user over quota): use fast preset images
+                preset_image_path = self._pick_preset_image(user_id, session)
                 
                 if preset_image_path:
-                    # Track recent images (keep last 5)
-                    recent_images.append(os.path.basename(preset_image_path))
-                    if len(recent_images) > 5:
-                        recent_images = recent_images[-5:]
-                    self.session_manager.update_session(user_id, recent_wisdom_images=recent_images)
-                    
                     image_url = preset_image_path  # Local file path
-                    logger.info(f"🚀 FAST: Using preset image '{os.path.basename(preset_image_path)}' for button request")
+                    logger.info(f"🚀 FAST: Using preset image '{os.path.basename(preset_image_path)}' for {preset_reason}")
                 else:
                     # Fallback to AI generation
                     logger.warning("⚠️ No preset image available, falling back to AI generation")
@@ -1478,6 +1671,8 @@ class OptimizedRabbiModule:
             else:
                 self.analytics.smart_logger.ai_performance("IMAGE_GENERATION", False, image_time, topic=wisdom_data.get("topic", "unknown"))
                 logger.error(f"🚨 CRITICAL: IMAGE_GENERATION ❌ in {image_time:.1f}s - No image URL returned")
+                # Generation failed or ran out of budget - a preset beats a text-only answer
+                image_url = self._pick_preset_image(user_id, session)
             
             # Stage 4: Final response
             self.analytics.log_stage(session_id, "response_delivery")
@@ -1631,6 +1826,10 @@ class OptimizedRabbiModule:
                 await self.telegram_client.send_message(chat_id, wisdom_text, keyboard)
                 logger.info("✅ Sent wisdom text only")
             
+            if stream_editor and stream_editor.edit_count:
+                # Final formatted message replaces the streamed preview
+                await self.telegram_client.delete_message(chat_id, thinking_msg_id)
+            
             # Update session with proper context
             self.session_manager.update_session(
                 user_id, 
@@ -1732,6 +1931,15 @@ class OptimizedQuizModule:
                 "follow_up": "What does this teach us about new beginnings?"
             }
         
+        # Degraded paths: no LLM call at all, straight to the curated pool
+        brownout = get_brownout_controller()
+        if brownout.pool_only_quizzes():
+            logger.info(f"🟠 Brownout active ({brownout.reason}) - serving quiz from pool (user: {user_id})")
+            return self._pool_quiz(language, user_id, avoid_duplicates)
+        if is_cheap_mode():
+            logger.info(f"🪣 User {user_id} over quiz quota - serving quiz from pool")
+            return self._pool_quiz(language, user_id, avoid_duplicates)
+        
         logger.info(f"🤖 AI GENERATING quiz for topic: '{topic}' (user: {user_id})")
         
         try:
@@ -1754,12 +1962,17 @@ class OptimizedQuizModule:
             
             if openai_client is None:
                 raise Exception("Global OpenAI client not initialized")
-            response = openai_client.chat.completions.create(
+            if not has_budget(LLM_MIN_BUDGET + SEND_RESERVE):
+                raise DeadlineExceeded("Request budget too low for quiz generation")
+            response = await guarded_openai_call("quiz LLM", run_coalesced_in_thread(
+                "quiz",
+                openai_client.chat.completions.create,
+                record_sample=get_brownout_controller().sampler("llm"),
                 model="gpt-4o",
                 messages=[{"role": "user", "content": prompt}],
                 max_completion_tokens=600,
                 temperature=0.7
-            )
+            ))
             
             content = response.choices[0].message.content
             if content is None:
@@ -1838,145 +2051,153 @@ class OptimizedQuizModule:
             
         except Exception as e:
             logger.error(f"Quiz generation error: {e}")
-            # IMPROVED: AI fallback with deduplication check
-            shown_quizzes = []
-            if user_id and avoid_duplicates:
-                session = self.session_manager.get_session(user_id)
-                shown_quizzes = session.get("shown_quizzes", [])
-                logger.info(f"⚠️ AI failed, using fallback with {len(shown_quizzes)} shown quizzes to avoid")
-            
-            # Diverse AI fallback with 6 options  
-            fallback_quizzes_en = [
-                {
-                    "question": "What is the first commandment in the Ten Commandments?",
-                    "options": ["Honor your parents", "Do not steal", "I am the Lord your God", "Do not murder", "Keep the Sabbath", "Do not covet"],
-                    "correct_answer": 2,
-                    "explanation": "The first commandment establishes the foundation of Jewish faith: recognition of God as the one true deity",
-                    "follow_up": "How does acknowledging God as your foundation change how you approach daily decisions?"
-                },
-                {
-                    "question": "According to Rabbi Hillel, what is the golden rule of Torah?",
-                    "options": ["Fast on Yom Kippur", "Study every day", "What is hateful to you, do not do to others", "Give charity regularly", "Keep all 613 commandments", "Pray three times daily"],
-                    "correct_answer": 2,
-                    "explanation": "Rabbi Hillel taught this as the essence of Torah when asked to teach it while standing on one foot",
-                    "follow_up": "Think of someone you struggle with - how can you apply this principle today?"
-                },
-                {
-                    "question": "Which Jewish holiday celebrates the giving of the Torah at Mount Sinai?",
-                    "options": ["Passover", "Rosh Hashanah", "Shavot", "Sukkot", "Purim", "Hanukkah"],
-                    "correct_answer": 2,
-                    "explanation": "Shavot, occurring 50 days after Passover, commemorates when Moses received the Torah from God",
-                    "follow_up": "What does receiving wisdom mean to you in your daily life?"
-                },
-                {
-                    "question": "What does 'Tikkun Olam' mean in Jewish tradition?",
-                    "options": ["Morning prayers", "Dietary laws", "Repairing the world", "Wedding ceremony", "Torah study", "Sabbath rest"],
-                    "correct_answer": 2,
-                    "explanation": "Tikkun Olam means 'repairing the world' - our responsibility to make the world more just and compassionate",
-                    "follow_up": "What small action could you take today to 'repair' part of your world?"
-                },
-                {
-                    "question": "Who was the first Jewish patriarch according to the Torah?",
-                    "options": ["Moses", "Abraham", "Isaac", "Jacob", "Noah", "Adam"],
-                    "correct_answer": 1,
-                    "explanation": "Abraham was chosen by God to be the first patriarch, beginning the covenant with the Jewish people",
-                    "follow_up": "Abraham left everything familiar for an unknown journey. When have you taken a leap of faith?"
-                },
-                {
-                    "question": "What is the meaning of 'Shalom' beyond just 'peace'?",
-                    "options": ["War", "Completeness", "Happiness", "Money", "Food", "Work"],
-                    "correct_answer": 1,
-                    "explanation": "Shalom comes from the root meaning 'wholeness' or 'completeness' - true peace comes from inner harmony",
-                    "follow_up": "Where in your life do you seek more wholeness and inner peace?"
-                }
-            ]
-            
-            fallback_quizzes_ru = [
-                {
-                    "question": "Какая первая заповедь в Десяти заповедях?",
-                    "options": ["Почитай родителей", "Не кради", "Я Господь, Бог твой", "Не убивай", "Соблюдай субботу", "Не завидуй"],
-                    "correct_answer": 2,
-                    "explanation": "Первая заповедь устанавливает основу еврейской веры: признание Бога как единственного истинного божества",
-                    "follow_up": "Как признание Бога в качестве основы меняет ваш подход к повседневным решениям?"
-                },
-                {
-                    "question": "Согласно рабби Гиллелю, какое золотое правило Торы?",
-                    "options": ["Поститься в Йом Кипур", "Учиться каждый день", "Что неприятно тебе, не делай другому", "Регулярно жертвовать", "Соблюдать все 613 заповедей", "Молиться три раза в день"],
-                    "correct_answer": 2,
-                    "explanation": "Рабби Гиллель учил этому как сущности Торы, когда его попросили объяснить всю Тору, стоя на одной ноге",
-                    "follow_up": "Подумайте о ком-то, с кем у вас сложности - как можете применить этот принцип сегодня?"
-                },
-                {
-                    "question": "Какой еврейский праздник отмечает дарование Торы на горе Синай?",
-                    "options": ["Песах", "Рош а-Шана", "Шавуот", "Суккот", "Пурим", "Ханука"],
-                    "correct_answer": 2,
-                    "explanation": "Шавуот, происходящий через 50 дней после Песаха, отмечает получение Моисеем Торы от Бога",
-                    "follow_up": "Что означает для вас получение мудрости в повседневной жизни?"
-                },
-                {
-                    "question": "Что означает 'Тикун Олам' в еврейской традиции?",
-                    "options": ["Утренние молитвы", "Законы кашрута", "Исправление мира", "Свадебная церемония", "Изучение Торы", "Субботний покой"],
-                    "correct_answer": 2,
-                    "explanation": "Тикун Олам означает 'исправление мира' - наша ответственность сделать мир более справедливым и сострадательным",
-                    "follow_up": "Какое маленькое действие вы могли бы предпринять сегодня, чтобы 'исправить' часть своего мира?"
-                },
-                {
-                    "question": "Кто был первым еврейским патриархом согласно Торе?",
-                    "options": ["Моисей", "Авраам", "Исаак", "Иаков", "Ной", "Адам"],
-                    "correct_answer": 1,
-                    "explanation": "Авраам был избран Богом стать первым патриархом, начав завет с еврейским народом",
-                    "follow_up": "Авраам оставил все знакомое ради неизвестного пути. Когда вы совершали прыжок веры?"
-                },
-                {
-                    "question": "Что означает 'Шалом' помимо просто 'мир'?",
-                    "options": ["Война", "Целостность", "Счастье", "Деньги", "Еда", "Работа"],
-                    "correct_answer": 1,
-                    "explanation": "Шалом происходит от корня, означающего 'целостность' или 'завершенность' - истинный мир приходит из внутренней гармонии",
-                    "follow_up": "Где в вашей жизни вы ищете больше целостности и внутреннего мира?"
-                }
-            ]
-            
-            # Choose fallback based on language
-            if language == "Russian":
-                fallback_quizzes = fallback_quizzes_ru
-            else:
-                fallback_quizzes = fallback_quizzes_en
-            
-            # SMART deduplication for fallback quizzes
-            if user_id and avoid_duplicates and shown_quizzes:
-                # Try to find quiz not in shown_quizzes
-                available_quizzes = []
-                for quiz in fallback_quizzes:
-                    quiz_sig = quiz["question"][:150]
-                    if not any(quiz_sig in shown for shown in shown_quizzes):
-                        available_quizzes.append(quiz)
-                
-                if available_quizzes:
-                    selected_quiz = random.choice(available_quizzes) 
-                    logger.info(f"📝 Selected non-duplicate fallback quiz: {selected_quiz['question'][:50]}...")
-                else:
-                    # All fallback quizzes shown, reset and pick any
-                    selected_quiz = random.choice(fallback_quizzes)
-                    logger.info(f"🔄 All fallback quizzes shown, reset and selected: {selected_quiz['question'][:50]}...")
-                    # Clear shown quizzes to start fresh
-                    self.session_manager.update_session(user_id, shown_quizzes=[])
+            return self._pool_quiz(language, user_id, avoid_duplicates)
+    
+    def _pool_quiz(self, language: str, user_id: Optional[int] = None, avoid_duplicates: bool = True) -> Dict[str, Any]:
+        """Curated fallback quiz (no AI), skipping questions this user has already seen"""
+        shown_quizzes = []
+        if user_id and avoid_duplicates:
+            session = self.session_manager.get_session(user_id)
+            shown_quizzes = session.get("shown_quizzes", [])
+            logger.info(f"📚 Pool quiz for user {user_id}, avoiding {len(shown_quizzes)} shown quizzes")
+        
+        # Diverse AI fallback with 6 options  
+        fallback_quizzes_en = [
+            {
+                "question": "What is the first commandment in the Ten Commandments?",
+                "options": ["Honor your parents", "Do not steal", "I am the Lord your God", "Do not murder", "Keep the Sabbath", "Do not covet"],
+                "correct_answer": 2,
+                "explanation": "The first commandment establishes the foundation of Jewish faith: recognition of God as the one true deity",
+                "follow_up": "How does acknowledging God as your foundation change how you approach daily decisions?"
+            },
+            {
+                "question": "According to Rabbi Hillel, what is the golden rule of Torah?",
+                "options": ["Fast on Yom Kippur", "Study every day", "What is hateful to you, do not do to others", "Give charity regularly", "Keep all 613 commandments", "Pray three times daily"],
+                "correct_answer": 2,
+                "explanation": "Rabbi Hillel taught this as the essence of Torah when asked to teach it while standing on one foot",
+                "follow_up": "Think of someone you struggle with - how can you apply this principle today?"
+            },
+            {
+                "question": "Which Jewish holiday celebrates the giving of the Torah at Mount Sinai?",
+                "options": ["Passover", "Rosh Hashanah", "Shavot", "Sukkot", "Purim", "Hanukkah"],
+                "correct_answer": 2,
+                "explanation": "Shavot, occurring 50 days after Passover, commemorates when Moses received the Torah from God",
+                "follow_up": "What does receiving wisdom mean to you in your daily life?"
+            },
+            {
+                "question": "What does 'Tikkun Olam' mean in Jewish tradition?",
+                "options": ["Morning prayers", "Dietary laws", "Repairing the world", "Wedding ceremony", "Torah study", "Sabbath rest"],
+                "correct_answer": 2,
+                "explanation": "Tikkun Olam means 'repairing the world' - our responsibility to make the world more just and compassionate",
+                "follow_up": "What small action could you take today to 'repair' part of your world?"
+            },
+            {
+                "question": "Who was the first Jewish patriarch according to the Torah?",
+                "options": ["Moses", "Abraham", "Isaac", "Jacob", "Noah", "Adam"],
+                "correct_answer": 1,
+                "explanation": "Abraham was chosen by God to be the first patriarch, beginning the covenant with the Jewish people",
+                "follow_up": "Abraham left everything familiar for an unknown journey. When have you taken a leap of faith?"
+            },
+            {
+                "question": "What is the meaning of 'Shalom' beyond just 'peace'?",
+                "options": ["War", "Completeness", "Happiness", "Money", "Food", "Work"],
+                "correct_answer": 1,
+                "explanation": "Shalom comes from the root meaning 'wholeness' or 'completeness' - true peace comes from inner harmony",
+                "follow_up": "Where in your life do you seek more wholeness and inner peace?"
+            }
+        ]
+        
+        fallback_quizzes_ru = [
+            {
+                "question": "Какая первая заповедь в Десяти заповедях?",
+                "options": ["Почитай родителей", "Не кради", "Я Господь, Бог твой", "Не убивай", "Соблюдай субботу", "Не завидуй"],
+                "correct_answer": 2,
+                "explanation": "Первая заповедь устанавливает основу еврейской веры: признание Бога как единственного истинного божества",
+                "follow_up": "Как признание Бога в качестве основы меняет ваш подход к повседневным решениям?"
+            },
+            {
+                "question": "Согласно рабби Гиллелю, какое золотое правило Торы?",
+                "options": ["Поститься в Йом Кипур", "Учиться каждый день", "Что неприятно тебе, не делай другому", "Регулярно жертвовать", "Соблюдать все 613 заповедей", "Молиться три раза в день"],
+                "correct_answer": 2,
+                "explanation": "Рабби Гиллель учил этому как сущности Торы, когда его попросили объяснить всю Тору, стоя на одной ноге",
+                "follow_up": "Подумайте о ком-то, с кем у вас сложности - как можете применить этот принцип сегодня?"
+            },
+            {
+                "question": "Какой еврейский праздник отмечает дарование Торы на горе Синай?",
+                "options": ["Песах", "Рош а-Шана", "Шавуот", "Суккот", "Пурим", "Ханука"],
+                "correct_answer": 2,
+                "explanation": "Шавуот, происходящий через 50 дней после Песаха, отмечает получение Моисеем Торы от Бога",
+                "follow_up": "Что означает для вас получение мудрости в повседневной жизни?"
+            },
+            {
+                "question": "Что означает 'Тикун Олам' в еврейской традиции?",
+                "options": ["Утренние молитвы", "Законы кашрута", "Исправление мира", "Свадебная церемония", "Изучение Торы", "Субботний покой"],
+                "correct_answer": 2,
+                "explanation": "Тикун Олам означает 'исправление мира' - наша ответственность сделать мир более справедливым и сострадательным",
+                "follow_up": "Какое маленькое действие вы могли бы предпринять сегодня, чтобы 'исправить' часть своего мира?"
+            },
+            {
+                "question": "Кто был первым еврейским патриархом согласно Торе?",
+                "options": ["Моисей", "Авраам", "Исаак", "Иаков", "Ной", "Адам"],
+                "correct_answer": 1,
+                "explanation": "Авраам был избран Богом стать первым патриархом, начав завет с еврейским народом",
+                "follow_up": "Авраам оставил все знакомое ради неизвестного пути. Когда вы совершали прыжок веры?"
+            },
+            {
+                "question": "Что означает 'Шалом' помимо просто 'мир'?",
+                "options": ["Война", "Целостность", "Счастье", "Деньги", "Еда", "Работа"],
+                "correct_answer": 1,
+                "explanation": "Шалом происходит от корня, означающего 'целостность' или 'завершенность' - истинный мир приходит из внутренней гармонии",
+                "follow_up": "Где в вашей жизни вы ищете больше целостности и внутреннего мира?"
+            }
+        ]
+        
+        # Choose fallback based on language
+        if language == "Russian":
+            fallback_quizzes = fallback_quizzes_ru
+        else:
+            fallback_quizzes = fallback_quizzes_en
+        
+        # SMART deduplication for fallback quizzes
+        if user_id and avoid_duplicates and shown_quizzes:
+            # Try to find quiz not in shown_quizzes
+            available_quizzes = []
+            for quiz in fallback_quizzes:
+                quiz_sig = quiz["question"][:150]
+                if not any(quiz_sig in shown for shown in shown_quizzes):
+                    available_quizzes.append(quiz)
+            
+            if available_quizzes:
+                selected_quiz = random.choice(available_quizzes) 
+                logger.info(f"📝 Selected non-duplicate fallback quiz: {selected_quiz['question'][:50]}...")
             else:
+                # All fallback quizzes shown, reset and pick any
                 selected_quiz = random.choice(fallback_quizzes)
-            
-            # IMPORTANT: Also track fallback quizzes in deduplication
-            if user_id and avoid_duplicates:
-                session = self.session_manager.get_session(user_id)
-                shown_quizzes = session.get("shown_quizzes", [])
-                quiz_signature = selected_quiz["question"][:150] 
-                shown_quizzes.append(quiz_signature)
-                if len(shown_quizzes) > 20:
-                    shown_quizzes = shown_quizzes[-20:]
-                self.session_manager.update_session(user_id, shown_quizzes=shown_quizzes)
-                logger.info(f"📝 Stored fallback quiz signature, total: {len(shown_quizzes)}")
-            
-            return selected_quiz
+                logger.info(f"🔄 All fallback quizzes shown, reset and selected: {selected_quiz['question'][:50]}...")
+                # Clear shown quizzes to start fresh
+                self.session_manager.update_session(user_id, shown_quizzes=[])
+        else:
+            selected_quiz = random.choice(fallback_quizzes)
+        
+        # IMPORTANT: Also track fallback quizzes in deduplication
+        if user_id and avoid_duplicates:
+            session = self.session_manager.get_session(user_id)
+            shown_quizzes = session.get("shown_quizzes", [])
+            quiz_signature = selected_quiz["question"][:150] 
+            shown_quizzes.append(quiz_signature)
+            if len(shown_quizzes) > 20:
+                shown_quizzes = shown_quizzes[-20:]
+            self.session_manager.update_session(user_id, shown_quizzes=shown_quizzes)
+            logger.info(f"📝 Stored fallback quiz signature, total: {len(shown_quizzes)}")
+        
+        return selected_quiz
     
     async def handle_quiz_request(self, chat_id: int, user_id: int, user_data: Optional[Dict] = None) -> bool:
+        """Complete quiz workflow bounded by a per-request deadline budget"""
+        with deadline_budget(QUIZ_DEADLINE_SECONDS):
+            return await self._run_quiz_workflow(chat_id, user_id, user_data)
+    
+    async def _run_quiz_workflow(self, chat_id: int, user_id: int, user_data: Optional[Dict] = None) -> bool:
         """Complete optimized quiz workflow with loader"""
         session_id = self.analytics.start_session(user_id, "torah_quiz", user_data)
         
@@ -2044,7 +2265,9 @@ class OptimizedQuizModule:
                     await self.telegram_client.edit_message_text(
                         chat_id, message_id, ready_text
                     )
-                    await asyncio.sleep(1)
+                    # Cosmetic pause only while the request still has budget to spare
+                    if has_budget(SEND_RESERVE + 1):
+                        await asyncio.sleep(1)
             except Exception:
                 pass
             
@@ -2682,6 +2905,9 @@ class TorahBotFinal:
         self.donation_module = SmartDonationModule(self.telegram_client, self.session_manager)
         self.language_module = LanguageModule(self.telegram_client, self.session_manager)
         
+        # Per-user fair-share quotas for the expensive AI workflows
+        self.user_quotas = get_user_workflow_limiter()
+        
         # Initialize mini game module (safe import)
         try:
             sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
@@ -2739,10 +2965,9 @@ class TorahBotFinal:
             self.newsletter_initialized = False
             self.admin_commands = None
         
-        # Initialize game module menu button for webhook
+        # Initialize game module menu button for webhook (no-op when this config is already applied)
         if self.game_module:
             try:
-                await asyncio.sleep(1)  # Wait for initialization
                 result = await self.game_module._setup_native_menu_button(None)
                 if result:
                     logger.info("🎮 Menu button initialized for webhook mode")
@@ -2872,7 +3097,11 @@ class TorahBotFinal:
             if callback_data == "main_menu":
                 await self.startup_screen.show_main_menu(chat_id, user_id, user_data)
             elif callback_data == "rabbi_wisdom":
-                await self.rabbi_module.handle_wisdom_request(chat_id, user_id, user_data=user_data)
+                await self.user_quotas.run(
+                    user_id, "wisdom",
+                    lambda: self.rabbi_module.handle_wisdom_request(chat_id, user_id, user_data=user_data),
+                    request_key=callback_data
+                )
             elif callback_data == "torah_quiz":
                 # CRITICAL FIX: Handle repeated quiz requests properly
                 session = self.session_manager.get_session(user_id, user_data)
@@ -2888,7 +3117,10 @@ class TorahBotFinal:
                     # First quiz after wisdom - keep current_topic
                     logger.info(f"🎯 FIRST QUIZ: User {user_id} topic: '{current_topic}' from previous workflow: {last_workflow}")
                 
-                await self.quiz_module.handle_quiz_request(chat_id, user_id, user_data)
+                await self.user_quotas.run(
+                    user_id, "quiz", lambda: self.quiz_module.handle_quiz_request(chat_id, user_id, user_data),
+                    request_key=callback_data
+                )
             elif callback_data == "donation":
                 await self.donation_module.show_donation(chat_id, user_id)
             elif callback_data.startswith("stars_"):
@@ -2992,10 +3224,16 @@ class TorahBotFinal:
             if last_workflow == "torah_quiz":
                 # Update session with new topic and generate quiz
                 self.session_manager.update_session(user_id, current_topic=text, last_workflow="torah_quiz")
-                await self.quiz_module.handle_quiz_request(chat_id, user_id, user_data)
+                await self.user_quotas.run(
+                    user_id, "quiz", lambda: self.quiz_module.handle_quiz_request(chat_id, user_id, user_data),
+                    request_key=text
+                )
             else:
                 # Default to Rabbi wisdom
-                await self.rabbi_module.handle_wisdom_request(chat_id, user_id, text, user_data)
+                await self.user_quotas.run(
+                    user_id, "wisdom", lambda: self.rabbi_module.handle_wisdom_request(chat_id, user_id, text, user_data),
+                    request_key=text
+                )
 
 async def main():
     """Production main loop with deployment safety checks"""
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Wisdom Streaming Helpers
+Incremental consumption of OpenAI completion streams with throttled
+progressive Telegram message edits (opt-in via WISDOM_STREAMING=true)
+"""
+
+import asyncio
+import html
+import logging
+import os
+import threading
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+from src.core.metrics import OPENAI_REQUEST_SECONDS, get_metrics
+
+logger = logging.getLogger(__name__)
+
+# Telegram tolerates roughly one edit per second per chat before returning 429
+DEFAULT_EDIT_INTERVAL = float(os.environ.get("WISDOM_STREAM_EDIT_INTERVAL", "1.2"))
+DEFAULT_MIN_CHARS_DELTA = 24
+
+_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+
+def is_streaming_enabled() -> bool:
+    """Check whether progressive wisdom streaming is switched on"""
+    return os.environ.get("WISDOM_STREAMING", "").lower() == "true"
+
+
+def extract_partial_json_string(buffer: str, key: str) -> Optional[str]:
+    """Extract the (possibly unterminated) string value of `key` from partial JSON text"""
+    marker = f'"{key}"'
+    key_pos = buffer.find(marker)
+    if key_pos == -1:
+        return None
+
+    pos = key_pos + len(marker)
+    length = len(buffer)
+    while pos < length and buffer[pos] in " \t\r\n":
+        pos += 1
+    if pos >= length or buffer[pos] != ":":
+        return None
+    pos += 1
+    while pos < length and buffer[pos] in " \t\r\n":
+        pos += 1
+    if pos >= length or buffer[pos] != '"':
+        return None
+    pos += 1
+
+    chars = []
+    while pos < length:
+        char = buffer[pos]
+        if char == '"':
+            break
+        if char == "\\":
+            if pos + 1 >= length:
+                break  # Escape sequence split across chunks
+            code = buffer[pos + 1]
+            if code == "u":
+                hex_digits = buffer[pos + 2:pos + 6]
+                if len(hex_digits) < 4:
+                    break
+                try:
+                    chars.append(chr(int(hex_digits, 16)))
+                except ValueError:
+                    pass
+                pos += 6
+                continue
+            chars.append(_ESCAPES.get(code, code))
+            pos += 2
+            continue
+        chars.append(char)
+        pos += 1
+
+    return "".join(chars)
+
+
+class ThrottledMessageEditor:
+    """Progressively edits one Telegram message without exceeding edit limits"""
+
+    def __init__(self, telegram_client, chat_id: int, message_id: int,
+                 min_interval: float = DEFAULT_EDIT_INTERVAL,
+                 min_chars_delta: int = DEFAULT_MIN_CHARS_DELTA,
+                 prefix: str = "", suffix: str = " ▌"):
+        self.telegram_client = telegram_client
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.min_interval = min_interval
+        self.min_chars_delta = min_chars_delta
+        self.prefix = prefix
+        self.suffix = suffix
+        self.last_text = ""
+        self.last_edit_time = 0.0
+        self.edit_count = 0
+        self.first_edit_latency: Optional[float] = None
+        self._created_at = time.monotonic()
+        self._disabled = False
+
+    def _render(self, text: str, suffix: str) -> str:
+        return f"{self.prefix}{html.escape(text)}{suffix}"
+
+    async def update(self, text: str) -> bool:
+        """Edit the message if enough time and new text have accumulated"""
+        if self._disabled or not text.strip():
+            return False
+        now = time.monotonic()
+        if now - self.last_edit_time < self.min_interval:
+            return False
+        if len(text) - len(self.last_text) < self.min_chars_delta:
+            return False
+        return await self._edit(text, self.suffix, now)
+
+    async def flush(self, text: str, suffix: str = "") -> bool:
+        """Force a final edit with the complete text"""
+        if self._disabled or not text.strip():
+            return False
+        return await self._edit(text, suffix, time.monotonic())
+
+    async def _edit(self, text: str, suffix: str, now: float) -> bool:
+        self.last_edit_time = now
+        result = await self.telegram_client.edit_message_text(
+            self.chat_id, self.message_id, self._render(text, suffix)
+        )
+        if not result or not result.get("ok"):
+            if result and result.get("error_code") == 429:
+                # Telegram asked us to back off - stop streaming edits for this message
+                logger.warning("🐢 Stream edit throttled by Telegram - disabling progressive edits")
+                self._disabled = True
+            return False
+        self.last_text = text
+        self.edit_count += 1
+        if self.first_edit_latency is None:
+            self.first_edit_latency = now - self._created_at
+        return True
+
+
+async def stream_completion_text(client, on_delta: Optional[Callable[[str], Awaitable[Any]]] = None,
+                                 record_sample: Optional[Callable[[float, bool], None]] = None,
+                                 **create_kwargs) -> str:
+    """
+    Consume a sync OpenAI chat completion stream off the event loop and return the full text
+    record_sample(duration, success) is called once with the outcome of the upstream call
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    done = object()
+    stop = threading.Event()
+
+    def _consume():
+        stream = None
+        try:
+            stream = client.chat.completions.create(stream=True, **create_kwargs)
+            for chunk in stream:
+                if stop.is_set():
+                    break
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    loop.call_soon_threadsafe(queue.put_nowait, delta)
+        except Exception as e:
+            if not stop.is_set():
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+        finally:
+            if stream is not None:
+                try:
+                    # Closes the HTTP response so OpenAI stops generating (and billing) tokens
+                    stream.close()
+                except Exception as e:
+                    logger.debug(f"Stream close failed: {e}")
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+
+    # If the caller is cancelled (e.g. request deadline), the stop event ends the read loop
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        consumer = loop.run_in_executor(None, _consume)
+        parts = []
+        while True:
+            item = await queue.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            parts.append(item)
+            if on_delta:
+                try:
+                    await on_delta("".join(parts))
+                except Exception as e:
+                    logger.warning(f"⚠️ Stream progress callback failed: {e}")
+
+        await consumer
+        outcome = "ok"
+        return "".join(parts)
+    finally:
+        stop.set()
+        # Cancellation (deadline) counts as an error - slowness is exactly what brownout tracks
+        duration = time.perf_counter() - start
+        get_metrics().observe(OPENAI_REQUEST_SECONDS, duration,
+                              model=create_kwargs.get("model", "unknown"), operation="stream", outcome=outcome)
+        if record_sample:
+            record_sample(duration, outcome == "ok")
@@ -14,8 +14,27 @@ from typing import List, Optional
 from datetime import datetime, date, timedelta
 from random import choice, sample
 
+from src.core.query_registry import get_query_registry, register_query
+
 logger = logging.getLogger(__name__)
 
+# Hot queries - executed by name through the query registry for per-query timing
+_queries = get_query_registry()
+
+Q_RECENT_WISDOM_TOPICS = register_query("topics.recent_wisdom", """
+    SELECT DISTINCT wisdom_topic
+    FROM newsletter_broadcasts
+    WHERE broadcast_date >= $1
+        AND wisdom_topic IS NOT NULL
+        AND broadcast_type = 'wisdom'
+        AND status IN ('sent', 'generating', 'ready')
+""")
+Q_WISDOM_BROADCAST_FOR_DATE = register_query("topics.wisdom_broadcast_for_date", """
+    SELECT id, created_by, successful_deliveries
+    FROM newsletter_broadcasts
+    WHERE broadcast_date = $1 AND broadcast_type = $2
+""")
+
 class WisdomTopicGenerator:
     """Generate unique wisdom topics to prevent content repetition"""
 
@@ -253,14 +272,7 @@ class WisdomTopicGenerator:
                     cutoff_date = date.today() - timedelta(days=days_back)
                     async with db_pool.acquire() as conn:
                         # FIX: Include ALL statuses to prevent duplicates during generation
-                        rows = await conn.fetch("""
-                            SELECT DISTINCT wisdom_topic 
-                            FROM newsletter_broadcasts 
-                            WHERE broadcast_date >= $1 
-                                AND wisdom_topic IS NOT NULL 
-                                AND broadcast_type = 'wisdom'
-                                AND status IN ('sent', 'generating', 'ready')
-                        """, cutoff_date)
+                        rows = await _queries.fetch(conn, Q_RECENT_WISDOM_TOPICS, cutoff_date)
                         recent_topics = [row['wisdom_topic'] for row in rows]
                         logger.info(f"🔍 Found {len(recent_topics)} recent wisdom topics in last {days_back} days (all statuses)")
                 except Exception as e:
@@ -323,11 +335,7 @@ class WisdomTopicGenerator:
             async with db_pool.acquire() as conn:
                 # CRITICAL FIX: Only update wisdom_topic field, preserve tracking data (broadcast_id, deliveries, etc)
                 # First check if record exists with tracking data
-                existing = await conn.fetchrow("""
-                    SELECT id, created_by, successful_deliveries 
-                    FROM newsletter_broadcasts 
-                    WHERE broadcast_date = $1 AND broadcast_type = $2
-                """, broadcast_date, 'wisdom')
+                existing = await _queries.fetchrow(conn, Q_WISDOM_BROADCAST_FOR_DATE, broadcast_date, 'wisdom')
                 
                 if existing and existing['created_by'] == 'newsletter_api':
                     # Record created by newsletter_api with tracking - only update wisdom_topic
@@ -358,43 +366,6 @@ class WisdomTopicGenerator:
         """Get a safe fallback topic when all else fails"""
         return "ежедневная мудрость и духовное наставление"
 
-    @classmethod
-    async def cleanup_old_topics(cls, db_pool: Optional[asyncpg.Pool], days_to_keep: int = 30) -> int:
-        """
-        Clean up old wisdom topics to prevent database bloat
-        
-        Args:
-            db_pool: Database connection pool
-            days_to_keep: Number of days to keep (default: 30)
-            
-        Returns:
-            int: Number of records cleaned up, -1 if error
-        """
-        if not db_pool:
-            logger.warning("⚠️ Cannot cleanup wisdom topics - database pool not available")
-            return -1
-            
-        try:
-            cutoff_date = date.today() - timedelta(days=days_to_keep)
-            
-            async with db_pool.acquire() as conn:
-                result = await conn.execute("""
-                    DELETE FROM newsletter_broadcasts 
-                    WHERE broadcast_date < $1 AND broadcast_type = 'wisdom'
-                """, cutoff_date)
-                
-            # Extract number from result string like "DELETE 5"
-            deleted_count = int(result.split()[-1]) if result and result.split() else 0
-            
-            if deleted_count > 0:
-                logger.info(f"🧹 Cleaned up {deleted_count} old wisdom topic records (older than {cutoff_date})")
-            
-            return deleted_count
-            
-        except Exception as e:
-            logger.error(f"❌ Failed to cleanup old wisdom topics: {e}")
-            return -1
-
 # For backward compatibility - can be used directly
 async def get_unique_wisdom_topic(db_pool: Optional[asyncpg.Pool] = None, days_back: int = 14) -> str:
     """Convenience function for getting unique wisdom topics"""
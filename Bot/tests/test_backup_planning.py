@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Tests for backup chain planning
+Full vs incremental selection from manifests on disk and FK restore order
+"""
+
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+# Add project root to path for imports
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from src.database.backup_manager import (
+    BACKUP_FULL_INTERVAL_DAYS, BACKUP_PREFIX, MANIFEST_NAME, DatabaseBackupManager, dependency_order
+)
+
+
+class TestDependencyOrder:
+    """Referenced tables restore before the tables pointing at them"""
+
+    def test_parents_come_first(self):
+        tables = ["delivery_log", "newsletter_broadcasts", "newsletter_subscriptions", "users"]
+        foreign_keys = [
+            ("delivery_log", "newsletter_broadcasts"),
+            ("delivery_log", "users"),
+            ("newsletter_subscriptions", "users"),
+        ]
+        order = dependency_order(tables, foreign_keys)
+        assert sorted(order) == sorted(tables)
+        for child, parent in foreign_keys:
+            assert order.index(parent) < order.index(child)
+
+    def test_independent_tables_keep_name_order(self):
+        assert dependency_order(["b", "c", "a"], []) == ["a", "b", "c"]
+
+    def test_references_outside_the_backup_are_ignored(self):
+        assert dependency_order(["orders"], [("orders", "customers")]) == ["orders"]
+
+    def test_cycle_falls_back_to_name_order(self):
+        order = dependency_order(["a", "b", "c", "root"], [("a", "b"), ("b", "a"), ("c", "a")])
+        assert order[0] == "root"
+        assert sorted(order) == ["a", "b", "c", "root"]
+        assert len(order) == 4
+
+
+class TestPlanBackup:
+    """_plan_backup() chains incrementals onto the newest backup until the full one ages out"""
+
+    @pytest.fixture
+    def manager(self, tmp_path):
+        manager = DatabaseBackupManager()
+        manager.backup_dir = tmp_path
+        return manager
+
+    def write_backup(self, manager, suffix: str, kind: str, created: datetime,
+                     base: str = None, parent: str = None) -> str:
+        name = f"{BACKUP_PREFIX}{suffix}"
+        path = manager.backup_dir / name
+        path.mkdir()
+        manifest = {
+            "kind": kind,
+            "base": base or name,
+            "parent": parent,
+            "created": created.isoformat(),
+            "tables": {"users": {"rows": 1, "compressed_bytes": 10, "high_water": created.isoformat()}}
+        }
+        (path / MANIFEST_NAME).write_text(json.dumps(manifest), encoding="utf-8")
+        # Newest-first listing is by mtime
+        os.utime(path, (created.timestamp(), created.timestamp()))
+        return name
+
+    def test_first_backup_is_full(self, manager):
+        assert manager._plan_backup(None) == ("full", None)
+
+    def test_chains_onto_recent_full_backup(self, manager):
+        full = self.write_backup(manager, "1", "full", datetime.now() - timedelta(days=1))
+        kind, parent = manager._plan_backup(None)
+        assert kind == "incremental"
+        assert parent["name"] == full
+        assert parent["base"] == full
+
+    def test_chains_onto_newest_incremental(self, manager):
+        now = datetime.now()
+        full = self.write_backup(manager, "1", "full", now - timedelta(days=2))
+        incremental = self.write_backup(manager, "2", "incremental", now - timedelta(days=1), base=full, parent=full)
+        kind, parent = manager._plan_backup(None)
+        assert kind == "incremental"
+        assert (parent["name"], parent["base"]) == (incremental, full)
+
+    def test_full_backup_once_the_chain_is_old(self, manager):
+        now = datetime.now()
+        full = self.write_backup(manager, "1", "full", now - timedelta(days=BACKUP_FULL_INTERVAL_DAYS + 1))
+        self.write_backup(manager, "2", "incremental", now - timedelta(hours=1), base=full, parent=full)
+        assert manager._plan_backup(None) == ("full", None)
+        # An explicit incremental still chains
+        assert manager._plan_backup("incremental")[0] == "incremental"
+
+    def test_explicit_full_ignores_existing_chain(self, manager):
+        self.write_backup(manager, "1", "full", datetime.now() - timedelta(hours=1))
+        assert manager._plan_backup("full") == ("full", None)
+
+    def test_missing_base_starts_a_new_chain(self, manager):
+        self.write_backup(manager, "2", "incremental", datetime.now() - timedelta(hours=1),
+                          base=f"{BACKUP_PREFIX}deleted", parent=f"{BACKUP_PREFIX}deleted")
+        assert manager._plan_backup(None) == ("full", None)
+        assert manager._plan_backup("incremental") == ("full", None)
+
+    def test_restore_chain_and_grouping(self, manager):
+        now = datetime.now()
+        old_full = self.write_backup(manager, "0", "full", now - timedelta(days=10))
+        full = self.write_backup(manager, "1", "full", now - timedelta(days=2))
+        first = self.write_backup(manager, "2", "incremental", now - timedelta(days=1), base=full, parent=full)
+        second = self.write_backup(manager, "3", "incremental", now - timedelta(hours=1), base=full, parent=first)
+
+        assert [path.name for path, _ in manager._resolve_chain("latest")] == [full, first, second]
+        assert [path.name for path, _ in manager._resolve_chain(first)] == [full, first]
+        assert [[path.name for path in chain] for chain in manager._backup_chains()] == [
+            [second, first, full], [old_full]
+        ]
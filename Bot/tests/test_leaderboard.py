@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Tests for the Shabbat Runner leaderboard
+Skip-list ranking, period rollover and merging persisted rows on load
+"""
+
+import bisect
+import os
+import random
+import sys
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+import pytest
+import pytest_asyncio
+
+# Add project root to path for imports
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from src.mini_game.backend import leaderboard as leaderboard_module
+from src.mini_game.backend.leaderboard import GameLeaderboard, IndexableSkipList
+
+
+class FakeConnection:
+    def __init__(self, rows):
+        self.rows = rows
+        self.executed = []
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+    async def execute(self, query, *args):
+        self.executed.append(query)
+
+    async def executemany(self, query, rows):
+        self.executed.append(query)
+
+    async def fetch(self, query, *args):
+        return self.rows
+
+
+class FakePool:
+    def __init__(self, rows=()):
+        self.connection = FakeConnection(list(rows))
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self.connection
+
+
+def frozen_clock(moment: datetime):
+    """Patch the leaderboard module's datetime so now() returns `moment`"""
+
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return moment
+
+    return patch.object(leaderboard_module, "datetime", FrozenDatetime)
+
+
+class TestIndexableSkipList:
+    """rank/slice/remove agree with a plain sorted list"""
+
+    def test_matches_sorted_list(self):
+        rng = random.Random(7)
+        skip_list, expected = IndexableSkipList(), []
+        for _ in range(2000):
+            if expected and rng.random() < 0.3:
+                key = rng.choice(expected)
+                skip_list.remove(key)
+                expected.remove(key)
+            else:
+                key = (rng.randint(-50, 0), rng.random(), rng.randint(1, 10**6))
+                skip_list.insert(key)
+                bisect.insort(expected, key)
+            assert len(skip_list) == len(expected)
+
+        for key in rng.sample(expected, 50):
+            assert skip_list.index(key) == bisect.bisect_left(expected, key)
+        for start in (0, 1, len(expected) // 2, len(expected) - 3, len(expected)):
+            assert skip_list.slice(start, 5) == expected[start:start + 5]
+
+    def test_slice_with_negative_start_is_clipped(self):
+        skip_list = IndexableSkipList()
+        for key in range(10):
+            skip_list.insert(key)
+        assert skip_list.slice(-2, 5) == [0, 1, 2]
+        assert skip_list.slice(-5, 3) == []
+
+    def test_remove_missing_key_raises(self):
+        skip_list = IndexableSkipList()
+        skip_list.insert(1)
+        with pytest.raises(KeyError):
+            skip_list.remove(2)
+        assert len(skip_list) == 1
+
+
+class TestGameLeaderboard:
+    """Ranking, period rollover and load/merge"""
+
+    @pytest_asyncio.fixture
+    async def board(self):
+        board = GameLeaderboard(flush_interval=3600)
+        await board.initialize(FakePool())
+        yield board
+        await board.close()
+
+    @pytest.mark.asyncio
+    async def test_ranks_best_score_with_earliest_tie_first(self, board):
+        await board.record_score(1, 300, "alice")
+        await board.record_score(2, 500, "bob")
+        await board.record_score(3, 300, "carol")
+        await board.record_score(1, 100)
+
+        assert [row["user_id"] for row in board.top("all")] == [2, 1, 3]
+        assert board.rank("all", 1) == {"rank": 2, "user_id": 1, "name": "alice", "score": 300, "games": 2}
+        assert [row["rank"] for row in board.around("all", 2, radius=1)] == [1, 2]
+
+    @pytest.mark.asyncio
+    async def test_out_of_range_score_is_rejected(self, board):
+        with pytest.raises(ValueError):
+            await board.record_score(1, leaderboard_module.GAME_MAX_SCORE + 1)
+        assert board.player_count() == 0
+
+    @pytest.mark.asyncio
+    async def test_daily_and_weekly_windows_roll_over(self, board):
+        with frozen_clock(datetime(2025, 3, 5, 23, 0, tzinfo=timezone.utc)):  # Wednesday
+            await board.record_score(1, 400)
+            assert board.player_count("daily") == 1
+
+        with frozen_clock(datetime(2025, 3, 6, 1, 0, tzinfo=timezone.utc)):
+            assert board.player_count("daily") == 0
+            assert board.player_count("weekly") == 1
+            assert board.player_count("all") == 1
+
+        with frozen_clock(datetime(2025, 3, 10, 1, 0, tzinfo=timezone.utc)):  # next Monday
+            assert board.player_count("weekly") == 0
+            assert board.rank("all", 1)["score"] == 400
+
+    @pytest.mark.asyncio
+    async def test_load_merges_with_scores_submitted_before_it(self, board):
+        await board.record_score(1, 500, "alice")
+        stored_at = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        rows = [
+            {"window_type": "all", "user_id": 1, "username": "alice", "best_score": 300,
+             "best_at": stored_at, "games_played": 4},
+            {"window_type": "all", "user_id": 2, "username": "bob", "best_score": 800,
+             "best_at": stored_at, "games_played": 9},
+        ]
+        await board._load(FakeConnection(rows))
+
+        assert board.rank("all", 2)["rank"] == 1
+        alice = board.rank("all", 1)
+        assert (alice["rank"], alice["score"], alice["games"]) == (2, 500, 5)
+
+    @pytest.mark.asyncio
+    async def test_flush_writes_pending_rows(self, board):
+        await board.record_score(1, 250)
+        assert len(board._table.pending) == len(leaderboard_module.WINDOWS)
+        await board.flush()
+        assert board._table.pending == {}
+        assert board.get_stats()["flushed_rows"] == len(leaderboard_module.WINDOWS)
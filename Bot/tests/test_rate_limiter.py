@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Tests for the GCRA rate limiter
+Allow/deny timing per tier with an explicit clock, endpoint rules and shared leases
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add project root to path for imports
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from src.core.rate_limiter import LocalRateLimitBackend, RateLimiter, RateLimitRule
+
+PATH = "/api/test"
+
+
+@pytest.fixture
+def limiter():
+    limiter = RateLimiter()
+    # Burst: 1 request per 2s up to 5; minute: 1 per 4s up to 15
+    limiter.add_endpoint_rule(PATH, RateLimitRule(requests_per_minute=15, requests_per_hour=1000, burst_limit=5))
+    return limiter
+
+
+class TestGCRATiming:
+    """check() admits a burst, then one request per emission interval"""
+
+    def test_burst_then_deny_with_retry_after(self, limiter):
+        for _ in range(5):
+            assert limiter.check("client", PATH, now=100.0) == (True, None, 0.0)
+
+        allowed, message, retry_after = limiter.check("client", PATH, now=100.0)
+        assert allowed is False
+        assert "per 10 seconds" in message
+        assert retry_after == pytest.approx(2.0)
+
+    def test_admits_again_after_emission_interval(self, limiter):
+        for _ in range(5):
+            limiter.check("client", PATH, now=100.0)
+
+        assert limiter.check("client", PATH, now=101.9)[0] is False
+        assert limiter.check("client", PATH, now=102.0)[0] is True
+        assert limiter.check("client", PATH, now=102.0)[0] is False
+
+    def test_denied_requests_do_not_consume_quota(self, limiter):
+        for _ in range(5):
+            limiter.check("client", PATH, now=100.0)
+        for _ in range(20):
+            assert limiter.check("client", PATH, now=100.5)[0] is False
+        assert limiter.check("client", PATH, now=102.0)[0] is True
+
+    def test_minute_tier_limits_sustained_rate(self, limiter):
+        # One request every 2s conforms to the burst tier but not to 15/min
+        results = [limiter.check("client", PATH, now=100.0 + 2.0 * step)[0] for step in range(30)]
+        denied_at = results.index(False)
+        assert all(results[:denied_at])
+        _, message, retry_after = limiter.check("client", PATH, now=100.0 + 2.0 * denied_at)
+        assert "per minute" in message
+        assert 0 < retry_after <= 4.0
+
+    def test_clients_and_rules_are_independent(self, limiter):
+        for _ in range(5):
+            limiter.check("client", PATH, now=100.0)
+        assert limiter.check("client", PATH, now=100.0)[0] is False
+        assert limiter.check("other", PATH, now=100.0)[0] is True
+        # The default rule (burst 10) has its own state for the same client
+        assert limiter.check("client", "/unmatched", now=100.0)[0] is True
+
+
+class TestEndpointRules:
+    """Patterns match as path substrings; unmatched paths use the default rule"""
+
+    def test_rule_resolution(self, limiter):
+        assert limiter.has_endpoint_rule(PATH + "/123")
+        assert limiter.get_rule_for_endpoint(PATH).burst_limit == 5
+        assert not limiter.has_endpoint_rule("/health")
+        assert limiter.get_rule_for_endpoint("/health") is limiter.default_rule
+
+
+class TestSharedBackend:
+    """acquire() leases admissions from the shared backend in batches"""
+
+    @pytest.mark.asyncio
+    async def test_one_round_trip_per_lease(self, monkeypatch):
+        monkeypatch.setattr("src.core.rate_limiter.time.time", lambda: 1000.0)
+        limiter = RateLimiter(backend=LocalRateLimitBackend())
+        # 30/min -> leases of 3 admissions
+        limiter.add_endpoint_rule(PATH, RateLimitRule(requests_per_minute=30, requests_per_hour=1000, burst_limit=10))
+        for _ in range(3):
+            assert (await limiter.acquire("client", PATH))[0] is True
+        assert limiter.backend_stats["round_trips"] == 1
+        assert limiter.backend_stats["lease_hits"] == 2
+
+    @pytest.mark.asyncio
+    async def test_denies_when_shared_window_is_exhausted(self, monkeypatch):
+        monkeypatch.setattr("src.core.rate_limiter.time.time", lambda: 1000.0)
+        backend = LocalRateLimitBackend()
+        limiter = RateLimiter(backend=backend)
+        limiter.add_endpoint_rule(PATH, RateLimitRule(requests_per_minute=3, requests_per_hour=1000, burst_limit=10))
+        # Another worker already spent the minute's quota
+        await backend.reserve(f"client|{PATH}", ((60, 3), (3600, 1000)), 3, now=1000.0)
+
+        allowed, message, retry_after = await limiter.acquire("client", PATH)
+        assert allowed is False
+        assert "per minute" in message
+        assert retry_after == pytest.approx(20.0)
+        assert limiter.backend_stats["shared_denials"] == 1
+
+    @pytest.mark.asyncio
+    async def test_backend_failure_fails_open(self):
+        class BrokenBackend(LocalRateLimitBackend):
+            async def reserve(self, *args, **kwargs):
+                raise ConnectionError("backend down")
+
+        limiter = RateLimiter(backend=BrokenBackend())
+        assert (await limiter.acquire("client", PATH))[0] is True
+        assert limiter.backend_stats["errors"] == 1
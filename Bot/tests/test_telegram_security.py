@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Tests for Telegram Mini App initData verification
+Valid, forged and expired initData signed the way Telegram signs it
+"""
+
+import hashlib
+import hmac
+import json
+import os
+import sys
+import time
+from urllib.parse import urlencode
+
+# Add project root to path for imports
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from src.core.telegram_security import verify_webapp_init_data
+
+BOT_TOKEN = "123456:TEST-TOKEN"
+USER = {"id": 42, "first_name": "Moshe", "username": "moshe"}
+
+
+def sign_init_data(fields: dict, bot_token: str = BOT_TOKEN) -> str:
+    """initData query string with Telegram's hash over the sorted key=value lines"""
+    data_check_string = "\n".join(f"{key}={value}" for key, value in sorted(fields.items()))
+    secret_key = hmac.new(b"WebAppData", bot_token.encode("utf-8"), hashlib.sha256).digest()
+    signature = hmac.new(secret_key, data_check_string.encode("utf-8"), hashlib.sha256).hexdigest()
+    return urlencode({**fields, "hash": signature})
+
+
+def init_data_fields(auth_date: int = None, user: dict = USER) -> dict:
+    return {
+        "auth_date": str(int(time.time()) if auth_date is None else auth_date),
+        "query_id": "AAH-test",
+        "user": json.dumps(user, separators=(",", ":"))
+    }
+
+
+class TestVerifyWebAppInitData:
+    """verify_webapp_init_data returns the signed user or None"""
+
+    def test_valid_init_data_returns_user(self):
+        assert verify_webapp_init_data(sign_init_data(init_data_fields()), BOT_TOKEN) == USER
+
+    def test_token_falls_back_to_environment(self, monkeypatch):
+        monkeypatch.setenv("BOT_TOKEN", BOT_TOKEN)
+        assert verify_webapp_init_data(sign_init_data(init_data_fields())) == USER
+
+    def test_tampered_user_is_rejected(self):
+        init_data = sign_init_data(init_data_fields())
+        forged = init_data.replace("%3A42%2C", "%3A43%2C")
+        assert forged != init_data
+        assert verify_webapp_init_data(forged, BOT_TOKEN) is None
+
+    def test_signed_with_another_token_is_rejected(self):
+        init_data = sign_init_data(init_data_fields(), bot_token="654321:OTHER-TOKEN")
+        assert verify_webapp_init_data(init_data, BOT_TOKEN) is None
+
+    def test_missing_hash_is_rejected(self):
+        assert verify_webapp_init_data(urlencode(init_data_fields()), BOT_TOKEN) is None
+
+    def test_expired_init_data_is_rejected(self):
+        stale = sign_init_data(init_data_fields(auth_date=int(time.time()) - 7200))
+        assert verify_webapp_init_data(stale, BOT_TOKEN, max_age=3600) is None
+        assert verify_webapp_init_data(stale, BOT_TOKEN, max_age=86400) == USER
+
+    def test_user_without_numeric_id_is_rejected(self):
+        init_data = sign_init_data(init_data_fields(user={"id": "42"}))
+        assert verify_webapp_init_data(init_data, BOT_TOKEN) is None
+
+    def test_missing_or_malformed_input_is_rejected(self):
+        assert verify_webapp_init_data(None, BOT_TOKEN) is None
+        assert verify_webapp_init_data("", BOT_TOKEN) is None
+        assert verify_webapp_init_data("not a query string", BOT_TOKEN) is None
@@ -5,6 +5,7 @@ Unified Webhook Service - TRUE UNIFIED ARCHITECTURE
 """
 
 import asyncio
+import hmac
 import logging
 import os
 import sys
@@ -16,14 +17,32 @@ from typing import Optional
 # FastAPI imports
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, JSONResponse, Response
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 
 # Security imports
-from src.core.rate_limiter import rate_limit_middleware, start_rate_limiter_cleanup
-from src.core.audit_logger import get_audit_logger, log_admin_action, AuditEventType
+from src.core.rate_limiter import (
+    RateLimitMiddleware, configure_rate_limit_backend, rate_limit_middleware, start_rate_limiter_cleanup
+)
+from src.core.telegram_security import WEBAPP_INIT_DATA_HEADER, log_security_event, verify_webapp_init_data
+from src.core.audit_logger import (
+    AuditQuery, decode_audit_cursor, get_audit_logger, get_audit_stats, log_admin_action, AuditEventType
+)
 from src.core.user_context import UserContext
+from src.core.single_flight import get_single_flight
+from src.core.brownout import get_brownout_controller
+from src.core.user_quotas import get_user_workflow_limiter
+from src.core.admin_cache import get_admin_cache
+from src.core.db_pool import get_pool_manager
+from src.core.query_registry import get_query_registry
+from src.core.resilience import get_resilience_status
+from src.core.metrics import MetricsMiddleware, gauge_family, get_event_loop_lag_monitor, get_metrics
+from src.core.validation import GAME_ANALYTICS_MAX_BATCH, GAME_MAX_SCORE, GameAnalyticsRequest
+from src.mini_game.backend.analytics import get_game_analytics
+from src.mini_game.backend.assets import get_asset_pipeline, get_html_cache
+from src.mini_game.backend.leaderboard import WINDOWS as LEADERBOARD_WINDOWS, get_game_leaderboard
+from src.mini_game.backend.menu_button import get_menu_button_registry
 
 # Add project root to path
 project_root = Path(__file__).parent
@@ -114,6 +133,7 @@ class UnifiedWebhookService:
         import asyncio
         asyncio.create_task(start_rate_limiter_cleanup())
         asyncio.create_task(get_audit_logger())  # Initialize audit logger
+        get_event_loop_lag_monitor().start()
         self.bot_instance = None
         self.telegram_client = None
         self.services_ready = False
@@ -147,6 +167,16 @@ class UnifiedWebhookService:
             allow_headers=["Content-Type", "Authorization", "X-Admin-Secret", "X-Telegram-Web-App-Init-Data", "X-Requested-With"],
         )
         
+        # 🚦 RATE LIMITING: GCRA checks run before routing for admin, audit, scheduler and score APIs
+        self.app.add_middleware(
+            RateLimitMiddleware,
+            protected_prefixes=("/api/manual_broadcast", "/api/audit_log", "/api/scheduler", "/game/score")
+        )
+        
+        # 📈 METRICS: outermost, so handler time includes CORS and rate limiting
+        self.app.add_middleware(MetricsMiddleware)
+        get_metrics().add_collector(self.collect_service_metrics)
+        
         # Setup routes after middleware
         self.setup_routes()
     
@@ -239,6 +269,9 @@ class UnifiedWebhookService:
             # PHASE 1: Database URL validation and sanity check
             await self._validate_database_configuration()
             
+            # PHASE 1.5: Shared rate limit backend (RATE_LIMIT_BACKEND), falls back to per-process limits
+            await configure_rate_limit_backend()
+            
             # PHASE 2: Initialize ServiceContainer for consistent state
             from src.core.service_container import get_container
             from src.core.service_factories import initialize_all_services
@@ -355,9 +388,32 @@ class UnifiedWebhookService:
         except Exception as e:
             logger.error(f"❌ Webhook setup error: {e}")
     
+    def collect_service_metrics(self):
+        """Scrape-time gauges for mini game background queues"""
+        analytics = get_game_analytics().get_stats()
+        leaderboard = get_game_leaderboard().get_stats()
+        return [gauge_family("torah_game_queue_depth", "Mini game items awaiting processing or persistence", {
+            (("queue", "analytics_events"),): analytics["queued"],
+            (("queue", "analytics_rows"),): analytics["pending_rows"],
+            (("queue", "leaderboard_rows"),): leaderboard["pending_rows"],
+        })]
+    
     def setup_routes(self):
         """Setup all routes in single FastAPI app"""
         
+        # === PROMETHEUS METRICS ===
+        @self.app.get("/metrics")
+        async def metrics(request: Request):
+            """Latency histograms, counters and gauges in Prometheus text format - REQUIRES AUTH
+            (Authorization: Bearer METRICS_TOKEN, or X-Admin-Secret; closed when neither is configured)"""
+            authorization = request.headers.get("Authorization", "")
+            presented = authorization[7:] if authorization.startswith("Bearer ") else request.headers.get("X-Admin-Secret", "")
+            expected = [secret for secret in (os.getenv("METRICS_TOKEN"), os.getenv("ADMIN_SECRET")) if secret]
+            if not presented or not any(hmac.compare_digest(presented.encode(), secret.encode()) for secret in expected):
+                logger.warning("🔒 Unauthorized metrics scrape - missing or invalid token")
+                raise HTTPException(status_code=401, detail="Unauthorized - metrics token required")
+            return Response(get_metrics().render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+        
         # === UNIFIED HEALTH CHECK ===
         @self.app.get("/health")
         @self.app.get("/api")  # Autoscale health check endpoint
@@ -397,8 +453,12 @@ class UnifiedWebhookService:
                     "jobs": self.background_scheduler.get_scheduled_jobs()
                 }
             
+            # 🔌 RESILIENCE: Open circuits mean a dependency is failing fast
+            circuits = get_resilience_status()
+            open_circuits = [name for name, circuit in circuits.items() if circuit["state"] != "closed"]
+            
             response_data = {
-                "status": "healthy",
+                "status": "degraded" if open_circuits else "healthy",
                 "service": "torah-bot-unified",
                 "mode": "webhook",
                 "deployment": deployment_status,
@@ -417,7 +477,21 @@ class UnifiedWebhookService:
                     "deployment_protection": "active",
                     "warnings": security_warnings
                 },
-                "background_scheduler": scheduler_status
+                "background_scheduler": scheduler_status,
+                "ai_coalescing": get_single_flight().get_stats(),
+                "brownout": get_brownout_controller().get_status(),
+                "user_quotas": get_user_workflow_limiter().get_stats(),
+                "db_pool": get_pool_manager().get_stats(),
+                "queries": get_query_registry().get_stats(),
+                "admin_cache": get_admin_cache().get_stats(),
+                "audit": get_audit_stats(),
+                "game_leaderboard": get_game_leaderboard().get_stats(),
+                "game_html_cache": get_html_cache().get_stats(),
+                "game_analytics": get_game_analytics().get_stats(),
+                "menu_button": get_menu_button_registry().get_stats(),
+                "event_loop_lag_ms": round(get_event_loop_lag_monitor().last_lag * 1000, 1),
+                "circuits": circuits,
+                "open_circuits": open_circuits
             }
             
             return JSONResponse(response_data)
@@ -592,14 +666,79 @@ class UnifiedWebhookService:
                 logger.error(f"❌ Webhook processing error: {e}")
                 return JSONResponse({"error": str(e)}, status_code=500)
         
+        # === AUDIT HISTORY API ===
+        def audit_query_from_request(request: Request) -> AuditQuery:
+            """Build audit filters from query params (HTTP 400 on bad values)"""
+            from datetime import datetime
+            params = request.query_params
+            try:
+                event_type = params.get("event_type")
+                since = params.get("since")
+                until = params.get("until")
+                return AuditQuery(
+                    event_type=AuditEventType(event_type) if event_type else None,
+                    user_identifier=params.get("user") or None,
+                    resource=params.get("resource") or None,
+                    since=datetime.fromisoformat(since) if since else None,
+                    until=datetime.fromisoformat(until) if until else None
+                )
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=f"Invalid filter: {e}")
+        
+        def require_admin_secret(request: Request):
+            admin_secret = request.headers.get("X-Admin-Secret")
+            expected_secret = os.getenv("ADMIN_SECRET")
+            if not admin_secret or not expected_secret or admin_secret != expected_secret:
+                logger.warning(f"🔒 Unauthorized audit log access - missing or invalid X-Admin-Secret")
+                raise HTTPException(status_code=401, detail="Unauthorized - X-Admin-Secret header required")
+        
+        @self.app.get("/api/audit_log")
+        async def audit_log_page(request: Request):
+            """One keyset page of audit history; follow next_cursor for older events - REQUIRES ADMIN AUTH"""
+            require_admin_secret(request)
+            query = audit_query_from_request(request)
+            try:
+                limit = int(request.query_params.get("limit", "100"))
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid limit")
+            
+            audit_logger = await get_audit_logger()
+            try:
+                page = await audit_logger.query_audit_history(
+                    query, cursor=request.query_params.get("cursor"), limit=limit
+                )
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            return JSONResponse(page)
+        
+        @self.app.get("/api/audit_log/export")
+        async def audit_log_export(request: Request):
+            """Stream all matching audit events as NDJSON, newest first - REQUIRES ADMIN AUTH"""
+            require_admin_secret(request)
+            query = audit_query_from_request(request)
+            cursor = request.query_params.get("cursor")
+            if cursor:
+                try:
+                    decode_audit_cursor(cursor)
+                except ValueError as e:
+                    raise HTTPException(status_code=400, detail=str(e))
+            audit_logger = await get_audit_logger()
+            
+            async def ndjson_lines():
+                try:
+                    async for item in audit_logger.stream_audit_history(query, cursor=cursor):
+                        yield json.dumps(item, default=str) + "\n"
+                except Exception as e:
+                    logger.error(f"❌ Audit log export interrupted: {e}")
+                    yield json.dumps({"error": str(e)}) + "\n"
+            
+            return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+        
         # === GITHUB ACTIONS SCHEDULER API ===
         @self.app.post("/api/manual_broadcast")
         async def github_actions_broadcast(request: Request):
             """GitHub Actions scheduler endpoint with SAFE newsletter broadcast - REQUIRES ADMIN AUTH"""
             try:
-                # 🚦 RATE LIMITING: Check rate limits first
-                await rate_limit_middleware(request)
-                
                 if not self.services_ready:
                     return JSONResponse({"error": "Service not ready"}, status_code=503)
                 
@@ -836,6 +975,46 @@ class UnifiedWebhookService:
             """Simple favicon handler to prevent 404 errors in logs"""
             return Response(status_code=204)
     
+    def log_game_analytics_event(self, event):
+        """Route one validated analytics event to the bot's SmartLogger"""
+        bot_service = getattr(self, 'bot_instance', None)
+        analytics = getattr(bot_service, 'analytics', None) if bot_service else None
+        smart_logger = getattr(analytics, 'smart_logger', None) if analytics else None
+        if not smart_logger:
+            return
+        
+        username = event.username or "unknown"
+        language = getattr(event.language, "value", event.language) or "unknown"
+        if event.event_type.startswith("TUTORIAL_"):
+            smart_logger.tutorial_event(
+                event.event_type,
+                event.user_id,
+                duration=event.duration,
+                username=username,
+                language=language,
+                first_time=event.first_time
+            )
+        elif event.event_type == "GAME_ACHIEVEMENT":
+            smart_logger.game_achievement_event(
+                event.achievement_type or "unknown",
+                event.user_id,
+                username=username,
+                language=language,
+                score=event.score
+            )
+        else:
+            smart_logger.game_session_event(
+                event.event_type,
+                event.user_id,
+                username=username,
+                language=language,
+                score=event.score,
+                duration=event.duration,
+                items_collected=event.items_collected,
+                mistakes=event.mistakes,
+                after_tutorial=event.after_tutorial
+            )
+    
     def setup_mini_game_routes(self):
         """Setup mini game static file serving"""
         
@@ -844,23 +1023,77 @@ class UnifiedWebhookService:
         frontend_dir = mini_game_dir / "frontend" 
         public_dir = frontend_dir / "public"
         
+        # Fingerprinted + precompressed assets; HTML references are rewritten to them
+        try:
+            assets = get_asset_pipeline()
+        except Exception as e:
+            logger.error(f"❌ Mini game asset pipeline failed, serving unhashed files: {e}")
+            assets = None
+        
+        # Rendered pages live in memory (mtime-invalidated) and are revalidated via ETag
+        html_cache = get_html_cache()
+        
         @self.app.get("/game", response_class=HTMLResponse)
-        async def serve_game():
+        async def serve_game(request: Request):
             """Serve mini game HTML"""
-            html_path = public_dir / "index.html"
-            if html_path.exists():
-                with open(html_path, "r", encoding="utf-8") as f:
-                    content = f.read()
-                
-                # CRITICAL: Disable caching for HTML to force reload of changes
-                headers = {
-                    "Cache-Control": "no-cache, no-store, must-revalidate",
-                    "Pragma": "no-cache", 
-                    "Expires": "0"
-                }
-                return HTMLResponse(content=content, headers=headers)
-            raise HTTPException(status_code=404, detail="Game not found")
-
+            response = html_cache.response(request, "index.html")
+            if response is None:
+                raise HTTPException(status_code=404, detail="Game not found")
+            return response
+        
+        @self.app.post("/game/score")
+        async def record_game_score(request: Request):
+            """Receive final game score from the mini app (leaderboard + per-player stats)"""
+            user = verify_webapp_init_data(request.headers.get(WEBAPP_INIT_DATA_HEADER))
+            if user is None:
+                log_security_event("INVALID_WEBAPP_INIT_DATA", request, "Score submission without valid initData")
+                raise HTTPException(status_code=401, detail="Invalid Telegram WebApp initData")
+            
+            try:
+                data = await request.json()
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid JSON")
+            if not isinstance(data, dict):
+                raise HTTPException(status_code=400, detail="Body must be a JSON object")
+            
+            # Identity comes from the signed initData, never from the body
+            user_id = user["id"]
+            username = user.get("username")
+            try:
+                score = int(data.get("score"))
+            except (TypeError, ValueError):
+                raise HTTPException(status_code=400, detail="Missing or invalid score")
+            if not 0 <= score <= GAME_MAX_SCORE:
+                raise HTTPException(status_code=400, detail=f"score must be between 0 and {GAME_MAX_SCORE}")
+            ranks = await get_game_leaderboard().record_score(user_id, score, username)
+            
+            game_module = getattr(self.bot_instance, 'game_module', None) if self.bot_instance else None
+            if game_module:
+                game_module.record_game_score(user_id, score, {
+                    "username": username or "unknown",
+                    "language": data.get("language", user.get("language_code", "unknown"))
+                })
+            
+            logger.info(f"🎮 Score received: user {user_id} scored {score} (rank {ranks['all']})")
+            return JSONResponse({"success": True, "ranks": ranks})
+        
+        @self.app.get("/game/leaderboard")
+        async def game_leaderboard(window: str = "all", limit: int = 10, user_id: Optional[int] = None, radius: int = 2):
+            """Top players, plus the player's rank and neighbours when user_id is given"""
+            if window not in LEADERBOARD_WINDOWS:
+                raise HTTPException(status_code=400, detail=f"window must be one of {', '.join(LEADERBOARD_WINDOWS)}")
+            leaderboard = get_game_leaderboard()
+            await leaderboard.initialize()
+            result = {
+                "window": window,
+                "players": leaderboard.player_count(window),
+                "top": leaderboard.top(window, max(1, min(limit, 100)))
+            }
+            if user_id is not None:
+                result["me"] = leaderboard.rank(window, user_id)
+                result["around"] = leaderboard.around(window, user_id, max(0, min(radius, 10)))
+            return JSONResponse(result)
+        
         @self.app.post("/game/share")
         async def share_game_score(request: Request):
             """Generate share message for game score - same as bot share mechanism"""
@@ -902,82 +1135,63 @@ class UnifiedWebhookService:
                 logger.error(f"❌ Failed to generate share URL: {e}")
                 raise HTTPException(status_code=500, detail="Share URL generation failed")
         
+        # Analytics batches are validated here and processed off the request path
+        game_analytics = get_game_analytics()
+        game_analytics.on_event = self.log_game_analytics_event
+        
         @self.app.post("/api/game-analytics")
         async def receive_game_analytics(request: Request):
-            """Receive game analytics from frontend"""
+            """Receive a batch of game analytics events from frontend"""
             try:
                 data = await request.json()
-                event_type = data.get("event_type")
-                user_id = data.get("user_id")
-                
-                if not event_type or not user_id:
-                    raise HTTPException(status_code=400, detail="Missing event_type or user_id")
-                
-                # Get analytics logger from bot service
-                bot_service = getattr(self, 'bot_instance', None)  # FIXED: correct variable name
-                analytics = getattr(bot_service, 'analytics', None) if bot_service else None
-                if analytics and hasattr(analytics, 'smart_logger'):
-                    smart_logger = analytics.smart_logger
-                    
-                    # Route different event types to appropriate logging methods
-                    if event_type.startswith("TUTORIAL_"):
-                        smart_logger.tutorial_event(
-                            event_type,
-                            user_id,
-                            duration=data.get("duration"),
-                            username=data.get("username", "unknown"),
-                            language=data.get("language", "unknown"),
-                            first_time=data.get("first_time", False)
-                        )
-                    elif event_type.startswith("GAME_"):
-                        smart_logger.game_session_event(
-                            event_type,
-                            user_id,
-                            username=data.get("username", "unknown"),
-                            language=data.get("language", "unknown"),
-                            score=data.get("score"),
-                            duration=data.get("duration"),
-                            items_collected=data.get("items_collected"),
-                            mistakes=data.get("mistakes"),
-                            after_tutorial=data.get("after_tutorial", False)
-                        )
-                    elif event_type == "GAME_ACHIEVEMENT":
-                        smart_logger.game_achievement_event(
-                            data.get("achievement_type", "unknown"),
-                            user_id,
-                            username=data.get("username", "unknown"),
-                            language=data.get("language", "unknown"),
-                            score=data.get("score"),
-                            games_played=data.get("games_played")
-                        )
-                
-                logger.info(f"📊 Frontend analytics: {event_type} from user {user_id}")
-                return JSONResponse({"success": True, "message": "Analytics received"})
-                
-            except Exception as e:
-                logger.error(f"❌ Failed to process game analytics: {e}")
-                raise HTTPException(status_code=500, detail="Analytics processing failed")
+            except Exception:
+                raise HTTPException(status_code=400, detail="Invalid JSON")
+            
+            # {"events": [...]}, a bare list, or a single event from clients still on the old script
+            if isinstance(data, dict):
+                items = data.get("events", [data])
+            else:
+                items = data
+            if not isinstance(items, list) or not items:
+                raise HTTPException(status_code=400, detail="Missing events")
+            if len(items) > GAME_ANALYTICS_MAX_BATCH:
+                raise HTTPException(status_code=413, detail=f"At most {GAME_ANALYTICS_MAX_BATCH} events per batch")
+            
+            events = []
+            for item in items:
+                try:
+                    events.append(GameAnalyticsRequest(**item))
+                except (TypeError, ValueError):
+                    continue
+            rejected = len(items) - len(events)
+            
+            accepted = await game_analytics.submit(events, rejected=rejected)
+            if rejected:
+                logger.debug(f"📊 Game analytics batch: {accepted} accepted, {rejected} invalid")
+            return JSONResponse({"success": True, "accepted": accepted, "rejected": len(items) - accepted})
         
         @self.app.get("/tutorial", response_class=HTMLResponse)
-        async def serve_tutorial():
+        async def serve_tutorial(request: Request):
             """Serve tutorial HTML - separate page for clean architecture"""
-            tutorial_path = public_dir / "tutorial.html"
-            if tutorial_path.exists():
-                with open(tutorial_path, "r", encoding="utf-8") as f:
-                    content = f.read()
-                
-                # CRITICAL: Disable caching for HTML to force reload of changes
-                headers = {
-                    "Cache-Control": "no-cache, no-store, must-revalidate",
-                    "Pragma": "no-cache", 
-                    "Expires": "0"
-                }
-                return HTMLResponse(content=content, headers=headers)
-            raise HTTPException(status_code=404, detail="Tutorial not found")
+            response = html_cache.response(request, "tutorial.html")
+            if response is None:
+                raise HTTPException(status_code=404, detail="Tutorial not found")
+            return response
+        
+        @self.app.get("/assets/{file_name}")
+        async def serve_asset(request: Request, file_name: str):
+            """Fingerprinted asset (cache forever)"""
+            response = assets.serve_fingerprinted(request, file_name) if assets else None
+            if response is None:
+                raise HTTPException(status_code=404, detail="Asset not found")
+            return response
         
         @self.app.get("/game_rabbi_with_torah.png")
-        async def serve_game_image():
-            """Serve game rabbi image"""
+        async def serve_game_image(request: Request):
+            """Serve game rabbi image (WebP/AVIF when the client accepts them)"""
+            response = assets.serve_source(request, "game_rabbi_with_torah.png") if assets else None
+            if response:
+                return response
             img_path = public_dir / "game_rabbi_with_torah.png"
             if img_path.exists():
                 from fastapi.responses import FileResponse
@@ -988,33 +1202,27 @@ class UnifiedWebhookService:
         if public_dir.exists():
             self.app.mount("/static", StaticFiles(directory=public_dir), name="static")
             
-            # Also serve key game files directly for easier access
+            # Unhashed URLs kept for pages cached before fingerprinting: same bytes, revalidated via ETag
             @self.app.get("/style.css")
-            async def serve_css():
+            async def serve_css(request: Request):
+                response = assets.serve_source(request, "style.css") if assets else None
+                if response:
+                    return response
                 css_path = public_dir / "style.css"
                 if css_path.exists():
                     from fastapi.responses import FileResponse
-                    # CRITICAL: Disable caching for CSS to force reload of changes
-                    headers = {
-                        "Cache-Control": "no-cache, no-store, must-revalidate",
-                        "Pragma": "no-cache",
-                        "Expires": "0"
-                    }
-                    return FileResponse(css_path, media_type="text/css", headers=headers)
+                    return FileResponse(css_path, media_type="text/css", headers={"Cache-Control": "no-cache"})
                 raise HTTPException(status_code=404, detail="CSS not found")
             
             @self.app.get("/game.js")
-            async def serve_js():
+            async def serve_js(request: Request):
+                response = assets.serve_source(request, "game.js") if assets else None
+                if response:
+                    return response
                 js_path = public_dir / "game.js"
                 if js_path.exists():
                     from fastapi.responses import FileResponse
-                    # CRITICAL: Disable caching for JS to force reload of changes
-                    headers = {
-                        "Cache-Control": "no-cache, no-store, must-revalidate",
-                        "Pragma": "no-cache", 
-                        "Expires": "0"
-                    }
-                    return FileResponse(js_path, media_type="application/javascript", headers=headers)
+                    return FileResponse(js_path, media_type="application/javascript", headers={"Cache-Control": "no-cache"})
                 raise HTTPException(status_code=404, detail="JS not found")
     
     def add_scheduler_endpoints(self):
@@ -1024,9 +1232,6 @@ class UnifiedWebhookService:
         async def scheduler_status_endpoint(request: Request):
             """Internal scheduler status and activity monitoring"""
             try:
-                # 🚦 RATE LIMITING: Check rate limits for scheduler endpoint
-                await rate_limit_middleware(request)
-                
                 if not self.services_ready:
                     return JSONResponse({"error": "Service not ready"}, status_code=503)
                 
@@ -1069,6 +1274,17 @@ class UnifiedServiceManager:
         """Cleanup resources on shutdown"""
         logger.info("🧹 Cleaning up resources...")
         
+        # Write out pending leaderboard scores
+        try:
+            await get_game_leaderboard().close()
+        except Exception as e:
+            logger.warning(f"⚠️ Leaderboard flush on shutdown failed: {e}")
+        try:
+            await get_game_analytics().close()
+        except Exception as e:
+            logger.warning(f"⚠️ Game analytics flush on shutdown failed: {e}")
+        get_event_loop_lag_monitor().stop()
+        
         # Close Telegram client session if exists
         if hasattr(self.service, 'telegram_client') and self.service.telegram_client:
             if hasattr(self.service.telegram_client, 'close_session'):